@@ -5,8 +5,13 @@ Evaluation metrics for PV Map comparison.
 Based on the Auto_Schematization_Evaluation_Benchmark.docx formulas.
 """
 import csv
+import os
 import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools'))
+
+import pvmap_comparator
+
 
 def load_pvmap(filepath):
     """Load pvmap CSV into dict: key -> {prop: value, ...}"""
@@ -36,86 +41,48 @@ def evaluate_pvmap(ground_truth_path, generated_path):
     - PV-level metrics: pvs_matched, pvs_modified, pvs_added, pvs_deleted
     - Accuracy metrics: node_accuracy, node_coverage, pv_accuracy, precision, recall
     """
-    gt = load_pvmap(ground_truth_path)
-    gen = load_pvmap(generated_path)
-
-    gt_keys = set(gt.keys())
-    gen_keys = set(gen.keys())
-
-    # Node-level metrics
-    nodes_ground_truth = len(gt_keys)
-    nodes_auto_generated = len(gen_keys)
-
-    common_keys = gt_keys & gen_keys
-    nodes_matched = sum(1 for k in common_keys if gt[k] == gen[k])
-    nodes_with_diff = len(common_keys) - nodes_matched
-    nodes_missing_in_mcf2 = len(gt_keys - gen_keys)  # LLM missed these
-    nodes_missing_in_mcf1 = len(gen_keys - gt_keys)  # Extra keys from LLM
-
-    # PV-level metrics
-    pvs_matched = pvs_modified = pvs_added = pvs_deleted = 0
-
-    for key in common_keys:
-        gt_props = gt[key]
-        gen_props = gen[key]
+    metrics = evaluate_pvmaps({'': (ground_truth_path, generated_path)})
+    return _get_metrics_dict(metrics.iloc[0])
 
-        gt_prop_names = set(gt_props.keys())
-        gen_prop_names = set(gen_props.keys())
 
-        # Properties in both
-        common_props = gt_prop_names & gen_prop_names
-        for prop in common_props:
-            if gt_props[prop] == gen_props[prop]:
-                pvs_matched += 1
-            else:
-                pvs_modified += 1
-
-        # Properties only in generated (added)
-        pvs_added += len(gen_prop_names - gt_prop_names)
-
-        # Properties only in ground truth (deleted/missing)
-        pvs_deleted += len(gt_prop_names - gen_prop_names)
-
-    # Also count PVs from keys that are completely missing
-    for key in (gt_keys - gen_keys):
-        pvs_deleted += len(gt[key])
-
-    for key in (gen_keys - gt_keys):
-        pvs_added += len(gen[key])
+def evaluate_pvmaps(pvmap_files):
+    """
+    Compare generated PV maps against ground truth for many datasets at once.
 
-    # Calculate accuracy metrics
-    node_accuracy = (nodes_matched / nodes_ground_truth * 100) if nodes_ground_truth else 0
-    node_coverage = ((nodes_matched + nodes_with_diff) / nodes_ground_truth * 100) if nodes_ground_truth else 0
+    Args:
+        pvmap_files: dict of dataset name -> (ground_truth_path, generated_path)
 
-    denom = pvs_matched + pvs_modified + pvs_deleted
-    pv_accuracy = (pvs_matched / denom * 100) if denom else 0
-    recall = pv_accuracy  # Same formula
+    Returns:
+        DataFrame indexed by dataset with the metrics of evaluate_pvmap()
+    """
+    pvmaps = {
+        name: (load_pvmap(gt_path), load_pvmap(gen_path))
+        for name, (gt_path, gen_path) in pvmap_files.items()
+    }
+    metrics, _ = pvmap_comparator.compare_pvmaps(pvmaps)
+    return metrics
 
-    prec_denom = pvs_matched + pvs_modified + pvs_added
-    precision = ((pvs_matched + pvs_modified) / prec_denom * 100) if prec_denom else 0
 
+def _get_metrics_dict(row):
+    """Convert a row of metrics into a dict of ints and floats."""
     return {
-        # Node-level
-        'nodes_ground_truth': nodes_ground_truth,
-        'nodes_auto_generated': nodes_auto_generated,
-        'nodes_matched': nodes_matched,
-        'nodes_with_diff': nodes_with_diff,
-        'nodes_missing_in_mcf2': nodes_missing_in_mcf2,
-        'nodes_missing_in_mcf1': nodes_missing_in_mcf1,
-        # PV-level
-        'pvs_matched': pvs_matched,
-        'pvs_modified': pvs_modified,
-        'pvs_added': pvs_added,
-        'pvs_deleted': pvs_deleted,
-        # Accuracy metrics
-        'node_accuracy': round(node_accuracy, 1),
-        'node_coverage': round(node_coverage, 1),
-        'pv_accuracy': round(pv_accuracy, 1),
-        'precision': round(precision, 1),
-        'recall': round(recall, 1)
+        column: (float(row[column]) if column in pvmap_comparator.ACCURACY_COLUMNS
+                 else int(row[column]))
+        for column in (pvmap_comparator.NODE_COUNT_COLUMNS +
+                       pvmap_comparator.PV_COUNT_COLUMNS +
+                       pvmap_comparator.ACCURACY_COLUMNS)
     }
 
 
+def load_pvmap_pairs(filepath):
+    """Load a CSV with columns dataset, ground_truth, generated into a dict."""
+    pvmap_files = {}
+    with open(filepath) as f:
+        for row in csv.DictReader(f):
+            pvmap_files[row['dataset']] = (row['ground_truth'], row['generated'])
+    return pvmap_files
+
+
 def print_results(results):
     """Print evaluation results in a formatted way."""
     print("\n" + "=" * 50)
@@ -152,9 +119,32 @@ def print_results(results):
     print("=" * 50 + "\n")
 
 
+def print_batch_results(metrics):
+    """Print per-dataset and aggregate results of evaluate_pvmaps()."""
+    print("\n" + "=" * 50)
+    print("PV MAP EVALUATION RESULTS")
+    print("=" * 50)
+    print(metrics[pvmap_comparator.ACCURACY_COLUMNS].to_string())
+
+    aggregate = pvmap_comparator.get_aggregate_metrics(metrics)
+    print(f"\n--- Aggregate over {aggregate['datasets']} datasets ---")
+    for column in pvmap_comparator.ACCURACY_COLUMNS:
+        print(f"  {column}: {aggregate[column]}% (avg {aggregate['avg_' + column]}%)")
+    print("=" * 50 + "\n")
+
+
 if __name__ == '__main__':
+    if len(sys.argv) in (3, 4) and sys.argv[1] == '--batch':
+        # CSV with columns: dataset,ground_truth,generated
+        batch_metrics = evaluate_pvmaps(load_pvmap_pairs(sys.argv[2]))
+        print_batch_results(batch_metrics)
+        if len(sys.argv) == 4:
+            batch_metrics.to_csv(sys.argv[3])
+        sys.exit(0)
+
     if len(sys.argv) != 3:
         print("Usage: python eval_metrics.py <ground_truth_pvmap.csv> <generated_pvmap.csv>")
+        print("       python eval_metrics.py --batch <pvmap_pairs.csv> [<output_metrics.csv>]")
         sys.exit(1)
 
     results = evaluate_pvmap(sys.argv[1], sys.argv[2])
@@ -21,14 +21,21 @@ _DATA_DIR = os.path.dirname(_SCRIPT_DIR)
 sys.path.append(os.path.join(_DATA_DIR, 'tools', 'statvar_importer'))
 sys.path.append(os.path.join(_DATA_DIR, 'tools', 'statvar_importer', 'schema'))
 sys.path.append(os.path.join(_DATA_DIR, 'util'))
+sys.path.append(os.path.join(_SCRIPT_DIR, 'tools'))
 
 from absl import app
 from absl import flags
 
+import ground_truth_index
+import pvmap_comparator
+
 _FLAGS = flags.FLAGS
 flags.DEFINE_string('dataset_path', '', 'Path to the dataset folder')
 flags.DEFINE_string('output_dir', '', 'Output directory for results')
 flags.DEFINE_string('auto_pvmap', '', 'Path to existing auto-generated pvmap (skips LLM step)')
+flags.DEFINE_string('ground_truth_repo', '',
+                    'Repository containing the dataset folder. Its directory'
+                    ' listing is indexed once and reused across runs.')
 
 
 def load_env():
@@ -47,13 +54,31 @@ def load_env():
         print(f"Loaded environment from: {env_file}")
 
 
-def find_test_data(dataset_path):
-    """Find input file (CSV or Excel) in test_data folder."""
+def _isdir(path, index=None):
+    """Returns True if path is a directory, using the index if set."""
+    if index and index.contains(path):
+        return index.is_dir(path)
+    return os.path.isdir(path)
+
+
+def _listdir(path, index=None):
+    """Returns the entries in a directory, using the index if set."""
+    if index and index.contains(path):
+        return index.list_dir(path)
+    return os.listdir(path)
+
+
+def find_test_data(dataset_path, index=None):
+    """Find input file (CSV or Excel) in test_data folder.
+
+    Directory listings under the ground_truth_index.GroundTruthIndex
+    are looked up in the index if one is given.
+    """
     # Try different naming conventions for test data folder
     test_data_dir = None
     for folder_name in ['test_data', 'testdata', 'test-data']:
         candidate = os.path.join(dataset_path, folder_name)
-        if os.path.exists(candidate):
+        if _isdir(candidate, index):
             test_data_dir = candidate
             break
 
@@ -64,18 +89,18 @@ def find_test_data(dataset_path):
     search_dirs = [test_data_dir]
     for subfolder in ['sample_input', 'input_file', 'input_files', 'input']:
         subdir = os.path.join(test_data_dir, subfolder)
-        if os.path.exists(subdir):
+        if _isdir(subdir, index):
             search_dirs.append(subdir)
             # Also add immediate subdirectories for nested structures
-            for nested in os.listdir(subdir):
+            for nested in _listdir(subdir, index):
                 nested_path = os.path.join(subdir, nested)
-                if os.path.isdir(nested_path):
+                if _isdir(nested_path, index):
                     search_dirs.append(nested_path)
 
     for search_dir in search_dirs:
-        if not os.path.isdir(search_dir):
+        if not _isdir(search_dir, index):
             continue
-        files = os.listdir(search_dir)
+        files = _listdir(search_dir, index)
 
         # Priority 1: Look for explicit input files (*_input.csv, *_data.csv)
         for f in files:
@@ -95,8 +120,11 @@ def find_test_data(dataset_path):
     raise FileNotFoundError(f"No input file (CSV/Excel) found in {test_data_dir}")
 
 
-def find_ground_truth_pvmap(dataset_path, input_file=None):
-    """Find the ground truth pv_map CSV matching the input file."""
+def find_ground_truth_pvmap(dataset_path, input_file=None, index=None):
+    """Find the ground truth pv_map CSV matching the input file.
+
+    Directory listings are looked up in the index if one is given.
+    """
     # Extract base name from input file to match pvmap
     input_base = None
     if input_file:
@@ -106,7 +134,7 @@ def find_ground_truth_pvmap(dataset_path, input_file=None):
     search_dirs = [dataset_path]
     for subdir in ['config_files', 'pv_map']:
         subdir_path = os.path.join(dataset_path, subdir)
-        if os.path.exists(subdir_path):
+        if _isdir(subdir_path, index):
             search_dirs.append(subdir_path)
 
     def is_pvmap_file(filename):
@@ -117,9 +145,9 @@ def find_ground_truth_pvmap(dataset_path, input_file=None):
     # First try to find pvmap matching input file name
     if input_base:
         for search_dir in search_dirs:
-            if not os.path.isdir(search_dir):
+            if not _isdir(search_dir, index):
                 continue
-            for f in os.listdir(search_dir):
+            for f in _listdir(search_dir, index):
                 if is_pvmap_file(f):
                     # Extract base name by removing pvmap suffix variations
                     pvmap_base = f.lower().replace('_pvmap.csv', '').replace('_pv_map.csv', '').replace('pvmap.csv', '').replace('pv_map.csv', '')
@@ -129,9 +157,9 @@ def find_ground_truth_pvmap(dataset_path, input_file=None):
 
     # Fallback: find any pvmap
     for search_dir in search_dirs:
-        if not os.path.isdir(search_dir):
+        if not _isdir(search_dir, index):
             continue
-        for f in os.listdir(search_dir):
+        for f in _listdir(search_dir, index):
             if is_pvmap_file(f):
                 return os.path.join(search_dir, f)
 
@@ -246,7 +274,12 @@ def load_pvmap_for_diff(pvmap_path, drop_ignored_props=True):
 
 
 def compare_pvmaps_diff(auto_pvmap_path, gt_pvmap_path, output_dir):
-    """Compare pv_maps using diff-based method from mcf_diff."""
+    """Compare pv_maps with the counters of the diff-based method from mcf_diff.
+
+    Counts are computed with the pvmap_comparator using the mcf_diff value
+    normalization. The diff of all nodes is saved in diff.txt in the
+    output_dir.
+    """
     from counters import Counters
     from mcf_diff import diff_mcf_nodes
 
@@ -256,18 +289,25 @@ def compare_pvmaps_diff(auto_pvmap_path, gt_pvmap_path, output_dir):
     gt_pvmap = load_pvmap_for_diff(gt_pvmap_path)
     auto_pvmap = load_pvmap_for_diff(auto_pvmap_path)
 
-    counters.add_counter('nodes-ground-truth', len(gt_pvmap))
-    counters.add_counter('nodes-auto-generated', len(auto_pvmap))
-
-    # Config for diff
+    print(f"\n  Comparing {len(gt_pvmap)} ground truth nodes with {len(auto_pvmap)} auto nodes...")
+    metrics, pvs = pvmap_comparator.compare_pvmaps({'': (gt_pvmap, auto_pvmap)},
+                                                   normalize=True)
+    for counter, value in get_diff_counters(metrics.iloc[0], pvs).items():
+        counters.add_counter(counter, value)
+    # Keys missing on either side, including keys with only ignored props
+    for counter, keys in [
+        ('dcid-missing-in-nodes2', gt_pvmap.keys() - auto_pvmap.keys()),
+        ('dcid-missing-in-nodes1', auto_pvmap.keys() - gt_pvmap.keys()),
+    ]:
+        if keys:
+            counters.add_counter(counter, len(keys))
+
+    # Diff of all nodes without updating the counters
     config = {
         'ignore_property': ['dcid', 'Node'],
         'show_diff_nodes_only': False,
     }
-
-    # Run diff
-    print(f"\n  Comparing {len(gt_pvmap)} ground truth nodes with {len(auto_pvmap)} auto nodes...")
-    diff_str = diff_mcf_nodes(gt_pvmap, auto_pvmap, config, counters)
+    diff_str = diff_mcf_nodes(gt_pvmap, auto_pvmap, config)
 
     # Save diff output
     diff_file = os.path.join(output_dir, "diff.txt")
@@ -280,6 +320,45 @@ def compare_pvmaps_diff(auto_pvmap_path, gt_pvmap_path, output_dir):
     return counter_dict, diff_str
 
 
+def compare_pvmaps_diff_batch(pvmap_files):
+    """Compare pv_maps for many datasets in one pass.
+
+    Args:
+        pvmap_files: dict of dataset name -> (auto_pvmap_path, gt_pvmap_path)
+
+    Returns:
+        tuple of (DataFrame of metrics per dataset, dict of aggregate metrics)
+    """
+    pvmaps = {
+        name: (load_pvmap_for_diff(gt_path), load_pvmap_for_diff(auto_path))
+        for name, (auto_path, gt_path) in pvmap_files.items()
+    }
+    metrics, _ = pvmap_comparator.compare_pvmaps(pvmaps, normalize=True)
+    return metrics, pvmap_comparator.get_aggregate_metrics(metrics)
+
+
+def get_diff_counters(metrics, pvs):
+    """Return the mcf_diff counters for a dataset's metrics and PV statuses."""
+    counters = {
+        'nodes-ground-truth': metrics['nodes_ground_truth'],
+        'nodes-auto-generated': metrics['nodes_auto_generated'],
+        'nodes-matched': metrics['nodes_matched'],
+        'nodes-with-diff': metrics['nodes_with_diff'],
+        'nodes-missing-in-mcf2': metrics['nodes_missing_in_mcf2'],
+        'nodes-missing-in-mcf1': metrics['nodes_missing_in_mcf1'],
+        'PVs-matched': metrics['pvs_matched'],
+    }
+    # Modified, added and deleted PVs in total and per property
+    for status in ['modified', 'added', 'deleted']:
+        counters[f'pvs-{status}'] = metrics[f'pvs_{status}']
+        prop_counts = pvs.loc[pvs['status'] == status, 'prop'].value_counts()
+        for prop, count in sorted(prop_counts.items()):
+            counters[f'pvs-{status}-{prop}'] = count
+    return {
+        counter: int(value) for counter, value in counters.items() if value
+    }
+
+
 def print_diff_report(counters, name):
     """Print evaluation report from diff counters."""
     print("\n" + "=" * 60)
@@ -342,8 +421,11 @@ def main(_):
 
     # Step 1: Find files
     print("\n[1] Finding files...")
-    input_csv = find_test_data(dataset_path)
-    gt_path = find_ground_truth_pvmap(dataset_path, input_csv)
+    index = None
+    if _FLAGS.ground_truth_repo:
+        index = ground_truth_index.get_index(_FLAGS.ground_truth_repo)
+    input_csv = find_test_data(dataset_path, index)
+    gt_path = find_ground_truth_pvmap(dataset_path, input_csv, index)
     print(f"  Input: {os.path.basename(input_csv)}")
     print(f"  Ground truth: {os.path.basename(gt_path)}")
 
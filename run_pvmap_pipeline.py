@@ -14,6 +14,10 @@ Usage:
     python3 run_pvmap_pipeline.py --dataset=bis      # Process specific dataset
     python3 run_pvmap_pipeline.py --resume-from=edu  # Resume from dataset
     python3 run_pvmap_pipeline.py --dry-run          # Show what would be processed
+    python3 run_pvmap_pipeline.py --validation-mode=in-process  # Validate on sampled data first
+    python3 run_pvmap_pipeline.py --generation-cache=replay     # Reuse recorded PVMAP responses
+    python3 run_pvmap_pipeline.py --only-step=evaluate          # Re-run only the evaluation
+    python3 run_pvmap_pipeline.py --compare-telemetry=logs/telemetry_<timestamp>.jsonl  # Compare step times
 """
 
 import os
@@ -38,19 +42,37 @@ if pythonpath:
 
 # Now import everything else
 import argparse
+import concurrent.futures
 import csv
 import glob
+import hashlib
+import json
 import logging
 import random
 import subprocess
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
+# File profiles for encoding, dialect and header rows of input files
+sys.path.insert(0, str(BASE_DIR / "util"))
+import file_util
+
+# Shared pool for Claude Code CLI calls, also used by the schema selector
+sys.path.append(str(BASE_DIR / "tools"))
+import cli_job_pool
+import ground_truth_index
+import multi_csv_reader
+import prompt_builder
+import step_telemetry
+
+# Modules with absl flags are imported by their name in tools, like the
+# processor and tests, so that their flags are defined once.
 # Import data sampler for Phase 2 integration
-from tools.data_sampler import sample_csv_file as data_sample_csv_file
+from data_sampler import sample_csv_file as data_sample_csv_file
 
 # Import schema selector for Phase 2.5 integration
-from tools import schema_selector
+import schema_selector
+
 INPUT_DIR = BASE_DIR / "input"
 OUTPUT_DIR = BASE_DIR / "output"
 TOOLS_DIR = BASE_DIR / "tools"
@@ -58,8 +80,31 @@ LOGS_DIR = BASE_DIR / "logs"
 SCHEMA_BASE_DIR = BASE_DIR / "schema_example_files"
 PROMPT_TEMPLATE = TOOLS_DIR / "improved_pvmap_prompt.txt"
 
+# Evaluator code whose changes invalidate the recorded evaluation results
+EVALUATOR_FILES = [
+    BASE_DIR / "eval_metrics.py",
+    BASE_DIR / "evaluate_pvmap_diff.py",
+    TOOLS_DIR / "pvmap_comparator.py",
+]
+
 MAX_RETRIES = 2
 
+# Seconds for a stat_var_processor validation run in either validation mode
+VALIDATION_TIMEOUT_SECS = 300
+
+# Model flag for the Claude Code CLI used to generate PVMAPs
+GENERATION_MODEL = "sonnet"
+
+# Directory for cached PVMAP generation responses
+GENERATION_CACHE_DIR = BASE_DIR / ".generation_cache"
+
+# Steps of process_dataset in order, recorded in the per-dataset manifest
+PIPELINE_STEPS = ['prepare', 'generate', 'evaluate']
+MANIFEST_FILE = "pipeline_manifest.json"
+
+# Files larger than this have their hash cached in the file profile
+MAX_FULL_HASH_BYTES = 16 * 1024 * 1024
+
 
 class DatasetInfo:
     """Information about a dataset and its files."""
@@ -79,7 +124,6 @@ class DatasetInfo:
         # Combined/merged file paths (created during preparation)
         self.combined_metadata: Optional[Path] = None
         self.combined_sampled_data: Optional[Path] = None
-        self.combined_input_data: Optional[Path] = None
 
         # Output paths
         self.output_dir = OUTPUT_DIR / name
@@ -87,6 +131,117 @@ class DatasetInfo:
         self.notes_path = self.output_dir / "generation_notes.md"
 
 
+def get_file_hash(filepath: Optional[Path]) -> str:
+    """Returns a content hash for a file or '' if it doesn't exist.
+
+    The hash of large input files is cached in the file profile until the
+    file's size or modification time changes.
+    """
+    if not filepath or not Path(filepath).exists():
+        return ''
+    if Path(filepath).stat().st_size > MAX_FULL_HASH_BYTES:
+        return file_util.file_get_sha256(str(filepath))
+    file_hash = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+class StepManifest:
+    """Record of the inputs, outputs and results of completed pipeline steps.
+
+    The manifest is saved as JSON in the dataset output directory with an
+    entry per step:
+        'inputs': dict of input name to content hash or option value
+        'outputs': dict of output file to content hash
+        'result': JSON result of the step, such as the dataset files
+        'completed': time the step completed
+
+    A step is current if its inputs are unchanged and all its outputs
+    exist with the recorded content, in which case a re-run can skip it.
+    """
+
+    def __init__(self, path: Path, logger: logging.Logger):
+        self.path = path
+        self.logger = logger
+        self.steps: Dict[str, Dict] = {}
+        if path.exists():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.steps = json.load(f).get('steps', {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring invalid manifest {path}: {e}")
+
+    def is_current(self, step: str, inputs: Dict) -> bool:
+        """Returns True if the step completed with the same inputs and outputs."""
+        entry = self.steps.get(step)
+        if not entry or entry.get('inputs') != inputs:
+            return False
+        for output_file, output_hash in entry.get('outputs', {}).items():
+            if get_file_hash(Path(output_file)) != output_hash:
+                self.logger.info(f"Output {output_file} of step {step} has changed")
+                return False
+        return True
+
+    def has_step(self, step: str) -> bool:
+        """Returns True if the step has completed before."""
+        return step in self.steps
+
+    def get_result(self, step: str):
+        """Returns the recorded result of the step."""
+        return self.steps.get(step, {}).get('result')
+
+    def record(self, step: str, inputs: Dict, output_files: List[Path], result=None):
+        """Records a completed step with the hashes of its output files."""
+        self.steps[step] = {
+            'inputs': inputs,
+            'outputs': {str(f): get_file_hash(f) for f in output_files if f},
+            'result': result,
+            'completed': datetime.now().isoformat(),
+        }
+        self.save()
+
+    def invalidate(self, step: str):
+        """Removes the record for a step."""
+        if self.steps.pop(step, None) is not None:
+            self.save()
+
+    def save(self):
+        """Saves the manifest into the dataset output directory."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'steps': self.steps}, f, indent=2, default=str)
+        os.replace(tmp_path, self.path)
+
+
+def get_dataset_files(dataset: DatasetInfo) -> Dict:
+    """Returns the prepared files of a dataset to be recorded in the manifest."""
+    def _path_str(path: Optional[Path]) -> Optional[str]:
+        return str(path) if path else None
+
+    return {
+        'schema_examples': _path_str(dataset.schema_examples),
+        'schema_mcf': _path_str(dataset.schema_mcf),
+        'sampled_data_files': [str(f) for f in dataset.sampled_data_files],
+        'combined_sampled_data': _path_str(dataset.combined_sampled_data),
+        'combined_metadata': _path_str(dataset.combined_metadata),
+    }
+
+
+def set_dataset_files(dataset: DatasetInfo, files: Dict):
+    """Restores the prepared files of a dataset from the manifest."""
+    def _path(path: Optional[str]) -> Optional[Path]:
+        return Path(path) if path else None
+
+    dataset.schema_examples = _path(files.get('schema_examples'))
+    dataset.schema_mcf = _path(files.get('schema_mcf'))
+    dataset.sampled_data_files = [Path(f) for f in files.get('sampled_data_files', [])]
+    dataset.combined_sampled_data = _path(files.get('combined_sampled_data'))
+    dataset.combined_metadata = _path(files.get('combined_metadata'))
+
+
 def setup_logging(timestamp: str) -> Tuple[logging.Logger, Path]:
     """Set up logging for the pipeline."""
     LOGS_DIR.mkdir(exist_ok=True)
@@ -177,8 +332,20 @@ def discover_datasets(input_dir: Path) -> List[DatasetInfo]:
     return datasets
 
 
-def combine_csv_files(files: List[Path], output_path: Path, logger: logging.Logger) -> bool:
-    """Combine multiple CSV files into one, preserving headers from first file."""
+def combine_csv_files(
+    files: List[Path],
+    output_path: Path,
+    logger: logging.Logger,
+    header_rows: int = 1
+) -> bool:
+    """Combine multiple CSV files into one, preserving headers from first file.
+
+    The header rows of the other files are dropped and their columns are
+    aligned to the first file by the column names, see MultiCSVReader.
+    The sampled files have a single header row as the sampler uses the
+    default header_rows config. It is not detected from the file profile
+    as files with only text columns would lose their first data rows.
+    """
     if not files:
         return False
 
@@ -192,30 +359,15 @@ def combine_csv_files(files: List[Path], output_path: Path, logger: logging.Logg
     logger.info(f"Combining {len(files)} files into {output_path.name}")
 
     try:
+        reader = multi_csv_reader.MultiCSVReader([str(f) for f in files],
+                                                 header_rows=header_rows)
+        num_rows = 0
         with open(output_path, 'w', newline='', encoding='utf-8') as outfile:
-            writer = None
-            header_written = False
-
-            for i, filepath in enumerate(files):
-                with open(filepath, 'r', encoding='utf-8') as infile:
-                    reader = csv.reader(infile)
-                    header = next(reader, None)
-
-                    if header is None:
-                        logger.warning(f"Empty file: {filepath.name}")
-                        continue
-
-                    if not header_written:
-                        writer = csv.writer(outfile)
-                        writer.writerow(header)
-                        header_written = True
-                        logger.debug(f"Using header from: {filepath.name}")
-
-                    for row in reader:
-                        writer.writerow(row)
-
-                logger.debug(f"Added data from: {filepath.name}")
-
+            writer = csv.writer(outfile)
+            for row in reader:
+                writer.writerow(row)
+                num_rows += 1
+        logger.debug(f"Combined {num_rows} rows with columns {reader.get_columns()}")
         return True
 
     except Exception as e:
@@ -283,17 +435,21 @@ def prepare_dataset(
 
     # [PHASE 2 INTEGRATION] Sample data if needed
     if not skip_sampling:
-        if not sample_dataset_files(dataset, logger, force_resample):
-            logger.error(f"Failed to sample data for {dataset.name}")
-            return False
+        with step_telemetry.span('sample') as span:
+            if not sample_dataset_files(dataset, logger, force_resample):
+                logger.error(f"Failed to sample data for {dataset.name}")
+                span.set(status='failed')
+                return False
 
     # [PHASE 2.5 INTEGRATION] Select and copy schema files
     if not skip_schema_selection:
         if schema_base_dir is None:
             schema_base_dir = SCHEMA_BASE_DIR
-        if not select_schema_for_dataset(dataset, logger, schema_base_dir, force_schema_selection):
-            logger.error(f"Failed to select schema for {dataset.name}")
-            return False
+        with step_telemetry.span('select_schema') as span:
+            if not select_schema_for_dataset(dataset, logger, schema_base_dir, force_schema_selection):
+                logger.error(f"Failed to select schema for {dataset.name}")
+                span.set(status='failed')
+                return False
 
     # Combine sampled data files
     if dataset.sampled_data_files:
@@ -307,11 +463,10 @@ def prepare_dataset(
         logger.warning(f"No sampled data files found for {dataset.name}")
         return False
 
-    # Combine input data files
+    # Input data files are read directly by the processor, one at a time
+    # with their own header rows, without a combined copy.
     if dataset.input_data_files:
-        combined_path = dataset.test_data_path / "combined_input.csv"
-        if combine_csv_files(dataset.input_data_files, combined_path, logger):
-            dataset.combined_input_data = combined_path
+        logger.debug(f"Using {len(dataset.input_data_files)} input file(s) for validation")
     else:
         logger.warning(f"No input data files found for {dataset.name}")
 
@@ -481,23 +636,6 @@ def select_schema_for_dataset(
             combined_metadata_path.unlink()
         return False
 
-    # Get category information
-    category_info = schema_selector.get_category_info()
-    if not category_info:
-        logger.error(f"  ✗ No schema categories found")
-        if combined_metadata_path and combined_metadata_path.exists():
-            combined_metadata_path.unlink()
-        return False
-
-    # Generate schema previews
-    try:
-        schema_previews = schema_selector.generate_schema_previews(schema_base_dir)
-    except Exception as e:
-        logger.error(f"  ✗ Failed to generate schema previews: {e}")
-        if combined_metadata_path and combined_metadata_path.exists():
-            combined_metadata_path.unlink()
-        return False
-
     # Read metadata content
     try:
         with open(metadata_file, 'r', encoding='utf-8') as f:
@@ -508,19 +646,14 @@ def select_schema_for_dataset(
             combined_metadata_path.unlink()
         return False
 
-    # Build Claude prompt
-    prompt = schema_selector.build_claude_prompt(
-        metadata_content,
-        data_preview,
-        category_info,
-        schema_previews
-    )
-
-    # Invoke Claude CLI
+    # Select the category from the cache, locally or with Claude CLI
     try:
-        logger.info("  Invoking Claude CLI to select schema category...")
-        success, result = schema_selector.invoke_claude_cli(prompt)
-
+        logger.info("  Selecting schema category...")
+        success, result = schema_selector.select_schema_category(
+            metadata_content,
+            data_preview,
+            schema_base_dir
+        )
         if not success:
             logger.error(f"  ✗ Failed to select schema category: {result}")
             if combined_metadata_path and combined_metadata_path.exists():
@@ -530,7 +663,7 @@ def select_schema_for_dataset(
         selected_category = result
         logger.info(f"  ✓ Selected schema category: {selected_category}")
     except Exception as e:
-        logger.error(f"  ✗ Claude CLI invocation failed: {e}")
+        logger.error(f"  ✗ Schema category selection failed: {e}")
         if combined_metadata_path and combined_metadata_path.exists():
             combined_metadata_path.unlink()
         return False
@@ -577,8 +710,17 @@ def read_file_content(filepath: Path) -> str:
         return f.read()
 
 
-def populate_prompt(dataset: DatasetInfo, logger: logging.Logger) -> Optional[str]:
-    """Populate the prompt template with dataset files."""
+def populate_prompt(
+    dataset: DatasetInfo,
+    logger: logging.Logger,
+    max_prompt_bytes: int = prompt_builder.DEFAULT_MAX_PROMPT_BYTES
+) -> Optional[str]:
+    """Populate the prompt template with dataset files.
+
+    Repeated schema examples and duplicate data rows are dropped and the
+    schema examples and sampled data are trimmed if the prompt is larger than
+    max_prompt_bytes (0 for no limit).
+    """
     logger.info("Populating prompt template")
 
     try:
@@ -609,12 +751,24 @@ def populate_prompt(dataset: DatasetInfo, logger: logging.Logger) -> Optional[st
             logger.error("No metadata available")
             return None
 
-        # Replace placeholders
-        prompt = template.replace("{{SCHEMA_EXAMPLES}}", schema_content)
-        prompt = prompt.replace("{{SAMPLED_DATA}}", sampled_content)
-        prompt = prompt.replace("{{METADATA_CONFIG}}", metadata_content)
-
-        logger.info(f"Prompt populated: {len(prompt)} chars total")
+        # Replace placeholders within the size budget
+        prompt, stats = prompt_builder.build_prompt(template, [
+            prompt_builder.PromptSection(
+                "{{SCHEMA_EXAMPLES}}", schema_content,
+                prompt_builder.compact_schema_examples),
+            prompt_builder.PromptSection(
+                "{{SAMPLED_DATA}}", sampled_content,
+                prompt_builder.compact_sampled_data),
+            prompt_builder.PromptSection("{{METADATA_CONFIG}}", metadata_content),
+        ], max_bytes=max_prompt_bytes)
+
+        for section, size in stats.items():
+            if section == 'total':
+                continue
+            logger.info(f"  {section}: {size['bytes']} bytes (~{size['tokens']} tokens)"
+                        f" from {size['input_bytes']} bytes")
+        logger.info(f"Prompt populated: {stats['total']['bytes']} bytes"
+                    f" (~{stats['total']['tokens']} tokens) total")
         return prompt
 
     except Exception as e:
@@ -622,20 +776,82 @@ def populate_prompt(dataset: DatasetInfo, logger: logging.Logger) -> Optional[st
         return None
 
 
+def get_generation_cache_key(
+    prompt: str,
+    model: str,
+    attempt: int,
+    previous_key: str = ''
+) -> str:
+    """Returns the cache key for a PVMAP generation request.
+
+    A retry is keyed by the key of the previous attempt instead of its error
+    feedback, as the feedback has processor logs with timestamps and random
+    samples that differ across runs for the same response.
+    """
+    request = json.dumps([prompt, model, attempt, previous_key])
+    return hashlib.sha256(request.encode('utf-8')).hexdigest()
+
+
+def load_cached_generation(cache_dir: Path, key: str, logger: logging.Logger) -> Optional[Dict]:
+    """Returns the cached generation response for the key or None."""
+    cache_file = cache_dir / f"{key}.json"
+    if not cache_file.exists():
+        return None
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring invalid cached response {cache_file}: {e}")
+        return None
+
+
+def save_cached_generation(cache_dir: Path, key: str, entry: Dict) -> Path:
+    """Saves the generation response for the key into the cache."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    cache_file = cache_dir / f"{key}.json"
+    tmp_file = cache_dir / f"{key}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(entry, f)
+    os.replace(tmp_file, cache_file)
+    return cache_file
+
+
 def generate_pvmap(
     dataset: DatasetInfo,
     prompt: str,
     logger: logging.Logger,
     error_feedback: Optional[str] = None,
-    attempt: int = 0
+    attempt: int = 0,
+    cache_mode: str = 'bypass',
+    cache_dir: Optional[Path] = None,
+    cache_key: Optional[str] = None
 ) -> Tuple[bool, str]:
     """
     Call Claude Code CLI to generate PVMAP.
 
+    Responses are cached by cache_key, see get_generation_cache_key(),
+    according to cache_mode:
+        'bypass': the CLI is always called and nothing is cached.
+        'record': the CLI is called and its response is saved in the cache.
+        'replay': the cached response is returned without calling the CLI,
+            failing if there is no cached response.
+
     Returns:
         Tuple of (success, output_content)
     """
-    logger.info("Calling Claude Code CLI to generate PVMAP")
+    cache_dir = cache_dir or GENERATION_CACHE_DIR
+    if not cache_key:
+        cache_key = get_generation_cache_key(prompt, GENERATION_MODEL, attempt)
+    cached = None
+    if cache_mode == 'replay':
+        cached = load_cached_generation(cache_dir, cache_key, logger)
+        if not cached:
+            logger.error(f"No cached response for {dataset.name} attempt {attempt} in {cache_dir}")
+            return False, "No cached response to replay"
+        logger.info(f"Replaying cached response {cache_key} for {dataset.name}")
+        step_telemetry.set_attributes(cached=True)
+    else:
+        logger.info("Calling Claude Code CLI to generate PVMAP")
 
     # Add error feedback to prompt if retrying
     if error_feedback:
@@ -655,28 +871,48 @@ def generate_pvmap(
         f.write(prompt)
 
     try:
-        # Call Claude Code CLI using stdin piping for large prompts
-        # The --print flag makes Claude output directly without interactive mode
-        # Using stdin pipe avoids shell argument length limits with large prompts
-        logger.debug(f"Running Claude Code with prompt from: {prompt_file}")
-
-        with open(prompt_file, 'r', encoding='utf-8') as prompt_f:
-            result = subprocess.run(
-                ['claude', '--dangerously-skip-permissions', '--print', '--model', 'sonnet', '-p', '-'],
-                stdin=prompt_f,
-                capture_output=True,
-                text=True,
+        if cached:
+            output = cached.get('output', '')
+        else:
+            # Call Claude Code CLI using stdin piping for large prompts
+            # The --print flag makes Claude output directly without interactive mode
+            # Using stdin pipe avoids shell argument length limits with large prompts
+            # The shared pool caps concurrent CLI calls across datasets
+            # and streams the response into the dataset log.
+            logger.debug(f"Running Claude Code with prompt from: {prompt_file}")
+
+            result = cli_job_pool.get_default_pool().run(
+                ['claude', '--dangerously-skip-permissions', '--print', '--model', GENERATION_MODEL, '-p', '-'],
+                input_text=prompt,
                 timeout=900,  # 15 minute timeout for larger datasets
-                cwd=str(BASE_DIR)
+                cwd=str(BASE_DIR),
+                output_callback=logger.debug,
+                name=f"generate-{dataset.name}"
             )
 
-        output = result.stdout
-
-        if result.returncode != 0:
-            logger.error(f"Claude Code returned error: {result.stderr}")
-            return False, result.stderr
-
-        logger.info(f"Claude Code completed, output: {len(output)} chars")
+            step_telemetry.set_attributes(
+                exit_status=result.returncode,
+                timed_out=result.timed_out,
+                queue_secs=round(result.queue_secs, 3),
+                run_secs=round(result.run_secs, 3)
+            )
+            if result.timed_out:
+                logger.error("Claude Code timed out after 15 minutes")
+                return False, "Timeout"
+            if result.cancelled:
+                logger.error("Claude Code was cancelled")
+                return False, "Cancelled"
+
+            output = result.stdout
+
+            if result.returncode != 0:
+                logger.error(f"Claude Code returned error: {result.stderr}")
+                return False, result.stderr
+
+            logger.info(
+                f"Claude Code completed, output: {len(output)} chars in {result.run_secs:.1f}s "
+                f"after {result.queue_secs:.1f}s in queue"
+            )
 
         # Save full Claude output for this attempt (includes reasoning)
         response_dir = dataset.output_dir / "generated_response"
@@ -701,7 +937,20 @@ def generate_pvmap(
             f.write(output)
 
         # Try to extract CSV from output
-        pvmap_csv = extract_pvmap_csv(output, logger)
+        if cached:
+            pvmap_csv = cached.get('pvmap_csv')
+        else:
+            pvmap_csv = extract_pvmap_csv(output, logger)
+            if cache_mode == 'record':
+                cache_file = save_cached_generation(cache_dir, cache_key, {
+                    'dataset': dataset.name,
+                    'model': GENERATION_MODEL,
+                    'attempt': attempt,
+                    'created': datetime.now().isoformat(),
+                    'output': output,
+                    'pvmap_csv': pvmap_csv,
+                })
+                logger.info(f"Recorded response in cache: {cache_file}")
 
         if pvmap_csv:
             with open(dataset.pvmap_path, 'w', encoding='utf-8') as f:
@@ -712,9 +961,6 @@ def generate_pvmap(
             logger.error("Could not extract PVMAP CSV from output")
             return False, "Could not extract PVMAP CSV from output"
 
-    except subprocess.TimeoutExpired:
-        logger.error("Claude Code timed out after 15 minutes")
-        return False, "Timeout"
     except Exception as e:
         logger.error(f"Error running Claude Code: {e}")
         return False, str(e)
@@ -806,9 +1052,19 @@ def extract_log_samples(log_output: str, tail_lines: int = 50, sample_count: int
     return '\n'.join(result_parts)
 
 
+def get_input_data_files(dataset: DatasetInfo) -> List[Path]:
+    """Returns the input data files processed for validation in order.
+
+    The files are not combined as the processor reads each file with its
+    own header rows.
+    """
+    return sorted(dataset.input_data_files)
+
+
 def get_validation_command(dataset: DatasetInfo) -> str:
     """Generate the stat_var_processor validation command."""
-    input_file = dataset.combined_input_data or dataset.input_data_files[0] if dataset.input_data_files else "INPUT_FILE_NOT_FOUND"
+    input_files = get_input_data_files(dataset)
+    input_file = ",".join(str(f) for f in input_files) if input_files else "INPUT_FILE_NOT_FOUND"
     metadata_file = dataset.combined_metadata or dataset.metadata_files[0] if dataset.metadata_files else "METADATA_NOT_FOUND"
 
     cmd = (
@@ -823,8 +1079,19 @@ def get_validation_command(dataset: DatasetInfo) -> str:
     return cmd
 
 
-def run_validation(dataset: DatasetInfo, logger: logging.Logger) -> Tuple[bool, Optional[str]]:
-    """Run stat_var_processor.py automatically and return success/error."""
+def run_validation(
+    dataset: DatasetInfo,
+    logger: logging.Logger,
+    validation_mode: str = 'subprocess'
+) -> Tuple[bool, Optional[str]]:
+    """Run stat_var_processor.py automatically and return success/error.
+
+    With validation_mode 'in-process', the processor is run within this
+    process on the sampled data first, see run_validation_in_process().
+    """
+    if validation_mode == 'in-process':
+        return run_validation_in_process(dataset, logger)
+
     logger.info("Running stat_var_processor validation...")
 
     # Set up environment with PYTHONPATH
@@ -838,14 +1105,12 @@ def run_validation(dataset: DatasetInfo, logger: logging.Logger) -> Tuple[bool,
     env['PYTHONPATH'] = ':'.join(filter(None, pythonpath_parts))
 
     # Determine input files
-    input_file = dataset.combined_input_data or (
-        dataset.input_data_files[0] if dataset.input_data_files else None
-    )
+    input_files = get_input_data_files(dataset)
     metadata_file = dataset.combined_metadata or (
         dataset.metadata_files[0] if dataset.metadata_files else None
     )
 
-    if not input_file or not metadata_file:
+    if not input_files or not metadata_file:
         error_msg = "Missing input_data or metadata file for validation"
         logger.error(error_msg)
         return False, error_msg
@@ -857,7 +1122,7 @@ def run_validation(dataset: DatasetInfo, logger: logging.Logger) -> Tuple[bool,
     cmd = [
         python_cmd,
         str(TOOLS_DIR / 'stat_var_processor.py'),
-        f'--input_data={input_file}',
+        f'--input_data={",".join(str(f) for f in input_files)}',
         f'--pv_map={dataset.pvmap_path}',
         f'--config_file={metadata_file}',
         '--generate_statvar_name=True',
@@ -871,10 +1136,11 @@ def run_validation(dataset: DatasetInfo, logger: logging.Logger) -> Tuple[bool,
             cmd,
             capture_output=True,
             text=True,
-            timeout=300,  # 5 minute timeout
+            timeout=VALIDATION_TIMEOUT_SECS,
             cwd=str(BASE_DIR),
             env=env
         )
+        step_telemetry.set_attributes(exit_status=result.returncode)
 
         # Log output
         if result.stdout:
@@ -918,6 +1184,7 @@ def run_validation(dataset: DatasetInfo, logger: logging.Logger) -> Tuple[bool,
             return False, error_msg
 
     except subprocess.TimeoutExpired:
+        step_telemetry.set_attributes(timed_out=True)
         error_msg = "Validation timed out after 5 minutes"
         logger.error(error_msg)
         return False, error_msg
@@ -927,6 +1194,127 @@ def run_validation(dataset: DatasetInfo, logger: logging.Logger) -> Tuple[bool,
         return False, error_msg
 
 
+def process_in_process(
+    input_files: List[Path],
+    pvmap_file: Path,
+    metadata_file: Path,
+    output_path: Path,
+    logger: logging.Logger
+) -> Tuple[Dict[str, int], Optional[str]]:
+    """Run StatVarDataProcessor within this process on the input files.
+
+    Processing of input rows fails with a TimeoutError after
+    VALIDATION_TIMEOUT_SECS, like the timeout of the subprocess mode.
+
+    Returns:
+        Tuple of (processor counters, exception message or None)
+    """
+    # Imported on first use as the processor loads large lookup tables.
+    import config_flags
+    import stat_var_processor
+
+    counters = {}
+    try:
+        config = config_flags.init_config_from_flags(str(metadata_file))
+        config.set_config('generate_statvar_name', True)
+        config.set_config('parallelism', 0)
+        config.set_config('processing_timeout', VALIDATION_TIMEOUT_SECS)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        stat_var_processor.process(
+            stat_var_processor.StatVarDataProcessor,
+            input_data=[str(f) for f in input_files],
+            output_path=str(output_path),
+            config=config,
+            pv_map_files=[str(pvmap_file)],
+            counters=counters,
+        )
+    except Exception as e:
+        logger.error(f"Processor raised {type(e).__name__}: {e}")
+        counters[f'error-exception-{type(e).__name__}'] = 1
+        return counters, f"{type(e).__name__}: {e}"
+    return counters, None
+
+
+def get_error_counters(counters: Dict[str, int]) -> Dict[str, int]:
+    """Returns the error counters with a non-zero value."""
+    return {
+        name: value for name, value in sorted(counters.items())
+        if name.startswith('err') and value
+    }
+
+
+def format_validation_errors(
+    stage: str,
+    counters: Dict[str, int],
+    exception: Optional[str] = None
+) -> str:
+    """Returns the validation feedback with the error counters of a stage."""
+    lines = [f"Validation FAILED on the {stage} data."]
+    if exception:
+        lines.append(f"Processor exception: {exception}")
+    error_counters = get_error_counters(counters)
+    if error_counters:
+        lines.append("Error counters:")
+        lines.extend(f"  {name}: {value}" for name, value in error_counters.items())
+    if not counters.get('output-svobs-csv-rows'):
+        lines.append(
+            "No observations were generated. "
+            "The PVMAP may have incorrect column mappings or key names that don't match the input data."
+        )
+    lines.append(
+        f"Input rows processed: {counters.get('processed', 0)}, "
+        f"observations: {counters.get('output-svobs-csv-rows', 0)}"
+    )
+    return '\n'.join(lines)
+
+
+def run_validation_in_process(dataset: DatasetInfo, logger: logging.Logger) -> Tuple[bool, Optional[str]]:
+    """Validate the PVMAP in-process on the sampled data before the full input.
+
+    The pass condition is the same as the subprocess mode: the processor
+    completes and generates at least one observation. The sampled data is
+    processed first and if it fails, the validation fails without a run over
+    the full input. The full input is processed only once the sample passes,
+    into the same processed output as the subprocess mode. Error counters
+    are returned in the feedback for a failed validation.
+
+    Returns:
+        Tuple of (success, error feedback with error counters or None)
+    """
+    input_files = get_input_data_files(dataset)
+    metadata_file = dataset.combined_metadata or (
+        dataset.metadata_files[0] if dataset.metadata_files else None
+    )
+    if not input_files or not metadata_file:
+        error_msg = "Missing input_data or metadata file for validation"
+        logger.error(error_msg)
+        return False, error_msg
+    sample_files = sorted(dataset.sampled_data_files)
+    if dataset.combined_sampled_data:
+        sample_files = [dataset.combined_sampled_data]
+
+    stages = []
+    if sample_files and [Path(f) for f in sample_files] != [Path(f) for f in input_files]:
+        stages.append(('sample', sample_files,
+                       dataset.output_dir / 'validation_sample' / 'processed'))
+    stages.append(('full', input_files, dataset.output_dir / 'processed'))
+    for stage, stage_input, output_path in stages:
+        logger.info(f"Running in-process validation on {stage} data: {[str(f) for f in stage_input]}")
+        with step_telemetry.span(f'process_{stage}') as span:
+            counters, exception = process_in_process(
+                stage_input, dataset.pvmap_path, metadata_file, output_path, logger)
+            span.set(input_rows=counters.get('processed', 0),
+                     observations=counters.get('output-svobs-csv-rows', 0))
+        logger.debug(f"Validation counters for {stage} data: {counters}")
+        if exception or not counters.get('output-svobs-csv-rows'):
+            error_msg = format_validation_errors(stage, counters, exception)
+            logger.error(error_msg)
+            return False, error_msg
+
+    logger.info(f"Validation PASSED ({counters.get('output-svobs-csv-rows')} observations)")
+    return True, None
+
+
 def is_pvmap_filename(filename: str) -> bool:
     """Check if filename appears to be a PVMAP file.
 
@@ -1011,43 +1399,49 @@ def find_ground_truth_pvmap(
     if not source_repo or not source_repo.exists():
         return None
 
+    # Directory listings come from an index of the repo that is built once
+    # and reused across datasets and runs while the repo is unchanged.
+    index = ground_truth_index.get_index(str(source_repo))
+
+    def _get_pvmap_files(folder: str) -> List[str]:
+        # Files matching the glob '*_pvmap.csv'
+        return [
+            f for f in index.list_files(folder)
+            if os.path.basename(f).endswith('_pvmap.csv') and
+            not os.path.basename(f).startswith('.')
+        ]
+
     # Strategy 1: Flat directory structure (e.g., ground_truth/{dataset}/*_pvmap.csv)
     # Look for subdirectory matching dataset name
-    for subdir in source_repo.iterdir():
-        if subdir.is_dir() and dataset_name.lower() in subdir.name.lower():
-            # Look for pvmap files in this subdirectory
-            for file in subdir.iterdir():
-                if file.is_file() and is_pvmap_filename(file.name):
-                    return file
+    for subdir in index.find_dirs(dataset_name, parent=str(source_repo)):
+        # Look for pvmap files in this subdirectory
+        for file in index.list_files(subdir):
+            if is_pvmap_filename(os.path.basename(file)):
+                return Path(file)
 
     # Strategy 2: Nested structure with statvar_imports (e.g., repo/statvar_imports/{category}/{dataset}/*_pvmap.csv)
     statvar_imports = source_repo / "statvar_imports"
-    if statvar_imports.exists():
+    if index.is_dir(str(statvar_imports)):
         # Extract category from dataset name (e.g., 'bis' from 'bis_bis_central_bank_policy_rate')
         parts = dataset_name.split('_')
 
         # Strategy 2a: Direct folder match
         if parts:
             category_path = statvar_imports / parts[0]
-            if category_path.exists():
-                for potential_folder in category_path.iterdir():
-                    if potential_folder.is_dir():
-                        pvmap_files = list(potential_folder.glob("*_pvmap.csv"))
-                        if pvmap_files and dataset_name.lower() in potential_folder.name.lower():
-                            return pvmap_files[0]
+            if index.is_dir(str(category_path)):
+                for potential_folder in index.find_dirs(dataset_name, parent=str(category_path)):
+                    pvmap_files = _get_pvmap_files(potential_folder)
+                    if pvmap_files:
+                        return Path(pvmap_files[0])
 
         # Strategy 2b: Substring match across all categories
-        for category_folder in statvar_imports.iterdir():
-            if not category_folder.is_dir():
+        statvar_imports_dir = os.path.join(index.get_root(), "statvar_imports")
+        for dataset_folder in index.find_dirs(dataset_name):
+            if os.path.dirname(os.path.dirname(dataset_folder)) != statvar_imports_dir:
                 continue
-            for dataset_folder in category_folder.iterdir():
-                if not dataset_folder.is_dir():
-                    continue
-                # Check if dataset name matches folder
-                if dataset_name.lower() in dataset_folder.name.lower():
-                    pvmap_files = list(dataset_folder.glob("*_pvmap.csv"))
-                    if pvmap_files:
-                        return pvmap_files[0]
+            pvmap_files = _get_pvmap_files(dataset_folder)
+            if pvmap_files:
+                return Path(pvmap_files[0])
 
     return None
 
@@ -1165,10 +1559,25 @@ def process_dataset(
     skip_evaluation: bool = False,
     ground_truth_repo: Optional[Path] = None,
     ground_truth_pvmap: Optional[Path] = None,
-    ground_truth_dir: Optional[Path] = None
+    ground_truth_dir: Optional[Path] = None,
+    validation_mode: str = 'subprocess',
+    generation_cache: str = 'bypass',
+    generation_cache_dir: Optional[Path] = None,
+    only_step: Optional[str] = None,
+    ignore_checkpoints: bool = False,
+    max_prompt_bytes: int = prompt_builder.DEFAULT_MAX_PROMPT_BYTES
 ) -> Tuple[bool, Optional[Dict]]:
     """Process a single dataset through the full pipeline (integrates Phase 2, 2.5 & 5).
 
+    Completed steps are recorded in a manifest in the dataset output directory
+    with the hashes of their inputs and outputs. A re-run skips each step
+    whose inputs and outputs are unchanged, unless ignore_checkpoints is set.
+    With only_step, just that step is run using the recorded results of the
+    earlier steps.
+
+    The timing and resource usage of each step is recorded in the shared
+    step_telemetry recorder.
+
     Returns:
         Tuple of (success, eval_metrics_dict or None)
     """
@@ -1192,67 +1601,210 @@ def process_dataset(
         logger.info("[DRY RUN] Would process this dataset")
         return True, None
 
+    manifest = StepManifest(dataset.output_dir / MANIFEST_FILE, dataset_logger)
+
+    def should_run_step(step: str, inputs: Dict, force: bool = False) -> Optional[bool]:
+        """Returns True to run a step, False to skip it or None on error."""
+        if only_step:
+            step_index = PIPELINE_STEPS.index(step)
+            only_index = PIPELINE_STEPS.index(only_step)
+            if step_index > only_index:
+                return False
+            if step_index < only_index:
+                if not manifest.has_step(step):
+                    logger.error(f"Step '{step}' has not completed for {dataset.name}, "
+                                 f"required for --only-step={only_step}")
+                    return None
+                return False
+            return True
+        if force or ignore_checkpoints:
+            return True
+        if manifest.is_current(step, inputs):
+            logger.info(f"Skipping step '{step}' for {dataset.name}: inputs unchanged")
+            return False
+        return True
+
     # Step 1: Prepare dataset (combine/merge files, includes Phase 2 sampling & Phase 2.5 schema selection)
-    if not prepare_dataset(
-        dataset,
-        dataset_logger,
-        skip_sampling,
-        force_resample,
-        skip_schema_selection,
-        force_schema_selection,
-        schema_base_dir or SCHEMA_BASE_DIR
-    ):
-        logger.error(f"Failed to prepare dataset: {dataset.name}")
-        return False, None
+    prepare_inputs = {
+        'input_data': {str(f): get_file_hash(f) for f in dataset.input_data_files},
+        'metadata': {
+            str(f): get_file_hash(f) for f in dataset.metadata_files
+            if not f.name.endswith("_combined_metadata.csv")
+        },
+        'skip_sampling': skip_sampling,
+        'skip_schema_selection': skip_schema_selection,
+        'schema_base_dir': str(schema_base_dir or SCHEMA_BASE_DIR),
+    }
+    with step_telemetry.span('prepare', dataset=dataset.name) as span:
+        run_step = should_run_step('prepare', prepare_inputs,
+                                   force=force_resample or force_schema_selection)
+        if run_step is None:
+            span.set(status='failed')
+            return False, None
+        if run_step:
+            if not prepare_dataset(
+                dataset,
+                dataset_logger,
+                skip_sampling,
+                force_resample,
+                skip_schema_selection,
+                force_schema_selection,
+                schema_base_dir or SCHEMA_BASE_DIR
+            ):
+                logger.error(f"Failed to prepare dataset: {dataset.name}")
+                manifest.invalidate('prepare')
+                span.set(status='failed')
+                return False, None
+            manifest.record(
+                'prepare', prepare_inputs,
+                dataset.sampled_data_files + [
+                    dataset.combined_sampled_data, dataset.combined_metadata, dataset.schema_examples
+                ],
+                result=get_dataset_files(dataset))
+        else:
+            span.set(status='skipped')
+            set_dataset_files(dataset, manifest.get_result('prepare') or {})
+
+    # Steps 2-4: Populate prompt, generate and validate PVMAP
+    generate_inputs = {
+        'sampled_data': get_file_hash(dataset.combined_sampled_data),
+        'schema_examples': get_file_hash(dataset.schema_examples),
+        'metadata': get_file_hash(dataset.combined_metadata),
+        'prompt_template': get_file_hash(PROMPT_TEMPLATE),
+        'max_prompt_bytes': max_prompt_bytes,
+        'model': GENERATION_MODEL,
+        'validation_mode': validation_mode,
+    }
+    with step_telemetry.span('generate', dataset=dataset.name) as span:
+        run_step = should_run_step('generate', generate_inputs)
+        if run_step is None:
+            span.set(status='failed')
+            return False, None
+        if run_step:
+            if not generate_and_validate_pvmap(
+                dataset, logger, dataset_logger, validation_mode,
+                generation_cache, generation_cache_dir, max_prompt_bytes
+            ):
+                manifest.invalidate('generate')
+                span.set(status='failed')
+                return False, None
+            manifest.record('generate', generate_inputs, [dataset.pvmap_path])
+        else:
+            span.set(status='skipped')
+
+    # Step 5: [PHASE 5 INTEGRATION] Evaluate against ground truth
+    # The ground truth is resolved here so that changes to it in the repo
+    # or directory re-run the evaluation.
+    gt_pvmap_path = None
+    if not skip_evaluation:
+        gt_pvmap_path = find_ground_truth_pvmap(
+            dataset.name,
+            source_repo=ground_truth_repo,
+            explicit_pvmap=ground_truth_pvmap,
+            search_dir=ground_truth_dir
+        )
+    evaluate_inputs = {
+        'pvmap': get_file_hash(dataset.pvmap_path),
+        'skip_evaluation': skip_evaluation,
+        'ground_truth_pvmap': str(gt_pvmap_path or ''),
+        'ground_truth_hash': get_file_hash(gt_pvmap_path),
+        'ground_truth_dir': str(ground_truth_dir or ''),
+        'ground_truth_repo': str(ground_truth_repo or ''),
+        'evaluator': {f.name: get_file_hash(f) for f in EVALUATOR_FILES},
+    }
+    with step_telemetry.span('evaluate', dataset=dataset.name) as span:
+        run_step = should_run_step('evaluate', evaluate_inputs)
+        if run_step is None:
+            span.set(status='failed')
+            return False, None
+        if run_step:
+            eval_success, eval_metrics = evaluate_generated_pvmap(
+                dataset,
+                dataset_logger,
+                source_repo=ground_truth_repo,
+                skip_eval=skip_evaluation,
+                explicit_pvmap=ground_truth_pvmap,
+                search_dir=ground_truth_dir
+            )
+            manifest.record('evaluate', evaluate_inputs, [], result=eval_metrics)
+        else:
+            span.set(status='skipped')
+            eval_metrics = manifest.get_result('evaluate')
+
+    logger.info(f"Dataset completed successfully: {dataset.name}")
+    return True, eval_metrics
+
+
+def generate_and_validate_pvmap(
+    dataset: DatasetInfo,
+    logger: logging.Logger,
+    dataset_logger: logging.Logger,
+    validation_mode: str = 'subprocess',
+    generation_cache: str = 'bypass',
+    generation_cache_dir: Optional[Path] = None,
+    max_prompt_bytes: int = prompt_builder.DEFAULT_MAX_PROMPT_BYTES
+) -> bool:
+    """Populate the prompt, generate the PVMAP and validate it with retries.
 
+    Returns:
+        True if a generated PVMAP passed validation
+    """
     # Step 2: Populate prompt
-    prompt = populate_prompt(dataset, dataset_logger)
-    if not prompt:
-        logger.error(f"Failed to populate prompt for: {dataset.name}")
-        return False, None
+    with step_telemetry.span('populate_prompt') as span:
+        prompt = populate_prompt(dataset, dataset_logger, max_prompt_bytes)
+        if not prompt:
+            logger.error(f"Failed to populate prompt for: {dataset.name}")
+            span.set(status='failed')
+            return False
 
     # Step 3: Generate PVMAP (with retry logic)
     error_feedback = None
+    cache_key = ''
     for attempt in range(MAX_RETRIES + 1):
         if attempt > 0:
             logger.info(f"Retry attempt {attempt}/{MAX_RETRIES}")
 
-        success, output = generate_pvmap(dataset, prompt, dataset_logger, error_feedback, attempt)
+        cache_key = get_generation_cache_key(prompt, GENERATION_MODEL, attempt, cache_key)
+        with step_telemetry.span('llm_generate', attempt=attempt) as span:
+            success, output = generate_pvmap(
+                dataset, prompt, dataset_logger, error_feedback, attempt,
+                cache_mode=generation_cache, cache_dir=generation_cache_dir,
+                cache_key=cache_key
+            )
+            if not success:
+                span.set(status='failed')
 
         if not success:
             logger.error(f"PVMAP generation failed: {output}")
+            if cli_job_pool.get_default_pool().is_cancelled():
+                # The pool refuses new CLI jobs once the pipeline is interrupted.
+                logger.error(f"PVMAP generation cancelled for: {dataset.name}")
+                return False
             if attempt < MAX_RETRIES:
                 error_feedback = output
                 continue
             else:
                 logger.error(f"Max retries exceeded for: {dataset.name}")
-                return False, None
+                return False
 
         # Step 4: Automated validation
-        valid, error = run_validation(dataset, dataset_logger)
+        with step_telemetry.span('validate', attempt=attempt,
+                                 validation_mode=validation_mode) as span:
+            valid, error = run_validation(dataset, dataset_logger, validation_mode)
+            if not valid:
+                span.set(status='failed')
 
         if valid:
-            # [PHASE 5 INTEGRATION] Evaluate against ground truth
-            eval_success, eval_metrics = evaluate_generated_pvmap(
-                dataset,
-                dataset_logger,
-                source_repo=ground_truth_repo,
-                skip_eval=skip_evaluation,
-                explicit_pvmap=ground_truth_pvmap,
-                search_dir=ground_truth_dir
-            )
-
-            logger.info(f"Dataset completed successfully: {dataset.name}")
-            return True, eval_metrics
+            return True
         else:
             # Retry with error feedback
             logger.warning(f"Validation failed, will retry with error feedback")
             error_feedback = error
             if attempt >= MAX_RETRIES:
                 logger.error(f"Max retries exceeded for: {dataset.name}")
-                return False, None
+                return False
 
-    return False, None
+    return False
 
 
 def main():
@@ -1322,6 +1874,66 @@ def main():
         type=str,
         help='Path to directory containing ground truth PVMAP files (searched by dataset name, takes precedence over --ground-truth-repo)'
     )
+    parser.add_argument(
+        '--validation-mode',
+        choices=['subprocess', 'in-process'],
+        default='subprocess',
+        help='Run stat_var_processor validation as a subprocess on the full input, '
+             'or in-process on the sampled data first (default: subprocess)'
+    )
+    parser.add_argument(
+        '--generation-cache',
+        choices=['bypass', 'record', 'replay'],
+        default='bypass',
+        help='Cache for PVMAP generation responses: bypass the cache, record '
+             'CLI responses or replay recorded responses without the CLI (default: bypass)'
+    )
+    parser.add_argument(
+        '--generation-cache-dir',
+        type=str,
+        default=str(GENERATION_CACHE_DIR),
+        help='Directory for cached PVMAP generation responses (default: .generation_cache/)'
+    )
+    parser.add_argument(
+        '--only-step',
+        choices=PIPELINE_STEPS,
+        help='Run only this step using the recorded results of earlier steps'
+    )
+    parser.add_argument(
+        '--ignore-checkpoints',
+        action='store_true',
+        help='Run all steps even if their inputs are unchanged since the last run'
+    )
+    parser.add_argument(
+        '--max-parallel-datasets',
+        type=int,
+        default=1,
+        help='Number of datasets processed concurrently (default: 1)'
+    )
+    parser.add_argument(
+        '--max-cli-jobs',
+        type=int,
+        default=2,
+        help='Maximum number of concurrent Claude Code CLI calls (default: 2)'
+    )
+    parser.add_argument(
+        '--max-prompt-bytes',
+        type=int,
+        default=prompt_builder.DEFAULT_MAX_PROMPT_BYTES,
+        help='Maximum prompt size in bytes; schema examples and sampled data '
+             'are trimmed to fit (0 = no limit, default: %(default)s)'
+    )
+    parser.add_argument(
+        '--telemetry-file',
+        type=str,
+        help='JSON Lines file for the timing and resource usage of each step '
+             '(default: logs/telemetry_<timestamp>.jsonl)'
+    )
+    parser.add_argument(
+        '--compare-telemetry',
+        type=str,
+        help='Telemetry file of an earlier run to compare this run with'
+    )
     parser.add_argument(
         '--input-dir',
         type=str,
@@ -1345,6 +1957,9 @@ def main():
     # Setup logging
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     logger, log_file = setup_logging(timestamp)
+    telemetry_file = Path(args.telemetry_file) if args.telemetry_file else (
+        LOGS_DIR / f"telemetry_{timestamp}.jsonl")
+    telemetry = step_telemetry.init_default_telemetry(str(telemetry_file), run_id=timestamp)
 
     # Validate contradictory flag combinations
     if args.skip_schema_selection and args.force_schema_selection:
@@ -1382,6 +1997,7 @@ def main():
     logger.info("PVMAP Generation & Validation Pipeline")
     logger.info(f"Started: {datetime.now().isoformat()}")
     logger.info(f"Log file: {log_file}")
+    logger.info(f"Telemetry file: {telemetry_file}")
     logger.info("=" * 70)
 
     # Discover datasets
@@ -1435,6 +2051,10 @@ def main():
     # Track if explicit pvmap has been used
     explicit_pvmap_used = False
 
+    cli_job_pool.init_default_pool(max_jobs=args.max_cli_jobs)
+    dataset_executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=max(1, args.max_parallel_datasets))
+    dataset_futures = []
     for dataset in datasets:
         # Setup per-dataset logging
         dataset_logger = setup_dataset_logging(dataset.name, timestamp)
@@ -1463,28 +2083,40 @@ def main():
                 # Note: ground_truth_repo will still be passed, but won't be used
                 # since we're explicitly setting the other params to None
 
+        # Determine ground_truth_repo: pass None if we're using explicit file or dir
+        # (or if subsequent dataset after explicit file was used)
+        current_ground_truth_repo = ground_truth_repo_path
+        if ground_truth_pvmap_path or ground_truth_dir_path:
+            current_ground_truth_repo = None
+
+        # Datasets run in parallel threads so that one dataset's CLI wait
+        # overlaps with another's sampling and validation.
+        dataset_futures.append((dataset, dataset_executor.submit(
+            process_dataset,
+            dataset,
+            logger,
+            dataset_logger,
+            dry_run=args.dry_run,
+            skip_sampling=args.skip_sampling,
+            force_resample=args.force_resample,
+            skip_schema_selection=args.skip_schema_selection,
+            force_schema_selection=args.force_schema_selection,
+            schema_base_dir=schema_base_dir_path,
+            skip_evaluation=args.skip_evaluation,
+            ground_truth_repo=current_ground_truth_repo,
+            ground_truth_pvmap=current_ground_truth_pvmap,
+            ground_truth_dir=current_ground_truth_dir,
+            validation_mode=args.validation_mode,
+            generation_cache=args.generation_cache,
+            generation_cache_dir=Path(args.generation_cache_dir),
+            only_step=args.only_step,
+            ignore_checkpoints=args.ignore_checkpoints,
+            max_prompt_bytes=args.max_prompt_bytes
+        )))
+
+    for dataset, future in dataset_futures:
         try:
-            # Determine ground_truth_repo: pass None if we're using explicit file or dir
-            # (or if subsequent dataset after explicit file was used)
-            current_ground_truth_repo = ground_truth_repo_path
-            if ground_truth_pvmap_path or ground_truth_dir_path:
-                current_ground_truth_repo = None
-
-            success, eval_metrics = process_dataset(
-                dataset,
-                logger,
-                dataset_logger,
-                dry_run=args.dry_run,
-                skip_sampling=args.skip_sampling,
-                force_resample=args.force_resample,
-                skip_schema_selection=args.skip_schema_selection,
-                force_schema_selection=args.force_schema_selection,
-                schema_base_dir=schema_base_dir_path,
-                skip_evaluation=args.skip_evaluation,
-                ground_truth_repo=current_ground_truth_repo,
-                ground_truth_pvmap=current_ground_truth_pvmap,
-                ground_truth_dir=current_ground_truth_dir
-            )
+            success, eval_metrics = future.result()
 
             results['processed'] += 1
             if success:
@@ -1497,10 +2129,14 @@ def main():
 
         except KeyboardInterrupt:
             logger.info("\nPipeline interrupted by user")
+            for _, pending in dataset_futures:
+                pending.cancel()
+            cli_job_pool.get_default_pool().cancel_all()
             break
         except Exception as e:
             logger.error(f"Error processing {dataset.name}: {e}")
             results['failed'] += 1
+    dataset_executor.shutdown(wait=True)
 
     # Summary
     logger.info("\n" + "=" * 70)
@@ -1510,6 +2146,13 @@ def main():
     logger.info(f"Processed: {results['processed']}")
     logger.info(f"Successful: {results['successful']}")
     logger.info(f"Failed: {results['failed']}")
+    cli_metrics = cli_job_pool.get_default_pool().get_metrics()
+    if cli_metrics.get('cli-jobs-completed'):
+        logger.info(
+            f"Claude CLI calls: {cli_metrics['cli-jobs-completed']}, "
+            f"run time: {cli_metrics.get('cli-run-secs', 0):.1f}s, "
+            f"queue wait: {cli_metrics.get('cli-queue-wait-secs', 0):.1f}s"
+        )
 
     # Add evaluation metrics summary (Phase 5 integration)
     if eval_metrics_list:
@@ -1522,8 +2165,27 @@ def main():
     elif not args.skip_evaluation:
         logger.info(f"\nEvaluation: 0 datasets evaluated (no ground truth found)")
 
+    # Step timing and resource usage
+    telemetry.close()
+    telemetry_records = telemetry.get_records()
+    if telemetry_records:
+        logger.info("\nStep Telemetry:")
+        logger.info(step_telemetry.format_table(
+            step_telemetry.summarize_records(telemetry_records),
+            step_telemetry.SUMMARY_COLUMNS))
+        if args.compare_telemetry:
+            try:
+                baseline_records = step_telemetry.load_records(args.compare_telemetry)
+                logger.info(f"\nComparison with {args.compare_telemetry}:")
+                logger.info(step_telemetry.format_table(
+                    step_telemetry.compare_records(baseline_records, telemetry_records),
+                    step_telemetry.COMPARE_COLUMNS))
+            except OSError as e:
+                logger.warning(f"Unable to load telemetry {args.compare_telemetry}: {e}")
+
     logger.info(f"\nCompleted: {datetime.now().isoformat()}")
     logger.info(f"Log file: {log_file}")
+    logger.info(f"Telemetry file: {telemetry_file}")
 
     return 0 if results['failed'] == 0 else 1
 
@@ -0,0 +1,346 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for run_pvmap_pipeline.py without the Claude CLI or DC API."""
+
+import logging
+import os
+import random
+import stat
+import sys
+import tempfile
+import unittest
+
+from pathlib import Path
+from unittest.mock import patch
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+
+import run_pvmap_pipeline
+
+_LOGGER = logging.getLogger('run_pvmap_pipeline_test')
+
+# Stub for the claude CLI that logs each call and returns a PVMAP.
+_STUB_CLI = """#!/bin/sh
+cat > /dev/null
+echo call >> "$STUB_CLI_CALLS"
+echo "key,property,value"
+echo "place,observationAbout,{Data}"
+"""
+
+
+class RunPvmapPipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset = self._get_dataset('test_dataset')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write_file(self, name: str, content: str) -> Path:
+        filename = Path(self.tmp_dir.name) / name
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        filename.write_text(content)
+        return filename
+
+    def _get_dataset(self, name: str) -> run_pvmap_pipeline.DatasetInfo:
+        dataset = run_pvmap_pipeline.DatasetInfo(
+            name, Path(self.tmp_dir.name) / name)
+        dataset.output_dir = Path(self.tmp_dir.name) / 'output' / name
+        dataset.pvmap_path = dataset.output_dir / 'generated_pvmap.csv'
+        dataset.notes_path = dataset.output_dir / 'generation_notes.md'
+        dataset.metadata_files = [
+            self._write_file(f'{name}/test_data/{name}_metadata.csv',
+                             'parameter,value\nheader_rows,1\n')
+        ]
+        dataset.input_data_files = [
+            self._write_file(f'{name}/test_data/{name}_{i}_input.csv',
+                             f'place,count\ngeoId/0{i},{i}\n')
+            for i in [2, 1]
+        ]
+        dataset.sampled_data_files = [
+            self._write_file(f'{name}/test_data/{name}_{i}_sampled_data.csv',
+                             f'place,count\ngeoId/0{i},{i}\n')
+            for i in [2, 1]
+        ]
+        return dataset
+
+    def test_run_validation_in_process(self):
+        calls = []
+        stage_counters = {
+            'sample': ({
+                'output-svobs-csv-rows': 2,
+                'error-place-lookup': 1
+            }, None),
+            'full': ({
+                'output-svobs-csv-rows': 4
+            }, None),
+        }
+
+        def _process_in_process(input_files, pvmap_file, metadata_file,
+                                output_path, logger):
+            stage = 'sample' if 'validation_sample' in str(
+                output_path) else 'full'
+            calls.append((stage, input_files))
+            return stage_counters[stage]
+
+        with patch.object(run_pvmap_pipeline, 'process_in_process',
+                          _process_in_process):
+            # Error counters alone don't fail the validation, like the
+            # subprocess mode.
+            self.assertEqual((True, None),
+                             run_pvmap_pipeline.run_validation_in_process(
+                                 self.dataset, _LOGGER))
+            # All sampled files are validated before the full input.
+            self.assertEqual([
+                ('sample', sorted(self.dataset.sampled_data_files)),
+                ('full', sorted(self.dataset.input_data_files)),
+            ], calls)
+
+            # Full input is not processed if the sample fails.
+            calls.clear()
+            stage_counters['sample'] = ({'error-pvmap': 1}, None)
+            valid, error = run_pvmap_pipeline.run_validation_in_process(
+                self.dataset, _LOGGER)
+            self.assertFalse(valid)
+            self.assertIn('error-pvmap: 1', error)
+            self.assertIn('No observations were generated', error)
+            self.assertEqual(['sample'], [stage for stage, _ in calls])
+
+            # Processor exceptions fail the validation.
+            stage_counters['sample'] = ({
+                'output-svobs-csv-rows': 2
+            }, 'TimeoutError: Processing timed out')
+            valid, error = run_pvmap_pipeline.run_validation_in_process(
+                self.dataset, _LOGGER)
+            self.assertFalse(valid)
+            self.assertIn('TimeoutError', error)
+
+    def _get_stub_cli_env(self) -> tuple:
+        """Returns the environment with the stub CLI in the PATH and the file
+        with its calls."""
+        bin_dir = Path(self.tmp_dir.name) / 'bin'
+        bin_dir.mkdir()
+        stub_cli = bin_dir / 'claude'
+        stub_cli.write_text(_STUB_CLI)
+        stub_cli.chmod(stub_cli.stat().st_mode | stat.S_IEXEC)
+        calls_file = Path(self.tmp_dir.name) / 'calls.txt'
+        self.dataset.output_dir.mkdir(parents=True)
+        env = {
+            'PATH': f'{bin_dir}{os.pathsep}{os.environ.get("PATH", "")}',
+            'STUB_CLI_CALLS': str(calls_file),
+        }
+        return env, calls_file
+
+    def _run_generation(self, cache_mode: str, cache_dir: Path) -> bool:
+        """Returns the result of generate_and_validate_pvmap with validation
+        failing on the first attempt with random processor logs."""
+        attempts = []
+
+        def _run_validation(dataset, logger, validation_mode):
+            attempts.append(validation_mode)
+            if len(attempts) == 1:
+                logs = '\n'.join(f'line {i}' for i in range(200))
+                return False, run_pvmap_pipeline.extract_log_samples(logs)
+            return True, None
+
+        with patch.object(run_pvmap_pipeline, 'populate_prompt',
+                          return_value='Generate a PVMAP'), patch.object(
+                              run_pvmap_pipeline, 'run_validation',
+                              _run_validation):
+            return run_pvmap_pipeline.generate_and_validate_pvmap(
+                self.dataset,
+                _LOGGER,
+                _LOGGER,
+                generation_cache=cache_mode,
+                generation_cache_dir=cache_dir)
+
+    def test_generation_cache_replay(self):
+        env, calls_file = self._get_stub_cli_env()
+        cache_dir = Path(self.tmp_dir.name) / 'cache'
+        with patch.dict(os.environ, env):
+            random.seed(1)
+            self.assertTrue(self._run_generation('record', cache_dir))
+            self.assertEqual(2, len(calls_file.read_text().splitlines()))
+            self.assertEqual(2, len(os.listdir(cache_dir)))
+
+            # Retries are replayed although the sampled logs differ.
+            random.seed(2)
+            self.dataset.pvmap_path.unlink()
+            self.assertTrue(self._run_generation('replay', cache_dir))
+            self.assertEqual(2, len(calls_file.read_text().splitlines()))
+            self.assertEqual('key,property,value\nplace,observationAbout,{Data}',
+                             self.dataset.pvmap_path.read_text())
+
+    def test_generation_cancelled(self):
+        env, calls_file = self._get_stub_cli_env()
+        pool = run_pvmap_pipeline.cli_job_pool.CLIJobPool()
+        pool.cancel_all()
+        with patch.dict(os.environ, env), patch.object(
+                run_pvmap_pipeline.cli_job_pool, 'get_default_pool',
+                return_value=pool), patch.object(
+                    run_pvmap_pipeline, 'generate_pvmap',
+                    wraps=run_pvmap_pipeline.generate_pvmap) as generate:
+            # Generation is not retried once the pool is cancelled.
+            self.assertFalse(self._run_generation('bypass', None))
+        self.assertEqual(1, generate.call_count)
+        self.assertFalse(calls_file.exists())
+        pool.shutdown()
+
+    def _process_dataset(self, **kwargs) -> list:
+        """Returns the steps run by process_dataset with stubs for each step."""
+        steps = []
+        dataset = self.dataset
+
+        def _prepare_dataset(dataset, logger, *args):
+            steps.append('prepare')
+            dataset.combined_sampled_data = dataset.sampled_data_files[0]
+            dataset.combined_metadata = dataset.metadata_files[0]
+            return True
+
+        def _generate_and_validate_pvmap(dataset, *args):
+            steps.append('generate')
+            dataset.output_dir.mkdir(parents=True, exist_ok=True)
+            dataset.pvmap_path.write_text('key,property,value\n')
+            return True
+
+        def _evaluate_generated_pvmap(dataset, logger, **kwargs):
+            steps.append('evaluate')
+            return True, {'node_accuracy': len(steps)}
+
+        with patch.object(run_pvmap_pipeline, 'prepare_dataset',
+                          _prepare_dataset), patch.object(
+                              run_pvmap_pipeline, 'generate_and_validate_pvmap',
+                              _generate_and_validate_pvmap), patch.object(
+                                  run_pvmap_pipeline,
+                                  'evaluate_generated_pvmap',
+                                  _evaluate_generated_pvmap):
+            success, eval_metrics = run_pvmap_pipeline.process_dataset(
+                dataset, _LOGGER, _LOGGER, **kwargs)
+        self.assertTrue(success)
+        return steps
+
+    def test_process_dataset_checkpoints(self):
+        evaluator_file = self._write_file('eval_metrics.py', 'VERSION = 1\n')
+        with patch.object(run_pvmap_pipeline, 'EVALUATOR_FILES',
+                          [evaluator_file]):
+            self.assertEqual(['prepare', 'generate', 'evaluate'],
+                             self._process_dataset())
+            # Steps with unchanged inputs and outputs are skipped.
+            self.assertEqual([], self._process_dataset())
+
+            # A changed evaluator re-runs only the evaluation.
+            evaluator_file.write_text('VERSION = 2\n')
+            self.assertEqual(['evaluate'], self._process_dataset())
+
+            # A changed output re-runs its step. The evaluation is current
+            # as the step regenerates the recorded PVMAP.
+            self.dataset.pvmap_path.write_text('key,property,value\nx,y,z\n')
+            self.assertEqual(['generate'], self._process_dataset())
+
+            # A changed input re-runs its step, and later steps only if the
+            # prepared files change.
+            self.dataset.input_data_files[0].write_text('place,count\n')
+            self.assertEqual(['prepare'], self._process_dataset())
+            self.dataset.sampled_data_files[0].write_text('place,count\n')
+            self.assertEqual(['prepare', 'generate'], self._process_dataset())
+
+            self.assertEqual(['prepare', 'generate', 'evaluate'],
+                             self._process_dataset(ignore_checkpoints=True))
+
+    def test_process_dataset_ground_truth_changes(self):
+        gt_dir = Path(self.tmp_dir.name) / 'ground_truth'
+        gt_file = self._write_file('ground_truth/test_dataset_pvmap.csv',
+                                   'key,property,value\n')
+        self.assertEqual(['prepare', 'generate', 'evaluate'],
+                         self._process_dataset(ground_truth_dir=gt_dir))
+        self.assertEqual([], self._process_dataset(ground_truth_dir=gt_dir))
+        # A changed ground truth in the directory re-runs the evaluation.
+        gt_file.write_text('key,property,value\nMale,gender,Male\n')
+        self.assertEqual(['evaluate'],
+                         self._process_dataset(ground_truth_dir=gt_dir))
+
+    def test_process_dataset_large_input_changes(self):
+        # Large inputs are hashed with their full content, including the
+        # middle of the file beyond the profile's sample bytes.
+        input_file = self.dataset.input_data_files[0]
+        input_file.write_text('place,count\n' + 'geoId/06,12\n' * 60000)
+        with patch.object(run_pvmap_pipeline, 'MAX_FULL_HASH_BYTES', 100):
+            self.assertEqual(['prepare', 'generate', 'evaluate'],
+                             self._process_dataset())
+            input_file.write_text('place,count\n' + 'geoId/06,12\n' * 30000 +
+                                  'geoId/06,13\n' + 'geoId/06,12\n' * 29999)
+            self.assertEqual(['prepare'], self._process_dataset())
+
+    def test_process_dataset_only_step(self):
+        # Earlier steps are required for --only-step.
+        with patch.object(run_pvmap_pipeline, 'prepare_dataset') as prepare:
+            success, _ = run_pvmap_pipeline.process_dataset(
+                self.dataset, _LOGGER, _LOGGER, only_step='generate')
+        self.assertFalse(success)
+        prepare.assert_not_called()
+
+        self.assertEqual(['prepare', 'generate', 'evaluate'],
+                         self._process_dataset())
+        # Only the requested step is run even if its inputs are unchanged.
+        self.assertEqual(['generate'],
+                         self._process_dataset(only_step='generate'))
+        self.assertEqual(['evaluate'],
+                         self._process_dataset(only_step='evaluate'))
+        self.assertEqual(['prepare'],
+                         self._process_dataset(only_step='prepare'))
+
+    def test_combine_csv_files_text_rows(self):
+        # Data rows with only text columns are not detected as headers.
+        files = [
+            self._write_file('text_1.csv', 'place,name\n'
+                             'geoId/06,California\ngeoId/36,New York\n'),
+            self._write_file('text_2.csv', 'name,place\n'
+                             'Texas,geoId/48\nOhio,geoId/39\n'),
+        ]
+        output_file = Path(self.tmp_dir.name) / 'combined.csv'
+        self.assertTrue(
+            run_pvmap_pipeline.combine_csv_files(files, output_file, _LOGGER))
+        self.assertEqual([
+            'place,name',
+            'geoId/06,California',
+            'geoId/36,New York',
+            'geoId/48,Texas',
+            'geoId/39,Ohio',
+        ],
+                         output_file.read_text().splitlines())
+
+    def test_process_in_process_timeout(self):
+        import stat_var_processor
+        configs = []
+
+        def _process(data_processor_class, input_data, output_path, config,
+                     pv_map_files, counters):
+            configs.append(config)
+            raise TimeoutError('Processing timed out')
+
+        with patch.object(stat_var_processor, 'process', _process):
+            counters, exception = run_pvmap_pipeline.process_in_process(
+                self.dataset.input_data_files, self.dataset.pvmap_path,
+                self.dataset.metadata_files[0],
+                self.dataset.output_dir / 'processed', _LOGGER)
+        self.assertEqual(run_pvmap_pipeline.VALIDATION_TIMEOUT_SECS,
+                         configs[0].get('processing_timeout'))
+        self.assertEqual('TimeoutError: Processing timed out', exception)
+        self.assertEqual({'error-exception-TimeoutError': 1}, counters)
+
+
+if __name__ == '__main__':
+    unittest.main()
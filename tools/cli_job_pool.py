@@ -0,0 +1,327 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Pool of subprocess jobs for long running command line tools.
+
+Runs commands such as the 'claude' CLI in the background with a cap on the
+number of concurrent processes, so that callers can overlap the wait for one
+command with other work. Each job has its own timeout, can be cancelled
+while queued or running and streams its stdout line by line to an optional
+callback, such as a logger for the dataset being processed.
+
+Once all jobs are cancelled, such as on an interrupt, the pool doesn't run
+any more jobs and callers get a cancelled result for new submits.
+
+The time each job waits in the queue and the time it runs are recorded in
+the result and added to the pool metrics.
+
+Example:
+  pool = cli_job_pool.get_default_pool()
+  future = pool.submit(['claude', '--print', '-p', '-'],
+                       input_text=prompt,
+                       timeout=900,
+                       output_callback=logger.debug)
+  ... do other work ...
+  result = future.result()
+  if result.returncode == 0 and not result.timed_out:
+     print(result.stdout)
+"""
+
+import concurrent.futures
+import os
+import subprocess
+import threading
+import time
+
+from absl import logging
+from typing import Callable, NamedTuple
+
+# Default number of concurrent jobs in the shared pool.
+_DEFAULT_MAX_JOBS = 2
+
+_DEFAULT_POOL = None
+_DEFAULT_POOL_LOCK = threading.Lock()
+
+
+class CLIJobResult(NamedTuple):
+    """Result of a command run by the CLIJobPool."""
+    returncode: int
+    stdout: str
+    stderr: str
+    # Set if the process was killed after the timeout.
+    timed_out: bool = False
+    # Set if the job was cancelled before or while running.
+    cancelled: bool = False
+    # Seconds the job waited in the queue before it started.
+    queue_secs: float = 0.0
+    # Seconds the process ran.
+    run_secs: float = 0.0
+
+
+class _Job:
+    """State of a submitted job."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.process = None
+        self.timed_out = threading.Event()
+        self.cancelled = threading.Event()
+
+
+class CLIJobPool:
+    """Runs commands as subprocesses with bounded concurrency."""
+
+    def __init__(self, max_jobs: int = _DEFAULT_MAX_JOBS):
+        """Initializes the pool.
+
+        Args:
+          max_jobs: maximum number of processes running at a time.
+            Jobs submitted beyond this wait in a queue.
+        """
+        self._max_jobs = max(1, max_jobs)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self._max_jobs, thread_name_prefix='cli-job')
+        self._lock = threading.Lock()
+        # Dict of metric name to the job count or seconds.
+        self._metrics = {}
+        # Dict of future to the _Job for jobs that are queued or running.
+        self._jobs = {}
+        # Set once all jobs are cancelled to refuse new jobs.
+        self._cancelled = threading.Event()
+
+    def get_max_jobs(self) -> int:
+        return self._max_jobs
+
+    def submit(self,
+               cmd: list,
+               input_text: str = '',
+               timeout: float = None,
+               cwd: str = None,
+               env: dict = None,
+               output_callback: Callable[[str], None] = None,
+               name: str = '') -> concurrent.futures.Future:
+        """Queues a command to be run in a subprocess.
+
+        Args:
+          cmd: list of the command and its arguments.
+          input_text: text written to the stdin of the process.
+          timeout: seconds after which the process is killed once started.
+          cwd: working directory for the process.
+          env: environment variables for the process.
+          output_callback: function called with each line of stdout.
+          name: name of the job for logs.
+
+        Returns:
+          future with the CLIJobResult for the command. The future raises
+          OSError if the command can't be started. If the pool is cancelled,
+          the result is marked cancelled without running the command.
+        """
+        job = _Job(name or os.path.basename(cmd[0]))
+        submit_time = time.perf_counter()
+        # Jobs are added under the lock so that cancel_all() either
+        # cancels them or they are refused.
+        with self._lock:
+            if self._cancelled.is_set():
+                future = None
+            else:
+                future = self._executor.submit(self._run_job, job, cmd,
+                                               input_text, timeout, cwd, env,
+                                               output_callback, submit_time)
+                self._jobs[future] = job
+        if future is None:
+            logging.info(f'Not running job {job.name} in cancelled pool')
+            future = concurrent.futures.Future()
+            future.set_result(
+                CLIJobResult(returncode=-1,
+                             stdout='',
+                             stderr='',
+                             cancelled=True))
+            self._add_metric('cli-jobs-cancelled', 1)
+            return future
+        future.add_done_callback(self._remove_job)
+        self._add_metric('cli-jobs-submitted', 1)
+        return future
+
+    def run(self, cmd: list, **kwargs) -> CLIJobResult:
+        """Runs a command in the pool and waits for its result.
+
+        Args:
+          cmd: list of the command and its arguments.
+          kwargs: other arguments for submit().
+
+        Returns:
+          CLIJobResult for the command.
+        """
+        return self.submit(cmd, **kwargs).result()
+
+    def cancel(self, future: concurrent.futures.Future) -> bool:
+        """Cancels a job, terminating its process if it is running.
+
+        Returns:
+          True if the job was queued or running.
+        """
+        if future.cancel():
+            self._add_metric('cli-jobs-cancelled', 1)
+            return True
+        with self._lock:
+            job = self._jobs.get(future)
+        if not job:
+            return False
+        job.cancelled.set()
+        self._kill(job)
+        return True
+
+    def cancel_all(self):
+        """Cancels all queued and running jobs and refuses new jobs."""
+        with self._lock:
+            self._cancelled.set()
+            futures = list(self._jobs.keys())
+        for future in futures:
+            self.cancel(future)
+
+    def is_cancelled(self) -> bool:
+        """Returns True if all jobs were cancelled by cancel_all()."""
+        return self._cancelled.is_set()
+
+    def shutdown(self, cancel: bool = False):
+        """Waits for all jobs to complete after cancelling them if set."""
+        if cancel:
+            self.cancel_all()
+        self._executor.shutdown(wait=True)
+
+    def get_metrics(self) -> dict:
+        """Returns a dict with the job counts and the queue-wait and run
+        times in seconds."""
+        with self._lock:
+            return dict(self._metrics)
+
+    def _add_metric(self, name: str, value: float):
+        with self._lock:
+            self._metrics[name] = self._metrics.get(name, 0) + value
+
+    def _remove_job(self, future: concurrent.futures.Future):
+        with self._lock:
+            self._jobs.pop(future, None)
+
+    def _kill(self, job: _Job):
+        process = job.process
+        if process and process.poll() is None:
+            logging.info(f'Killing job {job.name} with pid {process.pid}')
+            process.kill()
+
+    def _on_timeout(self, job: _Job):
+        job.timed_out.set()
+        self._kill(job)
+
+    def _run_job(self, job: _Job, cmd: list, input_text: str, timeout: float,
+                 cwd: str, env: dict, output_callback: Callable[[str], None],
+                 submit_time: float) -> CLIJobResult:
+        """Runs the command and returns its result."""
+        start_time = time.perf_counter()
+        queue_secs = start_time - submit_time
+        self._add_metric('cli-queue-wait-secs', queue_secs)
+        if job.cancelled.is_set():
+            return CLIJobResult(returncode=-1,
+                                stdout='',
+                                stderr='',
+                                cancelled=True,
+                                queue_secs=queue_secs)
+        logging.debug(f'Starting job {job.name}: {cmd} after {queue_secs:.2f}'
+                      ' secs in queue')
+        job.process = subprocess.Popen(cmd,
+                                       stdin=subprocess.PIPE,
+                                       stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE,
+                                       text=True,
+                                       encoding='utf-8',
+                                       errors='replace',
+                                       cwd=cwd,
+                                       env=env)
+        self._add_metric('cli-jobs-started', 1)
+        if job.cancelled.is_set():
+            # Cancelled while the process was starting.
+            self._kill(job)
+        timer = None
+        if timeout:
+            timer = threading.Timer(timeout, self._on_timeout, args=(job,))
+            timer.daemon = True
+            timer.start()
+
+        # Write stdin and read stderr in threads to avoid blocking on pipes.
+        stderr_lines = []
+
+        def _write_input():
+            try:
+                if input_text:
+                    job.process.stdin.write(input_text)
+                job.process.stdin.close()
+            except (BrokenPipeError, OSError, ValueError):
+                # Process exited without reading all input.
+                pass
+
+        def _read_stderr():
+            for line in job.process.stderr:
+                stderr_lines.append(line)
+
+        threads = [
+            threading.Thread(target=_write_input, daemon=True),
+            threading.Thread(target=_read_stderr, daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        stdout_lines = []
+        for line in job.process.stdout:
+            stdout_lines.append(line)
+            if output_callback:
+                output_callback(line.rstrip('\n'))
+        returncode = job.process.wait()
+        if timer:
+            timer.cancel()
+        for thread in threads:
+            thread.join()
+        run_secs = time.perf_counter() - start_time
+        self._add_metric('cli-run-secs', run_secs)
+        self._add_metric('cli-jobs-completed', 1)
+        if job.timed_out.is_set():
+            self._add_metric('cli-jobs-timed-out', 1)
+        if job.cancelled.is_set():
+            self._add_metric('cli-jobs-cancelled', 1)
+        logging.debug(f'Completed job {job.name} with return code {returncode}'
+                      f' in {run_secs:.2f} secs')
+        return CLIJobResult(returncode=returncode,
+                            stdout=''.join(stdout_lines),
+                            stderr=''.join(stderr_lines),
+                            timed_out=job.timed_out.is_set(),
+                            cancelled=job.cancelled.is_set(),
+                            queue_secs=queue_secs,
+                            run_secs=run_secs)
+
+
+def init_default_pool(max_jobs: int = _DEFAULT_MAX_JOBS) -> CLIJobPool:
+    """Creates the shared pool with the given concurrency.
+
+    Jobs already submitted to a previous shared pool continue to run.
+    """
+    global _DEFAULT_POOL
+    with _DEFAULT_POOL_LOCK:
+        _DEFAULT_POOL = CLIJobPool(max_jobs=max_jobs)
+        return _DEFAULT_POOL
+
+
+def get_default_pool() -> CLIJobPool:
+    """Returns the pool shared by all callers in the process."""
+    global _DEFAULT_POOL
+    with _DEFAULT_POOL_LOCK:
+        if _DEFAULT_POOL is None:
+            _DEFAULT_POOL = CLIJobPool()
+        return _DEFAULT_POOL
@@ -0,0 +1,115 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for cli_job_pool.py using a fake claude executable."""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+
+from cli_job_pool import CLIJobPool
+
+# Fake claude CLI that sleeps for the seconds in the first line of the
+# prompt and echoes the prompt.
+_FAKE_CLAUDE = f'''#!{sys.executable}
+import sys
+import time
+prompt = sys.stdin.read()
+time.sleep(float(prompt.split()[0]))
+for line in prompt.splitlines():
+    print('echo:', line, flush=True)
+print('done', file=sys.stderr)
+'''
+
+
+class CLIJobPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.claude = os.path.join(self.tmp_dir.name, 'claude')
+        with open(self.claude, 'w') as file:
+            file.write(_FAKE_CLAUDE)
+        os.chmod(self.claude, 0o755)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_run(self):
+        pool = CLIJobPool(max_jobs=1)
+        lines = []
+        result = pool.run([self.claude, '-p', '-'],
+                          input_text='0\nline2\n',
+                          timeout=30,
+                          output_callback=lines.append)
+        self.assertEqual(0, result.returncode)
+        self.assertEqual('echo: 0\necho: line2\n', result.stdout)
+        self.assertEqual('done\n', result.stderr)
+        self.assertEqual(['echo: 0', 'echo: line2'], lines)
+        self.assertFalse(result.timed_out)
+        pool.shutdown()
+
+    def test_concurrency_and_queue_wait(self):
+        pool = CLIJobPool(max_jobs=2)
+        futures = [
+            pool.submit([self.claude], input_text='0.5\n') for _ in range(4)
+        ]
+        results = [f.result() for f in futures]
+        self.assertTrue(all(r.returncode == 0 for r in results))
+        # Two jobs waited for the first two to complete.
+        queue_secs = sorted(r.queue_secs for r in results)
+        self.assertLess(queue_secs[1], 0.4)
+        self.assertGreater(queue_secs[2], 0.4)
+        metrics = pool.get_metrics()
+        self.assertEqual(4, metrics['cli-jobs-completed'])
+        self.assertGreater(metrics['cli-run-secs'], 2.0)
+        pool.shutdown()
+
+    def test_timeout_and_cancel(self):
+        pool = CLIJobPool(max_jobs=1)
+        result = pool.run([self.claude], input_text='10\n', timeout=0.5)
+        self.assertTrue(result.timed_out)
+        self.assertNotEqual(0, result.returncode)
+        self.assertLess(result.run_secs, 5)
+
+        running = pool.submit([self.claude], input_text='10\n')
+        queued = pool.submit([self.claude], input_text='10\n')
+        time.sleep(0.5)
+        start_time = time.perf_counter()
+        pool.cancel_all()
+        self.assertTrue(queued.cancelled())
+        self.assertTrue(running.result().cancelled)
+        self.assertLess(time.perf_counter() - start_time, 5)
+
+        # New jobs are not run after all jobs are cancelled.
+        self.assertTrue(pool.is_cancelled())
+        start_time = time.perf_counter()
+        result = pool.run([self.claude], input_text='10\n')
+        self.assertTrue(result.cancelled)
+        self.assertEqual('', result.stdout)
+        self.assertLess(time.perf_counter() - start_time, 1)
+        pool.shutdown()
+
+    def test_missing_command(self):
+        pool = CLIJobPool()
+        with self.assertRaises(FileNotFoundError):
+            pool.run([os.path.join(self.tmp_dir.name, 'missing')])
+        pool.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
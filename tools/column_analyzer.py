@@ -19,13 +19,21 @@ to improve sampling decisions. It detects:
 - Derived columns (percentages, sums calculated from other columns)
 - Redundant column pairs (1:1 mappings like FIPS code <-> county name)
 - Metadata columns (long text with low information value for sampling)
+
+Columns are analyzed in a single pass over the rows with running statistics,
+so the cost is linear in the number of rows and columns.
 """
 
 from dataclasses import dataclass, field
 from typing import Optional
+import itertools
+import math
+import random
 import re
 
 from absl import logging
+import mmh3
+import numpy as np
 
 
 @dataclass
@@ -55,11 +63,122 @@ class ColumnAnalysisResult:
         return skip
 
 
+class _HyperLogLog:
+    """HyperLogLog sketch for the approximate count of unique values."""
+
+    def __init__(self, precision: int = 12):
+        self._precision = precision
+        self._num_registers = 1 << precision
+        self._registers = bytearray(self._num_registers)
+        self._max_rank = 64 - precision + 1
+
+    def add(self, value: str) -> None:
+        """Adds a value to the sketch."""
+        hash_value = mmh3.hash64(value, signed=False)[0]
+        index = hash_value >> (64 - self._precision)
+        remainder = hash_value & ((1 << (64 - self._precision)) - 1)
+        rank = self._max_rank - remainder.bit_length()
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def count(self) -> int:
+        """Returns the estimated number of unique values."""
+        m = self._num_registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0**-r for r in self._registers)
+        num_zeros = self._registers.count(0)
+        if estimate <= 2.5 * m and num_zeros:
+            # Use linear counting for small cardinalities.
+            estimate = m * math.log(m / num_zeros)
+        return int(round(estimate))
+
+
+class _ColumnStats:
+    """Running statistics for the values of a column."""
+
+    __slots__ = ('num_values', 'num_empty', 'total_length', 'numeric_count',
+                 'numeric_min', 'numeric_max', 'value_labels', 'sketch',
+                 'label_hash', '_max_tracked_values')
+
+    def __init__(self, max_tracked_values: int):
+        self.num_values = 0
+        self.num_empty = 0
+        self.total_length = 0
+        self.numeric_count = 0
+        self.numeric_min = None
+        self.numeric_max = None
+        # Dict of value to the index of its first occurrence in the column.
+        # Replaced by a HyperLogLog sketch when the column has more than
+        # max_tracked_values unique values.
+        self.value_labels = {}
+        self.sketch = None
+        # Hash of the sequence of value labels for rows. Columns with the same
+        # sequence of labels have a 1:1 mapping of values.
+        self.label_hash = 0
+        self._max_tracked_values = max_tracked_values
+
+    def add(self, value: str, numeric_value: Optional[float]) -> None:
+        """Adds a value of the column."""
+        self.num_values += 1
+        self.total_length += len(value)
+        if not value or not value.strip():
+            self.num_empty += 1
+        if numeric_value is not None:
+            self.numeric_count += 1
+            if self.numeric_min is None or numeric_value < self.numeric_min:
+                self.numeric_min = numeric_value
+            if self.numeric_max is None or numeric_value > self.numeric_max:
+                self.numeric_max = numeric_value
+        if self.sketch is not None:
+            self.sketch.add(value)
+            return
+        label = self.value_labels.get(value)
+        if label is None:
+            label = len(self.value_labels)
+            if label >= self._max_tracked_values:
+                self._convert_to_sketch(value)
+                return
+            self.value_labels[value] = label
+        self.label_hash = (self.label_hash * _LABEL_HASH_MULTIPLIER + label +
+                           1) % _LABEL_HASH_MODULUS
+
+    def unique_count(self) -> int:
+        """Returns the exact or estimated number of unique values."""
+        if self.sketch is not None:
+            return self.sketch.count()
+        return len(self.value_labels)
+
+    def has_exact_values(self) -> bool:
+        """Returns True if unique values are tracked exactly."""
+        return self.sketch is None
+
+    def _convert_to_sketch(self, value: str) -> None:
+        """Replaces the tracked values with a HyperLogLog sketch."""
+        self.sketch = _HyperLogLog()
+        for tracked_value in self.value_labels:
+            self.sketch.add(tracked_value)
+        self.sketch.add(value)
+        self.value_labels = {}
+
+
+# Parameters for the hash of value labels.
+_LABEL_HASH_MULTIPLIER = 1000003
+_LABEL_HASH_MODULUS = (1 << 61) - 1
+
+
 class ColumnAnalyzer:
     """Analyzes columns to identify which are useful for sampling decisions.
 
     This class examines the data to classify columns and detect relationships
     that can help the sampler make better row selection decisions.
+
+    Rows are analyzed incrementally with running statistics per column, so the
+    analyzer can be fed one row at a time:
+        analyzer = ColumnAnalyzer()
+        analyzer.set_headers(headers)
+        for row in rows:
+            analyzer.add_row(row)
+        result = analyzer.get_result()
     """
 
     def __init__(self, config: dict = None):
@@ -71,21 +190,28 @@ class ColumnAnalyzer:
                 - correlation_threshold: Ratio for redundant pair detection (default 0.95)
                 - metadata_min_length: Min avg length for metadata detection (default 50)
                 - derived_tolerance: Tolerance for derived column math checks (default 0.01)
+                - max_tracked_values: Max unique values tracked exactly per column.
+                    Columns with more values use a HyperLogLog sketch and are
+                    not checked for redundant pairs (default 100000)
+                - sample_rows: Number of rows sampled for numeric ranges and
+                    percentage checks (default 10000)
         """
         self._config = config or {}
         self._constant_threshold = self._config.get('constant_threshold', 0.01)
         self._correlation_threshold = self._config.get('correlation_threshold', 0.95)
         self._metadata_min_length = self._config.get('metadata_min_length', 50)
         self._derived_tolerance = self._config.get('derived_tolerance', 0.01)
+        self._max_tracked_values = self._config.get('max_tracked_values', 100000)
+        self._sample_rows = self._config.get('sample_rows', 10000)
 
         # Internal state during analysis
-        self._rows = []
         self._headers = []
         self._num_rows = 0
         self._num_cols = 0
-        self._column_values = {}  # col_index -> list of values
-        self._column_unique = {}  # col_index -> set of unique values
-        self._column_numeric = {}  # col_index -> list of numeric values (or None)
+        self._column_stats = []  # col_index -> _ColumnStats
+        # Reservoir sample of rows with numeric values (or None) per column.
+        self._numeric_rows = []
+        self._random = random.Random(0)
 
     def analyze(self, rows: list, headers: list) -> ColumnAnalysisResult:
         """Analyze columns and return classification results.
@@ -100,13 +226,60 @@ class ColumnAnalyzer:
         if not rows:
             return ColumnAnalysisResult()
 
-        self._rows = rows
-        self._headers = headers
-        self._num_rows = len(rows)
-        self._num_cols = len(headers) if headers else (len(rows[0]) if rows else 0)
+        self.set_headers(headers, num_cols=len(rows[0]))
+        for row in rows:
+            self.add_row(row)
+        return self.get_result()
+
+    def set_headers(self, headers: list, num_cols: int = 0) -> None:
+        """Resets the analyzer for rows with the given headers.
+
+        Args:
+            headers: List of column header names
+            num_cols: Number of columns if there are no headers.
+        """
+        self._headers = headers or []
+        self._num_rows = 0
+        self._num_cols = len(self._headers) if self._headers else num_cols
+        self._column_stats = [
+            _ColumnStats(self._max_tracked_values)
+            for _ in range(self._num_cols)
+        ]
+        self._numeric_rows = []
+        self._random = random.Random(0)
+
+    def add_row(self, row: list) -> None:
+        """Updates the running statistics for all columns with a row."""
+        if not self._column_stats:
+            self.set_headers(self._headers, num_cols=len(row))
+        self._num_rows += 1
+        num_values = min(len(row), self._num_cols)
+        numeric_row = [None] * self._num_cols
+        for col_idx in range(num_values):
+            val = row[col_idx]
+            numeric_val = self._parse_numeric(val)
+            numeric_row[col_idx] = numeric_val
+            self._column_stats[col_idx].add(val, numeric_val)
+
+        # Keep a reservoir sample of rows for numeric checks.
+        if len(self._numeric_rows) < self._sample_rows:
+            self._numeric_rows.append(numeric_row)
+        else:
+            index = self._random.randrange(self._num_rows)
+            if index < self._sample_rows:
+                self._numeric_rows[index] = numeric_row
+
+    def get_result(self) -> ColumnAnalysisResult:
+        """Returns the classification results for the rows added so far."""
+        if not self._num_rows:
+            return ColumnAnalysisResult()
 
-        # Build column value collections
-        self._collect_column_values()
+        # Require >80% numeric values for numeric columns.
+        self._numeric_cols = [
+            col_idx for col_idx in range(self._num_cols)
+            if self._column_stats[col_idx].numeric_count and
+            self._column_stats[col_idx].numeric_count >= self._num_rows * 0.8
+        ]
 
         # Run detection algorithms
         result = ColumnAnalysisResult()
@@ -128,38 +301,20 @@ class ColumnAnalyzer:
 
         return result
 
-    def _collect_column_values(self) -> None:
-        """Collect values for each column from all rows."""
-        self._column_values = {i: [] for i in range(self._num_cols)}
-        self._column_unique = {i: set() for i in range(self._num_cols)}
-        self._column_numeric = {i: [] for i in range(self._num_cols)}
-
-        for row in self._rows:
-            for col_idx in range(min(len(row), self._num_cols)):
-                val = row[col_idx]
-                self._column_values[col_idx].append(val)
-                self._column_unique[col_idx].add(val)
-
-                # Try to parse as numeric
-                numeric_val = self._parse_numeric(val)
-                if numeric_val is not None:
-                    self._column_numeric[col_idx].append(numeric_val)
-                else:
-                    # Mark column as non-numeric if any value fails
-                    if self._column_numeric[col_idx] is not None:
-                        # Check if most values are numeric - allow some missing
-                        pass  # We'll handle this in post-processing
-
-        # Post-process numeric columns - require >80% numeric values
-        for col_idx in range(self._num_cols):
-            numeric_count = len(self._column_numeric[col_idx])
-            if numeric_count < self._num_rows * 0.8:
-                self._column_numeric[col_idx] = None
+    def _get_header(self, col_idx: int) -> str:
+        """Returns the header for a column index."""
+        if col_idx < len(self._headers):
+            return self._headers[col_idx]
+        return f'col_{col_idx}'
 
     def _parse_numeric(self, val: str) -> Optional[float]:
         """Try to parse a string value as numeric."""
-        if not val or val.strip() == '' or val == '.':
+        if not val or val == '.':
             return None
+        try:
+            return float(val)
+        except ValueError:
+            pass
         try:
             # Remove common formatting
             clean = val.strip().replace(',', '').replace('%', '').replace('$', '')
@@ -176,7 +331,7 @@ class ColumnAnalyzer:
         constant_cols = set()
 
         for col_idx in range(self._num_cols):
-            header = self._headers[col_idx] if col_idx < len(self._headers) else f'col_{col_idx}'
+            header = self._get_header(col_idx)
 
             # Check for empty header
             if not header or not header.strip():
@@ -184,12 +339,13 @@ class ColumnAnalyzer:
                 logging.debug(f'Empty header detected at column {col_idx}')
                 continue
 
-            unique_count = len(self._column_unique[col_idx])
-            unique_ratio = unique_count / self._num_rows if self._num_rows > 0 else 1.0
+            stats = self._column_stats[col_idx]
+            unique_count = stats.unique_count()
+            unique_ratio = unique_count / self._num_rows
 
             # Count empty values in column
-            empty_count = sum(1 for val in self._column_values[col_idx] if not val or not val.strip())
-            empty_ratio = empty_count / self._num_rows if self._num_rows > 0 else 0
+            empty_count = stats.num_empty
+            empty_ratio = empty_count / self._num_rows
 
             # Column is constant/empty if:
             # - Has very few unique values
@@ -218,22 +374,20 @@ class ColumnAnalyzer:
         metadata_cols = set()
 
         for col_idx in range(self._num_cols):
-            values = self._column_values[col_idx]
-            if not values:
+            stats = self._column_stats[col_idx]
+            if not stats.num_values:
                 continue
 
             # Calculate average length
-            total_len = sum(len(str(v)) for v in values)
-            avg_len = total_len / len(values)
+            avg_len = stats.total_length / stats.num_values
 
             # Check if long text AND mostly unique (not categorical)
-            unique_ratio = len(self._column_unique[col_idx]) / self._num_rows if self._num_rows > 0 else 0
+            unique_ratio = stats.unique_count() / self._num_rows
 
             if avg_len >= self._metadata_min_length and unique_ratio > 0.9:
                 metadata_cols.add(col_idx)
-                header = self._headers[col_idx] if col_idx < len(self._headers) else f'col_{col_idx}'
                 logging.debug(
-                    f'Metadata column detected: "{header}" '
+                    f'Metadata column detected: "{self._get_header(col_idx)}" '
                     f'(avg length {avg_len:.1f}, {unique_ratio:.1%} unique)'
                 )
 
@@ -242,66 +396,33 @@ class ColumnAnalyzer:
     def _detect_redundant_pairs(self) -> list:
         """Detect pairs of columns that have 1:1 mapping (redundant).
 
+        Columns are grouped by the number of values, unique values and the
+        hash of the sequence of value labels, where the label of a value is
+        the order of its first occurrence in the column. Two columns have a
+        1:1 mapping only if they have the same sequence of labels, so only
+        columns within a group are paired.
+
         Returns:
             List of tuples (col_a, col_b) where col_b is redundant with col_a.
         """
         redundant_pairs = []
-        checked = set()
-
-        for col_a in range(self._num_cols):
-            unique_a = self._column_unique[col_a]
-            if len(unique_a) <= 1:
-                continue  # Skip constant columns
-
-            for col_b in range(col_a + 1, self._num_cols):
-                if (col_a, col_b) in checked:
-                    continue
-                checked.add((col_a, col_b))
-
-                unique_b = self._column_unique[col_b]
-
-                # Quick check: must have same number of unique values
-                if len(unique_a) != len(unique_b):
-                    continue
-
-                # Check for 1:1 mapping
-                if self._check_one_to_one_mapping(col_a, col_b):
-                    redundant_pairs.append((col_a, col_b))
-                    header_a = self._headers[col_a] if col_a < len(self._headers) else f'col_{col_a}'
-                    header_b = self._headers[col_b] if col_b < len(self._headers) else f'col_{col_b}'
-                    logging.debug(
-                        f'Redundant pair detected: "{header_a}" <-> "{header_b}"'
-                    )
-
-        return redundant_pairs
-
-    def _check_one_to_one_mapping(self, col_a: int, col_b: int) -> bool:
-        """Check if two columns have a 1:1 mapping relationship."""
-        mapping_a_to_b = {}
-        mapping_b_to_a = {}
-
-        for row in self._rows:
-            if col_a >= len(row) or col_b >= len(row):
-                continue
-
-            val_a = row[col_a]
-            val_b = row[col_b]
-
-            # Check A -> B mapping
-            if val_a in mapping_a_to_b:
-                if mapping_a_to_b[val_a] != val_b:
-                    return False  # Not 1:1
-            else:
-                mapping_a_to_b[val_a] = val_b
-
-            # Check B -> A mapping
-            if val_b in mapping_b_to_a:
-                if mapping_b_to_a[val_b] != val_a:
-                    return False  # Not 1:1
-            else:
-                mapping_b_to_a[val_b] = val_a
+        groups = {}
+        for col_idx in range(self._num_cols):
+            stats = self._column_stats[col_idx]
+            if not stats.has_exact_values() or stats.unique_count() <= 1:
+                continue  # Skip constant and untracked columns
+            key = (stats.num_values, stats.unique_count(), stats.label_hash)
+            groups.setdefault(key, []).append(col_idx)
+
+        for columns in groups.values():
+            # Pair all columns with the same mapping.
+            for col_a, col_b in itertools.combinations(columns, 2):
+                redundant_pairs.append((col_a, col_b))
+                logging.debug(
+                    f'Redundant pair detected: "{self._get_header(col_a)}" <->'
+                    f' "{self._get_header(col_b)}"')
 
-        return True
+        return sorted(redundant_pairs)
 
     def _detect_derived_columns(self) -> set:
         """Detect columns that are derived/calculated from other columns.
@@ -365,90 +486,90 @@ class ColumnAnalyzer:
         return derived
 
     def _detect_percentage_columns(self) -> set:
-        """Detect columns that are percentages of other columns."""
-        derived = set()
+        """Detect columns that are percentages of other columns.
 
-        # Find numeric column pairs where one might be percentage of another
-        numeric_cols = [i for i in range(self._num_cols) if self._column_numeric[i] is not None]
+        Candidate columns are pruned with the running min/max and numeric
+        counts, and the implied totals are checked on sampled rows for all
+        base columns at once.
+        """
+        derived = set()
+        if not self._numeric_cols or not self._numeric_rows:
+            return derived
 
-        for col_pct in numeric_cols:
-            pct_values = self._column_numeric[col_pct]
-            if not pct_values:
-                continue
+        # Sample a few rows to check
+        num_samples = len(self._numeric_rows)
+        sample_size = min(10, num_samples)
+        sample_indices = list(
+            range(0, num_samples,
+                  max(1, num_samples // sample_size)))[:sample_size]
+        samples = np.array(
+            [[
+                self._numeric_rows[row_idx][col_idx]
+                for col_idx in self._numeric_cols
+            ]
+             for row_idx in sample_indices],
+            dtype=float,
+        )
+        numeric_counts = np.array(
+            [self._column_stats[c].numeric_count for c in self._numeric_cols])
 
+        for pct_pos, col_pct in enumerate(self._numeric_cols):
+            stats = self._column_stats[col_pct]
             # Skip if values don't look like percentages (0-100 range)
-            max_val = max(pct_values) if pct_values else 0
-            min_val = min(pct_values) if pct_values else 0
-            if max_val > 100 or min_val < 0:
+            if stats.numeric_max > 100 or stats.numeric_min < 0:
                 continue
 
-            # Check if this could be percentage of another column
-            for col_base in numeric_cols:
-                if col_base == col_pct:
-                    continue
-
-                base_values = self._column_numeric[col_base]
-                if not base_values or len(base_values) != len(pct_values):
-                    continue
-
-                # Check if col_pct ≈ col_base / total * 100 for some total
-                # This is expensive, so we use sampling
-                if self._check_percentage_relationship(pct_values, base_values):
-                    derived.add(col_pct)
-                    header = self._headers[col_pct] if col_pct < len(self._headers) else f'col_{col_pct}'
-                    base_header = self._headers[col_base] if col_base < len(self._headers) else f'col_{col_base}'
-                    logging.debug(f'Percentage column detected: "{header}" (from "{base_header}")')
-                    break
+            # Check if col_pct ≈ col_base / total * 100 for some total
+            # across base columns with the same number of numeric values.
+            base_pos = np.flatnonzero(numeric_counts == stats.numeric_count)
+            base_pos = base_pos[base_pos != pct_pos]
+            pct_values = samples[:, pct_pos]
+            pct_rows = pct_values > 0
+            if not len(base_pos) or not pct_rows.any():
+                continue
+            with np.errstate(divide='ignore', invalid='ignore'):
+                totals = samples[pct_rows][:, base_pos] / (
+                    pct_values[pct_rows, None] / 100)
+                avg_totals = totals.mean(axis=0)
+                deviation = np.abs(totals - avg_totals) / avg_totals
+            # Check if totals are consistent (same value)
+            is_consistent = ((avg_totals != 0) & ~np.isnan(avg_totals) &
+                             ~(deviation > self._derived_tolerance).any(axis=0))
+            if is_consistent.any():
+                derived.add(col_pct)
+                col_base = self._numeric_cols[base_pos[np.argmax(
+                    is_consistent)]]
+                logging.debug(
+                    f'Percentage column detected: "{self._get_header(col_pct)}"'
+                    f' (from "{self._get_header(col_base)}")')
 
         return derived
 
-    def _check_percentage_relationship(self, pct_values: list, base_values: list) -> bool:
-        """Check if pct_values are percentages derived from base_values."""
-        # Sample a few rows to check
-        sample_size = min(10, len(pct_values))
-        sample_indices = list(range(0, len(pct_values), max(1, len(pct_values) // sample_size)))[:sample_size]
-
-        # Try to find a consistent total
-        totals = []
-        for idx in sample_indices:
-            if pct_values[idx] > 0:
-                implied_total = base_values[idx] / (pct_values[idx] / 100)
-                totals.append(implied_total)
-
-        if not totals:
-            return False
-
-        # Check if totals are consistent (same value)
-        avg_total = sum(totals) / len(totals)
-        if avg_total == 0:
-            return False
-
-        for total in totals:
-            if abs(total - avg_total) / avg_total > self._derived_tolerance:
-                return False
-
-        return True
-
     def _get_numeric_column_ranges(self) -> dict:
         """Get min/max ranges for numeric columns.
 
+        Quartiles are computed from the sampled rows.
+
         Returns:
             Dictionary mapping column index to (min, max, quartiles) tuple.
         """
         ranges = {}
 
-        for col_idx in range(self._num_cols):
-            values = self._column_numeric[col_idx]
-            if values and len(values) > 0:
-                sorted_vals = sorted(values)
-                n = len(sorted_vals)
-                ranges[col_idx] = {
-                    'min': sorted_vals[0],
-                    'max': sorted_vals[-1],
-                    'q1': sorted_vals[n // 4] if n >= 4 else sorted_vals[0],
-                    'median': sorted_vals[n // 2],
-                    'q3': sorted_vals[3 * n // 4] if n >= 4 else sorted_vals[-1],
-                }
+        for col_idx in self._numeric_cols:
+            stats = self._column_stats[col_idx]
+            sorted_vals = sorted(row[col_idx]
+                                 for row in self._numeric_rows
+                                 if row[col_idx] is not None)
+            if not sorted_vals:
+                continue
+            n = len(sorted_vals)
+            ranges[col_idx] = {
+                'min': stats.numeric_min,
+                'max': stats.numeric_max,
+                'q1': sorted_vals[n // 4] if n >= 4 else sorted_vals[0],
+                'median': sorted_vals[n // 2],
+                'q3': sorted_vals[3 * n // 4] if n >= 4 else sorted_vals[-1],
+            }
 
         return ranges
 
@@ -459,6 +580,7 @@ class ColumnAnalyzer:
             Dictionary mapping column index to type string.
         """
         types = {}
+        redundant_columns = {col_b for _, col_b in result.redundant_pairs}
 
         for col_idx in range(self._num_cols):
             if col_idx in result.constant_columns:
@@ -467,13 +589,13 @@ class ColumnAnalyzer:
                 types[col_idx] = 'derived'
             elif col_idx in result.metadata_columns:
                 types[col_idx] = 'metadata'
-            elif any(col_idx == pair[1] for pair in result.redundant_pairs):
+            elif col_idx in redundant_columns:
                 types[col_idx] = 'redundant'
-            elif self._column_numeric[col_idx] is not None:
+            elif col_idx in result.numeric_columns:
                 types[col_idx] = 'numeric'
             else:
                 # Check if categorical (low unique ratio)
-                unique_ratio = len(self._column_unique[col_idx]) / self._num_rows if self._num_rows > 0 else 1
+                unique_ratio = self._column_stats[col_idx].unique_count() / self._num_rows
                 if unique_ratio < 0.1:
                     types[col_idx] = 'categorical'
                 else:
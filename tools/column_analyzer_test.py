@@ -0,0 +1,119 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for column_analyzer.py"""
+
+import os
+import sys
+import unittest
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+sys.path.append(os.path.dirname(_SCRIPT_DIR))
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.dirname(_SCRIPT_DIR)), 'util'))
+
+from column_analyzer import ColumnAnalyzer
+
+
+def _get_test_rows(num_rows: int) -> list:
+    """Returns rows with constant, redundant, derived and metadata columns."""
+    rows = []
+    for index in range(num_rows):
+        state = index % 20
+        count = (index % 50 + 1) * 10
+        rows.append([
+            f'{state:02d}',
+            f'State {state}',
+            'USA',
+            str(count),
+            f'{count * 100 / 1000:.2f}',
+            f'Notes for row {index} ' + 'x' * 50,
+            str(index * 7 % 101),
+        ])
+    return rows
+
+
+_TEST_HEADERS = [
+    'fips', 'name', 'country', 'E_count', 'EP_count', 'notes', 'value'
+]
+
+
+class ColumnAnalyzerTest(unittest.TestCase):
+    """Tests for the ColumnAnalyzer class."""
+
+    def test_analyze(self):
+        result = ColumnAnalyzer().analyze(_get_test_rows(1000), _TEST_HEADERS)
+        self.assertEqual({2}, result.constant_columns)
+        self.assertEqual({4}, result.derived_columns)
+        self.assertEqual({5}, result.metadata_columns)
+        self.assertEqual([(0, 1), (3, 4)], result.redundant_pairs)
+        self.assertEqual({1, 2, 4, 5}, result.get_skip_columns())
+        self.assertEqual(
+            {
+                0: 'numeric',
+                1: 'redundant',
+                2: 'constant',
+                3: 'numeric',
+                4: 'derived',
+                5: 'metadata',
+                6: 'numeric',
+            }, result.column_types)
+        self.assertEqual(
+            {
+                'min': 10.0,
+                'max': 500.0,
+                'q1': 130.0,
+                'median': 260.0,
+                'q3': 380.0
+            }, result.numeric_columns[3])
+
+    def test_add_row(self):
+        analyzer = ColumnAnalyzer({'sample_rows': 100})
+        analyzer.set_headers(_TEST_HEADERS)
+        for row in _get_test_rows(1000):
+            analyzer.add_row(row)
+        result = analyzer.get_result()
+        self.assertEqual([(0, 1), (3, 4)], result.redundant_pairs)
+        self.assertEqual({4}, result.derived_columns)
+        # Min and max are exact with sampled quartiles.
+        self.assertEqual(10.0, result.numeric_columns[3]['min'])
+        self.assertEqual(500.0, result.numeric_columns[3]['max'])
+
+    def test_redundant_pairs_in_group(self):
+        # All pairs of columns with the same mapping are redundant.
+        rows = [[f'{i % 20}', f'name {i % 20}', f'code{i % 20}', str(i)]
+                for i in range(1000)]
+        result = ColumnAnalyzer().analyze(rows, ['id', 'name', 'code', 'row'])
+        self.assertEqual([(0, 1), (0, 2), (1, 2)], result.redundant_pairs)
+        self.assertEqual({1, 2}, result.get_skip_columns())
+
+    def test_untracked_values(self):
+        # Columns with more unique values than tracked use a sketch.
+        rows = [[str(i), f'id{i}', 'a'] for i in range(5000)]
+        analyzer = ColumnAnalyzer({'max_tracked_values': 100})
+        result = analyzer.analyze(rows, ['index', 'id', 'constant'])
+        self.assertEqual({2}, result.constant_columns)
+        self.assertEqual([], result.redundant_pairs)
+        self.assertEqual('text', result.column_types[1])
+        self.assertAlmostEqual(5000,
+                               analyzer._column_stats[1].unique_count(),
+                               delta=250)
+
+    def test_empty_rows(self):
+        result = ColumnAnalyzer().analyze([], _TEST_HEADERS)
+        self.assertEqual(set(), result.get_skip_columns())
+
+
+if __name__ == '__main__':
+    unittest.main()
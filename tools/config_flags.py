@@ -39,6 +39,9 @@ _FLAGS = flags.FLAGS
 
 flags.DEFINE_string('config_file', '', 'File with configuration parameters.')
 flags.DEFINE_list('data_url', '', 'URLs to download the data from.')
+flags.DEFINE_string(
+    'download_cache_dir', '',
+    'Directory for a persistent cache of files downloaded from data_url.')
 flags.DEFINE_string('shard_input_by_column', '',
                     'Shard input data by unique values in column.')
 flags.DEFINE_integer(
@@ -46,12 +49,18 @@ flags.DEFINE_integer(
     sys.maxsize,
     'Shard input data by value prefix of given length.',
 )
+flags.DEFINE_integer(
+    'shard_input_num_shards', 0,
+    'Number of shards for input data by hash of the shard column value.'
+    ' If 0, input is sharded by unique values in the column.')
 flags.DEFINE_list(
     'pv_map', [],
     'Comma separated list of namespace:file with property values.')
 flags.DEFINE_list('input_data', [],
                   'Comma separated list of data files to be processed.')
-flags.DEFINE_string('input_encoding', 'utf-8', 'Encoding for input_data files.')
+flags.DEFINE_string(
+    'input_encoding', '',
+    'Encoding for input_data files. Detected from the file if not set.')
 flags.DEFINE_list(
     'input_xls_sheets',
     [],
@@ -61,6 +70,10 @@ flags.DEFINE_integer('input_rows', sys.maxsize,
                      'Number of rows per input file to process.')
 flags.DEFINE_integer('input_columns', sys.maxsize,
                      'Number of columns in input file to process.')
+flags.DEFINE_integer(
+    'processing_timeout', 0,
+    'Seconds to process input rows after which processing fails.'
+    ' 0 for no timeout.')
 flags.DEFINE_integer(
     'skip_rows', 0, 'Number of rows to skip at the begining of the input file.')
 flags.DEFINE_integer(
@@ -187,6 +200,8 @@ def get_default_config() -> dict:
             _FLAGS.input_data,
         'data_url':
             _FLAGS.data_url,
+        'download_cache_dir':
+            _FLAGS.download_cache_dir,
         'input_encoding':
             _FLAGS.input_encoding,
         'input_xls':
@@ -382,6 +397,8 @@ def get_default_config() -> dict:
             _FLAGS.input_rows,
         'input_columns':
             _FLAGS.input_columns,
+        'processing_timeout':
+            _FLAGS.processing_timeout,
         'skip_rows':
             _FLAGS.skip_rows,
         'ignore_rows': [0],
@@ -392,6 +409,12 @@ def get_default_config() -> dict:
         'process_rows': [0],
         'parallelism':
             _FLAGS.parallelism,
+        'shard_input_by_column':
+            _FLAGS.shard_input_by_column,
+        'shard_prefix_length':
+            _FLAGS.shard_prefix_length,
+        'shard_input_num_shards':
+            _FLAGS.shard_input_num_shards,
         'output_counters':
             _FLAGS.output_counters,
 
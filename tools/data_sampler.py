@@ -67,8 +67,9 @@ flags.DEFINE_string(
     'A comma-separated list of column names to use for selecting unique rows.')
 flags.DEFINE_string('sampler_input_delimiter', ',',
                     'The delimiter used in the input CSV file.')
-flags.DEFINE_string('sampler_input_encoding', 'UTF8',
-                    'The encoding of the input CSV file.')
+flags.DEFINE_string(
+    'sampler_input_encoding', '',
+    'The encoding of the input CSV file. Detected from the file if not set.')
 flags.DEFINE_string('sampler_output_delimiter', None,
                     'The delimiter to use in the output CSV file.')
 flags.DEFINE_float(
@@ -133,6 +134,7 @@ import file_util
 from config_map import ConfigMap
 from counters import Counters
 from column_analyzer import ColumnAnalyzer, ColumnAnalysisResult
+from multi_csv_reader import MultiCSVReader
 
 
 # Class to sample a data file.
@@ -305,10 +307,46 @@ class DataSampler:
                 logging.level_debug() and logging.debug(
                     f'Mapped unique column "{column_name}" to index {index}')
 
+    def _get_file_profile(self, input_file: str) -> dict:
+        """Returns the profile of the input file from file_util.
+
+        The detected profile is shared with other stages reading the file.
+        The encoding, delimiter and footer keywords from the config override
+        the detection if they differ.
+        """
+        footer_keywords = [
+            kw.strip()
+            for kw in self._config.get('sampler_footer_keywords', '').split(',')
+            if kw.strip()
+        ]
+        return file_util.file_get_profile(
+            input_file,
+            encoding=self._config.get('input_encoding'),
+            delimiter=self._config.get('input_delimiter'),
+            footer_keywords=footer_keywords or None)
+
+    def _get_reader_options(self, input_file: str) -> tuple:
+        """Returns a tuple of the encoding and csv.reader options for a file."""
+        profile = self._get_file_profile(input_file)
+        return profile.get('encoding', 'utf-8-sig'), dict(
+            profile.get('reader_options', {}))
+
+    def _get_reader(self, input_files: list[str],
+                    header_rows: int) -> MultiCSVReader:
+        """Returns a reader for the rows of all input files as a single CSV.
+
+        The header rows of the first file are returned once and the columns
+        of the other files are aligned to the first file.
+        """
+        return MultiCSVReader(input_files,
+                              header_rows=header_rows,
+                              reader_options=self._get_reader_options)
+
     def _auto_detect_header_rows(self, input_file: str) -> int:
         """Automatically detect the number of header rows.
 
-        Analyzes the first 10 rows to detect header patterns:
+        Uses the header rows from the file profile that examines the first
+        10 rows for header patterns:
         - Rows with >50% empty cells
         - Rows with metadata patterns (e.g., "Table X", "Year:")
         - Rows that are all text with no numbers
@@ -320,100 +358,38 @@ class DataSampler:
             Detected number of header rows (defaults to 1 if uncertain).
         """
         try:
-            input_encoding = self._config.get('input_encoding')
-            if not input_encoding:
-                input_encoding = file_util.file_get_encoding(input_file)
-
-            with file_util.FileIO(input_file, encoding=input_encoding) as csv_file:
-                csv_options = {'delimiter': self._config.get('input_delimiter')}
-                csv_options = file_util.file_get_csv_reader_options(input_file, csv_options)
-                csv_reader = csv.reader(csv_file, **csv_options)
-
-                rows = []
-                for i, row in enumerate(csv_reader):
-                    if i >= 10:  # Only examine first 10 rows
-                        break
-                    rows.append(row)
-
-                if not rows:
-                    return 1
-
-                header_count = 0
-                for i, row in enumerate(rows):
-                    # Count empty cells
-                    empty_count = sum(1 for cell in row if not cell.strip())
-                    empty_ratio = empty_count / len(row) if len(row) > 0 else 1.0
-
-                    # Check for metadata patterns
-                    first_cell = row[0].strip() if row else ''
-                    metadata_patterns = ['table', 'figure', 'year:', 'note', 'source', '(number', 'unnamed:']
-                    is_metadata = any(pattern in first_cell.lower() for pattern in metadata_patterns)
-
-                    # Count numeric cells (for distinguishing data from headers)
-                    numeric_count = 0
-                    for cell in row:
-                        try:
-                            float(cell.replace(',', '').replace('%', '').strip())
-                            numeric_count += 1
-                        except (ValueError, AttributeError):
-                            pass
-                    numeric_ratio = numeric_count / len(row) if len(row) > 0 else 0
-
-                    # Consider a row a header if:
-                    # - It has many empty cells (>50%)
-                    # - It has metadata patterns
-                    # - It has very few numbers (<10%)
-                    # - AND it's within the first 5 rows
-                    if i < 5 and (empty_ratio > 0.5 or is_metadata or numeric_ratio < 0.1):
-                        header_count = i + 1
-                    else:
-                        # Found data row, stop counting headers
-                        break
-
-                # Default to 1 if we didn't detect any special headers
-                detected = max(1, header_count)
-
-                if self._config.get('sampler_verbose', False):
-                    logging.info(f'Auto-detected {detected} header row(s)')
-
-                return detected
+            detected = self._get_file_profile(input_file).get('header_rows', 1)
+            if self._config.get('sampler_verbose', False):
+                logging.info(f'Auto-detected {detected} header row(s)')
+            return detected
 
         except Exception as e:
             logging.warning(f'Error auto-detecting headers: {e}. Defaulting to 1.')
             return 1
 
-    def _copy_entire_file(self, input_file: str, output_file: str, header_rows: int, output_delimiter: str) -> str:
-        """Copy entire input file to output without sampling (for tiny datasets).
+    def _copy_entire_file(self, input_files: list[str], output_file: str, header_rows: int, output_delimiter: str) -> str:
+        """Copy all input files to output without sampling (for tiny datasets).
 
         Args:
-            input_file: Path to input CSV file
+            input_files: List of input CSV files
             output_file: Path to output CSV file
-            header_rows: Number of header rows
+            header_rows: Number of header rows in each input file
             output_delimiter: Delimiter for output file
 
         Returns:
             Path to output file
         """
-        input_encoding = self._config.get('input_encoding')
-        if not input_encoding:
-            input_encoding = file_util.file_get_encoding(input_file)
-
-        with file_util.FileIO(input_file, encoding=input_encoding) as csv_file:
-            csv_options = {'delimiter': self._config.get('input_delimiter')}
-            csv_options = file_util.file_get_csv_reader_options(input_file, csv_options)
+        reader = self._get_reader(input_files, header_rows)
+        if not output_delimiter:
+            output_delimiter = self._get_reader_options(input_files[0])[1].get('delimiter', ',')
 
-            if not output_delimiter:
-                output_delimiter = csv_options.get('delimiter', ',')
+        with file_util.FileIO(output_file, mode='w') as output:
+            csv_writer = csv.writer(output, delimiter=output_delimiter, doublequote=False, escapechar='\\')
+            for row in reader:
+                csv_writer.writerow(row)
+                self._selected_rows += 1
 
-            with file_util.FileIO(output_file, mode='w') as output:
-                csv_writer = csv.writer(output, delimiter=output_delimiter, doublequote=False, escapechar='\\')
-                csv_reader = csv.reader(csv_file, **csv_options)
-
-                for row in csv_reader:
-                    csv_writer.writerow(row)
-                    self._selected_rows += 1
-
-        logging.info(f'Copied all {self._selected_rows} rows from {input_file} to {output_file}')
+        logging.info(f'Copied all {self._selected_rows} rows from {input_files} to {output_file}')
         return output_file
 
     def _add_random_rows_to_output(self, input_files: list[str], output_file: str,
@@ -430,27 +406,17 @@ class DataSampler:
         # Collect all data rows that weren't already selected
         available_rows = []
 
-        for file in input_files:
-            input_encoding = self._config.get('input_encoding')
-            if not input_encoding:
-                input_encoding = file_util.file_get_encoding(file)
-
-            with file_util.FileIO(file, encoding=input_encoding) as csv_file:
-                csv_options = {'delimiter': self._config.get('input_delimiter')}
-                csv_options = file_util.file_get_csv_reader_options(file, csv_options)
-                csv_reader = csv.reader(csv_file, **csv_options)
+        reader = self._get_reader(input_files, header_rows)
+        num_header_rows = len(reader.get_header_rows())
+        for row_index, row in enumerate(reader, 1):
+            # Skip header rows
+            if row_index <= num_header_rows:
+                continue
 
-                row_index = 0
-                for row in csv_reader:
-                    row_index += 1
-                    # Skip header rows
-                    if row_index <= header_rows:
-                        continue
-
-                    # Check if this row was already selected
-                    sig = self._get_row_signature(row)
-                    if sig not in self._selected_signatures:
-                        available_rows.append(row)
+            # Check if this row was already selected
+            sig = self._get_row_signature(row)
+            if sig not in self._selected_signatures:
+                available_rows.append(row)
 
         # Randomly sample from available rows
         if available_rows:
@@ -573,37 +539,29 @@ class DataSampler:
 
         return threshold
 
-    def _detect_categorical_columns(self, rows: list[list[str]],
+    def _detect_categorical_columns(self, column_values: dict[int, set[str]],
+                                     num_rows: int,
                                      headers: list[str]) -> dict[int, set[str]]:
-        """Analyze rows to detect categorical columns.
+        """Detect categorical columns from their unique values.
 
         A column is considered categorical if the ratio of unique values to
         total rows is below the configured threshold.
 
         Args:
-            rows: Sample rows to analyze (excluding headers).
+            column_values: Dictionary of column_index -> set of unique values
+              in the data rows, collected during the prescan.
+            num_rows: Number of data rows (excluding headers).
             headers: List of column header names.
 
         Returns:
             Dictionary mapping column_index -> set of unique values for
             categorical columns only.
         """
-        if not rows:
+        if not num_rows:
             return {}
 
-        num_rows = len(rows)
         # Use adaptive threshold based on dataset size
         threshold = self._get_adaptive_threshold(num_rows)
-        num_columns = len(headers) if headers else (len(rows[0]) if rows else 0)
-
-        # Count unique values per column
-        column_values = {}
-        for col_idx in range(num_columns):
-            column_values[col_idx] = set()
-
-        for row in rows:
-            for col_idx in range(min(len(row), num_columns)):
-                column_values[col_idx].add(row[col_idx])
 
         # Identify categorical columns (low cardinality)
         categorical_cols = {}
@@ -686,19 +644,28 @@ class DataSampler:
             }
         return stats
 
-    def _run_smart_column_analysis(self, rows: list, headers: list) -> None:
-        """Run smart column analysis to identify columns to skip.
+    def _get_column_analyzer(self, headers: list, num_cols: int) -> ColumnAnalyzer:
+        """Returns a column analyzer to be fed the rows during the prescan.
 
         Args:
-            rows: All data rows from prescan.
             headers: Column headers.
+            num_cols: Number of columns if there are no headers.
         """
         analyzer_config = {
             'constant_threshold': self._config.get('sampler_constant_threshold', 0.01),
             'correlation_threshold': self._config.get('sampler_correlation_threshold', 0.95),
         }
         analyzer = ColumnAnalyzer(analyzer_config)
-        self._column_analysis = analyzer.analyze(rows, headers)
+        analyzer.set_headers(headers, num_cols=num_cols)
+        return analyzer
+
+    def _run_smart_column_analysis(self, analyzer: ColumnAnalyzer) -> None:
+        """Run smart column analysis to identify columns to skip.
+
+        Args:
+            analyzer: Column analyzer with all data rows from the prescan.
+        """
+        self._column_analysis = analyzer.get_result()
 
         # Build skip columns set
         self._skip_columns = self._column_analysis.get_skip_columns()
@@ -895,41 +862,48 @@ class DataSampler:
                                           header_rows: int) -> None:
         """Pre-scan input files to detect categorical columns.
 
-        This method reads all input files to:
+        This method reads all input files once to:
         1. Extract headers
-        2. Collect all rows for categorical column detection
-        3. Detect ID columns based on header name patterns
-        4. Initialize uncovered values for coverage-based sampling
+        2. Collect the unique values per column for categorical column
+           detection
+        3. Feed the rows to the column analyzer for smart column analysis
+        4. Detect ID columns based on header name patterns
+        5. Initialize uncovered values for coverage-based sampling
+        Rows are not kept in memory.
 
         Args:
             input_files: List of input file paths.
             header_rows: Number of header rows to skip.
         """
-        all_rows = []
+        num_rows = 0
         headers = []
+        num_columns = 0
+        column_values = {}
+        analyzer = None
+        smart_columns = self._config.get('sampler_smart_columns', True)
+
+        reader = self._get_reader(input_files, header_rows)
+        num_header_rows = len(reader.get_header_rows())
+        for row_index, row in enumerate(reader, 1):
+            if row_index <= num_header_rows:
+                # Capture headers from first header row
+                if row_index == 1:
+                    headers = list(row)
+                continue
+            if not num_rows:
+                num_columns = len(headers) if headers else len(row)
+                column_values = {
+                    col_idx: set() for col_idx in range(num_columns)
+                }
+                if smart_columns:
+                    analyzer = self._get_column_analyzer(headers, len(row))
+            num_rows += 1
+            for col_idx in range(min(len(row), num_columns)):
+                column_values[col_idx].add(row[col_idx])
+            if analyzer:
+                analyzer.add_row(row)
 
-        for file in input_files:
-            input_encoding = self._config.get('input_encoding')
-            if not input_encoding:
-                input_encoding = file_util.file_get_encoding(file)
-
-            with file_util.FileIO(file, encoding=input_encoding) as csv_file:
-                csv_options = {'delimiter': self._config.get('input_delimiter')}
-                csv_options = file_util.file_get_csv_reader_options(
-                    file, csv_options)
-                csv_reader = csv.reader(csv_file, **csv_options)
-
-                row_index = 0
-                for row in csv_reader:
-                    row_index += 1
-                    if row_index <= header_rows:
-                        # Capture headers from first header row
-                        if row_index == 1 and not headers:
-                            headers = list(row)
-                        continue
-                    all_rows.append(row)
-
-        if not all_rows:
+        if not num_rows:
             logging.warning('No data rows found during prescan')
             return
 
@@ -942,7 +916,8 @@ class DataSampler:
             logging.info(f'Detected ID columns: {[headers[i] for i in self._id_column_indices if i < len(headers)]}')
 
         # Detect categorical columns
-        self._categorical_columns = self._detect_categorical_columns(all_rows, headers)
+        self._categorical_columns = self._detect_categorical_columns(
+            column_values, num_rows, headers)
 
         # Exclude ID columns from categorical columns (they're usually unique per row)
         for id_idx in self._id_column_indices:
@@ -958,8 +933,8 @@ class DataSampler:
         self._prescan_complete = True
 
         # Smart column analysis (new)
-        if self._config.get('sampler_smart_columns', True):
-            self._run_smart_column_analysis(all_rows, headers)
+        if analyzer:
+            self._run_smart_column_analysis(analyzer)
 
         # Log summary
         if self._categorical_columns:
@@ -1172,7 +1147,9 @@ class DataSampler:
             input_dir = os.path.dirname(input_files[0])
             output_file = os.path.join(input_dir, 'sampled_data.csv')
         # Set sampling rate by file size
-        num_rows = file_util.file_estimate_num_rows(input_files)
+        num_rows = sum(
+            self._get_file_profile(file).get('num_rows', 0)
+            for file in input_files)
 
         # NEW: Early exit for tiny datasets
         min_rows = self._config.get('sampler_min_rows', 40)
@@ -1183,7 +1160,7 @@ class DataSampler:
                     'Outputting entire dataset without sampling.'
                 )
             # Just copy the entire file
-            return self._copy_entire_file(input_files[0], output_file, header_rows, output_delimiter)
+            return self._copy_entire_file(input_files, output_file, header_rows, output_delimiter)
 
         if num_rows and self._config.get('sampler_rate') < 0:
             if max_rows > 0:
@@ -1199,91 +1176,83 @@ class DataSampler:
         if auto_detect and ensure_coverage:
             self._prescan_for_categorical_columns(input_files, header_rows)
 
-        # Get sample rows from each input file.
-        for input_index in range(len(input_files)):
-            file = input_files[input_index]
-            input_encoding = self._config.get('input_encoding')
-            if not input_encoding:
-                input_encoding = file_util.file_get_encoding(file)
-            with file_util.FileIO(file, encoding=input_encoding) as csv_file:
-                csv_options = {'delimiter': self._config.get('input_delimiter')}
-                csv_options = file_util.file_get_csv_reader_options(
-                    file, csv_options)
-                if not output_delimiter:
-                    # No output delimiter set. Use same as input.
-                    output_delimiter = csv_options.get('delimiter', ',')
-                output_mode = 'w' if input_index == 0 else 'a'
-                # Write sample rows from current input
-                with file_util.FileIO(output_file, mode=output_mode) as output:
-                    csv_writer = csv.writer(output,
-                                            delimiter=output_delimiter,
-                                            doublequote=False,
-                                            escapechar='\\')
-                    logging.level_debug() and logging.debug(
-                        f'Sampling rows from {file} with config: {self._config.get_configs()}'
-                    )
-                    # Examine each input row for any unique column values
-                    csv_reader = csv.reader(csv_file, **csv_options)
-                    row_index = 0
-                    for row in csv_reader:
-                        self._counters.add_counter('sampler-input-row', 1)
-                        row_index += 1
-                        # Process and write header rows from the first input file.
-                        if row_index <= header_rows and input_index == 0:
-                            self._process_header_row(row)
-                            csv_writer.writerow(row)
-                            self._counters.add_counter('sampler-header-rows', 1)
-                            # After processing all header rows, validate that all
-                            # requested unique columns were found
-                            if row_index == header_rows and self._unique_column_names:
-                                found = set(self._unique_column_indices.keys())
-                                missing = set(self._unique_column_names) - found
-                                if missing:
-                                    logging.error(
-                                        'Failed to map unique columns %s within %d header '
-                                        'row(s). Found: %s. Missing: %s. Increase '
-                                        'header_rows or verify column names.',
-                                        self._unique_column_names, header_rows,
-                                        found or 'none', missing)
-                                    raise ValueError(
-                                        f'Missing unique columns in headers: {missing}'
-                                    )
-                            continue
-                        # Check if input row has any unique values to be output
-                        if self.select_row(row, sample_rate):
-                            self._add_row_counts(row)
-                            # Mark categorical values as covered
-                            if self._prescan_complete:
-                                self._mark_values_covered(row)
-                            # Track row signature to avoid duplicates
-                            sig = self._get_row_signature(row)
-                            self._selected_signatures.add(sig)
-                            # Track aggregation rows
-                            if self._is_aggregation_row(row):
-                                self._selected_aggregation_rows += 1
-                            # Update numeric range coverage
-                            if self._numeric_ranges:
-                                self._update_numeric_coverage(row)
-                            csv_writer.writerow(row)
-                            logging.level_debug() and logging.log(
-                                2, f'Selecting row:{file}:{row_index}')
-
-                        # Check stopping conditions
-                        max_output = self._config.get('sampler_max_output_rows', 0)
-                        if max_output > 0 and self._selected_rows >= max_output:
-                            if self._all_categorical_covered():
-                                break
-                        elif max_rows > 0 and self._selected_rows >= max_rows:
-                            # Got enough sample output rows (legacy behavior)
-                            break
-
-                # Log coverage stats if using coverage mode
-                if self._prescan_complete and self._categorical_columns:
-                    stats = self._get_coverage_stats()
-                    for col_name, col_stats in stats['columns'].items():
-                        logging.info(
-                            f'Coverage for {col_name}: {col_stats["covered"]}/{col_stats["total"]} values'
-                        )
+        # Get sample rows from all input files as a single CSV with the
+        # header rows of the first file.
+        reader = self._get_reader(input_files, header_rows)
+        num_header_rows = len(reader.get_header_rows())
+        if not output_delimiter:
+            # No output delimiter set. Use same as input.
+            output_delimiter = self._get_reader_options(
+                input_files[0])[1].get('delimiter', ',')
+        with file_util.FileIO(output_file, mode='w') as output:
+            csv_writer = csv.writer(output,
+                                    delimiter=output_delimiter,
+                                    doublequote=False,
+                                    escapechar='\\')
+            logging.level_debug() and logging.debug(
+                f'Sampling rows from {input_files} with config: {self._config.get_configs()}'
+            )
+            # Examine each input row for any unique column values
+            row_index = 0
+            for row in reader:
+                self._counters.add_counter('sampler-input-row', 1)
+                row_index += 1
+                # Process and write header rows from the first input file.
+                if row_index <= num_header_rows:
+                    self._process_header_row(row)
+                    csv_writer.writerow(row)
+                    self._counters.add_counter('sampler-header-rows', 1)
+                    # After processing all header rows, validate that all
+                    # requested unique columns were found
+                    if row_index == header_rows and self._unique_column_names:
+                        found = set(self._unique_column_indices.keys())
+                        missing = set(self._unique_column_names) - found
+                        if missing:
+                            logging.error(
+                                'Failed to map unique columns %s within %d header '
+                                'row(s). Found: %s. Missing: %s. Increase '
+                                'header_rows or verify column names.',
+                                self._unique_column_names, header_rows,
+                                found or 'none', missing)
+                            raise ValueError(
+                                f'Missing unique columns in headers: {missing}'
+                            )
+                    continue
+                # Check if input row has any unique values to be output
+                if self.select_row(row, sample_rate):
+                    self._add_row_counts(row)
+                    # Mark categorical values as covered
+                    if self._prescan_complete:
+                        self._mark_values_covered(row)
+                    # Track row signature to avoid duplicates
+                    sig = self._get_row_signature(row)
+                    self._selected_signatures.add(sig)
+                    # Track aggregation rows
+                    if self._is_aggregation_row(row):
+                        self._selected_aggregation_rows += 1
+                    # Update numeric range coverage
+                    if self._numeric_ranges:
+                        self._update_numeric_coverage(row)
+                    csv_writer.writerow(row)
+                    logging.level_debug() and logging.log(
+                        2, 'Selecting row:%s:%s', *reader.get_source())
+
+                # Check stopping conditions
+                max_output = self._config.get('sampler_max_output_rows', 0)
+                if max_output > 0 and self._selected_rows >= max_output:
+                    if self._all_categorical_covered():
+                        reader.skip_file()
+                elif max_rows > 0 and self._selected_rows >= max_rows:
+                    # Got enough sample output rows (legacy behavior)
+                    reader.skip_file()
+
+        # Log coverage stats if using coverage mode
+        if self._prescan_complete and self._categorical_columns:
+            stats = self._get_coverage_stats()
+            for col_name, col_stats in stats['columns'].items():
+                logging.info(
+                    f'Coverage for {col_name}: {col_stats["covered"]}/{col_stats["total"]} values'
+                )
 
         # NEW: Minimum row guarantee - add more rows if needed
         min_rows = self._config.get('sampler_min_rows', 40)
@@ -1344,7 +1313,8 @@ def sample_csv_file(input_file: str,
             first header_rows rows or ValueError will be raised.
           - input_delimiter: The delimiter used in the input file.
           - output_delimiter: The delimiter to use in the output file.
-          - input_encoding: The encoding of the input file.
+          - input_encoding: The encoding of the input file. Detected from
+            the file if not set.
 
     Returns:
         The path to the output file with the sampled rows.
@@ -268,3 +268,39 @@ class DataSamplerTest(unittest.TestCase):
             lines = f.readlines()
             self.assertEqual(len(lines), 1)
             self.assertEqual(lines[0], 'header1,header2,header3\n')
+
+    def test_detected_encoding(self):
+        """Tests that the encoding is detected from the input file."""
+        input_file = os.path.join(self._tmp_dir, 'latin1.csv')
+        rows = [['city', 'count']]
+        rows.extend([['Zürich', '10'], ['Genève', '20'], ['Besançon', '30']] *
+                    10)
+        with open(input_file, 'w', encoding='cp1252', newline='') as f:
+            csv.writer(f).writerows(rows)
+        output_file = data_sampler.sample_csv_file(input_file,
+                                                   self.output_file)
+        with open(output_file, encoding='utf-8') as f:
+            output_rows = list(csv.reader(f))
+        self.assertEqual(rows[0], output_rows[0])
+        for row in output_rows[1:]:
+            self.assertIn(row, rows)
+
+    def test_multiple_input_files(self):
+        """Tests that multiple files are sampled with aligned columns."""
+        input_file1 = os.path.join(self._tmp_dir, 'part1.csv')
+        with open(input_file1, 'w') as f:
+            f.write('state,year,count\n')
+            f.write('CA,2020,10\n')
+        input_file2 = os.path.join(self._tmp_dir, 'part2.csv')
+        with open(input_file2, 'w') as f:
+            f.write('year,state,count\n')
+            f.write('2021,TX,20\n')
+        output_file = data_sampler.sample_csv_file(
+            f'{input_file1},{input_file2}', self.output_file)
+        with open(output_file) as f:
+            rows = list(csv.reader(f))
+        self.assertEqual([
+            ['state', 'year', 'count'],
+            ['CA', '2020', '10'],
+            ['TX', '2021', '20'],
+        ], rows)
@@ -22,6 +22,8 @@ run the command:
 """
 
 import calendar
+import math
+import operator
 import os
 import sys
 
@@ -29,6 +31,7 @@ from absl import app
 from absl import flags
 from absl import logging
 from datetime import datetime
+import numpy as np
 
 _SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(_SCRIPT_DIR)
@@ -217,6 +220,43 @@ def filter_data_svobs(svobs: dict,
         filter_data_max_change_ratio
       counters: counters updated with filter counts
     '''
+    series, allow = _filter_svobs_series(svobs, config, counters)
+    if series is None:
+        # No filtering required.
+        return svobs
+    filtered_series = {}
+    for index in series.output_order:
+        if allow[index]:
+            # Add the svobs PVs keyed by the input key.
+            key = series.keys[index]
+            filtered_series[key] = svobs[key]
+
+    return filtered_series
+
+
+def filter_data_get_outlier_keys(svobs: dict,
+                                 config: ConfigMap = None,
+                                 counters: Counters = None) -> list:
+    '''Returns the keys of svobs dropped by the filters.
+
+    The svobs are not modified so that the caller can remove the outliers
+    in place while retaining the order of the remaining svobs.
+    '''
+    series, allow = _filter_svobs_series(svobs, config, counters)
+    if series is None:
+        return []
+    allowed_keys = {series.keys[index] for index in np.flatnonzero(allow)}
+    # Observations replaced by a later one for the same series and date are
+    # dropped as well.
+    return [key for key in svobs if key not in allowed_keys]
+
+
+def _filter_svobs_series(svobs: dict, config: ConfigMap,
+                         counters: Counters) -> tuple:
+    '''Returns the series for the svobs and the filter result per observation.
+
+    Returns (None, None) if no filter is configured.
+    '''
     if config is None:
         config = ConfigMap(get_default_filter_data_config())
     if counters is None:
@@ -230,47 +270,289 @@ def filter_data_svobs(svobs: dict,
         config.get('filter_data_max_yearly_change_ratio', None))
     filter_keep_recent = config.get('filter_data_keep_recent', True)
     if filter_max_change is None and filter_max is None and filter_min is None and filter_max_yearly_change is None:
-        # No filtering required.
-        return svobs
+        return None, None
 
-    # Group SVObs into time series
-    # { <key> : { <date1> : <pvs>, <date2>: <pvs> ... }
+    # Group SVObs into time series with a code per series key,
     # where key is the concatenation of pvs except date and value.
     date_props = config.get('data_series_date_properties', ['observationDate'])
     value_props = config.get('data_series_value_properties', ['value'])
     ignore_props = set(date_props)
     ignore_props.update(value_props)
-    series_svobs = {}
-    for key, data_pvs in svobs.items():
-        series_key = filter_data_get_series_key(data_pvs, ignore_props)
-        date = filter_data_get_date_key(data_pvs, date_props)
-        if series_key is None or date is None:
-            counters.add_counter('filter-data-dropped-invalid-key', 1)
-            continue
-        series = series_svobs.get(series_key)
-        if series is None:
-            series = dict()
-            series_svobs[series_key] = series
-        # Copy the original key to restore filtered data
-        data_pvs['#Key'] = key
-        series[date] = data_pvs
-    counters.add_counter('filter-data-input-series', len(series_svobs))
+    series = _get_svobs_series(svobs, date_props, value_props, ignore_props)
+    counters.add_counter('filter-data-input-series', series.num_series)
     logging.info(
-        f'Filtering {len(series_svobs)} series with min: {filter_min}, max: {filter_max}, change: {filter_max_change}'
+        f'Filtering {series.num_series} series with min: {filter_min}, max: {filter_max}, change: {filter_max_change}'
     )
 
     # Filter each time series
-    filtered_series = {}
-    for key, series in series_svobs.items():
-        filter_data_series(series, filter_min, filter_max, filter_max_change,
-                           filter_max_yearly_change, filter_keep_recent,
-                           counters, value_props)
-        for date, pvs in series.items():
-            # Add the svobs PVs keyed by the input key.
-            key = pvs.pop('#Key')
-            filtered_series[key] = pvs
-
-    return filtered_series
+    allow = series.filter(filter_min, filter_max, filter_max_change,
+                          filter_max_yearly_change, filter_keep_recent,
+                          counters)
+    return series, allow
+
+
+class _SVObsSeries:
+    """Columnar arrays for the observations in time series.
+
+    The arrays have an entry per observation with a unique series key and
+    date. Observations are processed in the order of series and date, and
+    the filter for each series is computed with numpy operations.
+    """
+
+    def __init__(self, keys: list, series_codes: list, date_strs: list,
+                 date_codes: list, values: list, output_order: list):
+        # Input keys for each observation.
+        self.keys = keys
+        self.num_series = len(set(series_codes))
+        self.series_codes = np.array(series_codes, dtype=np.int64)
+        # Distinct date strings and the code for each observation.
+        self.date_strs = date_strs
+        self.date_codes = np.array(date_codes, dtype=np.int64)
+        self.values = np.array(values, dtype=float)
+        # Order of observations for the output.
+        self.output_order = output_order
+
+    def filter(self,
+               min_value: float = None,
+               max_value: float = None,
+               max_change_ratio: float = None,
+               max_yearly_change: float = None,
+               keep_recent: bool = True,
+               counters: Counters = None) -> np.ndarray:
+        """Returns a boolean array with True for observations to be kept.
+
+        The thresholds are the same as filter_data_series().
+        """
+        if counters is None:
+            counters = Counters()
+        num_obs = len(self.keys)
+        if not num_obs:
+            return np.zeros(0, dtype=bool)
+        values = self.values
+        allow = np.ones(num_obs, dtype=bool)
+        if min_value is not None:
+            below_min = values < min_value
+            allow &= ~below_min
+            _add_counter(counters, f'filter-data-dropped-min-{min_value}',
+                         below_min)
+        if max_value is not None:
+            above_max = values > max_value
+            allow &= ~above_max
+            _add_counter(counters, f'filter-data-dropped-max-{max_value}',
+                         above_max)
+
+        if max_change_ratio is not None or max_yearly_change is not None:
+            self._filter_changes(allow, max_change_ratio, max_yearly_change,
+                                 keep_recent, counters)
+
+        dropped = ~allow
+        _add_counter(counters, 'filter-data-dropped', dropped)
+        _add_counter(counters, 'filter-data-series-with-drops',
+                     np.unique(self.series_codes[dropped]))
+        return allow
+
+    def _filter_changes(self, allow: np.ndarray, max_change_ratio: float,
+                        max_yearly_change: float, keep_recent: bool,
+                        counters: Counters):
+        """Updates allow for observations that change too much from the
+        previous value kept in the series."""
+        # Sort observations by series and date string.
+        date_ranks = np.argsort(np.argsort(np.array(self.date_strs,
+                                                    dtype=object)))
+        obs_date_ranks = date_ranks[self.date_codes]
+        if keep_recent:
+            # process in reverse chronological order to keep most recent data.
+            obs_date_ranks = -obs_date_ranks
+        order = np.lexsort((obs_date_ranks, self.series_codes))
+        series = self.series_codes[order]
+        values = self.values[order]
+        days = None
+        if max_yearly_change is not None:
+            days = self._get_date_days()[self.date_codes[order]]
+
+        # Compare each value with the previous value within limits.
+        # This is the previous value kept unless values are dropped for
+        # change, in which case the series is processed sequentially.
+        sorted_allow = allow[order]
+        positions = np.arange(len(order))
+        prev = np.maximum.accumulate(np.where(sorted_allow, positions, -1))
+        prev = np.concatenate(([-1], prev[:-1]))
+        has_prev = prev >= 0
+        has_prev[has_prev] = series[prev[has_prev]] == series[has_prev]
+        change_failed = np.zeros(len(order), dtype=bool)
+        if has_prev.any():
+            change_failed[has_prev] = self._get_change_failures(
+                values[prev[has_prev]], values[has_prev],
+                None if days is None else days[prev[has_prev]],
+                None if days is None else days[has_prev], max_change_ratio,
+                max_yearly_change)
+
+        failed_series = np.unique(series[change_failed])
+        if not len(failed_series):
+            return
+        # Process series with values dropped for change sequentially.
+        starts = np.searchsorted(series, failed_series)
+        ends = np.searchsorted(series, failed_series, side='right')
+        sorted_allow = sorted_allow.tolist()
+        values = values.tolist()
+        if days is not None:
+            days = days.tolist()
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            self._filter_series_changes(sorted_allow, values, days, start, end,
+                                        max_change_ratio, max_yearly_change,
+                                        counters)
+        allow[order] = sorted_allow
+
+    def _filter_series_changes(self, allow: list, values: list, days: list,
+                               start: int, end: int, max_change_ratio: float,
+                               max_yearly_change: float, counters: Counters):
+        """Updates allow for values in a series from start to end comparing
+        each value with the previous value kept."""
+        prev_value = None
+        prev_day = None
+        for index in range(start, end):
+            value = values[index]
+            day = days[index] if days is not None else None
+            if not math.isnan(value) and prev_value is not None and (
+                    not math.isnan(prev_value)):
+                # Check if the data has changed too much
+                change = abs(prev_value - value)
+                change_pct = _divide(change,
+                                     min(abs(prev_value), abs(value)))
+                if max_change_ratio is not None and change_pct > max_change_ratio:
+                    allow[index] = False
+                    counters.add_counter(
+                        f'filter-data-dropped-change-{max_change_ratio}', 1)
+                if max_yearly_change is not None:
+                    years_diff = abs(prev_day - day) / 365.0
+                    yearly_change = _divide(change_pct, years_diff)
+                    if yearly_change > max_yearly_change:
+                        allow[index] = False
+                        counters.add_counter(
+                            f'filter-data-dropped-change-yearly-{max_yearly_change}',
+                            1)
+            if allow[index]:
+                prev_value = value
+                prev_day = day
+
+    def _get_change_failures(self, prev_values: np.ndarray,
+                             values: np.ndarray, prev_days: np.ndarray,
+                             days: np.ndarray, max_change_ratio: float,
+                             max_yearly_change: float) -> np.ndarray:
+        """Returns a boolean array with True for values that change more than
+        the thresholds compared to the previous values."""
+        failures = np.zeros(len(values), dtype=bool)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = np.abs(prev_values - values)
+            change_pct = change / np.minimum(np.abs(prev_values),
+                                             np.abs(values))
+            if max_change_ratio is not None:
+                failures |= change_pct > max_change_ratio
+            if max_yearly_change is not None:
+                years_diff = np.abs(prev_days - days) / 365.0
+                failures |= change_pct / years_diff > max_yearly_change
+        return failures
+
+    def _get_date_days(self) -> np.ndarray:
+        """Returns the days between each distinct date and the
+        first day of the calendar."""
+        days = np.full(len(self.date_strs), np.nan)
+        for index, date_str in enumerate(self.date_strs):
+            dt = _get_date_from_string(date_str)
+            if dt is not None:
+                days[index] = (dt - datetime.min).days
+        return days
+
+
+def _get_svobs_series(svobs: dict, date_props: list, value_props: list,
+                      ignore_props: set) -> _SVObsSeries:
+    """Returns the columnar series for the svobs.
+
+    The sorted properties for the series key are computed once for each set
+    of properties, and distinct date strings and values are parsed once.
+    For observations with the same series key and date, the last one is used
+    as in a dictionary keyed by date.
+    """
+    # Dict of the tuple of properties to the sorted properties for the key
+    # and a getter for their values.
+    key_props = {}
+    # Dict of series key to the series code in the order of first occurrence.
+    series_index = {}
+    # Dict of date string to date code.
+    date_index = {}
+    # Dict of value to the numeric value.
+    numeric_values = {}
+    # Dict of series and date code to index of the last observation.
+    series_dates = {}
+    obs_keys = []
+    obs_series = []
+    obs_dates = []
+    obs_values = []
+    for index, (key, data_pvs) in enumerate(svobs.items()):
+        props = tuple(data_pvs)
+        series_props = key_props.get(props)
+        if series_props is None:
+            # Internal properties such as '#input' are not in the key.
+            sorted_props = tuple(
+                p for p in sorted(props)
+                if p not in ignore_props and not p.startswith('#'))
+            series_props = (sorted_props, operator.itemgetter(*sorted_props)
+                            if sorted_props else lambda pvs: ())
+            key_props[props] = series_props
+        series_code = series_index.setdefault(
+            (series_props[0], series_props[1](data_pvs)), len(series_index))
+        date = filter_data_get_date_key(data_pvs, date_props)
+        date_code = date_index.setdefault(date, len(date_index))
+        value = np.nan
+        for prop in value_props:
+            prop_value = data_pvs.get(prop)
+            if prop_value is not None:
+                if isinstance(prop_value, str):
+                    value = numeric_values.get(prop_value)
+                    if value is None:
+                        value = get_numeric_value(prop_value)
+                        numeric_values[prop_value] = value
+                else:
+                    value = get_numeric_value(prop_value)
+                if value is None:
+                    value = np.nan
+                break
+        series_dates[(series_code << 32) | date_code] = index
+        obs_keys.append(key)
+        obs_series.append(series_code)
+        obs_dates.append(date_code)
+        obs_values.append(value)
+
+    # Keep the last observation for each series and date
+    # in the order of the first occurrence of the date in the series.
+    if len(series_dates) < len(obs_keys):
+        indices = list(series_dates.values())
+        obs_keys = [obs_keys[i] for i in indices]
+        obs_series = [obs_series[i] for i in indices]
+        obs_dates = [obs_dates[i] for i in indices]
+        obs_values = [obs_values[i] for i in indices]
+    # Output observations grouped by series.
+    output_order = np.argsort(np.array(obs_series, dtype=np.int64),
+                              kind='stable')
+    date_strs = list(date_index.keys())
+    return _SVObsSeries(obs_keys, obs_series, date_strs, obs_dates,
+                        obs_values, output_order.tolist())
+
+
+def _divide(numerator: float, denominator: float) -> float:
+    """Returns the ratio with inf or nan for a zero denominator as numpy."""
+    if denominator:
+        return numerator / denominator
+    if numerator > 0:
+        return math.inf
+    return math.nan
+
+
+def _add_counter(counters: Counters, name: str, items: np.ndarray):
+    """Adds the number of True values or items to the counter if not zero."""
+    count = int(np.count_nonzero(items)) if items.dtype == bool else len(items)
+    if count:
+        counters.add_counter(name, count)
 
 
 def filter_data_files(input_file: str,
@@ -221,3 +221,28 @@ class FilterDataOutlierTest(unittest.TestCase):
         filtered_svobs = filter_data.filter_data_svobs(svobs, config=config)
         self.assertEqual({2, 3, 6, 7},
                          set(data.keys()).difference(filtered_svobs.keys()))
+
+    def test_filter_data_svobs_zero_values(self):
+        config = {
+            'filter_data_max_change_ratio': 2,
+        }
+        data = {}
+        for index, (date, value) in enumerate([('2020', 0), ('2021', 0),
+                                                ('2022', 10), ('2022', 0),
+                                                ('2023', 1)]):
+            data[index] = {
+                'observationAbout': 'country/IND',
+                'variableMeasured': 'Count_Person',
+                'observationDate': date,
+                'value': value,
+            }
+        # Change from zero to a non-zero value is dropped.
+        filtered_svobs = filter_data.filter_data_svobs(dict(data),
+                                                       config=config)
+        self.assertEqual({4}, set(filtered_svobs.keys()))
+        # The last value for 2022 is used for the series and there is no
+        # change between zero values.
+        config['filter_data_keep_recent'] = False
+        filtered_svobs = filter_data.filter_data_svobs(dict(data),
+                                                       config=config)
+        self.assertEqual({0, 1, 3}, set(filtered_svobs.keys()))
@@ -0,0 +1,281 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Index of the directories and files in a ground truth repository.
+
+The repository is walked once and the list of sub-directories and files in
+each directory is saved in a JSON file in the cache directory along with the
+mtime of every directory. Later runs reuse the saved index as long as the
+mtimes of all directories are unchanged, which only needs a stat per
+directory instead of a listing of every file. Directory names are indexed by
+character trigrams to find directories containing a dataset name without a
+scan of the whole tree.
+
+The index replaces calls to os.listdir() and os.path.isdir() under the
+repository, so lookups such as find_ground_truth_pvmap() keep their matching
+rules. Entries are listed in sorted order. The '.git' directory and the
+contents of symlinked directories are not indexed.
+
+Example:
+  index = ground_truth_index.get_index('/path/to/datacommonsorg-data')
+  for folder in index.find_dirs('central_bank_policy_rate'):
+    print(folder, index.list_files(folder))
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from absl import logging
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(_SCRIPT_DIR),
+                                 '.generation_cache', 'ground_truth_index')
+
+# Version of the saved index.
+_INDEX_VERSION = 1
+
+# Size of the character ngrams used to index directory names.
+_NGRAM_SIZE = 3
+
+# Directories not indexed.
+_SKIP_DIRS = {'.git'}
+
+# Dict of (root, cache_dir) to the GroundTruthIndex shared in the process.
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+class GroundTruthIndex:
+    """Snapshot of the directory tree under a root directory."""
+
+    def __init__(self, root: str, cache_dir: str = DEFAULT_CACHE_DIR):
+        """Loads the saved index for root or walks root to build it.
+
+        Args:
+          root: directory to be indexed.
+          cache_dir: directory for the saved index or '' to not save it.
+        """
+        self._root = os.path.abspath(root)
+        self._cache_dir = cache_dir
+        # Dict of relative directory path to the tuple
+        # (mtime_ns, list of sub-directory names, list of file names).
+        self._dirs = {}
+        # Dict of ngram to set of relative directory paths whose name
+        # contains the ngram.
+        self._name_ngrams = {}
+        if not self._load():
+            self._build()
+            self._save()
+        self._index_names()
+
+    def get_root(self) -> str:
+        return self._root
+
+    def get_num_dirs(self) -> int:
+        return len(self._dirs)
+
+    def contains(self, path: str) -> bool:
+        """Returns True if path is the root or under it."""
+        rel_path = self._get_rel_path(path)
+        return rel_path is not None
+
+    def is_dir(self, path: str) -> bool:
+        """Returns True if path is a directory, like os.path.isdir()."""
+        rel_path = self._get_rel_path(path)
+        if rel_path is None:
+            return os.path.isdir(path)
+        return rel_path in self._dirs
+
+    def list_dir(self, path: str) -> list:
+        """Returns the names of sub-directories and files, like os.listdir().
+
+        Raises:
+          FileNotFoundError if path is not a directory.
+        """
+        rel_path = self._get_rel_path(path)
+        if rel_path is None:
+            return sorted(os.listdir(path))
+        entry = self._dirs.get(rel_path)
+        if entry is None:
+            raise FileNotFoundError(f'Directory not found: {path}')
+        return sorted(entry[1] + entry[2])
+
+    def list_subdirs(self, path: str) -> list:
+        """Returns the paths of the sub-directories in path."""
+        entry = self._dirs.get(self._get_rel_path(path), (0, [], []))
+        return [os.path.join(path, name) for name in entry[1]]
+
+    def list_files(self, path: str) -> list:
+        """Returns the paths of the files in path."""
+        entry = self._dirs.get(self._get_rel_path(path), (0, [], []))
+        return [os.path.join(path, name) for name in entry[2]]
+
+    def find_dirs(self, name: str, parent: str = None) -> list:
+        """Returns sorted paths of directories whose name contains name.
+
+        The match is case-insensitive.
+
+        Args:
+          name: string to look for in the directory names.
+          parent: if set, only directories directly under parent are returned.
+        """
+        name = name.lower()
+        if len(name) < _NGRAM_SIZE:
+            candidates = self._dirs.keys()
+        else:
+            candidates = None
+            for ngram in _get_ngrams(name):
+                dirs = self._name_ngrams.get(ngram, set())
+                candidates = dirs if candidates is None else candidates & dirs
+                if not candidates:
+                    return []
+        parent_rel_path = None
+        if parent is not None:
+            parent_rel_path = self._get_rel_path(parent)
+        matches = []
+        for rel_path in candidates:
+            if not rel_path or name not in os.path.basename(rel_path).lower():
+                continue
+            if parent is not None and os.path.dirname(
+                    rel_path) != parent_rel_path:
+                continue
+            matches.append(rel_path)
+        return [os.path.join(self._root, p) for p in sorted(matches)]
+
+    def _get_rel_path(self, path: str) -> str:
+        """Returns the path relative to root or None if outside root."""
+        path = os.path.abspath(path)
+        if path == self._root:
+            return ''
+        if not path.startswith(self._root + os.sep):
+            return None
+        return path[len(self._root) + 1:]
+
+    def _get_cache_file(self) -> str:
+        key = hashlib.sha256(self._root.encode('utf-8')).hexdigest()
+        return os.path.join(self._cache_dir, f'{key}.json')
+
+    def _build(self):
+        """Walks the root directory to index all sub-directories."""
+        start_time = time.perf_counter()
+        self._dirs = {}
+        num_files = 0
+        pending = ['']
+        while pending:
+            rel_path = pending.pop()
+            path = os.path.join(self._root, rel_path)
+            subdirs = []
+            files = []
+            try:
+                mtime = os.stat(path).st_mtime_ns
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            subdirs.append(entry.name)
+                            if (entry.name not in _SKIP_DIRS and
+                                    not entry.is_symlink()):
+                                pending.append(
+                                    os.path.join(rel_path, entry.name))
+                        else:
+                            files.append(entry.name)
+            except OSError as e:
+                logging.warning(f'Unable to list {path}: {e}')
+                continue
+            self._dirs[rel_path] = (mtime, sorted(subdirs), sorted(files))
+            num_files += len(files)
+        logging.info(f'Indexed {len(self._dirs)} directories and {num_files}'
+                     f' files in {self._root} in'
+                     f' {time.perf_counter() - start_time:.2f} secs')
+
+    def _load(self) -> bool:
+        """Loads the saved index if all directory mtimes are unchanged.
+
+        Returns:
+          True if the saved index was loaded.
+        """
+        if not self._cache_dir:
+            return False
+        cache_file = self._get_cache_file()
+        if not os.path.exists(cache_file):
+            return False
+        try:
+            with open(cache_file) as file:
+                saved = json.load(file)
+        except (OSError, ValueError) as e:
+            logging.warning(f'Ignoring invalid index {cache_file}: {e}')
+            return False
+        if saved.get('version') != _INDEX_VERSION or saved.get(
+                'root') != self._root:
+            return False
+        dirs = {
+            rel_path: tuple(entry)
+            for rel_path, entry in saved.get('dirs', {}).items()
+        }
+        for rel_path, entry in dirs.items():
+            try:
+                mtime = os.stat(os.path.join(self._root, rel_path)).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime != entry[0]:
+                logging.info(f'Rebuilding index for {self._root} as'
+                             f' {rel_path or "."} was modified')
+                return False
+        self._dirs = dirs
+        logging.debug(f'Loaded index for {self._root} from {cache_file}')
+        return True
+
+    def _save(self):
+        """Saves the index into the cache directory."""
+        if not self._cache_dir:
+            return
+        cache_file = self._get_cache_file()
+        tmp_file = f'{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            with open(tmp_file, 'w') as file:
+                json.dump(
+                    {
+                        'version': _INDEX_VERSION,
+                        'root': self._root,
+                        'dirs': self._dirs,
+                    }, file)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logging.warning(f'Unable to save index {cache_file}: {e}')
+
+    def _index_names(self):
+        """Indexes the directory names by ngrams."""
+        self._name_ngrams = {}
+        for rel_path in self._dirs:
+            for ngram in _get_ngrams(os.path.basename(rel_path).lower()):
+                self._name_ngrams.setdefault(ngram, set()).add(rel_path)
+
+
+def get_index(root: str, cache_dir: str = DEFAULT_CACHE_DIR) -> GroundTruthIndex:
+    """Returns the index for root shared by all callers in the process."""
+    key = (os.path.abspath(root), cache_dir)
+    with _INDEXES_LOCK:
+        if key not in _INDEXES:
+            _INDEXES[key] = GroundTruthIndex(root, cache_dir)
+        return _INDEXES[key]
+
+
+def _get_ngrams(name: str) -> set:
+    return {
+        name[pos:pos + _NGRAM_SIZE]
+        for pos in range(len(name) - _NGRAM_SIZE + 1)
+    }
@@ -0,0 +1,97 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for ground_truth_index.py."""
+
+import os
+import sys
+import tempfile
+import unittest
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+
+from ground_truth_index import GroundTruthIndex
+
+_FILES = [
+    'statvar_imports/bis/bis_central_bank_policy_rate/bis_pvmap.csv',
+    'statvar_imports/bis/bis_central_bank_policy_rate/test_data/input.csv',
+    'statvar_imports/oecd/oecd_wages/config_files/wages_pv_map.csv',
+    'us_census_pop/README.md',
+    '.git/objects/abc',
+]
+
+
+class GroundTruthIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp_dir.name, 'repo')
+        self.cache_dir = os.path.join(self.tmp_dir.name, 'cache')
+        for file in _FILES:
+            path = os.path.join(self.root, file)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write('key,value\n')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_lookup(self):
+        index = GroundTruthIndex(self.root, self.cache_dir)
+        bis_dir = os.path.join(self.root, 'statvar_imports', 'bis',
+                               'bis_central_bank_policy_rate')
+        self.assertEqual([bis_dir], index.find_dirs('Central_Bank'))
+        self.assertEqual([bis_dir],
+                         index.find_dirs('bank',
+                                         os.path.join(self.root,
+                                                      'statvar_imports',
+                                                      'bis')))
+        self.assertEqual([], index.find_dirs('bank', self.root))
+        self.assertEqual([os.path.join(self.root, 'us_census_pop')],
+                         index.find_dirs('us'))
+        self.assertEqual(['bis_pvmap.csv', 'test_data'],
+                         index.list_dir(bis_dir))
+        self.assertEqual([os.path.join(bis_dir, 'bis_pvmap.csv')],
+                         index.list_files(bis_dir))
+        self.assertTrue(index.is_dir(os.path.join(bis_dir, 'test_data')))
+        self.assertFalse(index.is_dir(os.path.join(bis_dir, 'missing')))
+        with self.assertRaises(FileNotFoundError):
+            index.list_dir(os.path.join(bis_dir, 'missing'))
+        # The .git directory is listed but not indexed.
+        self.assertIn('.git', index.list_dir(self.root))
+        self.assertEqual([], index.find_dirs('objects'))
+
+    def test_reuse_saved_index(self):
+        index = GroundTruthIndex(self.root, self.cache_dir)
+        self.assertEqual(1, len(os.listdir(self.cache_dir)))
+        num_dirs = index.get_num_dirs()
+
+        # Saved index is reused for an unchanged repo.
+        wages_dir = os.path.join(self.root, 'statvar_imports', 'oecd',
+                                 'oecd_wages')
+        index = GroundTruthIndex(self.root, self.cache_dir)
+        self.assertEqual(num_dirs, index.get_num_dirs())
+        self.assertEqual(['config_files'], index.list_dir(wages_dir))
+
+        # Index is rebuilt when a directory is modified.
+        os.makedirs(os.path.join(wages_dir, 'test_data'))
+        os.utime(wages_dir, ns=(0, 1))
+        index = GroundTruthIndex(self.root, self.cache_dir)
+        self.assertEqual(num_dirs + 1, index.get_num_dirs())
+        self.assertEqual(['config_files', 'test_data'],
+                         index.list_dir(wages_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
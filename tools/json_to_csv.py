@@ -13,6 +13,7 @@
 # limitations under the License.
 """Script to process data sets from OpenDataAfrica."""
 
+import csv
 import json
 import os
 import sys
@@ -39,15 +40,20 @@ flags.DEFINE_list('csv_columns', [], 'List of columns')
 flags.DEFINE_list('exclude_columns', [],
                   'Drop columns with the token in the list')
 
+flags.DEFINE_integer('json_column_scan_rows', sys.maxsize,
+                     'Maximum number of records scanned for columns.')
+
 _FLAGS = flags.FLAGS
 
+# Number of characters read from the JSON file at a time.
+_CHUNK_SIZE = 1 << 20
+
 
 def flatten_dict(nested_dict: dict, key_prefix: str = '') -> dict:
     """Returns a flattened dict with key:values from the  nested dict
 
   { prop1: { prop2: value }}, concatenating keys: { prop1.prop2: <value> }
   """
-    output_dict = {}
     if nested_dict is None:
         return {}
     if isinstance(nested_dict, str):
@@ -55,21 +61,31 @@ def flatten_dict(nested_dict: dict, key_prefix: str = '') -> dict:
     if isinstance(nested_dict, int) or isinstance(nested_dict, float):
         # value is a basic type. Keep it as is.
         return nested_dict
-    if isinstance(nested_dict, list):
-        nested_dict = {str(i): nested_dict[i] for i in range(len(nested_dict))}
-    # Expand any nested values
-    for key, value in nested_dict.items():
-        key = flatten_dict(key)
-        value = flatten_dict(value)
-        if isinstance(value, dict):
-            for nkey, nvalue in value.items():
-                nvalue = flatten_dict(nvalue)
-                output_dict[f'{key_prefix}{key}.{nkey}'] = nvalue
-        else:
-            output_dict[f'{key_prefix}{key}'] = value
+    output_dict = {}
+    _add_flattened_values(nested_dict, key_prefix, output_dict)
     return output_dict
 
 
+def _add_flattened_values(nested_value: Union[dict, list], key_prefix: str,
+                          output_dict: dict):
+    """Adds the values in the nested dict or list into the output_dict with
+    keys prefixed by the parent keys, in a single pass over the values."""
+    if isinstance(nested_value, list):
+        items = enumerate(nested_value)
+    else:
+        items = nested_value.items()
+    for key, value in items:
+        if isinstance(key, str):
+            key = key.replace('\n', ' ')
+        key = f'{key_prefix}{key}'
+        if isinstance(value, (dict, list)):
+            _add_flattened_values(value, f'{key}.', output_dict)
+        elif isinstance(value, str):
+            output_dict[key] = value.replace('\n', ' ')
+        elif value is not None:
+            output_dict[key] = value
+
+
 def list_to_dict(input_list: list, output_dict: dict = None) -> dict:
     """Returns a dict with each element in the list as a value of the index."""
     if output_dict is None:
@@ -99,50 +115,184 @@ def filter_columns(data: dict, output_columns: list,
     return data
 
 
+def iter_json_records(filename: str, chunk_size: int = _CHUNK_SIZE):
+    """Yields records from a JSON file parsed incrementally.
+
+    Each item of a top-level array is yielded as a record, as is each value in
+    a file with JSON lines or concatenated JSON values. Only the text for the
+    current record is held in memory.
+
+    Files that are not valid JSON, such as python dicts, are loaded fully
+    with file_util.file_load_py_dict().
+    """
+    decoder = json.JSONDecoder()
+    with file_util.FileIO(filename) as file:
+        buffer = ''
+        pos = 0
+        eof = False
+        in_array = False
+        # Number of top-level values parsed.
+        num_values = 0
+        while True:
+            # Skip whitespace and separators between records.
+            while pos < len(buffer) and (buffer[pos].isspace() or
+                                         (in_array and buffer[pos] == ',')):
+                pos += 1
+            if pos >= len(buffer):
+                if eof:
+                    break
+                buffer = file.read(chunk_size)
+                pos = 0
+                eof = not buffer
+                continue
+            if buffer[pos] == '[' and not in_array and num_values == 0:
+                # Stream items of the top-level array.
+                in_array = True
+                pos += 1
+                continue
+            if buffer[pos] == ']' and in_array:
+                in_array = False
+                num_values += 1
+                pos += 1
+                continue
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+                if end >= len(buffer) and not eof:
+                    # Value may be truncated at the end of the buffer.
+                    raise json.JSONDecodeError('Partial value', buffer, end)
+            except json.JSONDecodeError:
+                if not eof:
+                    # Read more data for the current record.
+                    more_data = file.read(max(chunk_size, len(buffer) - pos))
+                    buffer = buffer[pos:] + more_data
+                    pos = 0
+                    eof = not more_data
+                    continue
+                if num_values or in_array:
+                    raise
+                # Not a JSON file. Load it as a python dict.
+                logging.info(f'Loading {filename} as a python dict')
+                py_dict = file_util.file_load_py_dict(filename)
+                if isinstance(py_dict, list):
+                    yield from py_dict
+                else:
+                    yield py_dict
+                return
+            pos = end
+            if not in_array:
+                num_values += 1
+            yield record
+
+
 def file_json_to_csv(
     json_file: str,
     csv_output: str = '',
     output_columns: list = None,
     exclude_columns: list = None,
     set_key_column: bool = True,
+    column_scan_rows: int = sys.maxsize,
 ) -> str:
-    """Returns the CSV file generated from the json file."""
+    """Returns the CSV file generated from the json file.
+
+    The input files are streamed and rows are written as each record is
+    parsed. Top-level arrays, JSON lines and dicts with a row per file are
+    supported.
+
+    Args:
+      json_file: JSON file pattern to be converted.
+      csv_output: output CSV file. Defaults to the last input file with .csv.
+      output_columns: list of columns for the output. If more than one column
+        is set, the input is not scanned for columns.
+      exclude_columns: columns with any of these tokens are dropped.
+      set_key_column: If True, adds a column 'key' with the index of the row.
+      column_scan_rows: maximum number of records scanned for the columns.
+        Values in columns not seen in these records are dropped.
+
+    Returns:
+      the CSV file generated.
+    """
     input_files = file_util.file_get_matching(json_file)
     if not input_files:
         return ''
     counters = Counters()
     counters.add_counter('total', len(input_files))
-    input_list = []
-    for filename in input_files:
-        file_dict = file_util.file_load_py_dict(filename)
-        if isinstance(file_dict, list):
-            input_list.extend(file_dict)
-            logging.info(f'Loaded {len(file_dict)} items from {filename}')
-            counters.add_counter('input-rows', len(file_dict))
-        elif isinstance(file_dict, dict):
-            counters.max_counter('input-columns', len(file_dict))
-            filtered_dict = filter_columns(file_dict, output_columns,
-                                           exclude_columns)
-            input_list.append(filtered_dict)
-            counters.set_counter('output-columns', len(filtered_dict))
-            logging.info(f'Loaded row from {filename}')
-            counters.add_counter('input-rows', 1)
-        counters.add_counter('processed', 1)
-
-    csv_rows = list_to_dict(input_list)
+    key_column = None
+    if set_key_column:
+        key_column = 'key'
+    if output_columns and len(output_columns) == 1:
+        # Single column is used as the key.
+        key_column = output_columns[0]
+        output_columns = []
+
+    columns = []
+    if output_columns:
+        columns = list(output_columns)
+    else:
+        # Get the columns from a first pass over the records.
+        if key_column:
+            columns.append(key_column)
+        column_set = set(columns)
+        num_rows = 0
+        for record in _iter_json_rows(input_files, exclude_columns):
+            for column in record.keys():
+                if column not in column_set:
+                    column_set.add(column)
+                    columns.append(column)
+            num_rows += 1
+            if num_rows >= column_scan_rows:
+                break
+        if len(columns) == (1 if key_column else 0):
+            columns.append('value')
+
     if not csv_output:
         csv_output = file_util.file_get_name(input_files[-1], file_ext='.csv')
-    logging.info(
-        f'Writing {len(csv_rows)} rows from {input_files} into {csv_output}')
-    columns = file_util.file_write_csv_dict(
-        csv_rows,
-        csv_output,
-        output_columns,
-        key_column_name='key' if set_key_column else None)
+    logging.info(f'Writing rows from {input_files} into {csv_output} with'
+                 f' columns: {columns}')
+    column_set = set(columns)
+    with file_util.FileIO(csv_output, mode='w') as csv_file:
+        csv_writer = csv.DictWriter(
+            csv_file,
+            fieldnames=columns,
+            escapechar='\\',
+            extrasaction='ignore',
+            quotechar='"',
+            quoting=csv.QUOTE_NONNUMERIC,
+        )
+        csv_writer.writeheader()
+        num_rows = 0
+        for record in _iter_json_rows(input_files, exclude_columns, counters):
+            if key_column and key_column not in record:
+                record[key_column] = num_rows
+            if not column_set.issuperset(record.keys()):
+                counters.add_counter('rows-with-dropped-columns', 1)
+            csv_writer.writerow(record)
+            num_rows += 1
+    counters.set_counter('output-rows', num_rows)
     counters.set_counter('output-columns', len(columns))
+    logging.info(f'Wrote {num_rows} rows from {input_files} into {csv_output}')
     return csv_output
 
 
+def _iter_json_rows(input_files: list,
+                    exclude_columns: list = None,
+                    counters: Counters = None):
+    """Yields a flattened dict for each record in the input files."""
+    for filename in input_files:
+        num_rows = 0
+        for record in iter_json_records(filename):
+            row = flatten_dict(record)
+            if not isinstance(row, dict):
+                row = {'value': row}
+            if counters is not None:
+                counters.max_counter('input-columns', len(row))
+            yield filter_columns(row, None, exclude_columns)
+            num_rows += 1
+        logging.info(f'Loaded {num_rows} items from {filename}')
+        if counters is not None:
+            counters.add_counter('input-rows', num_rows)
+            counters.add_counter('processed', 1)
+
+
 def main(_):
     if not _FLAGS.input_json:
         logging.error(
@@ -154,6 +304,7 @@ def main(_):
         _FLAGS.csv_output,
         _FLAGS.csv_columns,
         _FLAGS.exclude_columns,
+        column_scan_rows=_FLAGS.json_column_scan_rows,
     )
 
 
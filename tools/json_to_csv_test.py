@@ -0,0 +1,118 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for json_to_csv.py."""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+sys.path.append(os.path.dirname(_SCRIPT_DIR))
+sys.path.append(os.path.dirname(os.path.dirname(_SCRIPT_DIR)))
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.dirname(_SCRIPT_DIR)), 'util'))
+sys.path.append(os.path.join(os.path.dirname(_SCRIPT_DIR), 'util'))
+
+from json_to_csv import file_json_to_csv, iter_json_records
+
+_TEST_RECORDS = [
+    {
+        'name': 'India',
+        'data': {
+            'year': 2020,
+            'value': 1.5
+        }
+    },
+    {
+        'name': 'Kenya, "KE"',
+        'data': {
+            'year': 2021
+        },
+        'tags': ['a', 'b']
+    },
+]
+
+
+class JsonToCsvTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write_file(self, filename: str, content: str) -> str:
+        filename = os.path.join(self.tmp_dir.name, filename)
+        with open(filename, 'w') as file:
+            file.write(content)
+        return filename
+
+    def _read_file(self, filename: str) -> str:
+        with open(filename) as file:
+            return file.read()
+
+    def test_iter_json_records(self):
+        json_file = self._write_file('test.json',
+                                     json.dumps(_TEST_RECORDS, indent=2))
+        # Records are parsed incrementally across small chunks.
+        self.assertEqual(_TEST_RECORDS,
+                         list(iter_json_records(json_file, chunk_size=7)))
+
+        jsonl_file = self._write_file(
+            'test.jsonl', '\n'.join(json.dumps(r) for r in _TEST_RECORDS))
+        self.assertEqual(_TEST_RECORDS,
+                         list(iter_json_records(jsonl_file, chunk_size=5)))
+
+        # Python dicts are loaded fully.
+        py_file = self._write_file('test.py', str(_TEST_RECORDS[0]))
+        self.assertEqual([_TEST_RECORDS[0]], list(iter_json_records(py_file)))
+
+    def test_file_json_to_csv(self):
+        json_file = self._write_file('test.json', json.dumps(_TEST_RECORDS))
+        csv_file = file_json_to_csv(json_file)
+        self.assertEqual(os.path.join(self.tmp_dir.name, 'test.csv'), csv_file)
+        self.assertEqual(
+            '"key","name","data.year","data.value","tags.0","tags.1"\n'
+            '0,"India",2020,1.5,"",""\n'
+            '1,"Kenya, ""KE""",2021,"","a","b"\n', self._read_file(csv_file))
+
+    def test_file_json_to_csv_columns(self):
+        jsonl_file = self._write_file(
+            'test.jsonl', '\n'.join(json.dumps(r) for r in _TEST_RECORDS))
+        output_file = os.path.join(self.tmp_dir.name, 'output.csv')
+        file_json_to_csv(jsonl_file,
+                         output_file,
+                         output_columns=['name', 'data.year'])
+        self.assertEqual(
+            '"name","data.year"\n'
+            '"India",2020\n'
+            '"Kenya, ""KE""",2021\n', self._read_file(output_file))
+
+        # Columns from the first record with excluded columns dropped.
+        file_json_to_csv(jsonl_file,
+                         output_file,
+                         exclude_columns=['value'],
+                         set_key_column=False,
+                         column_scan_rows=1)
+        self.assertEqual('"name","data.year"\n'
+                         '"India",2020\n'
+                         '"Kenya, ""KE""",2021\n',
+                         self._read_file(output_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
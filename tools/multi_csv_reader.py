@@ -0,0 +1,209 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Reads several CSV files as a single CSV without combining them on disk.
+
+The rows of all files are returned as one stream, like a csv.reader over a
+file with the rows of every file appended, but the files are read one at a
+time and nothing is written. The header rows of the first file are returned
+once and the header rows of the later files are dropped.
+
+The columns of the later files are aligned to the first file by the column
+names in their last header row, so files with the same columns in another
+order are returned with the columns of the first file. Columns not in the
+first file are appended after its columns. Files whose column names are
+empty or repeated are aligned by position.
+
+The file and line number of the last row returned is available with
+get_source() for logs and counters.
+
+Example:
+  reader = MultiCSVReader(['part1.csv', 'part2.csv'], header_rows=1)
+  for row in reader:
+    filename, line_number = reader.get_source()
+    ...
+"""
+
+import csv
+import os
+import sys
+
+from absl import logging
+from typing import Callable
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+sys.path.append(os.path.join(os.path.dirname(_SCRIPT_DIR), 'util'))
+
+import file_util
+
+
+def get_profile_reader_options(filename: str) -> tuple:
+    """Returns the encoding and csv.reader options from the file profile."""
+    profile = file_util.file_get_profile(filename)
+    return profile.get('encoding', 'utf-8'), dict(
+        profile.get('reader_options', {}))
+
+
+class MultiCSVReader:
+    """Iterator over the rows of several CSV files with aligned columns."""
+
+    def __init__(self,
+                 files: list,
+                 header_rows: int = None,
+                 reader_options: Callable[[str], tuple] = None):
+        """Reads the header rows of all files to align their columns.
+
+        Args:
+          files: list of files or file patterns, see
+            file_util.file_get_matching().
+          header_rows: number of header rows in each file or None to use
+            the header rows from the profile of each file.
+          reader_options: function that returns a tuple of
+            (encoding, csv.reader options) for a file.
+            Defaults to the options from the file profile.
+        """
+        self._files = file_util.file_get_matching(files)
+        self._header_rows = header_rows
+        self._reader_options = reader_options or get_profile_reader_options
+        # Header rows of the first file extended with any new columns.
+        self._headers = []
+        # Column names in the last header row of the headers.
+        self._columns = []
+        # List of (number of header rows, column map) per file, where the
+        # column map has the output column index for each column in the file
+        # or None if the columns are the same as the output.
+        self._file_columns = []
+        # Source of the last row returned.
+        self._filename = ''
+        self._line_number = 0
+        self._skip_file = False
+        self._init_columns()
+
+    def get_files(self) -> list:
+        return list(self._files)
+
+    def get_header_rows(self) -> list:
+        """Returns the header rows returned before the data rows."""
+        return [list(row) for row in self._headers]
+
+    def get_columns(self) -> list:
+        """Returns the column names of the aligned rows."""
+        return list(self._columns)
+
+    def get_source(self) -> tuple:
+        """Returns (filename, line number) of the last row returned."""
+        return self._filename, self._line_number
+
+    def skip_file(self):
+        """Continues the iteration from the data rows of the next file."""
+        self._skip_file = True
+
+    def __iter__(self):
+        for file_index, filename in enumerate(self._files):
+            num_header_rows, column_map = self._file_columns[file_index]
+            self._filename = filename
+            self._line_number = 0
+            self._skip_file = False
+            encoding, options = self._reader_options(filename)
+            with file_util.FileIO(filename, encoding=encoding,
+                                  newline='') as csv_file:
+                for row in csv.reader(csv_file, **options):
+                    self._line_number += 1
+                    if self._line_number <= num_header_rows:
+                        if file_index == 0:
+                            yield self._get_header_row(self._line_number - 1,
+                                                       row)
+                        continue
+                    yield self._align_row(row, column_map)
+                    if self._skip_file:
+                        break
+
+    def _init_columns(self):
+        """Sets the output columns and the column map for each file."""
+        column_index = {}
+        for file_index, filename in enumerate(self._files):
+            num_header_rows = self._header_rows
+            if num_header_rows is None:
+                num_header_rows = file_util.file_get_profile(filename).get(
+                    'header_rows', 1)
+            headers = self._read_rows(filename, num_header_rows)
+            columns = [c.strip() for c in headers[-1]] if headers else []
+            if file_index == 0:
+                self._headers = headers
+                self._columns = columns
+                column_index = _get_column_index(columns)
+                self._file_columns.append((num_header_rows, None))
+                continue
+            file_index_map = _get_column_index(columns)
+            if columns == self._columns[:len(columns)]:
+                column_map = None
+            elif column_index is None or file_index_map is None:
+                logging.warning(
+                    f'Aligning columns of {filename} by position as column'
+                    f' names are not unique: {columns}')
+                column_map = None
+            else:
+                column_map = []
+                for column in columns:
+                    if column not in column_index:
+                        column_index[column] = len(self._columns)
+                        self._columns.append(column)
+                        logging.info(
+                            f'Adding column {column} from {filename}')
+                    column_map.append(column_index[column])
+                if column_map == list(range(len(columns))):
+                    column_map = None
+            self._file_columns.append((num_header_rows, column_map))
+
+    def _read_rows(self, filename: str, num_rows: int) -> list:
+        """Returns the first num_rows rows of a file."""
+        rows = []
+        if num_rows <= 0:
+            return rows
+        encoding, options = self._reader_options(filename)
+        with file_util.FileIO(filename, encoding=encoding,
+                              newline='') as csv_file:
+            for row in csv.reader(csv_file, **options):
+                rows.append(row)
+                if len(rows) >= num_rows:
+                    break
+        return rows
+
+    def _get_header_row(self, index: int, row: list) -> list:
+        """Returns the header row extended with columns from other files."""
+        num_columns = len(self._columns)
+        if len(row) >= num_columns:
+            return row
+        if index == len(self._headers) - 1:
+            return row + self._columns[len(row):]
+        return row + [''] * (num_columns - len(row))
+
+    def _align_row(self, row: list, column_map: list) -> list:
+        """Returns the row with values moved to the output columns."""
+        if column_map is None:
+            return row
+        aligned = [''] * len(self._columns)
+        for index, value in enumerate(row):
+            if index < len(column_map):
+                aligned[column_map[index]] = value
+            else:
+                aligned.append(value)
+        return aligned
+
+
+def _get_column_index(columns: list) -> dict:
+    """Returns a dict of column name to index or None if names repeat."""
+    if not columns or not all(columns) or len(set(columns)) != len(columns):
+        return None
+    return {column: index for index, column in enumerate(columns)}
@@ -0,0 +1,80 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for multi_csv_reader.py."""
+
+import os
+import sys
+import tempfile
+import unittest
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+
+from multi_csv_reader import MultiCSVReader
+
+
+class MultiCSVReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write_file(self, name: str, content: str) -> str:
+        filename = os.path.join(self.tmp_dir.name, name)
+        with open(filename, 'w') as file:
+            file.write(content)
+        return filename
+
+    def test_aligned_columns(self):
+        file1 = self._write_file('part1.csv',
+                                 'Title,,\nstate,year,count\nCA,2020,10\n')
+        file2 = self._write_file(
+            'part2.csv',
+            'Title,,,\nyear,count,state,unit\n2021,20,TX,Person\n2022,30,NY,\n')
+        reader = MultiCSVReader([file1, file2], header_rows=2)
+        rows = []
+        sources = []
+        for row in reader:
+            rows.append(row)
+            sources.append(reader.get_source())
+        self.assertEqual([
+            ['Title', '', '', ''],
+            ['state', 'year', 'count', 'unit'],
+            ['CA', '2020', '10'],
+            ['TX', '2021', '20', 'Person'],
+            ['NY', '2022', '30', ''],
+        ], rows)
+        self.assertEqual([(file1, 1), (file1, 2), (file1, 3), (file2, 3),
+                          (file2, 4)], sources)
+        self.assertEqual(['state', 'year', 'count', 'unit'],
+                         reader.get_columns())
+
+    def test_positional_columns_and_skip_file(self):
+        file1 = self._write_file('part1.csv', 'a,a\n1,2\n3,4\n')
+        file2 = self._write_file('part2.csv', 'b,c\n5,6\n7,8\n')
+        reader = MultiCSVReader(f'{file1},{file2}', header_rows=1)
+        rows = []
+        for row in reader:
+            rows.append(row)
+            if row == ['1', '2']:
+                reader.skip_file()
+        # Duplicate column names in the first file align columns by position.
+        self.assertEqual([['a', 'a'], ['1', '2'], ['5', '6'], ['7', '8']],
+                         rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
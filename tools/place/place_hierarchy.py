@@ -0,0 +1,279 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Class for the containedInPlace hierarchy of places.
+
+Maintains the direct parents and types for each place dcid and the closure
+of all ancestors, so that checks such as "is place X within Y" are a set
+lookup.
+
+The hierarchy can be built offline from MCF or CSV files with the columns
+'dcid', 'containedInPlace' and 'typeOf', and saved as a CSV table:
+  python3 place_hierarchy.py --place_hierarchy_input=places.mcf \
+      --place_hierarchy_output=place_hierarchy.csv
+
+The saved table has the columns:
+  dcid: dcid of the place
+  typeOf: comma separated list of place types
+  containedInPlace: comma separated list of direct parents
+  ancestors: comma separated list of all ancestors of the place
+
+Example:
+  hierarchy = PlaceHierarchy('place_hierarchy.csv')
+  # Fetch parents for places not in the table in one lookup per level.
+  hierarchy.prefetch(['geoId/06085'], lookup_parents=get_parents_from_api)
+  if 'country/USA' in hierarchy.get_ancestors('geoId/06085'):
+     ...
+"""
+
+import csv
+import os
+import sys
+
+from absl import app
+from absl import flags
+from absl import logging
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+sys.path.append(os.path.dirname(_SCRIPT_DIR))
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(_SCRIPT_DIR))),
+                 'util'))
+
+_FLAGS = flags.FLAGS
+
+flags.DEFINE_list('place_hierarchy_input', [],
+                  'MCF or CSV files with containedInPlace and typeOf.')
+flags.DEFINE_string('place_hierarchy_output', '',
+                    'Output CSV file for the place hierarchy table.')
+
+import file_util
+
+from mcf_file_util import load_mcf_nodes, strip_namespace
+
+# Root of the place hierarchy that has no parents.
+_ROOT_PLACE = 'Earth'
+
+# Maximum number of levels of parents to lookup in prefetch.
+_MAX_LEVELS = 7
+
+_OUTPUT_COLUMNS = ['dcid', 'typeOf', 'containedInPlace', 'ancestors']
+
+
+class PlaceHierarchy:
+    """Table of parents, types and ancestors for place dcids."""
+
+    def __init__(self, filenames: list = None):
+        # Dict of dcid to set of direct parent dcids.
+        self._parents = {_ROOT_PLACE: set()}
+        # Dict of dcid to set of place types.
+        self._types = {}
+        # Dict of dcid to frozenset of all ancestors computed so far.
+        self._ancestors = {}
+        # Set of dcids with new parents whose descendants need new ancestors.
+        self._updated_places = set()
+        self._is_dirty = False
+        if filenames:
+            self.load(filenames)
+
+    def load(self, filenames: list):
+        """Loads places from MCF or CSV files.
+
+        CSV files need the columns 'dcid' and 'containedInPlace' and
+        may have 'typeOf' and 'ancestors'.
+        """
+        for filename in file_util.file_get_matching(filenames):
+            if filename.endswith('.mcf'):
+                self._load_mcf(filename)
+            else:
+                self._load_csv(filename)
+
+    def save(self, filename: str):
+        """Saves the hierarchy with the ancestors of each place as CSV."""
+        with file_util.FileIO(filename, mode='w') as output_file:
+            writer = csv.DictWriter(output_file, fieldnames=_OUTPUT_COLUMNS)
+            writer.writeheader()
+            for dcid in sorted(set(self._parents).union(self._types)):
+                writer.writerow({
+                    'dcid': dcid,
+                    'typeOf': _get_list_str(self._types.get(dcid)),
+                    'containedInPlace': _get_list_str(self._parents.get(dcid)),
+                    'ancestors': _get_list_str(self.get_ancestors(dcid)),
+                })
+        self._is_dirty = False
+        logging.info(f'Wrote {len(self._parents)} places into {filename}')
+
+    def is_dirty(self) -> bool:
+        """Returns True if places were added since the last save."""
+        return self._is_dirty
+
+    def has_place(self, dcid: str) -> bool:
+        """Returns True if the parents of the place are known."""
+        return dcid in self._parents
+
+    def add_place(self, dcid: str, parents: set = None, types: set = None):
+        """Adds the parents and types for a place."""
+        if parents is not None:
+            place_parents = self._parents.get(dcid)
+            if place_parents is None or not place_parents.issuperset(parents):
+                self._parents.setdefault(dcid, set()).update(parents)
+                # Ancestors of the place and its descendants are recomputed.
+                self._updated_places.add(dcid)
+        if types:
+            self._types.setdefault(dcid, set()).update(types)
+        self._is_dirty = True
+
+    def get_parents(self, dcid: str) -> set:
+        """Returns the set of direct parents of the place."""
+        return self._parents.get(dcid, set())
+
+    def get_types(self, dcid: str) -> set:
+        """Returns the set of types of the place."""
+        return self._types.get(dcid, set())
+
+    def get_ancestors(self, dcid: str) -> frozenset:
+        """Returns the set of all ancestors of the place."""
+        self._invalidate_ancestors()
+        ancestors = self._ancestors.get(dcid)
+        if ancestors is not None:
+            return ancestors
+        ancestors = set()
+        pending = list(self._parents.get(dcid, []))
+        while pending:
+            parent = pending.pop()
+            if parent in ancestors or parent == dcid:
+                continue
+            ancestors.add(parent)
+            parent_ancestors = self._ancestors.get(parent)
+            if parent_ancestors is not None:
+                ancestors.update(parent_ancestors)
+            else:
+                pending.extend(self._parents.get(parent, []))
+        ancestors = frozenset(ancestors)
+        self._ancestors[dcid] = ancestors
+        return ancestors
+
+    def get_ancestor_types(self, dcid: str) -> set:
+        """Returns the set of types of all ancestors of the place."""
+        types = set()
+        for ancestor in self.get_ancestors(dcid):
+            types.update(self._types.get(ancestor, []))
+        return types
+
+    def prefetch(self,
+                 dcids: list,
+                 lookup_places,
+                 max_levels: int = _MAX_LEVELS):
+        """Looks up parents and types for all places not in the hierarchy
+        and their ancestors, with one call to lookup_places per level.
+
+        Args:
+          dcids: list of place dcids.
+          lookup_places: function that takes a list of dcids and returns a
+            dict of dcid to a dict with the set of parent dcids for
+            'containedInPlace' and the set of place types for 'typeOf'.
+          max_levels: maximum number of levels of parents to lookup.
+        """
+        lookup_dcids = {d for d in dcids if d and d not in self._parents}
+        for _ in range(max_levels + 1):
+            if not lookup_dcids:
+                break
+            places = lookup_places(sorted(lookup_dcids))
+            next_dcids = set()
+            for dcid in lookup_dcids:
+                place = places.get(dcid) or {}
+                place_parents = _get_value_set(place.get('containedInPlace'))
+                self.add_place(dcid, place_parents,
+                               _get_value_set(place.get('typeOf')))
+                next_dcids.update(place_parents)
+            lookup_dcids = {
+                d for d in next_dcids if d and d not in self._parents
+            }
+
+    def _load_mcf(self, filename: str):
+        """Loads places from an MCF file."""
+        nodes = load_mcf_nodes(filename, strip_namespaces=True)
+        for dcid, node in nodes.items():
+            dcid = strip_namespace(node.get('dcid', dcid))
+            if not dcid or not isinstance(node, dict):
+                continue
+            self.add_place(dcid, _get_value_set(node.get('containedInPlace')),
+                           _get_value_set(node.get('typeOf')))
+        logging.info(f'Loaded {len(nodes)} places from {filename}')
+
+    def _load_csv(self, filename: str):
+        """Loads places from a CSV file."""
+        num_rows = 0
+        ancestors = {}
+        with file_util.FileIO(filename) as csv_file:
+            for row in csv.DictReader(csv_file):
+                dcid = strip_namespace(row.get('dcid', row.get('Node', '')))
+                if not dcid:
+                    continue
+                self.add_place(dcid,
+                               _get_value_set(row.get('containedInPlace')),
+                               _get_value_set(row.get('typeOf')))
+                if row.get('ancestors') is not None:
+                    ancestors[dcid] = frozenset(
+                        _get_value_set(row.get('ancestors')))
+                num_rows += 1
+        # Use the precomputed ancestors from a saved hierarchy.
+        self._invalidate_ancestors()
+        self._ancestors.update(ancestors)
+        self._is_dirty = False
+        logging.info(f'Loaded {num_rows} places from {filename}')
+
+    def _invalidate_ancestors(self):
+        """Removes the ancestors of places with new parents and of their
+        descendants, keeping the ancestors of all other places."""
+        if not self._updated_places:
+            return
+        updated_places = self._updated_places
+        self._updated_places = set()
+        self._ancestors = {
+            dcid: ancestors
+            for dcid, ancestors in self._ancestors.items()
+            if dcid not in updated_places and
+            ancestors.isdisjoint(updated_places)
+        }
+
+
+def _get_value_set(values: str) -> set:
+    """Returns a set of dcids from a comma separated string."""
+    if not values:
+        return set()
+    if not isinstance(values, str):
+        values = ','.join(values)
+    return {
+        strip_namespace(v.strip().strip('"'))
+        for v in values.split(',')
+        if v.strip()
+    }
+
+
+def _get_list_str(values: set) -> str:
+    """Returns a comma separated string of sorted values."""
+    if not values:
+        return ''
+    return ','.join(sorted(values))
+
+
+def main(_):
+    hierarchy = PlaceHierarchy(_FLAGS.place_hierarchy_input)
+    if _FLAGS.place_hierarchy_output:
+        hierarchy.save(_FLAGS.place_hierarchy_output)
+
+
+if __name__ == '__main__':
+    app.run(main)
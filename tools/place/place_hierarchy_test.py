@@ -0,0 +1,173 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for place_hierarchy.py."""
+
+import os
+import sys
+import tempfile
+import unittest
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+sys.path.append(os.path.dirname(_SCRIPT_DIR))
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(_SCRIPT_DIR))),
+                 'util'))
+
+from place_hierarchy import PlaceHierarchy
+
+_TEST_MCF = """
+Node: dcid:geoId/06085
+typeOf: dcs:County
+containedInPlace: dcid:geoId/06
+
+Node: dcid:geoId/06
+typeOf: dcs:State
+containedInPlace: dcid:country/USA
+
+Node: dcid:country/USA
+typeOf: dcs:Country
+containedInPlace: dcid:northamerica
+"""
+
+_TEST_CSV = """dcid,typeOf,containedInPlace
+northamerica,Continent,Earth
+"""
+
+# Parents returned by the test lookup function.
+_TEST_PARENTS = {
+    'geoId/0649670': ['geoId/06085', 'geoId/06'],
+    'geoId/06085': ['geoId/06'],
+    'geoId/06': ['country/USA'],
+    'country/USA': ['northamerica'],
+    'northamerica': ['Earth'],
+}
+
+# Types returned by the test lookup function.
+_TEST_TYPES = {
+    'geoId/0649670': 'City',
+    'geoId/06085': 'County',
+    'geoId/06': 'State',
+}
+
+
+class PlaceHierarchyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.mcf_file = os.path.join(self.tmp_dir.name, 'places.mcf')
+        with open(self.mcf_file, 'w') as file:
+            file.write(_TEST_MCF)
+        self.csv_file = os.path.join(self.tmp_dir.name, 'places.csv')
+        with open(self.csv_file, 'w') as file:
+            file.write(_TEST_CSV)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_load(self):
+        hierarchy = PlaceHierarchy([self.mcf_file, self.csv_file])
+        self.assertTrue(hierarchy.has_place('geoId/06085'))
+        self.assertFalse(hierarchy.has_place('geoId/06001'))
+        self.assertEqual({'geoId/06'}, hierarchy.get_parents('geoId/06085'))
+        self.assertEqual({'County'}, hierarchy.get_types('geoId/06085'))
+        self.assertEqual(
+            {'geoId/06', 'country/USA', 'northamerica', 'Earth'},
+            hierarchy.get_ancestors('geoId/06085'))
+        self.assertEqual({'State', 'Country', 'Continent'},
+                         hierarchy.get_ancestor_types('geoId/06085'))
+        self.assertEqual(set(), hierarchy.get_ancestors('Earth'))
+
+    def test_save(self):
+        hierarchy = PlaceHierarchy([self.mcf_file, self.csv_file])
+        output_file = os.path.join(self.tmp_dir.name, 'hierarchy.csv')
+        hierarchy.save(output_file)
+        self.assertFalse(hierarchy.is_dirty())
+        with open(output_file) as file:
+            lines = file.read().splitlines()
+        self.assertEqual('dcid,typeOf,containedInPlace,ancestors', lines[0])
+        self.assertIn(
+            'geoId/06085,County,geoId/06,'
+            '"Earth,country/USA,geoId/06,northamerica"', lines)
+
+        # Precomputed ancestors are used from the saved table.
+        saved_hierarchy = PlaceHierarchy([output_file])
+        self.assertFalse(saved_hierarchy.is_dirty())
+        self.assertEqual(hierarchy.get_ancestors('geoId/06085'),
+                         saved_hierarchy.get_ancestors('geoId/06085'))
+
+    def test_prefetch(self):
+        lookups = []
+
+        def _lookup_places(dcids: list) -> dict:
+            lookups.append(dcids)
+            return {
+                d: {
+                    'containedInPlace': _TEST_PARENTS.get(d),
+                    'typeOf': _TEST_TYPES.get(d, ''),
+                } for d in dcids
+            }
+
+        hierarchy = PlaceHierarchy()
+        hierarchy.prefetch(['geoId/0649670', 'geoId/06085'], _lookup_places)
+        # One lookup per level for places not in the hierarchy.
+        self.assertEqual([
+            ['geoId/06085', 'geoId/0649670'],
+            ['geoId/06'],
+            ['country/USA'],
+            ['northamerica'],
+        ], lookups)
+        self.assertTrue(hierarchy.is_dirty())
+        self.assertEqual(
+            {
+                'geoId/06085', 'geoId/06', 'country/USA', 'northamerica',
+                'Earth'
+            }, hierarchy.get_ancestors('geoId/0649670'))
+        self.assertEqual({'City'}, hierarchy.get_types('geoId/0649670'))
+        self.assertEqual({'County', 'State'},
+                         hierarchy.get_ancestor_types('geoId/0649670'))
+
+        # Places in the hierarchy are not looked up again.
+        hierarchy.prefetch(['geoId/06085', 'country/USA'], _lookup_places)
+        self.assertEqual(4, len(lookups))
+
+    def test_add_place_keeps_precomputed_ancestors(self):
+        hierarchy = PlaceHierarchy([self.mcf_file, self.csv_file])
+        output_file = os.path.join(self.tmp_dir.name, 'hierarchy.csv')
+        hierarchy.save(output_file)
+        # Precomputed ancestors that differ from the parents are kept.
+        with open(output_file, 'a') as file:
+            file.write('geoId/06001,County,geoId/06,"geoId/06,saved"\n')
+        saved_hierarchy = PlaceHierarchy([output_file])
+
+        # Adding a new place keeps the ancestors of other places.
+        saved_hierarchy.add_place('geoId/0649670', {'geoId/06085'})
+        self.assertEqual({'geoId/06', 'saved'},
+                         saved_hierarchy.get_ancestors('geoId/06001'))
+        self.assertEqual(
+            {
+                'geoId/06085', 'geoId/06', 'country/USA', 'northamerica',
+                'Earth'
+            }, saved_hierarchy.get_ancestors('geoId/0649670'))
+
+        # New parents update the ancestors of the place and descendants.
+        saved_hierarchy.add_place('northamerica', {'americas'})
+        self.assertIn('americas',
+                      saved_hierarchy.get_ancestors('geoId/0649670'))
+        self.assertEqual({'geoId/06', 'saved'},
+                         saved_hierarchy.get_ancestors('geoId/06001'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -102,6 +102,10 @@ flags.DEFINE_string(
 flags.DEFINE_string('place_resolver_cache', '',
                     'Cache file to save resolved places.')
 flags.DEFINE_list('output_place_columns', [], 'List of columns in the output.')
+flags.DEFINE_list(
+    'place_hierarchy_csv', '',
+    'CSV or MCF files with the containedInPlace hierarchy of places.'
+    ' The first file is updated with places looked up with the DC API.')
 flags.DEFINE_string('maps_api_cache', '',
                     'Cache file to save responses from maps API.')
 flags.DEFINE_integer('place_pprof_port', 0,
@@ -135,6 +139,7 @@ from config_map import ConfigMap
 from download_util import request_url
 from dc_api_wrapper import dc_api_batched_wrapper, dc_api_resolve_placeid
 from dc_api_wrapper import dc_api_resolve_latlng, dc_api_get_node_property
+from place_hierarchy import PlaceHierarchy
 from place_name_matcher import PlaceNameMatcher
 from property_value_cache import PropertyValueCache
 
@@ -1008,6 +1013,9 @@ class PlaceResolver:
             filename=self._config.get('places_resolved_csv'),
             normalize_key=self._config.get('resolver_normalize_key', True),
         )
+        # Ancestors for places loaded from a precomputed table.
+        self._place_hierarchy = PlaceHierarchy(
+            self._config.get('place_hierarchy_csv'))
         # In-memory cache of failed lookups to avoid retries.
         self._failure_cache = PropertyValueCache(
             key_props=['place_name', 'dcid', 'placeId', 'wikidataId'],
@@ -1022,6 +1030,13 @@ class PlaceResolver:
                                        time_interval <= time.perf_counter()):
             self._cache.save_cache_file()
             self._cache_save_timestamp = time.perf_counter()
+        hierarchy_files = self._config.get('place_hierarchy_csv')
+        if hierarchy_files and self._place_hierarchy.is_dirty() and (
+                not time_interval):
+            if isinstance(hierarchy_files, str):
+                hierarchy_files = hierarchy_files.split(',')
+            if file_util.file_is_csv(hierarchy_files[0]):
+                self._place_hierarchy.save(hierarchy_files[0])
 
     def _get_cache_value(self, cache_key: str, prop: str = '') -> dict:
         """Returns the value in the cache dictionary for the key
@@ -1062,20 +1077,29 @@ class PlaceResolver:
         self._failure_cache.add(value)
         return
 
-    def _cache_contained_in_places(self, dcids: list, level: int = 0):
-        """Cache the containedInPlace values for each dcid upto the root."""
+    def _cache_contained_in_places(self, dcids: list):
+        """Cache the containedInPlace values for each dcid upto the root.
+
+        Places are added to the place hierarchy with one lookup per level for
+        all dcids that are not already in the hierarchy.
+        """
+        self._place_hierarchy.prefetch(dcids, self._lookup_contained_in_places)
 
-        # Get dcids without containedInPlace
+    def _lookup_contained_in_places(self, dcids: list) -> dict:
+        """Returns a dict of dcid to the parent places and types from the
+        cache or DC API."""
+        places = {}
         lookup_dcids = []
-        parent_dcids = set()
         for dcid in dcids:
-            if dcid != 'Earth':
-                parents = self._get_cache_value(
-                    dcid, 'containedInPlace').get('containedInPlace')
-                if not parents:
-                    lookup_dcids.append(dcid)
-                else:
-                    parent_dcids.update(_get_value_set(parents))
+            cached_entry = self._get_cache_value(dcid, 'containedInPlace')
+            cached_parents = cached_entry.get('containedInPlace')
+            if cached_parents:
+                places[dcid] = {
+                    'containedInPlace': _get_value_set(cached_parents),
+                    'typeOf': _get_value_set(cached_entry.get('typeOf')),
+                }
+            else:
+                lookup_dcids.append(dcid)
 
         if lookup_dcids:
             dc_api_resp = dc_api_get_node_property(
@@ -1086,30 +1110,41 @@ class PlaceResolver:
             self._counters.add_counter(
                 f'dc-api-prop-value-containedInPlace-lookups',
                 len(lookup_dcids))
+            types_resp = dc_api_get_node_property(
+                dcids=list(dc_api_resp.keys()),
+                prop='typeOf',
+                config=self._config.get_configs(),
+            )
+            self._counters.add_counter(f'dc-api-prop-value-typeOf-lookups',
+                                       len(dc_api_resp))
             # Cache the property:value for the response.
             for dcid, prop_values in dc_api_resp.items():
                 val = prop_values.get('containedInPlace')
                 if val:
                     values_set = _get_value_set(val)
-                    self._set_cache_value(
-                        '',
-                        {
-                            'dcid': dcid,
-                            'containedInPlace': values_set,
-                        },
-                    )
-                    parent_dcids.update(values_set)
-
-        # Lookup containedInPlace heirarchy upto 7 levels.
-        if level < 7 and parent_dcids:
-            # lookup new parents
-            self._cache_contained_in_places(parent_dcids, level + 1)
+                    types_set = _get_value_set(
+                        types_resp.get(dcid, {}).get('typeOf'))
+                    cache_value = {
+                        'dcid': dcid,
+                        'containedInPlace': values_set,
+                    }
+                    if types_set:
+                        cache_value['typeOf'] = types_set
+                    self._set_cache_value('', cache_value)
+                    places[dcid] = {
+                        'containedInPlace': values_set,
+                        'typeOf': types_set,
+                    }
+        return places
 
     def _get_contained_in_place(self, dcid: str) -> set:
         """Returns the list of contained in places for a dcid from cache."""
         parents = set()
         if not dcid:
             return parents
+        if self._place_hierarchy.has_place(dcid):
+            self._counters.add_counter('place-hierarchy-hits', 1)
+            return set(self._place_hierarchy.get_ancestors(dcid))
         logging.log_every_n(logging.DEBUG,
                             f'Looking up containedInPlace for {dcid}',
                             self._log_every_n)
@@ -1351,6 +1386,7 @@ def main(_):
     config.set_config('place_latitude_column', _FLAGS.place_latitude_column)
     config.set_config('place_longitude_column', _FLAGS.place_longitude_column)
     config.set_config('places_resolved_csv', _FLAGS.place_resolver_cache)
+    config.set_config('place_hierarchy_csv', _FLAGS.place_hierarchy_csv)
     config.set_config('maps_api_key', _FLAGS.maps_key)
     config.set_config('maps_api_cache', _FLAGS.maps_api_cache)
     config.set_config('dc_api_key', _FLAGS.resolve_api_key)
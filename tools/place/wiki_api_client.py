@@ -0,0 +1,263 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""HTTP client for wiki search and Wikidata entity lookups.
+
+Requests share a pooled session with keep-alive and are rate limited across
+threads. Wikidata entities are fetched in batches with the wbgetentities API
+and saved in a persistent cache keyed by entity id.
+
+Example:
+  client = WikiAPIClient({'wiki_entity_cache': '/tmp/wiki_entities.sqlite'})
+  # Get the entity json for a list of wikidata ids.
+  entities = client.get_entities(['Q1355', 'Q99'])
+  # entities['Q99'] has 'labels', 'descriptions' and 'statements'.
+
+  # Get responses for a list of URLs with concurrent requests.
+  responses = client.get_json_urls([url1, url2])
+"""
+
+import concurrent.futures
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import requests
+
+from absl import logging
+from requests.adapters import HTTPAdapter
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+sys.path.append(os.path.dirname(_SCRIPT_DIR))
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(_SCRIPT_DIR))),
+                 'util'))
+
+import download_util
+
+from counters import Counters
+from config_map import ConfigMap
+
+_DEFAULT_CONFIG = {
+    # URL for the wiki action API used for wbgetentities.
+    'wiki_entities_api_url': 'https://www.wikidata.org/w/api.php',
+    # Maximum ids per wbgetentities request.
+    'wiki_entities_batch_size': 50,
+    # Maximum number of concurrent HTTP requests.
+    'wiki_http_max_concurrency': 8,
+    # Maximum HTTP requests per second across all threads.
+    'wiki_http_max_requests_per_sec': 10,
+    # Timeout per HTTP request in seconds.
+    'wiki_http_timeout': 30,
+    # Number of retries for failed requests.
+    'wiki_http_retries': 3,
+    # Sqlite file to persist wiki entities. Entities are only cached in
+    # memory if not set.
+    'wiki_entity_cache': '',
+}
+
+
+class RateLimiter:
+    """Limits calls to wait() to a maximum rate across threads."""
+
+    def __init__(self, max_per_sec: float):
+        self._interval = 1.0 / max_per_sec if max_per_sec > 0 else 0
+        self._next_time = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Blocks until the next call is allowed."""
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait_secs = self._next_time - now
+            self._next_time = max(now, self._next_time) + self._interval
+        if wait_secs > 0:
+            time.sleep(wait_secs)
+
+
+class WikiEntityCache:
+    """Persistent cache of wiki entity json keyed by entity id."""
+
+    def __init__(self, filename: str = ''):
+        self._entities = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if filename:
+            dirname = os.path.dirname(filename)
+            if dirname:
+                os.makedirs(dirname, exist_ok=True)
+            self._db = sqlite3.connect(filename, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS entities'
+                             ' (id TEXT PRIMARY KEY, json TEXT)')
+            logging.info(f'Using wiki entity cache {filename}')
+
+    def get(self, entity_ids: list) -> dict:
+        """Returns a dict of entity id to json for ids in the cache."""
+        result = {}
+        missing = []
+        with self._lock:
+            for entity_id in entity_ids:
+                if entity_id in self._entities:
+                    result[entity_id] = self._entities[entity_id]
+                else:
+                    missing.append(entity_id)
+            if self._db is not None and missing:
+                placeholders = ','.join('?' * len(missing))
+                for entity_id, entity_json in self._db.execute(
+                        f'SELECT id, json FROM entities WHERE id IN'
+                        f' ({placeholders})', missing):
+                    entity = json.loads(entity_json)
+                    self._entities[entity_id] = entity
+                    result[entity_id] = entity
+        return result
+
+    def add(self, entities: dict):
+        """Adds a dict of entity id to json into the cache."""
+        with self._lock:
+            self._entities.update(entities)
+            if self._db is not None and entities:
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO entities VALUES (?, ?)',
+                    [(k, json.dumps(v)) for k, v in entities.items()])
+                self._db.commit()
+
+
+class WikiAPIClient:
+    """Client for concurrent, rate limited and cached wiki API requests."""
+
+    def __init__(self, config_dict: dict = {}, counters: Counters = None):
+        self._config = ConfigMap(_DEFAULT_CONFIG)
+        self._config.update_config(config_dict)
+        self._counters = counters
+        if self._counters is None:
+            self._counters = Counters()
+        max_concurrency = self._config.get('wiki_http_max_concurrency', 8)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_concurrency,
+                              pool_maxsize=max_concurrency)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_concurrency)
+        self._rate_limiter = RateLimiter(
+            self._config.get('wiki_http_max_requests_per_sec', 10))
+        self._entity_cache = WikiEntityCache(
+            self._config.get('wiki_entity_cache', ''))
+
+    def get_json(self, url: str, params: dict = {}) -> dict:
+        """Returns the json response for a GET request to the url."""
+        # Check if the response is pre-filled for tests.
+        response = download_util.get_test_url_download_response(url, params)
+        if response is not None:
+            return response
+        retries = max(1, self._config.get('wiki_http_retries', 3))
+        for attempt in range(retries):
+            self._rate_limiter.wait()
+            self._counters.add_counter('wiki-http-requests', 1)
+            try:
+                response = self._session.get(
+                    url,
+                    params=params,
+                    timeout=self._config.get('wiki_http_timeout', 30))
+                if response.ok:
+                    return response.json()
+                logging.debug(f'Got response {response} for {url}, {params}')
+                if response.status_code < 500 and response.status_code != 429:
+                    break
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logging.debug(f'Got exception {e} for {url}, {params}')
+            self._counters.add_counter('wiki-http-retries', 1)
+        self._counters.add_counter('wiki-http-failures', 1)
+        return None
+
+    def get_json_urls(self, urls: list) -> list:
+        """Returns the json responses for the urls with concurrent requests."""
+        return list(self._executor.map(self.get_json, urls))
+
+    def get_entities(self, entity_ids: list) -> dict:
+        """Returns a dict of entity id to entity json for the ids.
+
+        Entities not in the cache are fetched in batches of up to
+        wiki_entities_batch_size ids per request with concurrent requests.
+        The entity json has 'labels', 'descriptions' and 'statements' in the
+        same form as the Wikibase REST API.
+        """
+        entity_ids = list(dict.fromkeys(i for i in entity_ids if i))
+        entities = self._entity_cache.get(entity_ids)
+        self._counters.add_counter('wiki-entity-cache-hits', len(entities))
+        missing = [i for i in entity_ids if i not in entities]
+        if not missing:
+            return entities
+        batch_size = self._config.get('wiki_entities_batch_size', 50)
+        batches = [
+            missing[i:i + batch_size]
+            for i in range(0, len(missing), batch_size)
+        ]
+        for batch_entities in self._executor.map(self._fetch_entities,
+                                                 batches):
+            self._entity_cache.add(batch_entities)
+            entities.update(batch_entities)
+        return entities
+
+    def _fetch_entities(self, entity_ids: list) -> dict:
+        """Returns the entities for the ids from the wbgetentities API."""
+        self._counters.add_counter('wiki-api-lookups', len(entity_ids))
+        response = self.get_json(
+            self._config.get('wiki_entities_api_url'), {
+                'action': 'wbgetentities',
+                'ids': '|'.join(entity_ids),
+                'props': 'labels|descriptions|claims',
+                'format': 'json',
+            })
+        if not response:
+            self._counters.add_counter('wiki-api-failures', len(entity_ids))
+            return {}
+        entities = {}
+        for entity_id, entity in response.get('entities', {}).items():
+            if 'missing' in entity:
+                continue
+            entities[entity_id] = get_rest_entity_json(entity)
+        return entities
+
+
+def get_rest_entity_json(entity: dict) -> dict:
+    """Returns the wbgetentities entity in the form of the Wikibase REST API.
+
+    labels and descriptions are dicts of language to text and statements is a
+    dict of property to a list of {'value': {'content': <value>}}.
+    """
+    result = {}
+    for prop in ['labels', 'descriptions']:
+        result[prop] = {
+            lang: item.get('value')
+            for lang, item in entity.get(prop, {}).items()
+        }
+    statements = {}
+    for prop, claims in entity.get('claims', {}).items():
+        prop_statements = []
+        for claim in claims:
+            datavalue = claim.get('mainsnak', {}).get('datavalue', {})
+            value = datavalue.get('value')
+            if isinstance(value, dict) and 'id' in value:
+                value = value['id']
+            if value is not None:
+                prop_statements.append({'value': {'content': value}})
+        statements[prop] = prop_statements
+    result['statements'] = statements
+    return result
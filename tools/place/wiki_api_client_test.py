@@ -0,0 +1,185 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for wiki_api_client.py using a local stub wiki server."""
+
+import http.server
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+import urllib.parse
+
+from absl import app
+from absl import logging
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+sys.path.append(os.path.dirname(_SCRIPT_DIR))
+sys.path.append(os.path.dirname(os.path.dirname(_SCRIPT_DIR)))
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(_SCRIPT_DIR))),
+                 'util'))
+
+from property_value_cache import PropertyValueCache
+from wiki_api_client import WikiAPIClient
+from wiki_place_resolver import WikiPlaceResolver
+
+
+def _get_claim(value) -> dict:
+    """Returns a wbgetentities claim for the value."""
+    if value.startswith('Q'):
+        value = {'entity-type': 'item', 'id': value}
+    return {'mainsnak': {'datavalue': {'value': value}}}
+
+
+# Entities returned by the stub wbgetentities API.
+_TEST_ENTITIES = {
+    'Q99': {
+        'labels': {
+            'en': {
+                'language': 'en',
+                'value': 'California'
+            }
+        },
+        'descriptions': {
+            'en': {
+                'language': 'en',
+                'value': 'state of the United States of America'
+            }
+        },
+        'claims': {
+            'P31': [_get_claim('Q35657')],
+            'P17': [_get_claim('Q30')],
+        },
+    },
+    'Q35657': {
+        'labels': {
+            'en': {
+                'language': 'en',
+                'value': 'U.S. state'
+            }
+        },
+    },
+    'Q30': {
+        'labels': {
+            'en': {
+                'language': 'en',
+                'value': 'United States'
+            }
+        },
+    },
+}
+
+# Search results returned by the stub custom search API.
+_TEST_SEARCH_RESULTS = {
+    'California': ['Q99'],
+}
+
+
+class _StubWikiHandler(http.server.BaseHTTPRequestHandler):
+    """Handler for the stub wbgetentities and custom search APIs."""
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        params = urllib.parse.parse_qs(url.query)
+        self.server.requests.append(self.path)
+        if url.path == '/w/api.php':
+            ids = params['ids'][0].split('|')
+            response = {'entities': {}}
+            for entity_id in ids:
+                response['entities'][entity_id] = _TEST_ENTITIES.get(
+                    entity_id, {
+                        'id': entity_id,
+                        'missing': ''
+                    })
+        else:
+            response = {
+                'items': [{
+                    'link': f'https://www.wikidata.org/wiki/{wiki_id}'
+                } for wiki_id in _TEST_SEARCH_RESULTS.get(
+                    params['q'][0], [])]
+            }
+        content = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        return
+
+
+class WikiAPIClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('localhost', 0),
+                                                      _StubWikiHandler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://localhost:{self.server.server_port}'
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config = {
+            'wiki_entities_api_url': self.url + '/w/api.php',
+            'wiki_search_url': self.url + '/customsearch/v1?key=KEY&',
+            'custom_search_key': 'TEST_KEY',
+            'wiki_entities_batch_size': 2,
+            'wiki_http_max_requests_per_sec': 0,
+            'wiki_entity_cache': os.path.join(self.tmp_dir.name,
+                                              'entities.sqlite'),
+        }
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def test_get_entities(self):
+        client = WikiAPIClient(self.config)
+        entities = client.get_entities(['Q99', 'Q30', 'Q35657', 'Q1'])
+        self.assertEqual(['Q30', 'Q35657', 'Q99'], sorted(entities.keys()))
+        self.assertEqual({'en': 'California'}, entities['Q99']['labels'])
+        self.assertEqual([{
+            'value': {
+                'content': 'Q35657'
+            }
+        }], entities['Q99']['statements']['P31'])
+        # Two batches of upto 2 ids each.
+        self.assertEqual(2, len(self.server.requests))
+
+        # Entities are reused from the persistent cache by a new client.
+        entities = WikiAPIClient(self.config).get_entities(['Q99', 'Q30'])
+        self.assertEqual(['Q30', 'Q99'], sorted(entities.keys()))
+        self.assertEqual(2, len(self.server.requests))
+
+    def test_lookup_wiki_places(self):
+        resolver = WikiPlaceResolver(
+            config_dict=self.config,
+            cache=PropertyValueCache(counters=None),
+        )
+        results = resolver.lookup_wiki_places({1: {'name': 'California'}})
+        self.assertEqual('Q99', results[1]['wikidataId'])
+        self.assertEqual('"state of the United States of America"',
+                         results[1]['description'])
+        self.assertEqual('Q35657', results[1]['PlaceType'])
+        self.assertEqual('"U.S. state"', results[1]['PlaceTypeName'])
+        self.assertEqual('"United States"', results[1]['CountryName'])
+        # One search and one entity request each for the place and its values.
+        self.assertEqual(3, len(self.server.requests))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -78,6 +78,9 @@ flags.DEFINE_string(
     'API key for Google custom search API.'
     'Get an API key at https://developers.google.com/custom-search/v1/introduction.'
 )
+flags.DEFINE_string(
+    'wiki_entity_cache', '',
+    'Sqlite file to persist wiki entities looked up across runs.')
 flags.DEFINE_integer('wiki_place_pprof_port', 0,
                      'HTTP port for running pprof server.')
 
@@ -98,6 +101,7 @@ from counters import Counters
 from config_map import ConfigMap
 from download_util import request_url
 from property_value_cache import PropertyValueCache
+from wiki_api_client import WikiAPIClient
 
 _DEFAULT_CONFIG = {
     # Map of wiki place property to named property
@@ -122,9 +126,10 @@ _DEFAULT_CONFIG = {
     'wiki_search_max_results':
         3,
 
-    # URL for wiki API that returns a json with wiki properties.
-    'wiki_api_url':
-        ('https://www.wikidata.org/w/rest.php/wikibase/v1/entities/items/'),
+    # URL for wiki API that returns a json with wiki properties for
+    # upto 50 ids per request.
+    'wiki_entities_api_url':
+        'https://www.wikidata.org/w/api.php',
 }
 
 
@@ -162,6 +167,9 @@ class WikiPlaceResolver:
         self._cache = cache
         if cache is None:
             self._cache = PropertyValueCache(counters=self._counters)
+        # Client for wiki HTTP requests shared across lookups.
+        self._client = WikiAPIClient(self._config.get_configs(),
+                                     self._counters)
 
     def is_ready(self) -> bool:
         """Returns True if config has the rquired settings."""
@@ -218,14 +226,22 @@ class WikiPlaceResolver:
         logging.log_every_n(
             logging.DEBUG, f'Looking up wiki ids for {len(lookup_names)} names',
             self._log_every_n)
-        for name in lookup_names.keys():
+        name_wiki_ids = self.search_wiki_names(list(lookup_names.keys()))
+        for name, wiki_name_ids in name_wiki_ids.items():
             place_pvs = places[lookup_names[name]]
-            wiki_name_ids = self.search_wiki_name(name)
             if wiki_name_ids:
                 place_pvs['wikidataId'] = _get_wiki_id(wiki_name_ids[0])
                 if len(wiki_name_ids) > 1:
                     place_pvs['CandidateWikiIds'] = wiki_name_ids[1:]
 
+        # Fetch the wiki json for all places and candidates in batches.
+        for key, place_pvs in places.items():
+            wiki_id = get_wiki_id_from_pvs(place_pvs, key)
+            if wiki_id:
+                wiki_ids.add(wiki_id)
+            wiki_ids.update(place_pvs.get('CandidateWikiIds', []))
+        self.prefetch_wiki_json(wiki_ids)
+
         # Lookup wiki properties for each place
         keys = list(places.keys())
         for key in keys:
@@ -260,6 +276,71 @@ class WikiPlaceResolver:
     Returns:
         list of wikidataIds that match the name.
     """
+        return self.search_wiki_names([name], max_results).get(name, [])
+
+    def search_wiki_names(self, names: list, max_results: int = None) -> dict:
+        """Returns a dict of name to list of wikiIds for each name.
+
+    Names not in the cache are searched with concurrent requests.
+
+    Args:
+        names: list of names to lookup for wiki pages.
+        max_results: maximum number of matches to return per name.
+
+    Returns:
+        dict of name to list of wikidataIds that match the name.
+    """
+        results = {}
+        search_names = []
+        for name in names:
+            result_wiki_ids = self._get_cached_wiki_ids(name)
+            if result_wiki_ids:
+                self._counters.add_counter('wiki-id-cache-hits', 1)
+                results[name] = result_wiki_ids
+            else:
+                search_names.append(name)
+        search_url = self._get_wiki_search_url()
+        if not search_url or not search_names:
+            return results
+        if not max_results:
+            max_results = self._config.get('wiki_search_max_results', 1)
+        search_urls = []
+        for name in search_names:
+            name_url = search_url + urllib.parse.urlencode({'q': name})
+            logging.level_debug() and logging.log_every_n(
+                logging.DEBUG,
+                f'Searching for {max_results} wikis for name "{name}" with {name_url}',
+                self._log_every_n)
+            self._counters.add_counter('wiki-name-searches', 1, name)
+            search_urls.append(name_url)
+        responses = self._client.get_json_urls(search_urls)
+        for name, resp in zip(search_names, responses):
+            results[name] = self._get_search_wiki_ids(name, resp)[:max_results]
+        return results
+
+    def prefetch_wiki_json(self, wiki_ids: list):
+        """Fetches the json for wiki ids and the wiki ids in their property
+        values with batched requests ahead of property lookups."""
+        props = self._config.get('wiki_place_property')
+        for _ in range(2):
+            fetch_ids = [i for i in wiki_ids if i not in self._wiki_id_json]
+            if not fetch_ids:
+                break
+            self._counters.add_counter('wiki-api-prefetch', len(fetch_ids))
+            entities = self._client.get_entities(fetch_ids)
+            for wiki_id in fetch_ids:
+                self._wiki_id_json[wiki_id] = entities.get(wiki_id)
+            # Prefetch the wiki ids in property values for their names.
+            wiki_ids = set()
+            for wiki_id in fetch_ids:
+                for wiki_prop in props:
+                    for val in self._get_wiki_json_property(
+                            self._wiki_id_json[wiki_id], wiki_prop):
+                        if isinstance(val, str) and val.startswith('Q'):
+                            wiki_ids.add(val)
+
+    def _get_cached_wiki_ids(self, name: str) -> list:
+        """Returns the list of wikiIds for the name in the cache."""
         result_wiki_ids = []
         cached_entry = self._cache.get_entry(value=name)
         if cached_entry:
@@ -269,23 +350,10 @@ class WikiPlaceResolver:
             candidate_wiki_ids = cached_entry.get('CandidateWikiIds')
             if candidate_wiki_ids:
                 result_wiki_ids.extend(candidate_wiki_ids)
-        if result_wiki_ids:
-            self._counters.add_counter('wiki-id-cache-hits', 1)
-            return result_wiki_ids
-        search_url = self._get_wiki_search_url()
-        if not search_url:
-            return []
-        if not max_results:
-            max_results = self._config.get('wiki_search_max_results', 1)
-        search_url += urllib.parse.urlencode({'q': name})
-        logging.level_debug() and logging.log_every_n(
-            logging.DEBUG,
-            f'Searching for {max_results} wikis for name "{name}" with {search_url}',
-            self._log_every_n)
-        self._counters.add_counter('wiki-name-searches', 1, name)
-        resp = download_util.request_url(search_url,
-                                         output='json',
-                                         use_cache=True)
+        return result_wiki_ids
+
+    def _get_search_wiki_ids(self, name: str, resp: dict) -> list:
+        """Returns the list of wikiIds in the search response for the name."""
         logging.level_debug() and logging.log_every_n(
             logging.DEBUG, f'Got wiki search response for {name}: {resp}',
             self._log_every_n)
@@ -294,6 +362,7 @@ class WikiPlaceResolver:
             return []
 
         # Get all wiki results for name.
+        result_wiki_ids = []
         for result in resp.get('items', []):
             link = result.get('link')
             if link and '/wiki/Q' in link:
@@ -306,7 +375,7 @@ class WikiPlaceResolver:
             self._log_every_n)
         self._counters.add_counter(
             f'wiki-search-results-{len(result_wiki_ids)}', 1, name)
-        return result_wiki_ids[:max_results]
+        return result_wiki_ids
 
     def lookup_wiki_properties(self, wiki_id: str, props: dict = None) -> dict:
         """Returns a dict of wiki properties for a wiki id.
@@ -373,18 +442,12 @@ class WikiPlaceResolver:
 
     def _get_wiki_json(self, wiki_id: str) -> dict:
         """Returns the json for the wiki id."""
-        wiki_json = self._wiki_id_json.get(wiki_id)
-        if wiki_json is None:
+        if wiki_id not in self._wiki_id_json:
             # No cached value. Lookup wiki API
-            wiki_api_url = self._config.get('wiki_api_url')
-            self._counters.add_counter('wiki-api-lookups', 1, wiki_id)
-            wiki_json = download_util.request_url(wiki_api_url + wiki_id,
-                                                  output='json',
-                                                  use_cache=True)
+            wiki_json = self._client.get_entities([wiki_id]).get(wiki_id)
             self._wiki_id_json[wiki_id] = wiki_json
-            if not wiki_json:
-                self._counters.add_counter('wiki-api-failures', 1, wiki_id)
         else:
+            wiki_json = self._wiki_id_json[wiki_id]
             self._counters.add_counter(f'wiki-api-cache-hits', 1)
         return wiki_json
 
@@ -479,6 +542,8 @@ def main(_):
     config = ConfigMap(_FLAGS.wiki_place_config)
     if _FLAGS.custom_search_key:
         config.set_config('custom_search_key', _FLAGS.custom_search_key)
+    if _FLAGS.wiki_entity_cache:
+        config.set_config('wiki_entity_cache', _FLAGS.wiki_entity_cache)
     wiki_place_resolver = WikiPlaceResolver(config_dict=config.get_configs())
     input_csv = _FLAGS.wiki_place_input_csv
     places = file_util.file_load_py_dict(input_csv)
@@ -0,0 +1,323 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Builds prompts from a template within a size budget.
+
+Each section of the prompt replaces a placeholder in the template. Sections
+with a compactor are deduplicated and, if the prompt exceeds the budget,
+trimmed to their share of the budget. The trimming is deterministic so the
+same inputs always produce the same prompt.
+
+Compactors for the PVMAP prompt sections:
+  compact_schema_examples: drops schema examples with the same
+    property:values as an earlier example and keeps the examples that cover
+    the most new properties and values.
+  compact_sampled_data: drops duplicate data rows and keeps the rows that
+    cover the most new column values, like the coverage sampling in the
+    data_sampler.
+
+Example:
+  prompt, stats = prompt_builder.build_prompt(template, [
+      PromptSection('{{SCHEMA_EXAMPLES}}', schema,
+                    prompt_builder.compact_schema_examples),
+      PromptSection('{{SAMPLED_DATA}}', data,
+                    prompt_builder.compact_sampled_data),
+      PromptSection('{{METADATA_CONFIG}}', metadata),
+  ], max_bytes=150000)
+"""
+
+import csv
+import heapq
+import io
+import os
+import re
+import sys
+
+from absl import logging
+from typing import Callable, NamedTuple
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+sys.path.append(os.path.join(os.path.dirname(_SCRIPT_DIR), 'util'))
+
+import file_util
+
+# Default maximum size of a prompt in bytes.
+DEFAULT_MAX_PROMPT_BYTES = 150000
+
+# Approximate number of bytes per token used to report token estimates.
+_BYTES_PER_TOKEN = 4
+
+# Separator between the label and the property:values in a schema example.
+_SCHEMA_EXAMPLE_SEPARATOR = re.compile(r'\s*-{1,2}>\s*')
+
+
+class PromptSection(NamedTuple):
+    """Content for a placeholder in the prompt template."""
+    placeholder: str
+    content: str
+    # Function(content, max_bytes) that returns the content deduplicated and
+    # trimmed to max_bytes or to any size if max_bytes is 0.
+    # Sections without a compactor are used as is.
+    compactor: Callable[[str, int], str] = None
+
+
+def get_size(text: str) -> int:
+    """Returns the size of the text in bytes."""
+    return len(text.encode('utf-8'))
+
+
+def build_prompt(template: str,
+                 sections: list,
+                 max_bytes: int = DEFAULT_MAX_PROMPT_BYTES) -> tuple:
+    """Returns the prompt with placeholders replaced by the sections.
+
+    Sections with a compactor are deduplicated. If the prompt is still larger
+    than max_bytes, the budget left after the template and the other sections
+    is divided equally among the compacted sections, with any share unused by
+    a smaller section going to the larger ones.
+
+    Args:
+      template: prompt template with the placeholders.
+      sections: list of PromptSection for the placeholders.
+      max_bytes: maximum size of the prompt in bytes or 0 for no limit.
+
+    Returns:
+      tuple of (prompt, stats) where stats is a dict with the size in bytes
+      and estimated tokens for each placeholder and the total.
+    """
+    fixed_size = get_size(template)
+    contents = {}
+    for section in sections:
+        fixed_size -= get_size(section.placeholder) * template.count(
+            section.placeholder)
+        content = section.content
+        if section.compactor:
+            content = section.compactor(content, 0)
+        else:
+            fixed_size += get_size(content)
+        contents[section.placeholder] = content
+
+    compact_sections = [s for s in sections if s.compactor]
+    compact_size = sum(get_size(contents[s.placeholder]) for s in compact_sections)
+    if max_bytes and fixed_size + compact_size > max_bytes:
+        budgets = _get_section_budgets(
+            {
+                s.placeholder: get_size(contents[s.placeholder])
+                for s in compact_sections
+            }, max(0, max_bytes - fixed_size))
+        for section in compact_sections:
+            contents[section.placeholder] = section.compactor(
+                contents[section.placeholder], budgets[section.placeholder])
+
+    prompt = template
+    stats = {}
+    for section in sections:
+        content = contents[section.placeholder]
+        prompt = prompt.replace(section.placeholder, content)
+        stats[section.placeholder] = _get_size_stats(
+            get_size(content), get_size(section.content))
+    stats['total'] = _get_size_stats(get_size(prompt))
+    if max_bytes and stats['total']['bytes'] > max_bytes:
+        logging.warning(f'Prompt size {stats["total"]["bytes"]} exceeds budget'
+                        f' {max_bytes} bytes')
+    return prompt, stats
+
+
+def compact_schema_examples(content: str, max_bytes: int = 0) -> str:
+    """Returns schema examples without repeated nodes within max_bytes.
+
+    Each line is an example of the form '<label> --> <property:value>, ...'.
+    Lines with the same set of property:values as an earlier line are dropped,
+    as are lines without property:values that repeat an earlier label.
+    If the remaining lines exceed max_bytes, lines are picked greedily by the
+    number of new properties and new property:values they add, ties broken by
+    position, and are returned in their original order.
+
+    Args:
+      content: schema examples, one per line.
+      max_bytes: maximum size of the returned content or 0 for no limit.
+
+    Returns:
+      compacted schema examples.
+    """
+    lines = []
+    # List of (set of properties, set of property:values) for each line.
+    line_pvs = []
+    seen_keys = set()
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        parts = _SCHEMA_EXAMPLE_SEPARATOR.split(line.strip(), maxsplit=1)
+        pvs = set()
+        if len(parts) > 1:
+            pvs = {pv.strip() for pv in parts[1].split(',') if ':' in pv}
+        key = frozenset(pvs) if pvs else parts[0].strip().lower()
+        if key in seen_keys:
+            continue
+        seen_keys.add(key)
+        lines.append(line)
+        line_pvs.append(({pv.split(':', 1)[0].strip() for pv in pvs}, pvs))
+
+    output = '\n'.join(lines) + '\n' if lines else ''
+    if not max_bytes or get_size(output) <= max_bytes:
+        if len(lines) < len(content.splitlines()):
+            return output
+        return content
+
+    # Weight new properties above new values of a known property.
+    features = []
+    for props, pvs in line_pvs:
+        line_features = {pv: 1 for pv in pvs}
+        line_features.update({('property', prop): 10 for prop in props})
+        features.append(line_features)
+    selected = _select_greedy([get_size(line) + 1 for line in lines],
+                              features, max_bytes)
+    return ''.join(lines[i] + '\n' for i in selected)
+
+
+def compact_sampled_data(content: str, max_bytes: int = 0) -> str:
+    """Returns sampled CSV data without duplicate rows within max_bytes.
+
+    Header rows are always kept. If the remaining rows exceed max_bytes,
+    rows are picked greedily by the number of new non-numeric column values
+    they cover, ties broken by position, and are returned in their original
+    order.
+
+    Args:
+      content: CSV data with header rows.
+      max_bytes: maximum size of the returned content or 0 for no limit.
+
+    Returns:
+      compacted CSV data.
+    """
+    rows = list(csv.reader(io.StringIO(content)))
+    if not rows:
+        return content
+    header_rows = file_util.file_get_csv_header_rows(rows)
+    data_rows = []
+    seen_rows = set()
+    for row in rows[header_rows:]:
+        key = tuple(row)
+        if key in seen_rows or not any(cell.strip() for cell in row):
+            continue
+        seen_rows.add(key)
+        data_rows.append(row)
+    if len(data_rows) == len(rows) - header_rows:
+        if not max_bytes or get_size(content) <= max_bytes:
+            return content
+
+    header = _get_csv_text(rows[:header_rows])
+    lines = [_get_csv_text([row]) for row in data_rows]
+    if not max_bytes or get_size(header) + sum(
+            get_size(line) for line in lines) <= max_bytes:
+        return header + ''.join(lines)
+
+    # Dict of (column, value) for the non-numeric values in each row.
+    features = []
+    for row in data_rows:
+        row_features = {}
+        for col, value in enumerate(row):
+            value = value.strip()
+            if value and not _is_number(value):
+                row_features[(col, value)] = 1
+        features.append(row_features)
+    selected = _select_greedy([get_size(line) for line in lines], features,
+                              max_bytes - get_size(header))
+    return header + ''.join(lines[i] for i in selected)
+
+
+def _select_greedy(sizes: list, features: list, max_bytes: int) -> list:
+    """Returns sorted indices of items picked greedily within max_bytes.
+
+    Items are picked by the total weight of their features not covered by
+    the items picked earlier, ties broken by the lower index. As the score
+    of an item can only decrease, scores are recomputed lazily when an item
+    reaches the top of the heap.
+
+    Args:
+      sizes: list of the size in bytes of each item.
+      features: list of dict of feature to weight for each item.
+      max_bytes: maximum total size of the picked items.
+
+    Returns:
+      list of picked item indices in increasing order.
+    """
+
+    def _get_score(index):
+        return sum(weight for feature, weight in features[index].items()
+                   if feature not in covered)
+
+    covered = set()
+    heap = [(-_get_score(i), i) for i in range(len(sizes))]
+    heapq.heapify(heap)
+    selected = []
+    budget = max_bytes
+    while heap:
+        neg_score, index = heapq.heappop(heap)
+        if sizes[index] > budget:
+            continue
+        score = _get_score(index)
+        if score < -neg_score:
+            heapq.heappush(heap, (-score, index))
+            continue
+        selected.append(index)
+        budget -= sizes[index]
+        covered.update(features[index])
+    logging.debug(f'Selected {len(selected)} of {len(sizes)} items within'
+                  f' {max_bytes} bytes')
+    return sorted(selected)
+
+
+def _get_section_budgets(sizes: dict, max_bytes: int) -> dict:
+    """Returns the budget for each section splitting max_bytes equally.
+
+    Sections smaller than their share keep their size and the unused
+    budget is shared among the larger sections.
+    """
+    budgets = {}
+    remaining = dict(sizes)
+    budget = max_bytes
+    while remaining:
+        share = budget // len(remaining)
+        small = {k: v for k, v in remaining.items() if v <= share}
+        if not small:
+            for key in remaining:
+                budgets[key] = share
+            break
+        for key, size in small.items():
+            budgets[key] = size
+            budget -= size
+            del remaining[key]
+    return budgets
+
+
+def _get_size_stats(size: int, input_size: int = None) -> dict:
+    stats = {'bytes': size, 'tokens': size // _BYTES_PER_TOKEN}
+    if input_size is not None:
+        stats['input_bytes'] = input_size
+    return stats
+
+
+def _get_csv_text(rows: list) -> str:
+    output = io.StringIO()
+    csv.writer(output, lineterminator='\n').writerows(rows)
+    return output.getvalue()
+
+
+def _is_number(value: str) -> bool:
+    try:
+        float(value.replace(',', '').replace('%', ''))
+        return True
+    except ValueError:
+        return False
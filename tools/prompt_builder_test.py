@@ -0,0 +1,98 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for prompt_builder.py."""
+
+import os
+import sys
+import unittest
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+
+import prompt_builder
+
+from prompt_builder import PromptSection
+
+_SCHEMA_EXAMPLES = '''Count of Person: Male --> gender:Male, populationType:Person
+Male Population --> populationType:Person, gender:Male
+Count of Person: Female --> gender:Female, populationType:Person
+Median Age of Person --> measuredProperty:age, statType:medianValue
+Economy --> displayRank:3
+Person With Age = 16 Years or More -->
+Person With Age = 16 Years or More -->
+'''
+
+_SAMPLED_DATA = '''State,Gender,Count
+CA,Male,10
+CA,Male,10
+CA,Female,20
+TX,Male,30
+TX,Female,40
+NY,Female,50
+'''
+
+
+class PromptBuilderTest(unittest.TestCase):
+
+    def test_compact_schema_examples(self):
+        # Repeated property:values and labels are dropped.
+        compacted = prompt_builder.compact_schema_examples(_SCHEMA_EXAMPLES)
+        self.assertNotIn('Male Population', compacted)
+        self.assertEqual(1, compacted.count('16 Years'))
+        self.assertEqual(5, len(compacted.splitlines()))
+
+        # Examples with new properties are kept within the budget.
+        lines = _SCHEMA_EXAMPLES.splitlines()
+        max_bytes = len(lines[0]) + len(lines[3]) + 2
+        self.assertEqual(
+            lines[0] + '\n' + lines[3] + '\n',
+            prompt_builder.compact_schema_examples(_SCHEMA_EXAMPLES,
+                                                   max_bytes))
+
+    def test_compact_sampled_data(self):
+        self.assertEqual(
+            _SAMPLED_DATA.replace('CA,Male,10\n', '', 1),
+            prompt_builder.compact_sampled_data(_SAMPLED_DATA))
+        # Rows covering all states and genders within the budget.
+        self.assertEqual(
+            'State,Gender,Count\nCA,Male,10\nTX,Female,40\nNY,Female,50\n',
+            prompt_builder.compact_sampled_data(_SAMPLED_DATA, 56))
+
+    def test_build_prompt(self):
+        template = 'Schema:\n{{SCHEMA}}\nData:\n{{DATA}}\nConfig: {{CONFIG}}'
+        sections = [
+            PromptSection('{{SCHEMA}}', _SCHEMA_EXAMPLES,
+                          prompt_builder.compact_schema_examples),
+            PromptSection('{{DATA}}', _SAMPLED_DATA,
+                          prompt_builder.compact_sampled_data),
+            PromptSection('{{CONFIG}}', 'header_rows,1'),
+        ]
+        prompt, stats = prompt_builder.build_prompt(template, sections, 0)
+        self.assertNotIn('{{', prompt)
+        self.assertIn('Config: header_rows,1', prompt)
+        self.assertEqual(len(_SAMPLED_DATA), stats['{{DATA}}']['input_bytes'])
+        self.assertEqual(len(_SAMPLED_DATA) - 11, stats['{{DATA}}']['bytes'])
+        self.assertEqual(len(prompt), stats['total']['bytes'])
+
+        # Trimmed to the budget deterministically.
+        prompt, stats = prompt_builder.build_prompt(template, sections, 250)
+        self.assertLessEqual(stats['total']['bytes'], 250)
+        self.assertIn('Config: header_rows,1', prompt)
+        self.assertEqual(
+            prompt,
+            prompt_builder.build_prompt(template, sections, 250)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
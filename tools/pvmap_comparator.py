@@ -0,0 +1,254 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compares generated PVMAPs with ground truth PVMAPs for many datasets.
+
+The PVMAPs of all datasets are converted into long tables with a row per
+(dataset, key, property, value) and compared with a single outer join on
+(dataset, key, property). Each property:value is classified as:
+  matched: same value in the ground truth and generated PVMAP
+  modified: property in both with different values
+  deleted: property only in the ground truth
+  added: property only in the generated PVMAP
+and each key as:
+  matched: key in both with all property:values matched
+  with_diff: key in both with any other property:value
+  missing_in_mcf2: key only in the ground truth
+  missing_in_mcf1: key only in the generated PVMAP
+
+The metrics per dataset are the counts of each node and PV status and the
+accuracy percentages in get_accuracy_metrics(). With normalize set, values
+are normalized and ignored properties dropped as in mcf_diff, so the counts
+match diff_mcf_nodes() for PVMAPs loaded with load_pvmap_for_diff(). Like
+mcf_diff, a key without any PVs left after normalization, such as a key with
+only '#Format', is the same as a missing key. Such keys are matched if
+neither side has PVs for the key and add one matched PV for the empty node.
+
+Example:
+  metrics, pvs = pvmap_comparator.compare_pvmaps({
+      'dataset1': (ground_truth_pvmap1, generated_pvmap1),
+      'dataset2': (ground_truth_pvmap2, generated_pvmap2),
+  })
+  print(metrics.loc['dataset1', 'pv_accuracy'])
+  print(pvmap_comparator.get_aggregate_metrics(metrics))
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+
+from mcf_file_util import normalize_value
+
+# Columns with the counts of each status in the metrics.
+NODE_COUNT_COLUMNS = [
+    'nodes_ground_truth',
+    'nodes_auto_generated',
+    'nodes_matched',
+    'nodes_with_diff',
+    'nodes_missing_in_mcf2',
+    'nodes_missing_in_mcf1',
+]
+PV_COUNT_COLUMNS = ['pvs_matched', 'pvs_modified', 'pvs_added', 'pvs_deleted']
+ACCURACY_COLUMNS = [
+    'node_accuracy', 'node_coverage', 'pv_accuracy', 'precision', 'recall'
+]
+
+# Properties ignored in comparisons with normalize set, like mcf_diff.
+_IGNORED_PROPS = {'dcid', 'Node'}
+
+_PV_COLUMNS = ['dataset', 'key', 'prop', 'value']
+
+
+def compare_pvmaps(pvmaps: dict, normalize: bool = False) -> tuple:
+    """Compares the ground truth and generated PVMAP for each dataset.
+
+    Args:
+      pvmaps: dict of dataset name to a tuple of
+        (ground truth PVMAP, generated PVMAP), each a dict of
+        key to dict of property:value.
+      normalize: if True, values are normalized and properties starting with
+        '#' or in _IGNORED_PROPS are dropped before comparison and keys are
+        classified as in mcf_diff, see the module docstring.
+
+    Returns:
+      tuple of (metrics, pvs) where
+        metrics: DataFrame indexed by dataset with the NODE_COUNT_COLUMNS,
+          PV_COUNT_COLUMNS and ACCURACY_COLUMNS.
+        pvs: DataFrame with columns dataset, key, prop, value_gt, value_gen
+          and status for every property in either PVMAP.
+    """
+    datasets = list(pvmaps.keys())
+    gt_nodes, gt_pvs = _get_pvmap_tables(
+        {name: pvmap[0] for name, pvmap in pvmaps.items()}, normalize)
+    gen_nodes, gen_pvs = _get_pvmap_tables(
+        {name: pvmap[1] for name, pvmap in pvmaps.items()}, normalize)
+
+    # Classify property:values joining on dataset, key and property.
+    pvs = gt_pvs.merge(gen_pvs,
+                       on=['dataset', 'key', 'prop'],
+                       how='outer',
+                       suffixes=('_gt', '_gen'),
+                       indicator=True)
+    in_both = pvs['_merge'] == 'both'
+    pvs['status'] = np.select(
+        [
+            in_both & (pvs['value_gt'] == pvs['value_gen']),
+            in_both,
+            pvs['_merge'] == 'left_only',
+        ],
+        ['matched', 'modified', 'deleted'],
+        default='added',
+    )
+    pvs = pvs.drop(columns='_merge')
+
+    # Classify keys, with keys that have any unmatched PV as a diff.
+    nodes = gt_nodes.merge(gen_nodes,
+                           on=['dataset', 'key'],
+                           how='outer',
+                           indicator=True)
+    diff_keys = pvs.loc[pvs['status'] != 'matched',
+                        ['dataset', 'key']].drop_duplicates()
+    diff_keys['has_diff'] = True
+    nodes = nodes.merge(diff_keys, on=['dataset', 'key'], how='left')
+    has_diff = nodes['has_diff'].eq(True)
+    in_both = nodes['_merge'] == 'both'
+    if normalize:
+        # Keys without PVs on either side compare as empty nodes in mcf_diff.
+        pv_keys = pvs[['dataset', 'key']].drop_duplicates()
+        pv_keys['has_pvs'] = True
+        nodes = nodes.merge(pv_keys, on=['dataset', 'key'], how='left')
+        empty_nodes = nodes[nodes['has_pvs'].ne(True)]
+        is_matched = ~has_diff
+    else:
+        empty_nodes = nodes.iloc[0:0]
+        is_matched = in_both & ~has_diff
+    nodes['status'] = np.select(
+        [
+            is_matched,
+            in_both,
+            nodes['_merge'] == 'left_only',
+        ],
+        ['matched', 'with_diff', 'missing_in_mcf2'],
+        default='missing_in_mcf1',
+    )
+
+    metrics = pd.DataFrame(index=pd.Index(datasets, name='dataset'))
+    metrics['nodes_ground_truth'] = _count_by_dataset(gt_nodes, datasets)
+    metrics['nodes_auto_generated'] = _count_by_dataset(gen_nodes, datasets)
+    for status in ['matched', 'with_diff', 'missing_in_mcf2', 'missing_in_mcf1']:
+        metrics[f'nodes_{status}'] = _count_by_dataset(
+            nodes[nodes['status'] == status], datasets)
+    for status in ['matched', 'modified', 'added', 'deleted']:
+        metrics[f'pvs_{status}'] = _count_by_dataset(
+            pvs[pvs['status'] == status], datasets)
+    metrics['pvs_matched'] += _count_by_dataset(empty_nodes, datasets)
+    metrics = get_accuracy_metrics(metrics)
+    return metrics, pvs[_PV_COLUMNS[:3] + ['value_gt', 'value_gen', 'status']]
+
+
+def get_accuracy_metrics(metrics: pd.DataFrame) -> pd.DataFrame:
+    """Returns the metrics with the ACCURACY_COLUMNS computed from the counts.
+
+    node_accuracy: nodes_matched / nodes_ground_truth
+    node_coverage: (nodes_matched + nodes_with_diff) / nodes_ground_truth
+    pv_accuracy, recall: pvs_matched / (pvs_matched + modified + deleted)
+    precision: (pvs_matched + modified) / (pvs_matched + modified + added)
+    All are percentages rounded to one decimal and 0 if undefined.
+    """
+    metrics = metrics.copy()
+    metrics['node_accuracy'] = _get_percent(metrics['nodes_matched'],
+                                            metrics['nodes_ground_truth'])
+    metrics['node_coverage'] = _get_percent(
+        metrics['nodes_matched'] + metrics['nodes_with_diff'],
+        metrics['nodes_ground_truth'])
+    metrics['pv_accuracy'] = _get_percent(
+        metrics['pvs_matched'], metrics['pvs_matched'] +
+        metrics['pvs_modified'] + metrics['pvs_deleted'])
+    metrics['precision'] = _get_percent(
+        metrics['pvs_matched'] + metrics['pvs_modified'],
+        metrics['pvs_matched'] + metrics['pvs_modified'] +
+        metrics['pvs_added'])
+    metrics['recall'] = metrics['pv_accuracy']
+    return metrics
+
+
+def get_aggregate_metrics(metrics: pd.DataFrame) -> dict:
+    """Returns metrics aggregated across datasets.
+
+    Counts are summed and accuracies are computed over the summed counts.
+    The mean of the per-dataset accuracies are returned as 'avg_<metric>'.
+    """
+    totals = metrics[NODE_COUNT_COLUMNS + PV_COUNT_COLUMNS].sum()
+    aggregate = {'datasets': len(metrics)}
+    aggregate.update({column: int(totals[column]) for column in totals.index})
+    accuracy = get_accuracy_metrics(totals.to_frame().T).iloc[0]
+    aggregate.update(
+        {column: float(accuracy[column]) for column in ACCURACY_COLUMNS})
+    for column in ACCURACY_COLUMNS:
+        aggregate[f'avg_{column}'] = round(
+            metrics[column].mean(), 1) if len(metrics) else 0
+    return aggregate
+
+
+def _get_pvmap_tables(pvmaps: dict, normalize: bool) -> tuple:
+    """Returns tables of keys and property:values for the PVMAPs.
+
+    Args:
+      pvmaps: dict of dataset to dict of key to dict of property:value.
+      normalize: if True, values are normalized and ignored properties
+        are dropped.
+
+    Returns:
+      tuple of DataFrames (nodes with columns dataset, key and
+      pvs with columns dataset, key, prop, value).
+    """
+    node_rows = []
+    pv_rows = []
+    normalized_values = {}
+    for dataset, pvmap in pvmaps.items():
+        for key, pvs in pvmap.items():
+            node_rows.append((dataset, key))
+            for prop, value in pvs.items():
+                if normalize:
+                    if prop in _IGNORED_PROPS or prop.startswith('#'):
+                        continue
+                    if not value:
+                        continue
+                    if not isinstance(value, str):
+                        value = normalize_value(value,
+                                                quantity_range_to_dcid=True)
+                    else:
+                        if value not in normalized_values:
+                            normalized_values[value] = normalize_value(
+                                value, quantity_range_to_dcid=True)
+                        value = normalized_values[value]
+                pv_rows.append((dataset, key, prop, value))
+    return (pd.DataFrame(node_rows, columns=_PV_COLUMNS[:2]),
+            pd.DataFrame(pv_rows, columns=_PV_COLUMNS))
+
+
+def _count_by_dataset(table: pd.DataFrame, datasets: list) -> pd.Series:
+    """Returns the number of rows in the table for each dataset."""
+    return table.groupby('dataset').size().reindex(datasets,
+                                                   fill_value=0).astype(int)
+
+
+def _get_percent(numerator: pd.Series, denominator: pd.Series) -> pd.Series:
+    """Returns numerator / denominator as a percentage or 0 if undefined."""
+    percent = numerator / denominator.where(denominator != 0) * 100
+    return percent.fillna(0).round(1)
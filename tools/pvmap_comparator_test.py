@@ -0,0 +1,182 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for pvmap_comparator.py."""
+
+import os
+import sys
+import unittest
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+sys.path.append(os.path.join(os.path.dirname(_SCRIPT_DIR), 'util'))
+
+import pvmap_comparator
+
+from counters import Counters
+from mcf_diff import diff_mcf_nodes
+
+_GROUND_TRUTH = {
+    'Male': {
+        'gender': 'dcs:Male'
+    },
+    'Female': {
+        'gender': 'Female'
+    },
+    'Total': {
+        'populationType': 'Person',
+        'measuredProperty': 'count'
+    },
+    'Age': {
+        'age': 'Years5To10'
+    },
+}
+
+_GENERATED = {
+    'Male': {
+        'gender': 'Male'
+    },
+    'Female': {
+        'gender': 'Female'
+    },
+    'Total': {
+        'populationType': 'Household',
+        'unit': 'Count'
+    },
+    'Year': {
+        'observationDate': '{Number}'
+    },
+}
+
+
+class PVMapComparatorTest(unittest.TestCase):
+
+    def test_compare_pvmaps(self):
+        metrics, pvs = pvmap_comparator.compare_pvmaps(
+            {'dataset': (_GROUND_TRUTH, _GENERATED)})
+        row = metrics.loc['dataset']
+        self.assertEqual(4, row['nodes_ground_truth'])
+        self.assertEqual(4, row['nodes_auto_generated'])
+        # 'dcs:Male' and 'Male' differ without normalization.
+        self.assertEqual(1, row['nodes_matched'])
+        self.assertEqual(2, row['nodes_with_diff'])
+        self.assertEqual(1, row['nodes_missing_in_mcf2'])
+        self.assertEqual(1, row['nodes_missing_in_mcf1'])
+        self.assertEqual(1, row['pvs_matched'])
+        self.assertEqual(2, row['pvs_modified'])
+        self.assertEqual(2, row['pvs_added'])
+        self.assertEqual(2, row['pvs_deleted'])
+        self.assertEqual(25.0, row['node_accuracy'])
+        self.assertEqual(75.0, row['node_coverage'])
+        self.assertEqual(20.0, row['pv_accuracy'])
+        self.assertEqual(60.0, row['precision'])
+        status = pvs.set_index(['key', 'prop'])['status']
+        self.assertEqual('modified', status[('Total', 'populationType')])
+        self.assertEqual('deleted', status[('Total', 'measuredProperty')])
+        self.assertEqual('added', status[('Total', 'unit')])
+
+    def test_compare_pvmaps_normalized(self):
+        ground_truth = dict(_GROUND_TRUTH)
+        ground_truth['Male'] = {'gender': 'dcs:Male', '#Column': 'sex'}
+        metrics, pvs = pvmap_comparator.compare_pvmaps(
+            {'dataset': (ground_truth, _GENERATED)}, normalize=True)
+        row = metrics.loc['dataset']
+        self.assertEqual(2, row['nodes_matched'])
+        self.assertEqual(2, row['pvs_matched'])
+        self.assertNotIn('#Column', set(pvs['prop']))
+
+    def test_aggregate_metrics(self):
+        metrics, _ = pvmap_comparator.compare_pvmaps({
+            'dataset1': (_GROUND_TRUTH, _GENERATED),
+            'dataset2': (_GROUND_TRUTH, _GROUND_TRUTH),
+            'empty': ({}, {}),
+        })
+        self.assertEqual(['dataset1', 'dataset2', 'empty'],
+                         list(metrics.index))
+        self.assertEqual(0, metrics.loc['empty', 'nodes_ground_truth'])
+        self.assertEqual(100.0, metrics.loc['dataset2', 'pv_accuracy'])
+        aggregate = pvmap_comparator.get_aggregate_metrics(metrics)
+        self.assertEqual(3, aggregate['datasets'])
+        self.assertEqual(8, aggregate['nodes_ground_truth'])
+        self.assertEqual(5, aggregate['nodes_matched'])
+        self.assertIsInstance(aggregate['nodes_matched'], int)
+        self.assertEqual(62.5, aggregate['node_accuracy'])
+        # (25 + 100 + 0) / 3
+        self.assertEqual(41.7, aggregate['avg_node_accuracy'])
+
+    def test_compare_pvmaps_mcf_diff_parity(self):
+        # PVMAPs as loaded by load_pvmap_for_diff() with keys that only have
+        # '#' properties that are dropped by the normalization.
+        ground_truth = {
+            'Date': {
+                '#Format': '%Y-%m'
+            },
+            'Value': {
+                '#Eval': 'Count={Number}'
+            },
+            'Male': {
+                'gender': 'dcs:Male',
+                'populationType': 'Person'
+            },
+            'Age': {
+                'age': 'Years5To10',
+                '#Format': '%d'
+            },
+        }
+        generated = {
+            'Value': {
+                'value': '{Number}'
+            },
+            'Male': {
+                'gender': 'Male',
+                'populationType': 'Person',
+                '#Eval': 'x=1'
+            },
+            'Unit': {
+                '#Format': '%Y'
+            },
+            'Female': {
+                'gender': 'Female'
+            },
+        }
+        for gt_pvmap, gen_pvmap in [
+            (ground_truth, generated),
+            (ground_truth, {'Male': generated['Male']}),
+            ({'Date': ground_truth['Date']}, {}),
+            ({}, generated),
+        ]:
+            gt_pvmap = {k: dict(v, dcid=k) for k, v in gt_pvmap.items()}
+            gen_pvmap = {k: dict(v, dcid=k) for k, v in gen_pvmap.items()}
+            counters = Counters()
+            diff_mcf_nodes(gt_pvmap, gen_pvmap,
+                           {'ignore_property': ['dcid', 'Node']}, counters)
+            expected = counters.get_counters()
+            metrics, _ = pvmap_comparator.compare_pvmaps(
+                {'dataset': (gt_pvmap, gen_pvmap)}, normalize=True)
+            row = metrics.loc['dataset']
+            for column, counter in [
+                ('nodes_matched', 'nodes-matched'),
+                ('nodes_with_diff', 'nodes-with-diff'),
+                ('nodes_missing_in_mcf2', 'nodes-missing-in-mcf2'),
+                ('nodes_missing_in_mcf1', 'nodes-missing-in-mcf1'),
+                ('pvs_matched', 'PVs-matched'),
+                ('pvs_modified', 'pvs-modified'),
+                ('pvs_added', 'pvs-added'),
+                ('pvs_deleted', 'pvs-deleted'),
+            ]:
+                self.assertEqual(expected.get(counter, 0), row[column],
+                                 f'{column} for {gt_pvmap}, {gen_pvmap}')
+
+
+if __name__ == '__main__':
+    unittest.main()
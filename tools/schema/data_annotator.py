@@ -573,6 +573,7 @@ class DataAnnotator:
         """Retuns the PV maps from schema matcher for the pv-map keys."""
         result_pvs = {}
         logging.info(f'Looking up schema PVs for {len(pv_map)} queries')
+        self._schema_matcher.prefetch_queries(list(pv_map.keys()))
         for key in pv_map.keys():
             pvs = self._schema_matcher.lookup_pvs_for_query(key,
                                                             prop_as_key=True)
@@ -160,6 +160,13 @@ class SchemaMatcher:
                         self._semantic_matcher.add_key_value(key, node)
             self._counters.add_counter('processed', 1)
 
+    def prefetch_queries(self, queries: list):
+        """Computes embeddings for the queries in batches ahead of lookups."""
+        if self._semantic_matcher is not None:
+            self._semantic_matcher.init_transformer()
+            self._semantic_matcher.get_query_embeddings(
+                [query for query in queries if query])
+
     def lookup_pvs_for_query(self,
                              query: str,
                              types: list = [],
@@ -5,19 +5,28 @@ Schema Selector Tool
 Automatically selects the most appropriate schema category for a dataset using
 Claude Code CLI, then copies the corresponding schema files to the input directory.
 
+Selections are cached by the hash of the metadata and data preview. On a cache
+miss, the categories are first scored locally by the overlap of terms in the
+metadata and data preview with each category's schema examples and Claude Code
+CLI is invoked only if the top local score is not confident.
+
 Usage:
     python tools/schema_selector.py --input_dir=input/dataset_name/
     python tools/schema_selector.py --input_dir=input/dataset_name/ --dry_run
     python tools/schema_selector.py --input_dir=input/dataset_name/ --force
+    python tools/schema_selector.py --input_dir=input/dataset_name/ --nolocal_preselect
 """
 
 import csv
+import hashlib
 import io
+import json
+import math
 import os
+import re
 import shutil
-import subprocess
 import sys
-import tempfile
+import threading
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
@@ -25,6 +34,12 @@ from absl import app
 from absl import flags
 from absl import logging
 
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+
+import cli_job_pool
+from ngram_matcher import NgramMatcher
+
 # Command-line flags
 flags.DEFINE_string('input_dir', None,
                     'Path to input directory (e.g., input/dataset_name/). Required.')
@@ -46,6 +61,31 @@ SCHEMA_CATEGORIES = ['Demographics', 'Economy', 'Education', 'Employment',
                      'Energy', 'Health', 'School']
 BASE_DIR = Path(__file__).parent.parent.resolve()
 DEFAULT_SCHEMA_DIR = BASE_DIR / "schema_example_files"
+DEFAULT_SCHEMA_CACHE_DIR = BASE_DIR / ".generation_cache" / "schema_selection"
+
+# Version of the schema selection cache entries.
+_SCHEMA_CACHE_VERSION = 1
+
+# Thresholds for a confident local selection. The top category must have at
+# least the minimum score, the minimum share of the total score across
+# categories and the minimum ratio to the score of the second category.
+_PRESELECT_MIN_SCORE = 2.0
+_PRESELECT_MIN_SHARE = 0.5
+_PRESELECT_MIN_MARGIN = 2.0
+
+# Extra weight for terms in the category name and description.
+_PRESELECT_DESCRIPTION_WEIGHT = 2.0
+
+# Common words ignored when matching terms.
+_PRESELECT_STOP_WORDS = {
+    'and', 'are', 'for', 'from', 'not', 'per', 'that', 'the', 'this', 'with',
+    'data', 'file', 'row', 'showing', 'total', 'value', 'year'
+}
+
+# Dict of schema_base_dir to the (NgramMatcher, term weights) for the
+# preselector, built once per process.
+_PRESELECTORS = {}
+_PRESELECTORS_LOCK = threading.Lock()
 
 
 def merge_metadata_files(files: List[Path], output_path: Path) -> bool:
@@ -408,61 +448,270 @@ def invoke_claude_cli(prompt: str, timeout: int = 180) -> Tuple[bool, str]:
         Tuple of (success, category_or_error_message)
     """
     try:
-        # Write prompt to temporary file
-        with tempfile.NamedTemporaryFile(mode='w', encoding='utf-8',
-                                        suffix='.txt', delete=False) as tmp_file:
-            tmp_file.write(prompt)
-            tmp_file_path = tmp_file.name
+        # Construct command
+        cmd = ['claude', '--dangerously-skip-permissions', '--print',
+               '--model', 'sonnet', '-p', '-']
+
+        logging.debug(f"Running Claude Code CLI with {len(prompt)} chars prompt")
+
+        # Run in the shared pool that caps concurrent CLI calls
+        result = cli_job_pool.get_default_pool().run(
+            cmd,
+            input_text=prompt,
+            timeout=timeout,
+            cwd=str(BASE_DIR),
+            name='schema-selector'
+        )
+        logging.debug(f"Claude CLI completed in {result.run_secs:.1f}s after"
+                      f" {result.queue_secs:.1f}s in queue")
+
+        if result.timed_out:
+            return False, f"Claude CLI timed out after {timeout} seconds"
+        if result.cancelled:
+            return False, "Claude CLI was cancelled"
+
+        # Check return code
+        if result.returncode != 0:
+            error_msg = f"Claude CLI returned non-zero exit code {result.returncode}"
+            if result.stderr:
+                error_msg += f"\nStderr: {result.stderr}"
+            return False, error_msg
+
+        # Parse response
+        response = result.stdout
+        category = parse_category_response(response, SCHEMA_CATEGORIES)
+
+        if category is None:
+            return False, f"Could not parse valid category from response:\n{response}"
+
+        return True, category
 
-        try:
-            # Construct command
-            cmd = ['claude', '--dangerously-skip-permissions', '--print',
-                   '--model', 'sonnet', '-p', '-']
-
-            logging.debug(f"Running Claude Code CLI with prompt from: {tmp_file_path}")
-
-            # Execute command
-            with open(tmp_file_path, 'r', encoding='utf-8') as prompt_f:
-                result = subprocess.run(
-                    cmd,
-                    stdin=prompt_f,
-                    capture_output=True,
-                    text=True,
-                    timeout=timeout,
-                    cwd=str(BASE_DIR)
-                )
-
-            # Check return code
-            if result.returncode != 0:
-                error_msg = f"Claude CLI returned non-zero exit code {result.returncode}"
-                if result.stderr:
-                    error_msg += f"\nStderr: {result.stderr}"
-                return False, error_msg
-
-            # Parse response
-            response = result.stdout
-            category = parse_category_response(response, SCHEMA_CATEGORIES)
-
-            if category is None:
-                return False, f"Could not parse valid category from response:\n{response}"
-
-            return True, category
-
-        finally:
-            # Clean up temp file
-            try:
-                os.unlink(tmp_file_path)
-            except:
-                pass
-
-    except subprocess.TimeoutExpired:
-        return False, f"Claude CLI timed out after {timeout} seconds"
     except FileNotFoundError:
         return False, "Claude CLI not found. Is 'claude' command available in PATH?"
     except Exception as e:
         return False, f"Error invoking Claude CLI: {str(e)}"
 
 
+def get_schema_terms(text: str) -> List[str]:
+    """Returns the normalized terms in the text for the local preselector.
+
+    Words are split at non-alphanumeric characters and camelCase boundaries,
+    converted to lower case and plurals are trimmed. Numbers, short words and
+    common words are dropped.
+    """
+    text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)
+    terms = []
+    for word in re.split(r'[^A-Za-z0-9]+', text.lower()):
+        if len(word) < 3 or word.isdigit():
+            continue
+        if len(word) > 4 and word.endswith('s'):
+            word = word[:-1]
+        if word not in _PRESELECT_STOP_WORDS:
+            terms.append(word)
+    return terms
+
+
+def _get_preselector(schema_base_dir: Path) -> Tuple[NgramMatcher, Dict]:
+    """Returns the matcher and term weights for the schema categories.
+
+    Each term in a category's schema examples or description is weighted by
+    log(num_categories / num_categories_with_term), so terms used by every
+    category don't contribute to the score.
+
+    Returns:
+        Tuple of (NgramMatcher with all terms as keys,
+                  dict of term to dict of category to weight)
+    """
+    key = str(schema_base_dir)
+    with _PRESELECTORS_LOCK:
+        if key in _PRESELECTORS:
+            return _PRESELECTORS[key]
+        category_info = get_category_info()
+        # Dict of term to dict of category to the weight multiplier.
+        category_terms = {}
+        num_categories = 0
+        for category in SCHEMA_CATEGORIES:
+            txt_file = (schema_base_dir / category /
+                        f"scripts_statvar_llm_config_schema_examples_dc_topic_{category}.txt")
+            if not txt_file.exists():
+                continue
+            num_categories += 1
+            with open(txt_file, 'r', encoding='utf-8') as f:
+                for term in get_schema_terms(f.read()):
+                    category_terms.setdefault(term, {})[category] = 1.0
+            description = f"{category} {category_info.get(category, '')}"
+            for term in get_schema_terms(description):
+                category_terms.setdefault(
+                    term, {})[category] = _PRESELECT_DESCRIPTION_WEIGHT
+        term_weights = {}
+        matcher = NgramMatcher({'ngram_size': 4})
+        for term, categories in category_terms.items():
+            idf = math.log(num_categories / len(categories))
+            if idf <= 0:
+                continue
+            term_weights[term] = {
+                category: weight * idf
+                for category, weight in categories.items()
+            }
+            matcher.add_key_value(term, term)
+        logging.debug(f"Loaded {len(term_weights)} terms for"
+                      f" {num_categories} schema categories")
+        _PRESELECTORS[key] = (matcher, term_weights)
+        return _PRESELECTORS[key]
+
+
+def score_schema_categories(metadata_content: str, data_preview: str,
+                            schema_base_dir: Path) -> Dict[str, float]:
+    """Scores categories by term overlap with their schema examples.
+
+    Each distinct term in the metadata and data preview is matched with
+    NgramMatcher to the closest term in the schema examples and adds the
+    weight of that term to the categories that use it.
+
+    Args:
+        metadata_content: Content of the metadata.csv file
+        data_preview: Preview of the dataset
+        schema_base_dir: Path to the schema files directory
+
+    Returns:
+        Dictionary mapping category names to scores, highest first
+    """
+    matcher, term_weights = _get_preselector(schema_base_dir)
+    scores = {}
+    for term in set(get_schema_terms(metadata_content + "\n" + data_preview)):
+        matches = matcher.lookup(term, num_results=1)
+        if not matches:
+            continue
+        for category, weight in term_weights[matches[0][1]].items():
+            scores[category] = scores.get(category, 0) + weight
+    return dict(sorted(scores.items(), key=lambda x: x[1], reverse=True))
+
+
+def preselect_schema_category(scores: Dict[str, float]) -> Optional[str]:
+    """Returns the top scoring category if it is a confident selection.
+
+    Args:
+        scores: Dictionary of category scores from score_schema_categories()
+
+    Returns:
+        Category name or None if the scores are too low or too close
+    """
+    ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+    if not ranked:
+        return None
+    top_category, top_score = ranked[0]
+    second_score = ranked[1][1] if len(ranked) > 1 else 0
+    if top_score < _PRESELECT_MIN_SCORE:
+        return None
+    if top_score < _PRESELECT_MIN_SHARE * sum(scores.values()):
+        return None
+    if top_score < _PRESELECT_MIN_MARGIN * second_score:
+        return None
+    return top_category
+
+
+def get_schema_cache_key(metadata_content: str, data_preview: str) -> str:
+    """Returns the cache key for a schema selection."""
+    key = json.dumps([_SCHEMA_CACHE_VERSION, metadata_content, data_preview])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def load_cached_schema_selection(cache_dir: Path, key: str) -> Optional[str]:
+    """Returns the cached category for the key or None if not cached."""
+    cache_file = Path(cache_dir) / f"{key}.json"
+    if not cache_file.exists():
+        return None
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            category = json.load(f).get('category')
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring invalid schema cache entry {cache_file}: {e}")
+        return None
+    if category not in SCHEMA_CATEGORIES:
+        return None
+    return category
+
+
+def save_cached_schema_selection(cache_dir: Path, key: str, category: str,
+                                 source: str, scores: Dict[str, float]):
+    """Saves the selected category for the key in the cache."""
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    cache_file = cache_dir / f"{key}.json"
+    tmp_file = cache_dir / f"{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'category': category,
+            'source': source,
+            'scores': scores
+        }, f, indent=2)
+    os.replace(tmp_file, cache_file)
+
+
+def select_schema_category(metadata_content: str,
+                           data_preview: str,
+                           schema_base_dir: Path,
+                           cache_dir: Optional[Path] = DEFAULT_SCHEMA_CACHE_DIR,
+                           local_preselect: bool = True,
+                           timeout: int = 180) -> Tuple[bool, str]:
+    """Selects the schema category for a dataset.
+
+    The category is looked up in the cache for the metadata and data preview
+    first. Otherwise the categories are scored locally and Claude CLI is
+    invoked only if the top local score is not confident.
+
+    Args:
+        metadata_content: Content of the metadata.csv file
+        data_preview: Preview of the dataset
+        schema_base_dir: Path to the schema files directory
+        cache_dir: Directory for cached selections or None to disable the cache
+        local_preselect: If False, always invoke Claude CLI on a cache miss
+        timeout: Timeout in seconds for Claude CLI
+
+    Returns:
+        Tuple of (success, category_or_error_message)
+    """
+    if data_preview.startswith('ERROR'):
+        # Don't cache selections without the data.
+        cache_dir = None
+    cache_key = get_schema_cache_key(metadata_content, data_preview)
+    if cache_dir:
+        category = load_cached_schema_selection(cache_dir, cache_key)
+        if category:
+            logging.info(f"Using cached schema category: {category}")
+            return True, category
+
+    scores = score_schema_categories(metadata_content, data_preview,
+                                     schema_base_dir)
+    logging.debug(f"Local schema category scores: {scores}")
+    category = None
+    source = 'local'
+    if local_preselect:
+        category = preselect_schema_category(scores)
+        if category:
+            logging.info(f"Selected schema category {category} locally with"
+                         f" score {scores[category]:.1f}")
+    if not category:
+        category_info = get_category_info()
+        schema_previews = generate_schema_previews(schema_base_dir)
+        prompt = build_claude_prompt(metadata_content, data_preview,
+                                     category_info, schema_previews)
+        logging.info("Invoking Claude Code CLI to select schema category...")
+        success, result = invoke_claude_cli(prompt, timeout=timeout)
+        if not success:
+            return False, result
+        category = result
+        source = 'claude'
+
+    if cache_dir:
+        try:
+            save_cached_schema_selection(cache_dir, cache_key, category,
+                                         source, scores)
+        except OSError as e:
+            logging.warning(f"Failed to cache schema selection: {e}")
+    return True, category
+
+
 def copy_schema_files(category: str, schema_base_dir: Path,
                      input_dir: Path, dry_run: bool) -> Tuple[bool, List[Path]]:
     """Copy schema files to the input directory.
@@ -593,23 +842,17 @@ def main(argv):
     logging.debug("Generating data preview...")
     data_preview = generate_data_preview(input_dir, FLAGS.preview_rows)
 
-    # Step 6: Get category information
-    category_info = get_category_info()
-
-    # Step 7: Generate schema previews
-    logging.debug("Generating schema previews...")
-    schema_previews = generate_schema_previews(schema_base_dir)
-
-    # Step 8: Build Claude prompt
-    prompt = build_claude_prompt(metadata_content, data_preview,
-                                 category_info, schema_previews)
-
-    # Step 9: Invoke Claude CLI
-    logging.info("Invoking Claude Code CLI to select schema category...")
-    success, result = invoke_claude_cli(prompt)
+    # Step 6: Select the category from the cache, locally or with Claude CLI
+    cache_dir = None
+    if FLAGS.use_schema_cache:
+        cache_dir = (Path(FLAGS.schema_cache_dir).resolve()
+                     if FLAGS.schema_cache_dir else DEFAULT_SCHEMA_CACHE_DIR)
+    success, result = select_schema_category(
+        metadata_content, data_preview, schema_base_dir,
+        cache_dir=cache_dir, local_preselect=FLAGS.local_preselect)
 
     if not success:
-        logging.error(f"Claude CLI invocation failed: {result}")
+        logging.error(f"Schema selection failed: {result}")
         logging.error("You may need to manually select the schema category")
         # Clean up combined metadata file if it was created
         if combined_metadata_path and combined_metadata_path.exists():
@@ -619,7 +862,7 @@ def main(argv):
     category = result
     logging.info(f"Selected category: {category}")
 
-    # Step 10: Copy schema files
+    # Step 7: Copy schema files
     if FLAGS.dry_run:
         logging.info(f"\nDRY RUN: Would copy schema files for category '{category}'")
     else:
@@ -635,12 +878,12 @@ def main(argv):
             combined_metadata_path.unlink()
         sys.exit(3)
 
-    # Step 11: Clean up temporary combined metadata file
+    # Step 8: Clean up temporary combined metadata file
     if combined_metadata_path and combined_metadata_path.exists():
         combined_metadata_path.unlink()
         logging.debug(f"Cleaned up temporary file: {combined_metadata_path.name}")
 
-    # Step 12: Success summary
+    # Step 9: Success summary
     if not FLAGS.dry_run:
         logging.info(f"\nSuccess! Copied {len(copied_files)} file(s):")
         for file in copied_files:
@@ -0,0 +1,112 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the local preselector and cache in schema_selector.py."""
+
+import os
+import sys
+import tempfile
+import unittest
+
+from pathlib import Path
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+
+import schema_selector
+
+_ENERGY_PREVIEW = '''Showing 4 rows from eia_sampled_data.csv:
+
+State,Fuel,Net generation (MWh),Consumption
+CA,Solar,1000,2
+CA,Coal,200,3
+TX,Wind power,3000,1
+'''
+
+
+class SchemaSelectorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self.tmp_dir.name) / 'cache'
+        self.claude_calls = []
+        self._invoke_claude_cli = schema_selector.invoke_claude_cli
+        schema_selector.invoke_claude_cli = self._fake_invoke_claude_cli
+
+    def tearDown(self):
+        schema_selector.invoke_claude_cli = self._invoke_claude_cli
+        self.tmp_dir.cleanup()
+
+    def _fake_invoke_claude_cli(self, prompt, timeout=180):
+        self.claude_calls.append(prompt)
+        return True, 'Demographics'
+
+    def test_get_schema_terms(self):
+        self.assertEqual(
+            ['mortality', 'event', 'cause', 'death', 'heart', 'disease'],
+            schema_selector.get_schema_terms(
+                'MortalityEvent: causeOfDeath 2020, Heart Diseases'))
+
+    def test_preselect_schema_category(self):
+        scores = schema_selector.score_schema_categories(
+            'source,EIA\n', _ENERGY_PREVIEW,
+            schema_selector.DEFAULT_SCHEMA_DIR)
+        self.assertEqual('Energy', list(scores.keys())[0])
+        self.assertEqual('Energy',
+                         schema_selector.preselect_schema_category(scores))
+        # Close or low scores are not confident.
+        self.assertIsNone(
+            schema_selector.preselect_schema_category({
+                'Health': 5.0,
+                'Demographics': 4.0
+            }))
+        self.assertIsNone(
+            schema_selector.preselect_schema_category({'Health': 1.0}))
+        self.assertIsNone(schema_selector.preselect_schema_category({}))
+
+    def test_select_schema_category(self):
+        # Unambiguous dataset is selected locally and cached.
+        self.assertEqual((True, 'Energy'),
+                         schema_selector.select_schema_category(
+                             'source,EIA\n',
+                             _ENERGY_PREVIEW,
+                             schema_selector.DEFAULT_SCHEMA_DIR,
+                             cache_dir=self.cache_dir))
+        self.assertEqual([], self.claude_calls)
+        self.assertEqual(1, len(os.listdir(self.cache_dir)))
+
+        # Ambiguous dataset is selected by Claude and cached.
+        preview = 'Showing 1 rows:\n\nCounty,Name\nX,Y\n'
+        for _ in range(2):
+            self.assertEqual((True, 'Demographics'),
+                             schema_selector.select_schema_category(
+                                 'source,Unknown\n',
+                                 preview,
+                                 schema_selector.DEFAULT_SCHEMA_DIR,
+                                 cache_dir=self.cache_dir))
+        self.assertEqual(1, len(self.claude_calls))
+        self.assertEqual(2, len(os.listdir(self.cache_dir)))
+
+        # Claude is always invoked without the preselector or cache.
+        self.assertEqual((True, 'Demographics'),
+                         schema_selector.select_schema_category(
+                             'source,EIA\n',
+                             _ENERGY_PREVIEW,
+                             schema_selector.DEFAULT_SCHEMA_DIR,
+                             cache_dir=None,
+                             local_preselect=False))
+        self.assertEqual(2, len(self.claude_calls))
+
+
+if __name__ == '__main__':
+    unittest.main()
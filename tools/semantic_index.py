@@ -0,0 +1,352 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Nearest neighbour search over normalized embeddings.
+
+Supports an exact search over all embeddings and an approximate inverted
+file (IVF) index that clusters the embeddings with k-means and only scores
+the embeddings in the clusters closest to the query.
+
+Example:
+  # Build an index with 1024 clusters over the corpus embeddings.
+  index = IVFIndex(embeddings)
+  index.build(num_lists=1024)
+  index.save('/tmp/embeddings.ivf.npz')
+
+  # Get the top 10 corpus ids for each query, scoring 8 clusters per query.
+  ids = index.search(query_embeddings, top_k=10, nprobe=8)
+
+To benchmark recall and latency of the IVF index against exact search for
+an embeddings file saved by SemanticMatcher:
+  python3 semantic_index.py --semantic_index_embeddings=<file>.npy \
+      --semantic_index_nprobe=1,4,16,64
+"""
+
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+
+from absl import app
+from absl import flags
+from absl import logging
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+sys.path.append(os.path.dirname(_SCRIPT_DIR))
+sys.path.append(os.path.join(os.path.dirname(_SCRIPT_DIR), 'util'))
+
+_FLAGS = flags.FLAGS
+
+import file_util
+
+flags.DEFINE_string('semantic_index_embeddings', '',
+                    'Numpy file with corpus embeddings to benchmark.')
+flags.DEFINE_integer('semantic_index_num_lists', 0,
+                     'Number of IVF clusters. Defaults to sqrt(corpus size).')
+flags.DEFINE_list('semantic_index_nprobe', ['1', '4', '16', '64'],
+                  'Number of clusters to probe per query in the benchmark.')
+flags.DEFINE_integer('semantic_index_num_queries', 1000,
+                     'Number of queries for the benchmark.')
+flags.DEFINE_integer('semantic_index_top_k', 10,
+                     'Number of results per query for the benchmark.')
+
+# Scale for int8 quantized embeddings. Normalized embeddings are in [-1, 1].
+INT8_SCALE = 127.0
+
+# Number of corpus rows scored at a time to bound memory for large corpora.
+_SEARCH_CHUNK_SIZE = 65536
+
+# Number of rows assigned to centroids at a time.
+_ASSIGN_CHUNK_SIZE = 8192
+
+
+def get_float_embeddings(embeddings: np.ndarray) -> np.ndarray:
+    """Returns float32 embeddings, dequantizing int8 embeddings."""
+    if embeddings.dtype == np.int8:
+        return np.asarray(embeddings, dtype=np.float32) / INT8_SCALE
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def get_embeddings_fingerprint(embeddings: np.ndarray) -> str:
+    """Returns a hash of the shape, type and values of the embeddings.
+
+    Embeddings from another model or for other keys have a different hash
+    even if they have the same shape.
+    """
+    fingerprint = hashlib.sha256(
+        f'{embeddings.shape}:{embeddings.dtype}'.encode('utf-8'))
+    for start in range(0, embeddings.shape[0], _SEARCH_CHUNK_SIZE):
+        fingerprint.update(
+            np.ascontiguousarray(embeddings[start:start +
+                                            _SEARCH_CHUNK_SIZE]).tobytes())
+    return fingerprint.hexdigest()
+
+
+def _merge_top_k(top_ids: np.ndarray, top_scores: np.ndarray, ids: np.ndarray,
+                 scores: np.ndarray, top_k: int) -> tuple:
+    """Returns the top_k (ids, scores) per row merging the two sets."""
+    scores = np.concatenate([top_scores, scores], axis=1)
+    ids = np.concatenate([top_ids, ids], axis=1)
+    if scores.shape[1] > top_k:
+        keep = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        scores = np.take_along_axis(scores, keep, axis=1)
+        ids = np.take_along_axis(ids, keep, axis=1)
+    return ids, scores
+
+
+def exact_search(embeddings: np.ndarray, query_embeddings: np.ndarray,
+                 top_k: int) -> list:
+    """Returns the list of top_k corpus ids per query by cosine score.
+
+    The corpus is scored in chunks so that quantized embeddings are
+    converted to float32 one chunk at a time.
+    """
+    num_queries = query_embeddings.shape[0]
+    top_k = min(top_k, embeddings.shape[0])
+    if top_k <= 0:
+        return [[] for _ in range(num_queries)]
+    top_ids = np.empty((num_queries, 0), dtype=np.int64)
+    top_scores = np.empty((num_queries, 0), dtype=np.float32)
+    for start in range(0, embeddings.shape[0], _SEARCH_CHUNK_SIZE):
+        chunk = get_float_embeddings(embeddings[start:start +
+                                                _SEARCH_CHUNK_SIZE])
+        scores = query_embeddings @ chunk.T
+        ids = np.broadcast_to(np.arange(start, start + chunk.shape[0]),
+                              scores.shape)
+        top_ids, top_scores = _merge_top_k(top_ids, top_scores, ids, scores,
+                                           top_k)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    return np.take_along_axis(top_ids, order, axis=1).tolist()
+
+
+class IVFIndex:
+    """Approximate nearest neighbour index with an inverted file of clusters.
+
+    Embeddings are assigned to the nearest of num_lists k-means centroids.
+    A search scores only the embeddings in the nprobe clusters nearest to the
+    query. Higher nprobe gives better recall at the cost of latency;
+    nprobe == num_lists is the same as an exact search.
+    """
+
+    def __init__(self, embeddings: np.ndarray):
+        self._embeddings = embeddings
+        self._centroids = None
+        # Corpus ids sorted by cluster with offsets for each cluster:
+        # ids in cluster c are _list_ids[_list_offsets[c]:_list_offsets[c+1]]
+        self._list_offsets = None
+        self._list_ids = None
+
+    def build(self,
+              num_lists: int = 0,
+              num_iterations: int = 10,
+              sample_size: int = 0,
+              seed: int = 0):
+        """Clusters the embeddings with spherical k-means.
+
+        Args:
+          num_lists: number of clusters, defaults to sqrt of corpus size.
+          num_iterations: number of k-means iterations.
+          sample_size: number of embeddings sampled to train the centroids.
+            Defaults to 256 per cluster.
+          seed: seed for the random sample and initial centroids.
+        """
+        num_embeddings = self._embeddings.shape[0]
+        if not num_embeddings:
+            self._centroids = np.zeros((1, self._embeddings.shape[1]),
+                                       dtype=np.float32)
+            self._set_lists(np.empty(0, dtype=np.int64))
+            return
+        if num_lists <= 0:
+            num_lists = int(np.sqrt(num_embeddings))
+        num_lists = max(1, min(num_lists, num_embeddings))
+        if sample_size <= 0:
+            sample_size = num_lists * 256
+        rng = np.random.default_rng(seed)
+        sample_ids = np.sort(
+            rng.choice(num_embeddings,
+                       size=min(sample_size, num_embeddings),
+                       replace=False))
+        sample = get_float_embeddings(self._embeddings[sample_ids])
+        centroids = sample[rng.choice(sample.shape[0],
+                                      size=num_lists,
+                                      replace=False)]
+        start_time = time.perf_counter()
+        for _ in range(num_iterations):
+            assignments = _get_nearest_centroids(sample, centroids)
+            order = np.argsort(assignments, kind='stable')
+            counts = np.bincount(assignments, minlength=num_lists)
+            non_empty = np.flatnonzero(counts)
+            # Sum the sample embeddings per cluster.
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[non_empty]
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            # Empty clusters keep the previous centroid.
+            centroids[non_empty] = sums / norms
+        self._centroids = centroids
+        self._set_lists(
+            _get_nearest_centroids(self._embeddings, self._centroids))
+        logging.info(
+            f'Built IVF index with {num_lists} lists for {num_embeddings}'
+            f' embeddings in {time.perf_counter() - start_time:.2f} secs')
+
+    def search(self,
+               query_embeddings: np.ndarray,
+               top_k: int = 10,
+               nprobe: int = 8) -> list:
+        """Returns the list of top_k corpus ids per query by cosine score."""
+        nprobe = max(1, min(nprobe, self._centroids.shape[0]))
+        centroid_scores = query_embeddings @ self._centroids.T
+        probes = np.argpartition(-centroid_scores, nprobe - 1,
+                                 axis=1)[:, :nprobe]
+        results = []
+        for query, lists in zip(query_embeddings, probes):
+            ids = np.concatenate([
+                self._list_ids[self._list_offsets[c]:self._list_offsets[c + 1]]
+                for c in lists
+            ])
+            if not len(ids):
+                results.append([])
+                continue
+            ids.sort()
+            scores = get_float_embeddings(self._embeddings[ids]) @ query
+            k = min(top_k, len(ids))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind='stable')]
+            results.append(ids[top].tolist())
+        return results
+
+    def save(self, filename: str):
+        """Writes the centroids and inverted lists into a numpy file."""
+        with file_util.FileIO(filename, 'wb') as file:
+            np.savez(file,
+                     centroids=self._centroids,
+                     list_offsets=self._list_offsets,
+                     list_ids=self._list_ids,
+                     fingerprint=get_embeddings_fingerprint(
+                         self._embeddings))
+        logging.info(f'Wrote IVF index to {filename}')
+
+    def load(self, filename: str) -> bool:
+        """Loads the index from a numpy file.
+
+        Returns False if the index was built for other embeddings.
+        """
+        with file_util.FileIO(filename, 'rb') as file, np.load(file) as index:
+            fingerprint = ''
+            if 'fingerprint' in index:
+                fingerprint = str(index['fingerprint'])
+            if fingerprint != get_embeddings_fingerprint(self._embeddings):
+                logging.info(f'Ignoring IVF index {filename} built for'
+                             f' other embeddings')
+                return False
+            list_ids = index['list_ids']
+            self._centroids = index['centroids']
+            self._list_offsets = index['list_offsets']
+            self._list_ids = list_ids
+        logging.info(f'Loaded IVF index from {filename}')
+        return True
+
+    def _set_lists(self, assignments: np.ndarray):
+        """Sets the inverted lists from the cluster of each embedding."""
+        self._list_ids = np.argsort(assignments, kind='stable')
+        counts = np.bincount(assignments, minlength=self._centroids.shape[0])
+        self._list_offsets = np.concatenate([[0], np.cumsum(counts)])
+
+
+def _get_nearest_centroids(embeddings: np.ndarray,
+                           centroids: np.ndarray) -> np.ndarray:
+    """Returns the index of the nearest centroid for each embedding."""
+    assignments = np.empty(embeddings.shape[0], dtype=np.int64)
+    for start in range(0, embeddings.shape[0], _ASSIGN_CHUNK_SIZE):
+        chunk = get_float_embeddings(embeddings[start:start +
+                                                _ASSIGN_CHUNK_SIZE])
+        assignments[start:start + chunk.shape[0]] = np.argmax(chunk @
+                                                              centroids.T,
+                                                              axis=1)
+    return assignments
+
+
+def get_recall(index: IVFIndex,
+               embeddings: np.ndarray,
+               query_embeddings: np.ndarray,
+               top_k: int = 10,
+               nprobe: int = 8) -> dict:
+    """Returns the recall and latency of the IVF index against exact search.
+
+    Returns:
+      dict with 'recall': fraction of exact top_k results found by the index,
+      'exact_secs' and 'index_secs': average search time per query.
+    """
+    start_time = time.perf_counter()
+    expected = exact_search(embeddings, query_embeddings, top_k)
+    exact_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    actual = index.search(query_embeddings, top_k, nprobe)
+    index_time = time.perf_counter() - start_time
+    num_found = 0
+    num_expected = 0
+    for expected_ids, actual_ids in zip(expected, actual):
+        num_found += len(set(expected_ids).intersection(actual_ids))
+        num_expected += len(expected_ids)
+    num_queries = max(1, len(expected))
+    return {
+        'recall': num_found / max(1, num_expected),
+        'exact_secs': exact_time / num_queries,
+        'index_secs': index_time / num_queries,
+    }
+
+
+def benchmark_recall(embeddings_file: str,
+                     num_lists: int = 0,
+                     nprobes: list = [1, 4, 16, 64],
+                     num_queries: int = 1000,
+                     top_k: int = 10) -> dict:
+    """Returns the recall for each nprobe of an IVF index for the embeddings.
+
+    Queries are corpus embeddings with some noise added.
+    """
+    embeddings = np.load(embeddings_file, mmap_mode='r')
+    rng = np.random.default_rng(0)
+    query_ids = rng.choice(embeddings.shape[0],
+                           size=min(num_queries, embeddings.shape[0]),
+                           replace=False)
+    queries = get_float_embeddings(embeddings[np.sort(query_ids)])
+    queries += rng.normal(scale=0.02, size=queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    index = IVFIndex(embeddings)
+    index.build(num_lists)
+    results = {}
+    for nprobe in nprobes:
+        results[nprobe] = get_recall(index, embeddings, queries, top_k, nprobe)
+        logging.info(f'nprobe: {nprobe}, {results[nprobe]}')
+    return results
+
+
+def main(_):
+    results = benchmark_recall(_FLAGS.semantic_index_embeddings,
+                               _FLAGS.semantic_index_num_lists,
+                               [int(n) for n in _FLAGS.semantic_index_nprobe],
+                               _FLAGS.semantic_index_num_queries,
+                               _FLAGS.semantic_index_top_k)
+    for nprobe, result in results.items():
+        print(f'nprobe={nprobe}: recall@{_FLAGS.semantic_index_top_k}='
+              f'{result["recall"]:.4f}, exact={result["exact_secs"]*1000:.3f}ms,'
+              f' ivf={result["index_secs"]*1000:.3f}ms per query')
+
+
+if __name__ == '__main__':
+    app.run(main)
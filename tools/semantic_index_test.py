@@ -0,0 +1,91 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for semantic_index.py"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from absl import app
+from absl import logging
+import semantic_index
+
+
+def _get_test_embeddings(num_clusters: int = 50,
+                         per_cluster: int = 40,
+                         dim: int = 32) -> np.ndarray:
+    """Returns normalized embeddings grouped around random centers."""
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(num_clusters, dim))
+    embeddings = np.repeat(centers, per_cluster, axis=0)
+    embeddings += rng.normal(scale=0.3, size=embeddings.shape)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings.astype(np.float32)
+
+
+class SemanticIndexTest(unittest.TestCase):
+
+    def test_exact_search(self):
+        embeddings = np.eye(4, dtype=np.float32)
+        queries = np.array([[0.1, 0.9, 0.3, 0], [0, 0, 0, 1]],
+                           dtype=np.float32)
+        self.assertEqual([[1, 2], [3, 0]],
+                         semantic_index.exact_search(embeddings, queries, 2))
+        quantized = np.round(embeddings * semantic_index.INT8_SCALE).astype(
+            np.int8)
+        self.assertEqual([[1, 2, 0, 3]],
+                         semantic_index.exact_search(quantized, queries[:1],
+                                                     10))
+
+    def test_ivf_recall(self):
+        embeddings = _get_test_embeddings()
+        queries = embeddings[::20] + 0.01
+        index = semantic_index.IVFIndex(embeddings)
+        index.build(num_lists=40)
+        # Probing all lists is an exact search.
+        self.assertEqual(
+            1.0,
+            semantic_index.get_recall(index, embeddings, queries, 10,
+                                      nprobe=40)['recall'])
+        low_recall = semantic_index.get_recall(index, embeddings, queries, 10,
+                                               1)['recall']
+        high_recall = semantic_index.get_recall(index, embeddings, queries,
+                                                10, 8)['recall']
+        self.assertGreaterEqual(high_recall, low_recall)
+        self.assertGreater(high_recall, 0.9)
+
+    def test_save_load(self):
+        embeddings = _get_test_embeddings()
+        index = semantic_index.IVFIndex(embeddings)
+        index.build(num_lists=16)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index_file = os.path.join(tmp_dir, 'index.ivf.npz')
+            index.save(index_file)
+            loaded_index = semantic_index.IVFIndex(embeddings)
+            self.assertTrue(loaded_index.load(index_file))
+            queries = embeddings[:5]
+            self.assertEqual(index.search(queries, 5, 2),
+                             loaded_index.search(queries, 5, 2))
+            # Index is not used for a different corpus.
+            self.assertFalse(
+                semantic_index.IVFIndex(embeddings[:10]).load(index_file))
+            # Index is not used for other embeddings of the same shape.
+            self.assertFalse(
+                semantic_index.IVFIndex(embeddings[::-1]).load(index_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,11 +14,14 @@
 """Utility for semantic text search using embeddings."""
 
 import csv
+import io
 import os
 import pickle
 import sys
 import time
 
+import numpy as np
+
 from absl import app
 from absl import flags
 from absl import logging
@@ -42,13 +45,30 @@ flags.DEFINE_string('semantic_matcher_output', '',
                     'Output file with results per query.')
 flags.DEFINE_string('semantic_matcher_model', 'all-MiniLM-L6-v2',
                     'Output file with results per query.')
+flags.DEFINE_enum('semantic_matcher_embeddings_dtype', 'float32',
+                  ['float32', 'float16', 'int8'],
+                  'Type of the normalized corpus embeddings held in memory.')
+flags.DEFINE_integer('semantic_matcher_query_cache_size', 10000,
+                     'Maximum number of query embeddings to cache.')
+flags.DEFINE_integer('semantic_matcher_batch_size', 64,
+                     'Number of queries to encode per forward pass.')
+flags.DEFINE_enum('semantic_matcher_index', 'exact', ['exact', 'ivf'],
+                  'Search all corpus embeddings or use an approximate IVF index.')
+flags.DEFINE_integer('semantic_matcher_ivf_num_lists', 0,
+                     'Number of IVF clusters. Defaults to sqrt(corpus size).')
+flags.DEFINE_integer(
+    'semantic_matcher_ivf_nprobe', 8,
+    'Number of IVF clusters scored per query. Higher values improve recall'
+    ' at the cost of latency.')
 flags.DEFINE_bool('semantic_matcher_debug', False, 'Enable debug logs.')
 
 import file_util
 import process_http_server
 
+from collections import OrderedDict
 from config_map import ConfigMap
 from counters import Counters
+from semantic_index import INT8_SCALE, IVFIndex, exact_search
 
 
 # Class to perform semantic search for text strings using embeddings.
@@ -65,6 +85,9 @@ from counters import Counters
 # results = matcher.lookup('boy')
 # # Should return list of keys, values matching the lookup string
 # # [ ('child', 'age: [- 17 Years]'), ]
+#
+# # Lookup multiple queries with a single encode call.
+# results = matcher.lookup_batch(['boy', 'dollars'])
 class SemanticMatcher:
 
     def __init__(self, config: ConfigMap = None, counters: Counters = None):
@@ -79,6 +102,8 @@ class SemanticMatcher:
         self._key_values = dict()
         self._corpus = list()
         self._corpus_embeddings = None
+        # Approximate nearest neighbour index for corpus embeddings.
+        self._index = None
 
         # Embeddings matcher
         self._embedder = None
@@ -86,11 +111,18 @@ class SemanticMatcher:
         if cache_file:
             self.load_corpus_cache(cache_file)
 
-        # Cache of query embeddings.
-        self._query_embeddings = dict()
+        # LRU cache of query embeddings.
+        self._query_embeddings = OrderedDict()
+        self._query_cache_size = self._config.get(
+            'semantic_matcher_query_cache_size', 10000)
 
     def load_corpus_cache(self, cache_file: str):
-        """Load corpus text and embeddings from cache pickle file."""
+        """Load corpus text and embeddings from cache pickle file.
+
+        The corpus embeddings are loaded from the numpy file next to the
+        pickle file, memory-mapped for local files.
+        Older caches with embeddings within the pickle are also supported.
+        """
         cache_files = file_util.file_get_matching(cache_file)
         if not cache_files:
             return
@@ -100,25 +132,37 @@ class SemanticMatcher:
             cache = pickle.load(file)
         self._key_values = cache.get('key_values')
         self._corpus = cache.get('corpus')
-        self._corpus_embeddings = cache.get('embeddings')
+        embeddings = cache.get('embeddings')
+        if embeddings is not None:
+            # Legacy cache with embeddings in the pickle.
+            self._corpus_embeddings = self._quantize_embeddings(
+                _normalize_embeddings(embeddings))
+        else:
+            self._corpus_embeddings = _load_embeddings(
+                _get_embeddings_filename(cache_file))
         logging.info(
             f'Loaded {len(self._corpus)} sentences from cache {cache_file}')
         self.init_transformer()
 
     def save_corpus_to_cache(self, cache_file: str):
-        """Write corpus sentences and embeddings into cache."""
+        """Write corpus sentences into the cache pickle file and the
+        embeddings into a numpy file next to it."""
         if not cache_file:
             return
 
         cache = {}
         cache['key_values'] = self._key_values
         cache['corpus'] = self._corpus
-        cache['embeddings'] = self._corpus_embeddings
+        cache['embeddings_dtype'] = str(self._corpus_embeddings.dtype)
 
+        embeddings_file = _get_embeddings_filename(cache_file)
+        with file_util.FileIO(embeddings_file, 'wb') as file:
+            np.save(file, self._corpus_embeddings)
         with file_util.FileIO(cache_file, 'wb') as file:
             pickle.dump(cache, file)
         logging.info(
-            f'Wrote {len(self._corpus)} corpus sentences to cache {cache_file}')
+            f'Wrote {len(self._corpus)} corpus sentences to cache {cache_file}'
+            f' with embeddings in {embeddings_file}')
 
     def add_key_value(self, key: str, value: str = ''):
         """Add a key:value for lookup corpus.
@@ -155,17 +199,17 @@ class SemanticMatcher:
         # Import modules needed when running SemanticMatcher
         # This is not imported in import-executor automation
         # that calls stvtar processor, but doesn't need semantic matching.
-        from sentence_transformers import SentenceTransformer, util
+        from sentence_transformers import SentenceTransformer
 
         model = self._config.get('embeddings_model', 'all-MiniLM-L6-v2')
         logging.info(f'Creating SentenceTransformer with {model}')
-        self._embedder = SentenceTransformer(model)
-        self._semantic_search_util = util.semantic_search
+        self._embedder = SentenceTransformer(model, device='cpu')
 
         if self._corpus_embeddings is None:
             logging.info(
                 f'Generating embeddings for corpus {len(self._corpus)}')
-            self._corpus_embeddings = self.get_embeddings(self._corpus)
+            self._corpus_embeddings = self._quantize_embeddings(
+                self.get_embeddings(self._corpus))
             self._counters.add_counter('semantic_matcher_corpus_embeddings',
                                        len(self._corpus))
             logging.info(
@@ -182,73 +226,157 @@ class SemanticMatcher:
       Returns
         list of tuples of (key, value) ordered by score.
       """
-        self.init_transformer()
         if not key:
+            self.init_transformer()
             return []
+        return self.lookup_batch([key], num_results)[0]
+
+    def lookup_batch(self, keys: list, num_results: int = 10) -> list:
+        """Returns a list of results, one per key in keys.
+
+      Queries not in the cache are encoded together in batches.
+
+      Args:
+        keys: list of strings to lookup
+        num_results: max results to return per key
+      Returns
+        list with a list of tuples of (key, value) ordered by score per key.
+      """
+        self.init_transformer()
+        results = [[] for _ in keys]
+        query_index = [i for i, key in enumerate(keys) if key]
+        if not query_index:
+            return results
 
         # Get the query embeddings.
-        query_embedding = self.get_query_embedding(key)
-        if query_embedding is None:
-            logging.error(f'Unable to get embeddings for query: {key}')
-            return []
+        query_embeddings = self.get_query_embeddings(
+            [keys[i] for i in query_index])
 
         # Lookup query embeddings in corpus
         start_time = time.perf_counter()
-        matches = self._semantic_search_util(query_embedding,
-                                             self._corpus_embeddings,
-                                             top_k=num_results)
+        matches = self._search(query_embeddings, num_results)
         end_time = time.perf_counter()
-        logging.level_debug() and logging.debug(
-            f'Got semantic search result for {key}: {matches}')
-        if matches is None:
-            self._counters.add_counter(f'semantic_search_lookup_failures', 1)
-            return []
 
         # Get values for corpus matches
-        results = []
-        for match in matches[0]:
-            corpus_id = match.get('corpus_id', '')
-            key = self._corpus[corpus_id]
-            value = self._key_values.get(key, None)
-            if key and value is not None:
-                results.append((key, value))
+        for index, corpus_ids in zip(query_index, matches):
+            key_results = []
+            for corpus_id in corpus_ids:
+                key = self._corpus[corpus_id]
+                value = self._key_values.get(key, None)
+                if key and value is not None:
+                    key_results.append((key, value))
+            logging.level_debug() and logging.debug(
+                f'Got semantic search result for {keys[index]}: {key_results}')
+            results[index] = key_results
+            self._counters.add_counter(
+                f'semantic_search_lookup_results_{len(key_results)}', 1)
 
         # Update counters
-        self._counters.add_counter(f'semantic_search_lookups', 1)
-        self._counters.add_counter(
-            f'semantic_search_lookup_results_{len(results)}', 1)
-        query_time = end_time - start_time
+        self._counters.add_counter(f'semantic_search_lookups',
+                                   len(query_index))
+        self._counters.add_counter(f'semantic_search_lookup_time',
+                                   end_time - start_time)
         tot_query_time = self._counters.get_counter(
             'semantic_search_lookup_time')
-        tot_query_time += query_time
         tot_lookups = self._counters.get_counter('semantic_search_lookups')
         avg_time = tot_query_time / tot_lookups
         self._counters.set_counter(f'semantic_search_avg_lookup_time', avg_time)
         return results
 
-    def get_query_embedding(self, key: str) -> str:
+    def get_query_embedding(self, key: str) -> np.ndarray:
         """Returns the embedding for the query, building it if not set in cache."""
-        query_embedding = self._query_embeddings.get(key)
-        if query_embedding is not None:
-            self._counters.add_counter('semantic_matcher_query_cache_hits', 1)
-            return query_embedding
-
-        # Create embeddings for the query.
-        query_embedding = self.get_embeddings(key)
-        self._query_embeddings[key] = query_embedding
-        self._counters.add_counter('semantic_matcher_query_embeddings', 1)
-        return query_embedding
-
-    def get_embeddings(self, text) -> str:
-        """Returns the embeddings for the text."""
+        return self.get_query_embeddings([key])[0]
+
+    def get_query_embeddings(self, keys: list) -> np.ndarray:
+        """Returns a matrix with the embedding for each query.
+
+        Queries missing in the cache are encoded in a single batch.
+        """
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        embeddings = [None] * len(keys)
+        new_keys = {}
+        for index, key in enumerate(keys):
+            query_embedding = self._query_embeddings.get(key)
+            if query_embedding is not None:
+                self._query_embeddings.move_to_end(key)
+                self._counters.add_counter(
+                    'semantic_matcher_query_cache_hits', 1)
+                embeddings[index] = query_embedding
+            else:
+                new_keys.setdefault(key, []).append(index)
+
+        if new_keys:
+            # Create embeddings for the new queries.
+            new_embeddings = self.get_embeddings(list(new_keys.keys()))
+            for key, query_embedding in zip(new_keys.keys(), new_embeddings):
+                for index in new_keys[key]:
+                    embeddings[index] = query_embedding
+                self._add_query_embedding(key, query_embedding)
+            self._counters.add_counter('semantic_matcher_query_embeddings',
+                                       len(new_keys))
+        return np.stack(embeddings)
+
+    def get_embeddings(self, text) -> np.ndarray:
+        """Returns the normalized float32 embeddings for the text."""
         start_time = time.perf_counter()
-        embeddings = self._embedder.encode(text, convert_to_tensor=True)
+        embeddings = self._embedder.encode(
+            text,
+            batch_size=self._config.get('semantic_matcher_batch_size', 64),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        ).astype(np.float32, copy=False)
         end_time = time.perf_counter()
         self._counters.add_counter(f'semantic_matcher_encode_time',
                                    end_time - start_time)
         self._counters.add_counter(f'semantic_matcher_encode_calls', 1)
         return embeddings
 
+    def _add_query_embedding(self, key: str, query_embedding: np.ndarray):
+        """Adds the query embedding to the cache, evicting the least recently
+        used query if the cache is full."""
+        self._query_embeddings[key] = query_embedding
+        self._query_embeddings.move_to_end(key)
+        while len(self._query_embeddings) > self._query_cache_size:
+            self._query_embeddings.popitem(last=False)
+            self._counters.add_counter('semantic_matcher_query_cache_evictions',
+                                       1)
+
+    def _quantize_embeddings(self, embeddings: np.ndarray) -> np.ndarray:
+        """Returns the normalized embeddings in the configured dtype."""
+        dtype = self._config.get('semantic_matcher_embeddings_dtype',
+                                 'float32')
+        if dtype == 'int8':
+            return np.round(embeddings * INT8_SCALE).astype(np.int8)
+        return embeddings.astype(dtype, copy=False)
+
+    def _search(self, query_embeddings: np.ndarray, top_k: int) -> list:
+        """Returns the list of top_k corpus ids per query by cosine score."""
+        if self._config.get('semantic_matcher_index', 'exact') == 'ivf':
+            if self._index is None:
+                self._init_index()
+            return self._index.search(
+                query_embeddings, top_k,
+                self._config.get('semantic_matcher_ivf_nprobe', 8))
+        return exact_search(self._corpus_embeddings, query_embeddings, top_k)
+
+    def _init_index(self):
+        """Loads the IVF index saved next to the embeddings cache or builds
+        it from the corpus embeddings."""
+        self._index = IVFIndex(self._corpus_embeddings)
+        cache_file = self._config.get('semantic_matcher_cache')
+        index_file = ''
+        if cache_file:
+            index_file = _get_index_filename(cache_file)
+            if file_util.file_get_matching(index_file) and self._index.load(
+                    index_file):
+                return
+        self._index.build(self._config.get('semantic_matcher_ivf_num_lists',
+                                           0))
+        self._counters.add_counter('semantic_matcher_index_builds', 1)
+        if index_file:
+            self._index.save(index_file)
+
     # Returns True if sentence transformer is initialized.
     # More key values cannot be added once initialized.
     def is_initialized(self):
@@ -261,11 +389,56 @@ def get_semantic_matcher_default_config() -> dict:
     if not _FLAGS.is_parsed():
         _FLAGS.mark_as_parsed()
     return {
-        'embeddings_model': _FLAGS.semantic_matcher_model,
-        'semantic_matcher_cache': _FLAGS.semantic_matcher_cache,
+        'embeddings_model':
+            _FLAGS.semantic_matcher_model,
+        'semantic_matcher_cache':
+            _FLAGS.semantic_matcher_cache,
+        'semantic_matcher_embeddings_dtype':
+            _FLAGS.semantic_matcher_embeddings_dtype,
+        'semantic_matcher_query_cache_size':
+            _FLAGS.semantic_matcher_query_cache_size,
+        'semantic_matcher_batch_size':
+            _FLAGS.semantic_matcher_batch_size,
+        'semantic_matcher_index':
+            _FLAGS.semantic_matcher_index,
+        'semantic_matcher_ivf_num_lists':
+            _FLAGS.semantic_matcher_ivf_num_lists,
+        'semantic_matcher_ivf_nprobe':
+            _FLAGS.semantic_matcher_ivf_nprobe,
     }
 
 
+def _get_embeddings_filename(cache_file: str) -> str:
+    """Returns the numpy file for corpus embeddings of the cache file."""
+    return os.path.splitext(cache_file)[0] + '.npy'
+
+
+def _get_index_filename(cache_file: str) -> str:
+    """Returns the IVF index file for the cache file."""
+    return os.path.splitext(cache_file)[0] + '.ivf.npz'
+
+
+def _load_embeddings(embeddings_file: str) -> np.ndarray:
+    """Returns the embeddings from the numpy file.
+
+    Local files are memory-mapped so that the corpus is paged in on demand.
+    """
+    if file_util.file_is_local(embeddings_file):
+        return np.load(embeddings_file, mmap_mode='r')
+    with file_util.FileIO(embeddings_file, 'rb', use_tempfile=False) as file:
+        return np.load(io.BytesIO(file.read()))
+
+
+def _normalize_embeddings(embeddings) -> np.ndarray:
+    """Returns unit length float32 embeddings from a tensor or array."""
+    if hasattr(embeddings, 'cpu'):
+        embeddings = embeddings.cpu().numpy()
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+
 def semantic_matcher_lookup(corpus_file: str,
                             input_file: str,
                             output_file: str,
@@ -298,8 +471,9 @@ def semantic_matcher_lookup(corpus_file: str,
     logging.info(f'Looking up {len(queries)} queries from {input_file}')
     results = {}
     counters.add_counter('total', len(queries))
-    for query in queries.keys():
-        matches = semantic_matcher.lookup(query)
+    query_list = list(queries.keys())
+    for query, matches in zip(query_list,
+                              semantic_matcher.lookup_batch(query_list)):
         result = {}
         for kv in matches:
             k, v = kv
@@ -13,12 +13,59 @@
 # limitations under the License.
 """Test for semantic_matcher.py"""
 
+import os
+import tempfile
 import unittest
 
+import numpy as np
+
 from absl import app
 from absl import logging
+from config_map import ConfigMap
 from semantic_matcher import SemanticMatcher
 
+# Fixed embeddings for the fake encoder.
+_TEST_EMBEDDINGS = {
+    'child': [1.0, 0.1, 0.0],
+    'adult': [0.6, 0.8, 0.0],
+    'USD': [0.0, 0.1, 1.0],
+    'INR': [0.0, 0.5, 0.8],
+    'boy': [0.9, 0.2, 0.0],
+    'dollars': [0.0, 0.0, 1.0],
+}
+
+
+class _FakeEmbedder:
+    """Encoder returning fixed embeddings that counts encode calls."""
+
+    def __init__(self):
+        self.num_calls = 0
+
+    def encode(self, text, **kwargs):
+        self.num_calls += 1
+        texts = [text] if isinstance(text, str) else text
+        embeddings = np.array([_TEST_EMBEDDINGS[t] for t in texts],
+                              dtype=np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings[0] if isinstance(text, str) else embeddings
+
+
+def _get_test_matcher(config: dict = {}) -> SemanticMatcher:
+    """Returns a SemanticMatcher with a fake encoder and test corpus."""
+    matcher = SemanticMatcher(
+        ConfigMap({
+            'semantic_matcher_cache': '',
+            **config
+        }))
+    matcher.add_key_value('child', 'age: [- 17 Years]')
+    matcher.add_key_value('adult', 'age: [18 - Years]')
+    matcher.add_key_value('USD', 'unit: USDollar')
+    matcher.add_key_value('INR', 'unit: IndianRupee')
+    matcher._embedder = _FakeEmbedder()
+    matcher._corpus_embeddings = matcher._quantize_embeddings(
+        matcher.get_embeddings(matcher._corpus))
+    return matcher
+
 
 class SemanticMatcherTest(unittest.TestCase):
 
@@ -38,3 +85,62 @@ class SemanticMatcherTest(unittest.TestCase):
         results = matcher.lookup('boy')
         # Should return list of keys, values matching the lookup string
         self.assertEqual(('child', 'age: [- 17 Years]'), results[0])
+
+    def test_lookup_batch(self):
+        for dtype in ['float32', 'float16', 'int8']:
+            matcher = _get_test_matcher(
+                {'semantic_matcher_embeddings_dtype': dtype})
+            embedder = matcher._embedder
+            corpus_calls = embedder.num_calls
+            results = matcher.lookup_batch(['boy', '', 'dollars', 'boy'],
+                                           num_results=2)
+            self.assertEqual(corpus_calls + 1, embedder.num_calls)
+            self.assertEqual([('child', 'age: [- 17 Years]'),
+                              ('adult', 'age: [18 - Years]')], results[0])
+            self.assertEqual([], results[1])
+            self.assertEqual([('USD', 'unit: USDollar'),
+                              ('INR', 'unit: IndianRupee')], results[2])
+            self.assertEqual(results[0], results[3])
+            # Cached queries are not encoded again.
+            self.assertEqual(results[0], matcher.lookup('boy', num_results=2))
+            self.assertEqual(corpus_calls + 1, embedder.num_calls)
+
+    def test_query_cache_size(self):
+        matcher = _get_test_matcher({'semantic_matcher_query_cache_size': 1})
+        matcher.lookup_batch(['boy', 'dollars'])
+        self.assertEqual(['dollars'], list(matcher._query_embeddings.keys()))
+
+    def test_corpus_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_file = os.path.join(tmp_dir, 'embeddings.pkl')
+            matcher = _get_test_matcher(
+                {'semantic_matcher_embeddings_dtype': 'float16'})
+            matcher.save_corpus_to_cache(cache_file)
+            self.assertTrue(
+                os.path.exists(os.path.join(tmp_dir, 'embeddings.npy')))
+
+            loaded_matcher = SemanticMatcher(
+                ConfigMap({'semantic_matcher_cache': ''}))
+            loaded_matcher._embedder = _FakeEmbedder()
+            loaded_matcher.load_corpus_cache(cache_file)
+            self.assertEqual(matcher._corpus, loaded_matcher._corpus)
+            self.assertIsInstance(loaded_matcher._corpus_embeddings, np.memmap)
+            self.assertEqual(np.float16,
+                             loaded_matcher._corpus_embeddings.dtype)
+            self.assertEqual(matcher.lookup('dollars'),
+                             loaded_matcher.lookup('dollars'))
+
+    def test_lookup_ivf_index(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_file = os.path.join(tmp_dir, 'embeddings.pkl')
+            matcher = _get_test_matcher({
+                'semantic_matcher_index': 'ivf',
+                'semantic_matcher_ivf_num_lists': 2,
+                'semantic_matcher_ivf_nprobe': 2,
+                'semantic_matcher_cache': cache_file,
+            })
+            self.assertEqual([('child', 'age: [- 17 Years]'),
+                              ('adult', 'age: [18 - Years]')],
+                             matcher.lookup('boy', num_results=2))
+            self.assertTrue(
+                os.path.exists(os.path.join(tmp_dir, 'embeddings.ivf.npz')))
@@ -77,7 +77,7 @@ import data_annotator
 
 import property_value_utils as pv_utils
 
-from filter_data_outliers import filter_data_svobs
+from filter_data_outliers import filter_data_get_outlier_keys
 from mcf_file_util import get_numeric_value, get_value_list, add_pv_to_node
 from mcf_file_util import load_mcf_nodes, write_mcf_nodes, add_namespace, strip_namespace
 from mcf_filter import drop_existing_mcf_nodes
@@ -1226,8 +1226,18 @@ class StatVarsMap:
         return formatted_svobs
 
     def filter_svobs(self):
-        """Filter SVObs to remove outliers."""
-        filter_data_svobs(self._statvar_obs_map, self._config, self._counters)
+        """Filter SVObs to remove outliers.
+
+    Outliers are removed in place so that the remaining SVObs are written in
+    the order they were added.
+    """
+        outlier_keys = filter_data_get_outlier_keys(self._statvar_obs_map,
+                                                    self._config,
+                                                    self._counters)
+        for svobs_key in outlier_keys:
+            pvs = self._statvar_obs_map.pop(svobs_key)
+            self._counters.add_counter('dropped-outlier-svobs', 1,
+                                       pvs.get('variableMeasured', ''))
 
     def write_statvar_obs_csv(
         self,
@@ -1835,30 +1845,43 @@ class StatVarDataProcessor:
                                     f'Skipping processing as {outputs} exist',
                                     self._log_every_n)
                 return
+        # Processing fails with a TimeoutError after the deadline.
+        deadline = sys.maxsize
+        if self._config.get('processing_timeout', 0) > 0:
+            deadline = time_start + self._config.get('processing_timeout')
         # Expand any wildcard in filenames
-        encoding = self._config.get('input_encoding', 'utf-8')
         files = file_util.file_get_matching(filenames)
         for file in files:
-            self._counters.add_counter('total',
-                                       file_util.file_estimate_num_rows(file))
+            # Profile is computed once per file and reused for each pass.
+            self._counters.add_counter(
+                'total',
+                file_util.file_get_profile(file).get('num_rows', 0))
         # Process all input data files, one at a time.
         for filename in files:
+            encoding = self._config.get('input_encoding')
+            if not encoding:
+                encoding = file_util.file_get_profile(filename).get(
+                    'encoding', 'utf-8')
             logging.log_every_n(
                 logging.INFO,
                 f'Processing input data file {filename} with encoding:{encoding}...',
                 self._log_every_n)
             file_start_time = time.perf_counter()
-            if filename.endswith('.json'):
+            if filename.endswith(('.json', '.jsonl')):
                 # Convert json to csv file.
                 logging.log_every_n(
                     logging.INFO, f'Converting json file {filename} into csv',
                     self._log_every_n)
                 filename = file_json_to_csv(filename)
+            profile = file_util.file_get_profile(filename)
             fileio = file_util.FileIO(filename, newline='', encoding=encoding)
             with fileio as csvfile:
                 self._counters.add_counter('input-files-processed', 1)
-                num_file_rows = file_util.file_estimate_num_rows(
-                    fileio.get_local_filename())
+                num_file_rows = profile.get('num_rows')
+                if num_file_rows is None:
+                    # No profile for spreadsheets. Use the local copy.
+                    num_file_rows = file_util.file_estimate_num_rows(
+                        fileio.get_local_filename())
                 self._counters.add_counter(f'num-rows-{filename}',
                                            num_file_rows)
                 max_rows_per_file = int(
@@ -1885,6 +1908,13 @@ class StatVarDataProcessor:
                 for row in reader:
                     self._counters.add_counter('processed', 1, filename)
                     line_number += 1
+                    if time.perf_counter() > deadline:
+                        self._counters.add_counter('error-processing-timeout',
+                                                   1, filename)
+                        raise TimeoutError(
+                            f'Processing timed out after'
+                            f' {self._config.get("processing_timeout")} secs'
+                            f' at {filename}:{line_number}')
                     if line_number <= skip_rows:
                         logging.level_debug() and logging.log_every_n(
                             2, f'Skipping row {filename}:{line_number}:{row}',
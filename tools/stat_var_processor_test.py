@@ -29,9 +29,10 @@ sys.path.append(os.path.dirname(os.path.dirname(_SCRIPT_DIR)))
 sys.path.append(
     os.path.join(os.path.dirname(os.path.dirname(_SCRIPT_DIR)), 'util'))
 
+from config_flags import get_default_config
 from counters import Counters
 from mcf_diff import diff_mcf_files
-from stat_var_processor import StatVarDataProcessor, process
+from stat_var_processor import StatVarDataProcessor, StatVarsMap, process
 
 
 class TestStatVarProcessor(unittest.TestCase):
@@ -149,6 +150,31 @@ class TestStatVarProcessor(unittest.TestCase):
             self.process_file(test_file)
 
 
+class TestStatVarsMap(unittest.TestCase):
+
+    def test_filter_svobs(self):
+        config = get_default_config()
+        config['filter_data_max_change_ratio'] = 2
+        statvars_map = StatVarsMap(config)
+        for index, (date, value) in enumerate([('2020', 10), ('2021', 12),
+                                               ('2022', 100), ('2023', 11)]):
+            statvars_map.add_statvar_obs({
+                'observationAbout': 'dcid:geoId/06',
+                'variableMeasured': 'dcid:Count_Person',
+                'observationDate': date,
+                'value': value,
+                '#input': f'input.csv:{index}',
+            })
+        statvars_map.filter_svobs()
+        # Outlier is dropped and the remaining SVObs retain their order.
+        self.assertEqual(['2020', '2021', '2023'], [
+            svobs['observationDate']
+            for svobs in statvars_map._statvar_obs_map.values()
+        ])
+        self.assertEqual(
+            1, statvars_map._counters.get_counter('dropped-outlier-svobs'))
+
+
 if __name__ == '__main__':
     app.run()
     unittest.main()
@@ -0,0 +1,456 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Timing and resource usage of the steps of a pipeline run.
+
+Each step runs within a span that records its start and end time, wall time,
+CPU time and peak memory along with attributes set by the step, such as the
+exit status of a subprocess. Spans started within another span in the same
+thread are nested under it with the path '<parent>/<step>'.
+
+Spans are written as JSON Lines, one record per completed span:
+  run_id, span_id, parent_id, dataset, step, path, start, end: identifiers
+    and ISO timestamps of the span.
+  wall_secs: elapsed time of the span.
+  cpu_secs: CPU time of the thread running the span.
+  child_cpu_secs: CPU time of subprocesses of the process that completed
+    during the span.
+  peak_rss_bytes, peak_child_rss_bytes: peak resident memory of the process
+    and of all its subprocesses, sampled with psutil.
+  status: 'ok', 'failed', 'skipped' or 'error' if the step raised.
+  any attributes of the step, such as exit_status of a subprocess.
+
+Memory and subprocess CPU are measured for the whole process, so with
+datasets processed in parallel they include the usage of concurrent steps.
+
+The records of a run can be summarized per step and compared with another
+run to find the steps that got slower:
+  python step_telemetry.py --telemetry_files=<run.jsonl>
+  python step_telemetry.py --telemetry_files=<baseline.jsonl>,<run.jsonl>
+
+Example:
+  telemetry = step_telemetry.init_default_telemetry('logs/telemetry.jsonl')
+  with step_telemetry.span('validate', dataset='bis') as span:
+      result = subprocess.run(cmd)
+      span.set(exit_status=result.returncode)
+      if result.returncode:
+          span.set(status='failed')
+"""
+
+import contextlib
+import itertools
+import json
+import os
+import threading
+import time
+
+from absl import app
+from absl import flags
+from absl import logging
+from datetime import datetime
+
+import psutil
+
+_FLAGS = flags.FLAGS
+
+flags.DEFINE_list(
+    'telemetry_files', [],
+    'Telemetry JSON Lines files to summarize. With two files, the second run'
+    ' is compared with the first.')
+
+# Seconds between samples of the memory usage.
+DEFAULT_SAMPLE_INTERVAL_SECS = 0.5
+
+# Columns of the summary per step.
+SUMMARY_COLUMNS = [
+    'path', 'count', 'failed', 'skipped', 'wall_secs_total', 'wall_secs_mean',
+    'wall_secs_max', 'cpu_secs_total', 'child_cpu_secs_total',
+    'peak_rss_mb', 'peak_child_rss_mb'
+]
+
+# Columns of the comparison of two runs per step.
+COMPARE_COLUMNS = [
+    'path', 'count_1', 'count_2', 'wall_secs_mean_1', 'wall_secs_mean_2',
+    'wall_secs_change_pct', 'wall_secs_total_1', 'wall_secs_total_2',
+    'peak_rss_mb_1', 'peak_rss_mb_2'
+]
+
+_DEFAULT_TELEMETRY = None
+_DEFAULT_TELEMETRY_LOCK = threading.Lock()
+
+
+class StepSpan:
+    """Measurements of a step in progress."""
+
+    def __init__(self, span_id: int, step: str, dataset: str,
+                 parent: 'StepSpan', attributes: dict):
+        self.span_id = span_id
+        self.step = step
+        self.dataset = dataset
+        self.parent_id = parent.span_id if parent else None
+        self.path = f'{parent.path}/{step}' if parent else step
+        self.attributes = {'status': 'ok'}
+        self.attributes.update(attributes)
+        self.peak_rss = 0
+        self.peak_child_rss = 0
+
+    def set(self, **attributes):
+        """Sets attributes such as 'status' or 'exit_status' of the span."""
+        self.attributes.update(attributes)
+
+    def update_peak(self, rss: int, child_rss: int):
+        self.peak_rss = max(self.peak_rss, rss)
+        self.peak_child_rss = max(self.peak_child_rss, child_rss)
+
+
+class StepTelemetry:
+    """Records spans for the steps of a run into a JSON Lines file."""
+
+    def __init__(self,
+                 output_file: str = '',
+                 run_id: str = '',
+                 sample_interval: float = DEFAULT_SAMPLE_INTERVAL_SECS):
+        """Initializes the recorder.
+
+        Args:
+          output_file: JSON Lines file the records are appended to or ''
+            to only keep them in memory.
+          run_id: identifier of the run added to each record.
+          sample_interval: seconds between samples of the memory usage or
+            0 to sample only at the start and end of each span.
+        """
+        self._output_file = output_file
+        self._run_id = run_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+        self._sample_interval = sample_interval
+        self._process = psutil.Process(os.getpid())
+        self._lock = threading.Lock()
+        self._span_ids = itertools.count(1)
+        # Spans in progress across all threads.
+        self._active_spans = set()
+        # Stack of spans in progress in each thread.
+        self._thread_spans = threading.local()
+        self._records = []
+        self._sampler = None
+        self._stop = threading.Event()
+        if output_file:
+            os.makedirs(os.path.dirname(os.path.abspath(output_file)),
+                        exist_ok=True)
+
+    def get_run_id(self) -> str:
+        return self._run_id
+
+    def get_output_file(self) -> str:
+        return self._output_file
+
+    def get_records(self) -> list:
+        """Returns the records of all completed spans."""
+        with self._lock:
+            return list(self._records)
+
+    @contextlib.contextmanager
+    def span(self, step: str, dataset: str = '', **attributes):
+        """Context manager that records the span of a step.
+
+        Args:
+          step: name of the step.
+          dataset: name of the dataset processed by the step. Defaults to
+            the dataset of the enclosing span.
+          attributes: attributes added to the record.
+
+        Yields:
+          StepSpan to set attributes of the step.
+        """
+        stack = self._get_stack()
+        parent = stack[-1] if stack else None
+        if not dataset and parent:
+            dataset = parent.dataset
+        span = StepSpan(next(self._span_ids), step, dataset, parent,
+                        attributes)
+        span.update_peak(*self._get_rss())
+        start_time = datetime.now()
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        start_child_cpu = self._get_child_cpu_secs()
+        stack.append(span)
+        with self._lock:
+            self._active_spans.add(span)
+            self._start_sampler()
+        try:
+            yield span
+        except BaseException as e:
+            span.set(status='error', error=f'{type(e).__name__}: {e}')
+            raise
+        finally:
+            stack.pop()
+            with self._lock:
+                self._active_spans.discard(span)
+            span.update_peak(*self._get_rss())
+            record = {
+                'run_id': self._run_id,
+                'span_id': span.span_id,
+                'parent_id': span.parent_id,
+                'dataset': span.dataset,
+                'step': span.step,
+                'path': span.path,
+                'start': start_time.isoformat(),
+                'end': datetime.now().isoformat(),
+                'wall_secs': round(time.perf_counter() - start_wall, 6),
+                'cpu_secs': round(time.thread_time() - start_cpu, 6),
+                'child_cpu_secs': round(
+                    self._get_child_cpu_secs() - start_child_cpu, 6),
+                'peak_rss_bytes': span.peak_rss,
+                'peak_child_rss_bytes': span.peak_child_rss,
+            }
+            record.update(span.attributes)
+            self._write(record)
+
+    def set_attributes(self, **attributes):
+        """Sets attributes of the innermost span of the current thread."""
+        stack = self._get_stack()
+        if stack:
+            stack[-1].set(**attributes)
+
+    def close(self):
+        """Stops the memory sampler."""
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+            self._sampler = None
+
+    def _get_stack(self) -> list:
+        if not hasattr(self._thread_spans, 'stack'):
+            self._thread_spans.stack = []
+        return self._thread_spans.stack
+
+    def _start_sampler(self):
+        """Starts the memory sampler thread if not running."""
+        if self._sampler or not self._sample_interval or self._stop.is_set():
+            return
+        self._sampler = threading.Thread(target=self._sample,
+                                         name='step-telemetry',
+                                         daemon=True)
+        self._sampler.start()
+
+    def _sample(self):
+        while not self._stop.wait(self._sample_interval):
+            with self._lock:
+                if not self._active_spans:
+                    continue
+                spans = list(self._active_spans)
+            rss, child_rss = self._get_rss()
+            for span in spans:
+                span.update_peak(rss, child_rss)
+
+    def _get_rss(self) -> tuple:
+        """Returns the resident memory of the process and its children."""
+        try:
+            rss = self._process.memory_info().rss
+            children = self._process.children(recursive=True)
+        except psutil.Error:
+            return 0, 0
+        child_rss = 0
+        for child in children:
+            try:
+                child_rss += child.memory_info().rss
+            except psutil.Error:
+                # Child exited since it was listed.
+                pass
+        return rss, child_rss
+
+    def _get_child_cpu_secs(self) -> float:
+        try:
+            cpu_times = self._process.cpu_times()
+        except psutil.Error:
+            return 0.0
+        return cpu_times.children_user + cpu_times.children_system
+
+    def _write(self, record: dict):
+        with self._lock:
+            self._records.append(record)
+            if not self._output_file:
+                return
+            try:
+                with open(self._output_file, 'a', encoding='utf-8') as file:
+                    file.write(json.dumps(record, default=str) + '\n')
+            except OSError as e:
+                logging.warning(
+                    f'Unable to write telemetry to {self._output_file}: {e}')
+
+
+def init_default_telemetry(output_file: str = '',
+                           run_id: str = '',
+                           sample_interval: float = DEFAULT_SAMPLE_INTERVAL_SECS
+                          ) -> StepTelemetry:
+    """Creates the recorder shared by all callers in the process."""
+    global _DEFAULT_TELEMETRY
+    with _DEFAULT_TELEMETRY_LOCK:
+        if _DEFAULT_TELEMETRY:
+            _DEFAULT_TELEMETRY.close()
+        _DEFAULT_TELEMETRY = StepTelemetry(output_file, run_id,
+                                           sample_interval)
+        return _DEFAULT_TELEMETRY
+
+
+def get_default_telemetry() -> StepTelemetry:
+    """Returns the shared recorder, keeping records in memory if not set."""
+    global _DEFAULT_TELEMETRY
+    with _DEFAULT_TELEMETRY_LOCK:
+        if _DEFAULT_TELEMETRY is None:
+            _DEFAULT_TELEMETRY = StepTelemetry()
+        return _DEFAULT_TELEMETRY
+
+
+def span(step: str, dataset: str = '', **attributes):
+    """Returns a span for the step in the shared recorder."""
+    return get_default_telemetry().span(step, dataset, **attributes)
+
+
+def set_attributes(**attributes):
+    """Sets attributes of the current thread's innermost span."""
+    get_default_telemetry().set_attributes(**attributes)
+
+
+def load_records(telemetry_file: str) -> list:
+    """Returns the records in a telemetry JSON Lines file."""
+    records = []
+    with open(telemetry_file, 'r', encoding='utf-8') as file:
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError as e:
+                logging.warning(
+                    f'Ignoring invalid record {telemetry_file}:{line_number}:'
+                    f' {e}')
+    return records
+
+
+def summarize_records(records: list) -> list:
+    """Returns a summary per step path in the order the steps first ended.
+
+    Skipped spans are counted but excluded from the times.
+
+    Returns:
+      list of dicts with the SUMMARY_COLUMNS.
+    """
+    summaries = {}
+    for record in records:
+        path = record.get('path') or record.get('step', '')
+        summary = summaries.setdefault(
+            path, {
+                'path': path,
+                'count': 0,
+                'failed': 0,
+                'skipped': 0,
+                'wall_secs_total': 0.0,
+                'wall_secs_mean': 0.0,
+                'wall_secs_max': 0.0,
+                'cpu_secs_total': 0.0,
+                'child_cpu_secs_total': 0.0,
+                'peak_rss_mb': 0.0,
+                'peak_child_rss_mb': 0.0,
+            })
+        status = record.get('status', 'ok')
+        if status == 'skipped':
+            summary['skipped'] += 1
+            continue
+        summary['count'] += 1
+        if status != 'ok':
+            summary['failed'] += 1
+        wall_secs = record.get('wall_secs', 0)
+        summary['wall_secs_total'] += wall_secs
+        summary['wall_secs_max'] = max(summary['wall_secs_max'], wall_secs)
+        summary['cpu_secs_total'] += record.get('cpu_secs', 0)
+        summary['child_cpu_secs_total'] += record.get('child_cpu_secs', 0)
+        summary['peak_rss_mb'] = max(
+            summary['peak_rss_mb'],
+            record.get('peak_rss_bytes', 0) / (1024 * 1024))
+        summary['peak_child_rss_mb'] = max(
+            summary['peak_child_rss_mb'],
+            record.get('peak_child_rss_bytes', 0) / (1024 * 1024))
+    for summary in summaries.values():
+        if summary['count']:
+            summary['wall_secs_mean'] = (summary['wall_secs_total'] /
+                                         summary['count'])
+        for column, value in summary.items():
+            if isinstance(value, float):
+                summary[column] = round(value, 3)
+    return list(summaries.values())
+
+
+def compare_records(records1: list, records2: list) -> list:
+    """Returns a comparison per step path of the second run with the first.
+
+    The change in the mean wall time is only set for steps run in both.
+
+    Returns:
+      list of dicts with the COMPARE_COLUMNS for the steps in either run.
+    """
+    summaries1 = {s['path']: s for s in summarize_records(records1)}
+    summaries2 = {s['path']: s for s in summarize_records(records2)}
+    comparison = []
+    paths = list(summaries1.keys())
+    paths.extend(p for p in summaries2 if p not in summaries1)
+    for path in paths:
+        summary1 = summaries1.get(path, {})
+        summary2 = summaries2.get(path, {})
+        row = {'path': path}
+        for column in [
+                'count', 'wall_secs_mean', 'wall_secs_total', 'peak_rss_mb'
+        ]:
+            row[f'{column}_1'] = summary1.get(column, 0)
+            row[f'{column}_2'] = summary2.get(column, 0)
+        row['wall_secs_change_pct'] = None
+        if row['count_1'] and row['count_2'] and row['wall_secs_mean_1']:
+            row['wall_secs_change_pct'] = round(
+                (row['wall_secs_mean_2'] - row['wall_secs_mean_1']) /
+                row['wall_secs_mean_1'] * 100, 1)
+        comparison.append({column: row[column] for column in COMPARE_COLUMNS})
+    return comparison
+
+
+def format_table(rows: list, columns: list) -> str:
+    """Returns the rows as a text table with aligned columns."""
+    table = [columns]
+    for row in rows:
+        table.append(
+            ['' if row.get(c) is None else str(row.get(c)) for c in columns])
+    widths = [max(len(line[i]) for line in table) for i in range(len(columns))]
+    lines = []
+    for line in table:
+        cells = [
+            cell.ljust(width) if i == 0 else cell.rjust(width)
+            for i, (cell, width) in enumerate(zip(line, widths))
+        ]
+        lines.append('  '.join(cells).rstrip())
+    return '\n'.join(lines)
+
+
+def main(_):
+    files = _FLAGS.telemetry_files
+    if len(files) == 1:
+        print(
+            format_table(summarize_records(load_records(files[0])),
+                         SUMMARY_COLUMNS))
+    elif len(files) == 2:
+        print(
+            format_table(
+                compare_records(load_records(files[0]),
+                                load_records(files[1])), COMPARE_COLUMNS))
+    else:
+        raise app.UsageError('--telemetry_files needs one or two files')
+
+
+if __name__ == '__main__':
+    app.run(main)
@@ -0,0 +1,108 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for step_telemetry.py."""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+
+import step_telemetry
+
+
+class StepTelemetryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.telemetry_file = os.path.join(self.tmp_dir.name,
+                                           'telemetry.jsonl')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_spans(self):
+        telemetry = step_telemetry.StepTelemetry(self.telemetry_file,
+                                                 run_id='run1',
+                                                 sample_interval=0.01)
+        with telemetry.span('generate', dataset='bis'):
+            with telemetry.span('validate', attempt=0) as span:
+                result = subprocess.run(
+                    [sys.executable, '-c', 'import sys; sys.exit(3)'])
+                telemetry.set_attributes(exit_status=result.returncode)
+                span.set(status='failed')
+        with self.assertRaises(ValueError):
+            with telemetry.span('evaluate', dataset='bis'):
+                raise ValueError('bad pvmap')
+        telemetry.close()
+
+        records = step_telemetry.load_records(self.telemetry_file)
+        self.assertEqual(records, telemetry.get_records())
+        self.assertEqual(['generate/validate', 'generate', 'evaluate'],
+                         [r['path'] for r in records])
+        validate, generate, evaluate = records
+        self.assertEqual('run1', validate['run_id'])
+        self.assertEqual('bis', validate['dataset'])
+        self.assertEqual(generate['span_id'], validate['parent_id'])
+        self.assertEqual(3, validate['exit_status'])
+        self.assertEqual(0, validate['attempt'])
+        self.assertEqual('failed', validate['status'])
+        self.assertGreater(validate['child_cpu_secs'], 0)
+        self.assertGreater(validate['peak_rss_bytes'], 0)
+        self.assertGreaterEqual(generate['wall_secs'], validate['wall_secs'])
+        self.assertEqual('ok', generate['status'])
+        self.assertEqual('error', evaluate['status'])
+        self.assertEqual('ValueError: bad pvmap', evaluate['error'])
+
+    def test_summarize_and_compare(self):
+        run1 = [
+            {'path': 'prepare', 'wall_secs': 2.0, 'cpu_secs': 1.0},
+            {'path': 'prepare', 'wall_secs': 4.0, 'status': 'failed'},
+            {'path': 'generate', 'wall_secs': 10.0,
+             'peak_rss_bytes': 2 * 1024 * 1024},
+        ]
+        run2 = [
+            {'path': 'prepare', 'wall_secs': 1.5},
+            {'path': 'prepare', 'wall_secs': 0.0, 'status': 'skipped'},
+            {'path': 'generate', 'wall_secs': 15.0},
+            {'path': 'evaluate', 'wall_secs': 1.0},
+        ]
+        summary = step_telemetry.summarize_records(run1)
+        self.assertEqual(['prepare', 'generate'], [s['path'] for s in summary])
+        self.assertEqual(2, summary[0]['count'])
+        self.assertEqual(1, summary[0]['failed'])
+        self.assertEqual(6.0, summary[0]['wall_secs_total'])
+        self.assertEqual(3.0, summary[0]['wall_secs_mean'])
+        self.assertEqual(4.0, summary[0]['wall_secs_max'])
+        self.assertEqual(2.0, summary[1]['peak_rss_mb'])
+        self.assertEqual(1, step_telemetry.summarize_records(run2)[0]['skipped'])
+
+        comparison = {
+            row['path']: row
+            for row in step_telemetry.compare_records(run1, run2)
+        }
+        self.assertEqual(-50.0, comparison['prepare']['wall_secs_change_pct'])
+        self.assertEqual(50.0, comparison['generate']['wall_secs_change_pct'])
+        self.assertIsNone(comparison['evaluate']['wall_secs_change_pct'])
+        table = step_telemetry.format_table(comparison.values(),
+                                            step_telemetry.COMPARE_COLUMNS)
+        self.assertEqual(4, len(table.splitlines()))
+        self.assertTrue(table.startswith('path'))
+
+
+if __name__ == '__main__':
+    unittest.main()
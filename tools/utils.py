@@ -16,14 +16,22 @@
 This module provides helper functions used across the StatVar import process.
 """
 
+import contextlib
+import csv
+import glob
+import hashlib
+import json
 import os
 import logging
+import multiprocessing
 import re
 import sys
 import tempfile
 from typing import Union, Optional, Dict, List
 
+import mmh3
 import pandas as pd
+from python_calamine import CalamineWorkbook
 
 _SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(_SCRIPT_DIR)
@@ -34,6 +42,7 @@ sys.path.append(
 
 import file_util
 
+from download_cache import DownloadCache
 from download_util import download_file_from_url
 
 
@@ -306,13 +315,18 @@ def get_filename_for_url(url: str, path: str) -> str:
 def download_csv_from_url(urls: Union[str, List[str]],
                           download_files: Optional[Union[str,
                                                          List[str]]] = None,
-                          overwrite: bool = False) -> List[str]:
+                          overwrite: bool = False,
+                          cache_dir: str = '') -> List[str]:
     """Downloads data from one or more URLs and saves it to specified files.
 
     If `download_files` are provided, they are used as the destination paths for
     the corresponding URLs. If not, filenames are automatically generated based
     on the URL.
 
+    If `cache_dir` is set, the URLs are downloaded in parallel through a
+    persistent download cache, and URLs that have not changed since they were
+    cached are copied from the cache without downloading them again.
+
     Args:
         urls: A single URL string or a list of URL strings to download from.
         download_files: A single destination file path or a list of paths.
@@ -320,6 +334,8 @@ def download_csv_from_url(urls: Union[str, List[str]],
                         If None, filenames are generated automatically.
         overwrite: If True, existing files will be overwritten.
                    Defaults to False.
+        cache_dir: Directory for the download cache. The cache is not used if
+                   empty.
 
     Returns:
         A list of file paths for the successfully downloaded files.
@@ -343,6 +359,25 @@ def download_csv_from_url(urls: Union[str, List[str]],
         data_path = os.path.dirname(download_files[0])
     else:
         data_path = './'
+    if cache_dir:
+        filenames = []
+        for index, url in enumerate(urls):
+            if download_files and index < len(download_files):
+                filename = download_files[index]
+            else:
+                filename = get_filename_for_url(url, data_path)
+                # Use a unique name for URLs with the same filename.
+                base, ext = os.path.splitext(filename)
+                count = 0
+                while filename in filenames:
+                    count += 1
+                    filename = f'{base}-{count}{ext}'
+            filenames.append(filename)
+        logging.info(f'Downloading {urls} into {filenames}')
+        output_files = DownloadCache(cache_dir).download_files(urls, filenames)
+        data_files = [f for f in output_files if f]
+        logging.info(f'Downloaded {urls} into {data_files}.')
+        return data_files
     for index in range(len(urls)):
         url = urls[index]
         if download_files and index < len(download_files):
@@ -364,23 +399,32 @@ def shard_csv_data(
     column: Optional[str] = None,
     prefix_len: int = sys.maxsize,
     keep_existing_files: bool = True,
+    num_shards: int = 0,
+    chunk_rows: int = 100000,
 ) -> List[str]:
-    """Shards one or more CSV files into multiple smaller CSV files based on the unique values in a specified column.
+    """Shards one or more CSV files into multiple smaller CSV files based on the values in a specified column.
+
+    The input files are streamed in a single pass and each row is appended to
+    the shard for the value (or a prefix of the value) in the specified
+    `column`, so memory is bounded by `chunk_rows` irrespective of the input
+    size.
 
-    This function reads one or more CSVs, concatenates them, and then splits the
-    resulting DataFrame into new CSV files. Each new file contains all rows that
-    share the same unique value (or a common prefix of that value) in the
-    specified `column`.
+    If `num_shards` is set, rows are assigned to one of `num_shards` shards by
+    a stable hash of the column value so that all rows with the same value
+    are in the same shard. Otherwise, there is one shard per unique value.
 
-    If no `column` is specified, the first column of the DataFrame is used for sharding.
+    If no `column` is specified, the first column of the input is used for sharding.
 
     Args:
         files: A list of paths to the input CSV files.
         column: The name of the column to shard by. If None, the first column is used.
         prefix_len: The number of characters of the column value to use for grouping.
                     Defaults to the full length of the value.
-        keep_existing_files: If True, existing shard files will not be overwritten.
-                             Defaults to True.
+        keep_existing_files: If True, existing shard files are returned without
+                             reading the input files. Defaults to True.
+        num_shards: The number of shards by hash of the column value.
+                    If 0, creates a shard per unique value of the column.
+        chunk_rows: The number of rows buffered before appending to the shards.
 
     Returns:
         A list of file paths for the generated shard files.
@@ -388,6 +432,8 @@ def shard_csv_data(
     Examples:
         >>> shard_csv_data(['my_data.csv'], column='country')
         ['my_data-country-00000-of-00002.csv', 'my_data-country-00001-of-00002.csv']
+        >>> shard_csv_data(['my_data.csv'], column='country', num_shards=4)
+        ['my_data-country-00000-of-00004.csv', ..., 'my_data-country-00003-of-00004.csv']
         >>> shard_csv_data([], column='country')
         []
     """
@@ -395,47 +441,149 @@ def shard_csv_data(
         f'Loading data files: {files} for sharding by column: {column}...')
     if not files:
         return []
-    dfs = []
+    # Get the columns across all files.
+    file_headers = []
+    columns = {}
     for file in files:
-        dfs.append(
-            pd.read_csv(file_util.FileIO(file), dtype=str, na_filter=False))
-    df = pd.concat(dfs)
+        with file_util.FileIO(file, newline='') as csv_file:
+            header = next(csv.reader(csv_file), [])
+        file_headers.append(header)
+        columns.update({c: None for c in header})
+    columns = list(columns.keys())
+    if not columns:
+        return []
     if not column:
         # Pick the first column.
-        column = list(df.columns)[0]
-    # Convert nan to empty string so sharding doesn't drop any rows.
-    # df[column] = df[column].fillna('')
-    # Get unique shard prefix values from column.
-    shards = list(
-        sorted(set([str(x)[:prefix_len] for x in df[column].unique()])))
-    if file_util.file_is_local(file):
-        (file_prefix, file_ext) = os.path.splitext(file)
+        column = columns[0]
+    if file_util.file_is_local(files[0]):
+        (file_prefix, file_ext) = os.path.splitext(files[0])
     else:
         fd, file_prefix = tempfile.mkstemp()
-        file_ext = '.csv'
     column_suffix = re.sub(r'[^A-Za-z0-9_-]', '-', column)
+    if prefix_len < sys.maxsize:
+        column_suffix += f'-prefix{prefix_len}'
     output_path = f'{file_prefix}-{column_suffix}'
-    logging.info(f'Sharding {files} into {len(shards)} shards by column'
-                 f' {column}:{shards} into {output_path}-*.csv.')
+    existing_files = sorted(glob.glob(f'{output_path}-[0-9]*-of-[0-9]*.csv'))
+    if existing_files:
+        if keep_existing_files and _is_valid_shards(existing_files, files,
+                                                    num_shards):
+            logging.info(f'Using existing shards {existing_files}')
+            return existing_files
+        logging.info(f'Removing existing shards {existing_files}')
+        for file in existing_files:
+            os.remove(file)
+
+    # Dict of shard key to list of rows pending write.
+    shard_rows = {}
+    # Dict of shard key to temporary file with rows for the shard.
+    shard_files = {}
+    num_rows = 0
+    column_index = columns.index(column)
+    for file, header in zip(files, file_headers):
+        logging.info(f'Sharding {file} by column {column} into {output_path}')
+        # Map columns in the file to the output columns.
+        index_map = None
+        if header != columns:
+            index_map = [
+                header.index(c) if c in header else -1 for c in columns
+            ]
+        with file_util.FileIO(file, newline='') as csv_file:
+            reader = csv.reader(csv_file)
+            next(reader, None)
+            for row in reader:
+                if index_map:
+                    row = [
+                        row[i] if 0 <= i < len(row) else '' for i in index_map
+                    ]
+                value = row[column_index] if column_index < len(row) else ''
+                shard = value[:prefix_len]
+                if num_shards > 0:
+                    shard = mmh3.hash(shard, signed=False) % num_shards
+                shard_rows.setdefault(shard, []).append(row)
+                num_rows += 1
+                if num_rows % chunk_rows == 0:
+                    _append_shard_rows(shard_rows, shard_files, columns,
+                                       output_path)
+    if num_shards > 0:
+        # Add empty shards so that all num_shards files exist.
+        for shard in range(num_shards):
+            shard_rows.setdefault(shard, [])
+    _append_shard_rows(shard_rows, shard_files, columns, output_path)
+
+    # Rename the temporary shard files in order of the shard keys.
+    shards = sorted(shard_files.keys())
+    total_shards = len(shards)
+    if num_shards > 0:
+        total_shards = num_shards
     output_files = []
-    num_shards = len(shards)
-    for shard_index in range(num_shards):
-        shard_value = shards[shard_index]
-        output_file = f'{output_path}-{shard_index:05d}-of-{num_shards:05d}.csv'
-        logging.info(
-            f'Sharding by {column}:{shard_value} into {output_file}...')
-        if not os.path.exists(output_file) or not keep_existing_files:
-            if shard_value:
-                df[df[column].str.startswith(shard_value)].to_csv(output_file,
-                                                                  index=False)
-            else:
-                df[df[column] == ''].to_csv(output_file, index=False)
+    for shard in shards:
+        shard_index = len(output_files)
+        if num_shards > 0:
+            shard_index = shard
+        output_file = f'{output_path}-{shard_index:05d}-of-{total_shards:05d}.csv'
+        os.replace(shard_files[shard], output_file)
         output_files.append(output_file)
+    logging.info(f'Sharded {num_rows} rows from {files} by column {column}'
+                 f' into {len(output_files)} files: {output_files}')
     return output_files
 
 
+def _is_valid_shards(shard_files: List[str], files: List[str],
+                     num_shards: int) -> bool:
+    """Returns True if the shard files are a complete set of shards that are
+    newer than the input files.
+
+    Shards are complete if all files are named '<prefix>-<i>-of-<N>.csv'
+    with the same N, and there are N of them, with N equal to num_shards
+    for shards by hash.
+    """
+    totals = set()
+    for shard_file in shard_files:
+        match = re.search(r'-([0-9]+)-of-([0-9]+)\.csv$', shard_file)
+        if not match:
+            return False
+        totals.add(int(match.group(2)))
+    if len(totals) != 1:
+        logging.info(f'Ignoring shards {shard_files} from multiple runs')
+        return False
+    total_shards = totals.pop()
+    if len(shard_files) != total_shards or (num_shards > 0 and
+                                            total_shards != num_shards):
+        logging.info(f'Ignoring {len(shard_files)} shards {shard_files}'
+                     f' for {num_shards} shards')
+        return False
+    input_mtime = max((os.path.getmtime(file)
+                       for file in files
+                       if file_util.file_is_local(file)),
+                      default=0)
+    if min(os.path.getmtime(file) for file in shard_files) < input_mtime:
+        logging.info(f'Ignoring shards {shard_files} older than {files}')
+        return False
+    return True
+
+
+def _append_shard_rows(shard_rows: Dict, shard_files: Dict, columns: List[str],
+                       output_path: str):
+    """Appends the pending rows for each shard into its temporary file.
+
+    The shard files are opened only for the append so that the number of open
+    files is bounded irrespective of the number of shards.
+    """
+    for shard, rows in shard_rows.items():
+        shard_file = shard_files.get(shard)
+        if shard_file is None:
+            shard_file = f'{output_path}-shard-{len(shard_files)}.tmp'
+            shard_files[shard] = shard_file
+            with open(shard_file, 'w', newline='') as output_file:
+                csv.writer(output_file).writerow(columns)
+        with open(shard_file, 'a', newline='') as output_file:
+            csv.writer(output_file).writerows(rows)
+    shard_rows.clear()
+
+
 def convert_xls_to_csv(filenames: List[str],
-                       sheets: Optional[List[str]] = None) -> List[str]:
+                       sheets: Optional[List[str]] = None,
+                       parallelism: int = 0) -> List[str]:
     """Converts specified sheets from Excel files (.xls, .xlsx) into CSV files.
 
     For each file in `filenames`, if it has an Excel extension, this function
@@ -447,10 +595,19 @@ def convert_xls_to_csv(filenames: List[str],
     original Excel file and the sheet name. Non-Excel files in the `filenames`
     list are passed through unchanged.
 
+    Workbooks are opened once per conversion task and rows are streamed into
+    the CSV files. Sheets across workbooks are converted in parallel processes.
+    The content hash of each workbook is saved in a manifest file
+    '<workbook>.csv.json' and sheets of unchanged workbooks are not converted
+    again.
+
     Args:
         filenames: A list of file paths, which can include Excel and other file types.
         sheets: An optional list of sheet names to convert. If None, all sheets
                 in the Excel files are converted.
+        parallelism: The number of parallel processes for conversion.
+                     Defaults to the number of workbooks upto the number
+                     of CPUs.
 
     Returns:
         A list of file paths, including the newly created CSV files and any
@@ -464,28 +621,155 @@ def convert_xls_to_csv(filenames: List[str],
         >>> convert_xls_to_csv([])
         []
     """
-    csv_files = []
+    with contextlib.ExitStack() as local_files:
+        return _convert_xls_files(filenames, sheets, parallelism, local_files)
+
+
+def _convert_xls_files(filenames: List[str], sheets: Optional[List[str]],
+                       parallelism: int,
+                       local_files: contextlib.ExitStack) -> List[str]:
+    """Converts the sheets of the Excel files into CSV files.
+
+    Remote workbooks are copied into local files that are removed when
+    local_files is closed.
+    """
+    # Dict of workbook to dict of sheet name to csv file.
+    xls_sheets = {}
+    # Dict of workbook to hash of its content.
+    xls_hashes = {}
+    # List of (workbook, local workbook, [sheets]) to be converted.
+    tasks = []
     for file in filenames:
         filename, ext = os.path.splitext(file)
+        if '.xls' not in ext:
+            continue
         logging.info(f'Converting {filename}{ext} into csv for {sheets}')
-        if '.xls' in ext:
-            # Convert the xls file into csv file per sheet.
-            xls = pd.ExcelFile(file)
-            for sheet in xls.sheet_names:
-                # Read each sheet as a Pandas DataFrame and save it as csv
-                if not sheets or sheet in sheets:
-                    df = pd.read_excel(xls, sheet_name=sheet, dtype=str)
-                    csv_filename = re.sub('[^A-Za-z0-9_.-]+', '_',
-                                          f'{filename}_{sheet}.csv')
-                    df.to_csv(csv_filename, index=False)
-                    logging.info(
-                        f'Converted {file}:{sheet} into csv {csv_filename}')
-                    csv_files.append(csv_filename)
+        workbook_file = file_util.FileIO(file, mode='rb')
+        local_files.enter_context(workbook_file)
+        local_file = workbook_file.get_local_filename()
+        workbook_hash = _get_file_hash(local_file)
+        manifest = _load_xls_manifest(file)
+        if manifest.get('hash') != workbook_hash:
+            manifest = {}
+        converted_sheets = {
+            sheet: csv_file
+            for sheet, csv_file in manifest.get('sheets', {}).items()
+            if file_util.file_get_matching(csv_file)
+        }
+        sheet_names = CalamineWorkbook.from_path(local_file).sheet_names
+        convert_sheets = []
+        xls_sheets[file] = {}
+        for sheet in sheet_names:
+            if sheets and sheet not in sheets:
+                continue
+            if sheet in converted_sheets:
+                logging.info(f'Using existing csv for unchanged {file}:{sheet}'
+                             f' {converted_sheets[sheet]}')
+                xls_sheets[file][sheet] = converted_sheets[sheet]
+            else:
+                xls_sheets[file][sheet] = None
+                convert_sheets.append(sheet)
+        if convert_sheets:
+            tasks.append((file, local_file, convert_sheets))
+        xls_hashes[file] = workbook_hash
+
+    if tasks:
+        if not parallelism:
+            # Convert workbooks in parallel with one process per workbook.
+            parallelism = min(os.cpu_count(), len(tasks))
+        # Split sheets of each workbook into tasks upto the parallelism.
+        task_sheets = []
+        tasks_per_workbook = max(1, parallelism // len(tasks))
+        for file, local_file, convert_sheets in tasks:
+            num_splits = min(tasks_per_workbook, len(convert_sheets))
+            for index in range(num_splits):
+                task_sheets.append(
+                    (file, local_file, convert_sheets[index::num_splits]))
+        if parallelism > 1 and len(task_sheets) > 1:
+            with multiprocessing.get_context('spawn').Pool(
+                    min(parallelism, len(task_sheets))) as pool:
+                results = pool.starmap(_convert_xls_sheets, task_sheets)
+        else:
+            results = [_convert_xls_sheets(*task) for task in task_sheets]
+        for (file, _, _), sheet_csvs in zip(task_sheets, results):
+            xls_sheets[file].update(sheet_csvs)
+        for file, _, _ in tasks:
+            _save_xls_manifest(file, xls_hashes[file], xls_sheets[file])
+
+    csv_files = []
+    for file in filenames:
+        if file in xls_sheets:
+            csv_files.extend(xls_sheets[file].values())
         else:
             csv_files.append(file)
     return csv_files
 
 
+def _convert_xls_sheets(file: str, local_file: str,
+                        sheets: List[str]) -> Dict[str, str]:
+    """Converts the sheets of a workbook into CSV files next to the file.
+
+    The workbook is read from the local copy local_file.
+    Returns a dictionary of sheet name to the CSV file.
+    """
+    filename, ext = os.path.splitext(file)
+    workbook = CalamineWorkbook.from_path(local_file)
+    sheet_csvs = {}
+    for sheet in sheets:
+        # Replace special characters in the file name but not the directory.
+        csv_filename = os.path.join(
+            os.path.dirname(filename),
+            re.sub('[^A-Za-z0-9_.-]+', '_',
+                   f'{os.path.basename(filename)}_{sheet}.csv'))
+        num_rows = 0
+        with file_util.FileIO(csv_filename, mode='w',
+                              newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            for row in workbook.get_sheet_by_name(sheet).iter_rows():
+                writer.writerow([_get_xls_cell_str(value) for value in row])
+                num_rows += 1
+        logging.info(
+            f'Converted {num_rows} rows from {file}:{sheet} into csv {csv_filename}'
+        )
+        sheet_csvs[sheet] = csv_filename
+    return sheet_csvs
+
+
+def _get_xls_cell_str(value) -> str:
+    """Returns the string for a spreadsheet cell value."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if value is None:
+        return ''
+    return str(value)
+
+
+def _get_file_hash(file: str) -> str:
+    """Returns the sha256 hash of the file content."""
+    with open(file, 'rb') as fp:
+        return hashlib.file_digest(fp, 'sha256').hexdigest()
+
+
+def _load_xls_manifest(file: str) -> Dict:
+    """Returns the manifest with the hash and sheets converted for a workbook."""
+    manifest_file = f'{file}.csv.json'
+    if not file_util.file_get_matching(manifest_file):
+        return {}
+    try:
+        with file_util.FileIO(manifest_file) as fp:
+            return json.load(fp)
+    except (OSError, ValueError) as e:
+        logging.warning(f'Ignoring invalid manifest {manifest_file}: {e}')
+        return {}
+
+
+def _save_xls_manifest(file: str, workbook_hash: str, sheet_csvs: Dict):
+    """Saves the hash and the sheets converted for a workbook."""
+    manifest = {'hash': workbook_hash, 'sheets': sheet_csvs}
+    with file_util.FileIO(f'{file}.csv.json', mode='w') as fp:
+        json.dump(manifest, fp, indent=1)
+
+
 def prepare_input_data(config: Dict) -> List[str]:
     """Prepares input data for processing by downloading, converting, and sharding files as needed.
 
@@ -502,6 +786,8 @@ def prepare_input_data(config: Dict) -> List[str]:
                 - `data_url` (str): URL to download data from if `input_data` is not found.
                 - `input_xls` (list): A list of sheets to convert from Excel files.
                 - `shard_input_by_column` (str): The column to shard by.
+                - `shard_input_num_shards` (int): The number of shards by hash
+                  of the column value.
                 - `parallelism` (int): The number of parallel processes to use.
 
     Returns:
@@ -549,8 +835,12 @@ def prepare_input_data(config: Dict) -> List[str]:
         data_url = config.get('data_url', '')
         if not data_url:
             raise RuntimeError(f'Provide data with --data_url or --input_data.')
-        input_files = download_csv_from_url(data_url, input_data)
-    input_files = convert_xls_to_csv(input_files, config.get('input_xls', []))
+        input_files = download_csv_from_url(
+            data_url,
+            input_data,
+            cache_dir=config.get('download_cache_dir', ''))
+    input_files = convert_xls_to_csv(input_files, config.get('input_xls', []),
+                                     config.get('parallelism', 0))
     shard_column = config.get('shard_input_by_column', '')
     if config.get('parallelism', 0) > 0 and shard_column:
         return shard_csv_data(
@@ -558,5 +848,6 @@ def prepare_input_data(config: Dict) -> List[str]:
             shard_column,
             config.get('shard_prefix_length', sys.maxsize),
             True,
+            config.get('shard_input_num_shards', 0),
         )
     return input_files
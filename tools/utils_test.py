@@ -14,6 +14,8 @@
 
 import unittest
 import os
+import tempfile
+import time
 from unittest.mock import patch
 import pandas as pd
 
@@ -307,26 +309,92 @@ class TestDownloadCsvFromUrl(unittest.TestCase):
         files = download_csv_from_url([], [])
         self.assertEqual(files, [])
 
+    @patch('utils.DownloadCache')
+    @patch('utils.get_filename_for_url')
+    def test_download_with_cache(self, mock_get_filename, mock_cache):
+        mock_get_filename.return_value = '/tmp/data.csv'
+        mock_cache.return_value.download_files.return_value = [
+            '/tmp/data.csv', None
+        ]
+        urls = ['http://example.com/data.csv', 'http://example.org/data.csv']
+        files = download_csv_from_url(urls, cache_dir='/tmp/cache')
+        self.assertEqual(files, ['/tmp/data.csv'])
+        mock_cache.assert_called_once_with('/tmp/cache')
+        # URLs with the same filename are downloaded into unique files.
+        mock_cache.return_value.download_files.assert_called_once_with(
+            urls, ['/tmp/data.csv', '/tmp/data-1.csv'])
+
 
 class TestShardCsvData(unittest.TestCase):
 
-    @patch('utils.file_util.FileIO')
-    @patch('utils.pd.read_csv')
-    @patch('utils.pd.DataFrame.to_csv')
-    @patch('utils.file_util.file_is_local')
-    @patch('utils.os.path.exists')
-    def test_shard_csv_data(self, mock_exists, mock_is_local, mock_to_csv,
-                            mock_read_csv, mock_file_io):
-        mock_exists.return_value = False
-        mock_is_local.return_value = True
-        df = pd.DataFrame({
-            'col1': ['a', 'b', 'c'],
-            'col2': [1, 2, 3],
-        })
-        mock_read_csv.return_value = df
-        files = shard_csv_data(['test.csv'], 'col1')
-        self.assertEqual(len(files), 3)
-        self.assertEqual(mock_to_csv.call_count, 3)
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.input_file = os.path.join(self.tmp_dir.name, 'test.csv')
+        with open(self.input_file, 'w') as file:
+            file.write('col1,col2\nab,1\nb,2\nac,3\nb,4\n,5\n')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _read_shards(self, files: list) -> list:
+        return [pd.read_csv(f, dtype=str, na_filter=False) for f in files]
+
+    def test_shard_csv_data(self):
+        files = shard_csv_data([self.input_file], 'col1')
+        self.assertEqual([
+            os.path.join(self.tmp_dir.name, f'test-col1-0000{i}-of-00004.csv')
+            for i in range(4)
+        ], files)
+        shards = self._read_shards(files)
+        self.assertEqual([[''], ['ab'], ['ac'], ['b', 'b']],
+                         [list(df['col1']) for df in shards])
+        self.assertEqual(['2', '4'], list(shards[3]['col2']))
+
+    def test_shard_csv_data_prefix(self):
+        files = shard_csv_data([self.input_file],
+                               'col1',
+                               prefix_len=1,
+                               chunk_rows=2)
+        self.assertEqual([[''], ['ab', 'ac'], ['b', 'b']],
+                         [list(df['col1']) for df in self._read_shards(files)])
+
+    def test_shard_csv_data_hash(self):
+        files = shard_csv_data([self.input_file],
+                               'col1',
+                               num_shards=2,
+                               chunk_rows=1)
+        shards = self._read_shards(files)
+        self.assertEqual(2, len(files))
+        self.assertEqual(5, sum(len(df) for df in shards))
+        # Rows with the same value are in the same shard.
+        self.assertEqual(1, sum('b' in list(df['col1']) for df in shards))
+
+        # Existing shards are reused.
+        self.assertEqual(
+            files,
+            shard_csv_data([self.input_file], 'col1', num_shards=2))
+
+    def test_shard_csv_data_stale_shards(self):
+        files = shard_csv_data([self.input_file], 'col1', num_shards=2)
+        # Shards for another number of shards are replaced.
+        self.assertEqual([
+            os.path.join(self.tmp_dir.name, f'test-col1-0000{i}-of-00003.csv')
+            for i in range(3)
+        ], shard_csv_data([self.input_file], 'col1', num_shards=3))
+        for file in files:
+            self.assertFalse(os.path.exists(file))
+
+        # Shards older than the input are replaced.
+        with open(self.input_file, 'a') as file:
+            file.write('d,6\n')
+        os.utime(self.input_file, (time.time() + 10, time.time() + 10))
+        files = shard_csv_data([self.input_file], 'col1', num_shards=3)
+        self.assertEqual(6, sum(len(df) for df in self._read_shards(files)))
+
+        # Shards by prefix are kept separate.
+        files = shard_csv_data([self.input_file], 'col1', prefix_len=1)
+        self.assertEqual([[''], ['ab', 'ac'], ['b', 'b'], ['d']],
+                         [list(df['col1']) for df in self._read_shards(files)])
 
     def test_empty_files(self):
         files = shard_csv_data([], 'col1')
@@ -335,23 +403,54 @@ class TestShardCsvData(unittest.TestCase):
 
 class TestConvertXlsToCsv(unittest.TestCase):
 
-    @patch('utils.pd.ExcelFile')
-    @patch('utils.pd.read_excel')
-    @patch('utils.pd.DataFrame.to_csv')
-    def test_convert_xls_to_csv(self, mock_to_csv, mock_read_excel,
-                                mock_excel_file):
-        mock_excel_file.return_value.sheet_names = ['sheet1', 'sheet2']
-        df = pd.DataFrame({'col1': ['a', 'b', 'c'], 'col2': [1, 2, 3]})
-        mock_read_excel.return_value = df
-        files = convert_xls_to_csv(['test.xlsx'], [])
-        self.assertEqual(len(files), 2)
-        self.assertEqual(mock_to_csv.call_count, 2)
-
-    @patch('utils.pd.ExcelFile')
-    def test_convert_xls_to_csv_no_xls(self, mock_excel_file):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.xls_file = os.path.join(self.tmp_dir.name, 'test.xlsx')
+        with pd.ExcelWriter(self.xls_file) as writer:
+            pd.DataFrame({
+                'col1': ['a', 'b', None],
+                'col2': [1, 2.5, 3],
+            }).to_excel(writer, sheet_name='sheet1', index=False)
+            pd.DataFrame({
+                'col3': ['c'],
+            }).to_excel(writer, sheet_name='sheet 2', index=False)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_convert_xls_to_csv(self):
+        files = convert_xls_to_csv([self.xls_file], [], parallelism=1)
+        self.assertEqual([
+            os.path.join(self.tmp_dir.name, 'test_sheet1.csv'),
+            os.path.join(self.tmp_dir.name, 'test_sheet_2.csv'),
+        ], files)
+        with open(files[0]) as file:
+            self.assertEqual('col1,col2\na,1\nb,2.5\n,3\n', file.read())
+
+        # Unchanged workbooks are not converted again.
+        with patch('utils._convert_xls_sheets') as mock_convert:
+            self.assertEqual(files, convert_xls_to_csv([self.xls_file], []))
+            mock_convert.assert_not_called()
+
+    def test_convert_xls_to_csv_parallel(self):
+        files = convert_xls_to_csv([self.xls_file, 'test.csv'], [],
+                                   parallelism=2)
+        self.assertEqual([
+            os.path.join(self.tmp_dir.name, 'test_sheet1.csv'),
+            os.path.join(self.tmp_dir.name, 'test_sheet_2.csv'),
+            'test.csv',
+        ], files)
+        with open(files[1]) as file:
+            self.assertEqual('col3\nc\n', file.read())
+
+    def test_convert_xls_to_csv_sheets(self):
+        files = convert_xls_to_csv([self.xls_file], ['sheet 2'])
+        self.assertEqual(
+            [os.path.join(self.tmp_dir.name, 'test_sheet_2.csv')], files)
+
+    def test_convert_xls_to_csv_no_xls(self):
         files = convert_xls_to_csv(['test.csv'], [])
         self.assertEqual(files, ['test.csv'])
-        mock_excel_file.assert_not_called()
 
     def test_empty_files(self):
         files = convert_xls_to_csv([], [])
@@ -372,7 +471,7 @@ class TestPrepareInputData(unittest.TestCase):
         files = prepare_input_data(config)
         self.assertEqual(files, ['test.csv'])
         mock_download.assert_not_called()
-        mock_convert.assert_called_once_with(['test.csv'], [])
+        mock_convert.assert_called_once_with(['test.csv'], [], 0)
         mock_shard.assert_not_called()
 
     @patch('utils.file_util.file_get_matching', return_value=[])
@@ -390,7 +489,8 @@ class TestPrepareInputData(unittest.TestCase):
         files = prepare_input_data(config)
         self.assertEqual(files, ['converted.csv'])
         mock_download.assert_called_once()
-        mock_convert.assert_called_once_with(['downloaded.xlsx'], ['Sheet1'])
+        mock_convert.assert_called_once_with(['downloaded.xlsx'], ['Sheet1'],
+                                             0)
         mock_shard.assert_not_called()
 
     @patch('utils.file_util.file_get_matching')
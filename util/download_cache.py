@@ -0,0 +1,306 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+'''Persistent cache for files downloaded from URLs.
+
+Downloaded content is saved in the cache directory in a file named by the
+sha256 of the content, so URLs with the same content share a single copy.
+The ETag and Last-Modified headers of each URL are saved along with the
+hash of the content and are used to revalidate the URL once the cached
+response is older than max_age_secs. Responses within max_age_secs are
+returned without any request.
+
+Large files are downloaded into a partial file that is resumed with a range
+request if the download is interrupted.
+
+Example:
+  cache = DownloadCache('/tmp/download_cache')
+  # Download a list of URLs in parallel into local files.
+  files = cache.download_files(
+      ['https://example.com/data1.csv', 'https://example.com/data2.csv'],
+      ['data1.csv', 'data2.csv'])
+  # Get the content for a URL as bytes.
+  content = cache.get_content('https://example.com/data1.csv')
+
+The cache layout is:
+  <cache_dir>/content/<sha256>: downloaded content
+  <cache_dir>/urls/<key>.json: headers and content hash for a URL
+  <cache_dir>/partial/<key>: partially downloaded content for a URL
+where key is the sha256 of the method, URL and parameters.
+'''
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+import requests
+import requests_cache
+
+from absl import logging
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+
+from counters import Counters
+
+# Bytes read from the response at a time.
+_CHUNK_SIZE = 1024 * 1024
+
+
+class DownloadCache:
+    '''Content addressed cache for downloads with revalidation.'''
+
+    def __init__(self,
+                 cache_dir: str,
+                 max_age_secs: int = 24 * 3600,
+                 timeout: int = 30,
+                 retries: int = 3,
+                 retry_secs: int = 5,
+                 max_workers: int = 8,
+                 counters: Counters = None):
+        '''Initializes the cache.
+
+        Args:
+          cache_dir: directory for the cached files.
+          max_age_secs: URLs fetched within this duration are not revalidated.
+          timeout: timeout in seconds per request.
+          retries: number of attempts per URL.
+          retry_secs: interval in seconds before the first retry that is
+            doubled for every subsequent retry.
+          max_workers: maximum number of parallel downloads.
+          counters: counters updated with cache hits and downloads.
+        '''
+        self._cache_dir = cache_dir
+        self._max_age_secs = max_age_secs
+        self._timeout = timeout
+        self._retries = max(1, retries)
+        self._retry_secs = retry_secs
+        self._max_workers = max(1, max_workers)
+        self._counters = counters
+        if self._counters is None:
+            self._counters = Counters()
+        # Revalidation and resumed downloads need responses from the server,
+        # so the session is not cached even if requests_cache is installed.
+        self._session = requests_cache.OriginalSession()
+        for subdir in ['content', 'urls', 'partial']:
+            os.makedirs(os.path.join(cache_dir, subdir), exist_ok=True)
+
+    def download_files(self,
+                       urls: list,
+                       output_files: list,
+                       params: dict = {},
+                       method: str = 'GET') -> list:
+        '''Downloads the URLs in parallel into the output files.
+
+        Returns:
+          list with the output file for each URL or None if the download
+          failed.
+        '''
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._max_workers) as executor:
+            return list(
+                executor.map(
+                    lambda url, output_file: self.download_file(
+                        url, output_file, params, method), urls,
+                    output_files))
+
+    def download_file(self,
+                      url: str,
+                      output_file: str,
+                      params: dict = {},
+                      method: str = 'GET') -> str:
+        '''Copies the content of the URL into the output_file.
+
+        Returns:
+          output_file if the URL was downloaded or None.
+        '''
+        content_file = self.get_content_file(url, params, method)
+        if not content_file:
+            return None
+        output_dir = os.path.dirname(output_file)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        shutil.copyfile(content_file, output_file)
+        logging.info(f'Copied {url} from {content_file} into {output_file}')
+        return output_file
+
+    def get_content(self,
+                    url: str,
+                    params: dict = {},
+                    method: str = 'GET') -> bytes:
+        '''Returns the content of the URL as bytes or None on failure.'''
+        content_file = self.get_content_file(url, params, method)
+        if not content_file:
+            return None
+        with open(content_file, 'rb') as file:
+            return file.read()
+
+    def get_content_file(self,
+                         url: str,
+                         params: dict = {},
+                         method: str = 'GET') -> str:
+        '''Returns the cached file with the content of the URL.
+
+        The URL is downloaded if it is not in the cache and is revalidated if
+        the cached content is older than max_age_secs.
+
+        Returns:
+          the cached content file or None if the download failed.
+        '''
+        key = _get_key(url, params, method)
+        url_info = self._load_url_info(key)
+        content_file = None
+        if url_info:
+            content_file = self._get_content_path(url_info.get('sha256', ''))
+            if not os.path.exists(content_file):
+                url_info = {}
+            elif time.time() - url_info.get('fetch_time',
+                                            0) < self._max_age_secs:
+                self._counters.add_counter('download-cache-hits', 1)
+                return content_file
+        for attempt in range(self._retries):
+            if attempt:
+                retry_secs = self._retry_secs * (2**(attempt - 1))
+                logging.info(f'Retrying {url} after {retry_secs} secs')
+                self._counters.add_counter('download-cache-retries', 1)
+                time.sleep(retry_secs)
+            try:
+                content_file, retry = self._fetch(key, url, params, method,
+                                                  url_info)
+                if content_file:
+                    return content_file
+            except (requests.exceptions.RequestException, OSError) as e:
+                logging.error(f'Failed to download {url}: {e}')
+                continue
+            if not retry:
+                break
+        self._counters.add_counter('download-cache-failures', 1)
+        return None
+
+    def _fetch(self, key: str, url: str, params: dict, method: str,
+               url_info: dict) -> tuple:
+        '''Requests the URL and saves the content in the cache.
+
+        Returns:
+          tuple of the content file or None if the request failed and
+          a bool set to True if a failed request can be retried.
+        '''
+        is_get = method.upper() == 'GET'
+        headers = {}
+        if url_info and is_get:
+            # Revalidate the cached content.
+            if url_info.get('etag'):
+                headers['If-None-Match'] = url_info['etag']
+            if url_info.get('last_modified'):
+                headers['If-Modified-Since'] = url_info['last_modified']
+        partial_file = os.path.join(self._cache_dir, 'partial', key)
+        partial_info = self._load_url_info(key, partial=True)
+        partial_size = 0
+        if is_get and os.path.exists(partial_file) and partial_info:
+            validator = partial_info.get('etag') or partial_info.get(
+                'last_modified')
+            if validator:
+                # Resume the download for the same version of the content.
+                partial_size = os.path.getsize(partial_file)
+                headers['Range'] = f'bytes={partial_size}-'
+                headers['If-Range'] = validator
+        request_args = {'params': params} if is_get else {'json': params}
+        with self._session.request(method,
+                                   url,
+                                   headers=headers,
+                                   stream=True,
+                                   timeout=self._timeout,
+                                   **request_args) as response:
+            if response.status_code == 304 and url_info:
+                logging.debug(f'Reusing cached content for {url}')
+                self._counters.add_counter('download-cache-revalidated', 1)
+                url_info['fetch_time'] = time.time()
+                self._save_url_info(key, url_info)
+                return self._get_content_path(url_info['sha256']), False
+            if not response.ok:
+                logging.error(f'Got response {response} for {url}')
+                # Retry only for server errors.
+                return None, (response.status_code >= 500 or
+                              response.status_code == 429)
+            response_info = {
+                'url': url,
+                'params': params,
+                'method': method,
+                'etag': response.headers.get('ETag', ''),
+                'last_modified': response.headers.get('Last-Modified', ''),
+            }
+            content_hash = hashlib.sha256()
+            if response.status_code == 206 and partial_size:
+                self._counters.add_counter('download-cache-resumed', 1)
+                with open(partial_file, 'rb') as file:
+                    for chunk in iter(lambda: file.read(_CHUNK_SIZE), b''):
+                        content_hash.update(chunk)
+                mode = 'ab'
+            else:
+                mode = 'wb'
+                self._save_url_info(key, response_info, partial=True)
+            with open(partial_file, mode) as file:
+                for chunk in response.iter_content(chunk_size=_CHUNK_SIZE):
+                    content_hash.update(chunk)
+                    file.write(chunk)
+        sha256 = content_hash.hexdigest()
+        content_file = self._get_content_path(sha256)
+        os.replace(partial_file, content_file)
+        response_info['sha256'] = sha256
+        response_info['size'] = os.path.getsize(content_file)
+        response_info['fetch_time'] = time.time()
+        self._save_url_info(key, response_info)
+        os.remove(self._get_url_info_path(key, partial=True))
+        self._counters.add_counter('download-cache-downloads', 1)
+        logging.info(
+            f'Downloaded {response_info["size"]} bytes from {url} into'
+            f' {content_file}')
+        return content_file, False
+
+    def _get_content_path(self, sha256: str) -> str:
+        return os.path.join(self._cache_dir, 'content', sha256)
+
+    def _get_url_info_path(self, key: str, partial: bool = False) -> str:
+        subdir = 'partial' if partial else 'urls'
+        return os.path.join(self._cache_dir, subdir, key + '.json')
+
+    def _load_url_info(self, key: str, partial: bool = False) -> dict:
+        '''Returns the saved headers and content hash for a URL.'''
+        filename = self._get_url_info_path(key, partial)
+        if not os.path.exists(filename):
+            return {}
+        try:
+            with open(filename) as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            logging.error(f'Ignoring invalid cache entry {filename}: {e}')
+            return {}
+
+    def _save_url_info(self, key: str, url_info: dict, partial: bool = False):
+        '''Saves the headers and content hash for a URL.'''
+        filename = self._get_url_info_path(key, partial)
+        tmp_filename = f'{filename}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_filename, 'w') as file:
+            json.dump(url_info, file)
+        os.replace(tmp_filename, filename)
+
+
+def _get_key(url: str, params: dict, method: str) -> str:
+    '''Returns the cache key for a request.'''
+    request = json.dumps([method.upper(), url, params], sort_keys=True)
+    return hashlib.sha256(request.encode()).hexdigest()
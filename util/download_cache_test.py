@@ -0,0 +1,185 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#         https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+'''Tests for download_cache.py using a local HTTP server.'''
+
+import http.server
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+import requests_cache
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+
+import download_util
+
+from download_cache import DownloadCache
+
+_LAST_MODIFIED = 'Wed, 21 Oct 2015 07:28:00 GMT'
+
+
+class _TestHandler(http.server.BaseHTTPRequestHandler):
+    '''Handler for files with ETag and range requests.
+
+    Files in server.truncate_files are closed after sending half the content
+    once to simulate an interrupted download.
+    '''
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        content = self.server.files.get(self.path)
+        if content is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        etag = f'"{hash(content)}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        start = 0
+        byte_range = self.headers.get('Range')
+        if byte_range and self.headers.get('If-Range') == etag:
+            start = int(byte_range.split('=')[1].split('-')[0])
+            self.send_response(206)
+            self.send_header('Content-Range',
+                             f'bytes {start}-{len(content) - 1}/{len(content)}')
+        else:
+            self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', _LAST_MODIFIED)
+        self.send_header('Content-Length', str(len(content) - start))
+        self.end_headers()
+        if self.path in self.server.truncate_files:
+            self.server.truncate_files.remove(self.path)
+            self.wfile.write(content[start:len(content) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(content[start:])
+
+    def log_message(self, format, *args):
+        return
+
+
+class DownloadCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('localhost', 0),
+                                                      _TestHandler)
+        self.server.files = {
+            '/data1.csv': b'a,b\n1,2\n' * 1000,
+            '/data2.csv': b'a,b\n3,4\n' * 1000,
+            '/copy.csv': b'a,b\n1,2\n' * 1000,
+        }
+        self.server.requests = []
+        self.server.truncate_files = set()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://localhost:{self.server.server_port}'
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp_dir.name, 'cache')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def test_download_files(self):
+        cache = DownloadCache(self.cache_dir, retry_secs=0)
+        urls = [
+            f'{self.url}/{f}' for f in ['data1.csv', 'data2.csv', 'copy.csv']
+        ]
+        output_files = [
+            os.path.join(self.tmp_dir.name, 'output', f'{i}.csv')
+            for i in range(len(urls))
+        ]
+        self.assertEqual(output_files, cache.download_files(urls, output_files))
+        for url, output_file in zip(urls, output_files):
+            with open(output_file, 'rb') as file:
+                self.assertEqual(self.server.files[url[len(self.url):]],
+                                 file.read())
+        # URLs with the same content share a file in the cache.
+        self.assertEqual(
+            2, len(os.listdir(os.path.join(self.cache_dir, 'content'))))
+        self.assertEqual(3, len(self.server.requests))
+
+        # Cached content is returned without a request.
+        self.assertEqual(self.server.files['/data1.csv'],
+                         cache.get_content(urls[0]))
+        self.assertEqual(3, len(self.server.requests))
+
+        # Stale content is revalidated with the ETag.
+        cache = DownloadCache(self.cache_dir, max_age_secs=0, retry_secs=0)
+        self.assertEqual(self.server.files['/data1.csv'],
+                         cache.get_content(urls[0]))
+        self.assertEqual(4, len(self.server.requests))
+        self.assertIn('If-None-Match', self.server.requests[-1][1])
+        self.server.files['/data1.csv'] = b'a,b\n5,6\n'
+        self.assertEqual(b'a,b\n5,6\n', cache.get_content(urls[0]))
+
+        # Missing URLs are not retried.
+        self.assertIsNone(cache.get_content(f'{self.url}/missing.csv'))
+        self.assertEqual(1, len([
+            r for r in self.server.requests if r[0] == '/missing.csv'
+        ]))
+
+    def test_resume_download(self):
+        content = b'a,b\n1,2\n' * 500000
+        self.server.files['/large.csv'] = content
+        self.server.truncate_files.add('/large.csv')
+        cache = DownloadCache(self.cache_dir, retry_secs=0)
+        self.assertEqual(content, cache.get_content(f'{self.url}/large.csv'))
+        # Second request resumes from the partial download.
+        self.assertEqual(2, len(self.server.requests))
+        headers = self.server.requests[-1][1]
+        self.assertIn('Range', headers)
+        self.assertNotEqual('bytes=0-', headers['Range'])
+
+    def test_installed_requests_cache(self):
+        requests_cache.install_cache(backend='memory')
+        self.addCleanup(requests_cache.uninstall_cache)
+        url = f'{self.url}/data1.csv'
+        cache = DownloadCache(self.cache_dir, max_age_secs=0, retry_secs=0)
+        for _ in range(2):
+            self.assertEqual(self.server.files['/data1.csv'],
+                             cache.get_content(url))
+        # Stale content is revalidated with the server.
+        self.assertEqual(2, len(self.server.requests))
+        self.assertIn('If-None-Match', self.server.requests[-1][1])
+
+    def test_download_file_from_url(self):
+        output_file = os.path.join(self.tmp_dir.name, 'data.csv')
+        for _ in range(2):
+            self.assertEqual(
+                output_file,
+                download_util.download_file_from_url(
+                    f'{self.url}/data2.csv',
+                    output_file=output_file,
+                    cache_dir=self.cache_dir))
+        with open(output_file, 'rb') as file:
+            self.assertEqual(self.server.files['/data2.csv'], file.read())
+        self.assertEqual(1, len(self.server.requests))
+        self.assertEqual(
+            'a,b\n3,4\n' * 1000,
+            download_util.request_url(f'{self.url}/data2.csv',
+                                      cache_dir=self.cache_dir))
+        self.assertEqual(1, len(self.server.requests))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -57,6 +57,14 @@ This contains the following utilities to download data from URLS:
         method='POST',
         output_file='india_state_population.csv')
 
+  To reuse files across runs, set cache_dir to a directory for a persistent
+  cache of downloaded content that is revalidated with the ETag and
+  Last-Modified headers of the URL. See download_cache.py for details.
+    filename = download_util.download_file_from_url(
+        url='https://example.com/data.csv',
+        output_file='data.csv',
+        cache_dir='/tmp/download_cache')
+
 3. set_test_response():
   For tests that use the above functions, use this to seed the response for a URL.
   When the caller requests for the URL later, the pre-filled response is returned.
@@ -79,6 +87,7 @@ import json
 import os
 import requests
 import requests_cache
+import sys
 import time
 import urllib
 
@@ -86,6 +95,11 @@ from absl import logging
 from google.cloud import storage
 from typing import Union
 
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+
+from download_cache import DownloadCache
+
 # Response pre-filled for tests.
 _PREFILLED_RESPONSE = {}
 
@@ -98,7 +112,8 @@ def request_url(url: str,
                 timeout: int = 30,
                 retries: int = 3,
                 retry_secs: int = 5,
-                use_cache: bool = False) -> Union[str, dict, bytes]:
+                use_cache: bool = False,
+                cache_dir: str = '') -> Union[str, dict, bytes]:
     '''Wrapper around requests to make a HTTP request and return the response.
     Returns the response from the http request in the specified format(text/json/bytes).
 
@@ -112,6 +127,8 @@ def request_url(url: str,
       retries: Number of retries in case of HTTP errors.
       retry_sec: Interval in seconds between retries for which caller is blocked.
       use_cache: If True, uses request cache for faster response.
+      cache_dir: directory for a persistent download cache used for GET
+        requests without headers.
 
     Returns:
       The response from the URL download in the output format whcih is one of:
@@ -137,6 +154,12 @@ def request_url(url: str,
         f'Downloading URL: {url} with params: {params}, method: {method}')
     if not retries or retries <= 0:
         retries = 1
+    if cache_dir and 'get' in method.lower() and not headers:
+        content = DownloadCache(cache_dir,
+                                timeout=timeout,
+                                retries=retries,
+                                retry_secs=retry_secs).get_content(url, params)
+        return _get_output(content, output)
     # Setup request cache
     if not requests_cache.is_installed():
         requests_cache.install_cache(expires_after=300)
@@ -227,7 +250,8 @@ def download_file_from_url(url: str,
                            retries: int = 3,
                            retry_secs: int = 5,
                            output_file: str = None,
-                           overwrite: bool = True) -> str:
+                           overwrite: bool = True,
+                           cache_dir: str = '') -> str:
     '''Download a URL and save it as output_file.
     If the url is compressed, the output_file is uncompressed.
 
@@ -242,6 +266,9 @@ def download_file_from_url(url: str,
         if not specified, the filename if picked from the url.
         if set to empty string '', the downloaded content is returned as a string.
       overwrite: If set to False, will not download url if the output_file exists.
+      cache_dir: directory for a persistent download cache.
+        If set, the url is only downloaded if its content has changed since
+        it was cached.
 
     Returns:
       filename if the file is downloaded successfully.
@@ -262,7 +289,8 @@ def download_file_from_url(url: str,
                           timeout=timeout,
                           retries=retries,
                           retry_secs=retry_secs,
-                          output='bytes')
+                          output='bytes',
+                          cache_dir=cache_dir)
 
     if content is None:
         logging.error(f'Failed to download {output_file} from {url}, {params}')
@@ -292,6 +320,17 @@ def download_file_from_url(url: str,
     return output_file
 
 
+def _get_output(content: bytes, output: str) -> Union[str, dict, bytes]:
+    '''Returns the content in the output format 'text', 'json' or 'bytes'.'''
+    if content is None:
+        return None
+    if 'json' in output.lower():
+        return json.loads(content)
+    elif 'text' in output:
+        return content.decode()
+    return content
+
+
 def set_test_url_download_response(url: str, params: dict, response: str):
     '''Sets a pre-filled response for tests.
     Args:
@@ -303,6 +342,11 @@ def set_test_url_download_response(url: str, params: dict, response: str):
     _PREFILLED_RESPONSE[key] = response
 
 
+def get_test_url_download_response(url: str, params: dict = {}):
+    '''Returns the pre-filled response for the URL set for tests or None.'''
+    return _PREFILLED_RESPONSE.get(_get_prefilled_key(url, params))
+
+
 def _get_prefilled_key(url: str, params: dict) -> str:
     '''Returns the key for the URL with params.'''
     key = url
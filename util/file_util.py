@@ -19,10 +19,12 @@ Spreadsheets.
 
 import ast
 import chardet
+import codecs
 import csv
 import fnmatch
 import glob
 import gspread
+import hashlib
 import io
 import json
 import os
@@ -40,6 +42,28 @@ from google.cloud import storage
 from retry.api import retry_call
 from typing import Union
 
+# Global Google Storage Client for GCS file operations.
+_GCS_CLIENT = None
+
+# Bytes per range request or upload request for streaming GCS files.
+# Uploads require a multiple of 256KB.
+_GCS_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Bytes read from the start and the end of a file for its profile.
+_PROFILE_SAMPLE_BYTES = 256 * 1024
+
+# Version of the profile saved in sidecar files.
+# Increment when the profile fields or the detection changes.
+_PROFILE_VERSION = 2
+
+# Keywords in the first column of footer rows detected in profiles.
+_PROFILE_FOOTER_KEYWORDS = sorted(
+    ['source', 'note', 'data from', 'footnote', '*', '†', '‡'])
+
+# Profiles computed by file_get_profile keyed by filename for the detected
+# profile or by (filename, options) for profiles with overrides.
+_FILE_PROFILES = {}
+
 
 class FileIO:
     """Class for file IO with support for context manager.
@@ -86,11 +110,16 @@ class FileIO:
     before the file is closed, the destination file does not have partial
     content.
 
-    To avoid creating temporary copies for operations on blob, such as read(),
-    set use_tempfile=False with binary mode:
-      with FileIO('gc://<my-gcf-file', mode='rb', use_tempfile=False) as file:
-        # Get content as bytes
-        contents = file.read()
+    To avoid creating temporary copies of GCS files, set use_tempfile=False.
+    Reads are then streamed with chunked range requests that read ahead
+    chunk_size bytes, and writes are uploaded in chunks with a resumable
+    upload that is completed when the file is closed. If an exception is
+    raised within the context, the upload is cancelled and the GCS file is
+    not modified.
+      with FileIO('gs://<my-gcs-file>', mode='r', use_tempfile=False) as file:
+        for row in csv.reader(file):
+          print(row)
+    Google spreadsheets always use a temporary copy.
   """
 
     def __init__(
@@ -101,6 +130,7 @@ class FileIO:
         newline: str = None,
         use_tempfile: bool = True,
         errors: str = None,
+        chunk_size: int = _GCS_CHUNK_SIZE,
     ):
         self._filename = filename
         self._mode = mode
@@ -109,6 +139,8 @@ class FileIO:
         self._tmp_filename = None
         self._errors = errors
         self._fd = None
+        # BlobReader or BlobWriter for streaming GCS files.
+        self._gcs_stream = None
 
         if not file_is_local(self._filename):
             # Create a local copy for non-local files.
@@ -158,10 +190,22 @@ class FileIO:
             logging.debug(f'Opening GCSFile:{filename} mode:{self._mode}')
             if self._mode.startswith('r'):
                 blob = file_get_gcs_blob(filename, exists=True)
-                self._fd = storage.fileio.BlobReader(blob)
+                if blob is None:
+                    raise FileNotFoundError(f'GCS file not found: {filename}')
+                self._gcs_stream = storage.fileio.BlobReader(
+                    blob, chunk_size=chunk_size)
             else:
                 blob = file_get_gcs_blob(filename, exists=False)
-                self._fd = storage.fileio.BlobWriter(blob)
+                # Flush from a text wrapper is ignored and the upload is
+                # completed on close.
+                self._gcs_stream = storage.fileio.BlobWriter(
+                    blob, chunk_size=chunk_size, ignore_flush=True)
+            self._fd = self._gcs_stream
+            if 'b' not in self._mode:
+                self._fd = io.TextIOWrapper(self._gcs_stream,
+                                            encoding=self._encoding or 'utf-8',
+                                            errors=self._errors,
+                                            newline=self._newline)
         else:
             logging.debug(f'Opening file:{filename} mode:{self._mode}')
             self._fd = open(
@@ -187,11 +231,24 @@ class FileIO:
     """
 
         # Close the file handle.
+        if exc_type is not None and isinstance(self._gcs_stream,
+                                               storage.fileio.BlobWriter):
+            # Cancel the upload so that partial content is not saved.
+            logging.debug(f'Cancelling upload to {self._filename}')
+            gcs_stream = self._gcs_stream
+            self._gcs_stream = None
+            self._fd = None
+            try:
+                gcs_stream.terminate()
+            except Exception as e:
+                logging.warning(
+                    f'Failed to cancel upload to {self._filename}: {e}')
         if self._fd:
             logging.debug(
                 f'Closing file:{self._filename}, tmp:{self._tmp_filename}')
-            self._fd.__exit__(exc_type, exc_value, exc_tb)
+            fd = self._fd
             self._fd = None
+            fd.__exit__(exc_type, exc_value, exc_tb)
 
         # Copy over the temp file written into the original file.
         if self._tmp_filename and self._mode.startswith('w'):
@@ -270,10 +327,6 @@ def file_is_gcs(filename: str) -> bool:
     return False
 
 
-# Global Google Storage Client for GCS file operations.
-_GCS_CLIENT = None
-
-
 def file_get_gcs_bucket(filename: str) -> storage.bucket.Bucket:
     """Return the GCS bucket for the file path.
 
@@ -418,6 +471,144 @@ def file_estimate_num_rows(filename: Union[str, list]) -> int:
     return 0
 
 
+def file_get_csv_ranges(filename: str,
+                        num_ranges: int = 0,
+                        min_range_bytes: int = 1000000,
+                        quotechar: str = '"') -> list:
+    """Returns byte ranges of a CSV file that start and end at row boundaries.
+
+    The file is scanned once for newlines outside quoted values so that
+    values with embedded newlines are not split across ranges. Each range can
+    be read independently with file_read_csv_range(), for instance by worker
+    processes.
+
+    Args:
+      filename: local or GCS CSV file with an ASCII compatible encoding.
+      num_ranges: maximum number of ranges. Defaults to the number of CPUs.
+      min_range_bytes: minimum size of a range in bytes.
+      quotechar: character used to quote values.
+
+    Returns:
+      list of dicts with the keys:
+        'filename': name of the file
+        'start': offset of the first byte in the range
+        'end': offset after the last byte in the range
+        'num_rows': number of rows in the range including any header.
+      The sum of 'num_rows' across ranges is the exact number of rows.
+    """
+    size = file_get_size(filename)
+    if num_ranges <= 0:
+        num_ranges = os.cpu_count() or 1
+    num_ranges = max(1, min(num_ranges, size // max(min_range_bytes, 1)))
+    # Ranges end at the first row boundary after each split offset.
+    split_offsets = [size * i // num_ranges for i in range(1, num_ranges)]
+    ranges = []
+    start = 0
+    num_rows = 0
+    last_row_end = 0
+    for row_ends in _file_get_csv_row_ends(filename, quotechar):
+        index = 0
+        while split_offsets:
+            split_index = index + int(
+                np.searchsorted(row_ends[index:], split_offsets[0]))
+            if split_index >= len(row_ends):
+                break
+            end = int(row_ends[split_index])
+            num_rows += split_index + 1 - index
+            ranges.append({
+                'filename': filename,
+                'start': start,
+                'end': end,
+                'num_rows': num_rows,
+            })
+            start = end
+            num_rows = 0
+            index = split_index + 1
+            while split_offsets and split_offsets[0] <= end:
+                split_offsets.pop(0)
+        num_rows += len(row_ends) - index
+        if len(row_ends):
+            last_row_end = int(row_ends[-1])
+    if size > last_row_end:
+        # Last row without a newline.
+        num_rows += 1
+    if size > start:
+        ranges.append({
+            'filename': filename,
+            'start': start,
+            'end': size,
+            'num_rows': num_rows,
+        })
+    logging.debug(f'Got {len(ranges)} ranges for {filename}: {ranges}')
+    return ranges
+
+
+def file_read_csv_range(csv_range: dict,
+                        encoding: str = 'utf-8-sig',
+                        **reader_options):
+    """Yields the rows as lists of values for a range of a CSV file.
+
+    Args:
+      csv_range: dict with 'filename', 'start' and 'end' offsets as returned by
+        file_get_csv_ranges().
+      encoding: character encoding of the file.
+      reader_options: additional options for csv.reader such as 'delimiter'.
+    """
+    with FileIO(csv_range['filename'], 'rb', use_tempfile=False) as fh:
+        fh.seek(csv_range['start'])
+        range_reader = _FileRangeReader(fh,
+                                        csv_range['end'] - csv_range['start'])
+        text_reader = io.TextIOWrapper(io.BufferedReader(range_reader),
+                                       encoding=encoding,
+                                       newline='')
+        yield from csv.reader(text_reader, **reader_options)
+
+
+class _FileRangeReader(io.RawIOBase):
+    """Raw reader for a limited number of bytes from an open file."""
+
+    def __init__(self, fh, num_bytes: int):
+        self._fh = fh
+        self._remaining = num_bytes
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._fh.read(min(len(buffer), self._remaining))
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+
+def _file_get_csv_row_ends(filename: str,
+                           quotechar: str = '"',
+                           chunk_size: int = 16000000):
+    """Yields arrays with the offset after the newline at the end of each row.
+
+    Newlines within quoted values are skipped by tracking the parity of the
+    quote characters before each newline.
+    """
+    quote = ord(quotechar)
+    newline = ord('\n')
+    in_quotes = 0
+    offset = 0
+    with FileIO(filename, 'rb', use_tempfile=False) as fh:
+        while True:
+            data = fh.read(chunk_size)
+            if not data:
+                break
+            buffer = np.frombuffer(data, dtype=np.uint8)
+            newlines = np.flatnonzero(buffer == newline)
+            quotes = np.flatnonzero(buffer == quote)
+            if len(quotes) or in_quotes:
+                num_quotes = np.searchsorted(quotes, newlines) + in_quotes
+                newlines = newlines[(num_quotes & 1) == 0]
+                in_quotes = (len(quotes) + in_quotes) & 1
+            yield newlines + (offset + 1)
+            offset += len(data)
+
+
 def file_get_name(file_path: str,
                   suffix: str = '',
                   file_ext: str = '.csv') -> str:
@@ -735,12 +926,12 @@ def file_load_py_dict(dict_filename: str) -> dict:
             py_dict.update(file_load_csv_dict(filename))
         elif filename.endswith('.pkl'):
             logging.info(f'Loading dict from pickle file: {filename}')
-            with FileIO(filename, 'rb') as file:
+            with FileIO(filename, 'rb', use_tempfile=False) as file:
                 py_dict.update(pickle.load(file))
         else:
             # Assumes the file is a py or json dict.
             logging.info(f'Loading dict from py from file: {filename}')
-            with FileIO(filename) as file:
+            with FileIO(filename, use_tempfile=False) as file:
                 dict_str = file.read()
             if dict_str:
                 # Load the map assuming a python dictionary.
@@ -1017,7 +1208,8 @@ def file_get_sample_bytes(file: str, byte_count: int = 4096) -> bytes:
         file = file.name
     if isinstance(file, str):
         logging.debug(f'Getting sample {byte_count} bytes from {file}')
-        with FileIO(file, 'rb') as fh:
+        with FileIO(file, 'rb', use_tempfile=False,
+                    chunk_size=byte_count) as fh:
             return fh.read(byte_count)
     else:
         return b''
@@ -1115,6 +1307,365 @@ def file_get_csv_reader_options(
     return result
 
 
+def file_get_profile(filename: str,
+                     encoding: str = None,
+                     delimiter: str = None,
+                     footer_keywords: list = None,
+                     sample_bytes: int = _PROFILE_SAMPLE_BYTES,
+                     use_sidecar: bool = True,
+                     profile_dir: str = None) -> dict:
+    """Returns the profile of a CSV file computed from a single bounded read.
+
+    Only the first and last sample_bytes of the file are read, once, to
+    detect the encoding, the CSV dialect, the header rows and footer rows and
+    to estimate the number of rows. The detected profile is cached in memory
+    and, for local files, in a sidecar file in profile_dir, so every stage
+    processing the same file reuses it until the size or the modification
+    time of the file changes.
+
+    The encoding, delimiter and footer_keywords override the detection.
+    If they are the same as the detected values, the cached profile is
+    returned, else the profile is computed again with the overrides and
+    cached only in memory.
+
+    Args:
+      filename: local or GCS file name.
+      encoding: encoding of the file. Detected if not set.
+      delimiter: delimiter for the CSV file. Detected if not set.
+      footer_keywords: keywords in the first column of footer rows.
+      sample_bytes: bytes read from the start and the end of the file.
+      use_sidecar: if True, the profile is loaded from and saved into the
+        sidecar file for local files.
+      profile_dir: directory for sidecar files.
+        Defaults to 'file_profiles' in the temp directory.
+
+    Returns:
+      dict with the following:
+        'filename': name of the file.
+        'size': size of the file in bytes.
+        'mtime': modification time of the file.
+        'encoding': character encoding of the file.
+        'reader_options': dict of options for csv.reader such as
+          'delimiter', 'quotechar', 'doublequote'.
+        'header_rows': number of header rows at the start of the file.
+        'footer_rows': number of footer rows at the end of the file.
+        'footer_start': index of the first footer row.
+        'num_rows': number of rows, estimated from the sample rows if
+          the file is larger than the sample.
+        'num_rows_exact': True if num_rows is the exact row count.
+        'content_hash': sha256 of the content for files within the sample,
+          else a sha256 of the size with the first and last sample bytes.
+      or an empty dict if the file doesn't exist.
+    """
+    size, mtime = _file_get_size_mtime(filename)
+    if size is None:
+        return {}
+    options = {
+        'encoding': None,
+        'delimiter': None,
+        'footer_keywords': _PROFILE_FOOTER_KEYWORDS,
+        'sample_bytes': sample_bytes,
+    }
+
+    def _is_valid(profile: dict) -> bool:
+        return (profile and profile.get('version') == _PROFILE_VERSION and
+                profile.get('filename') == filename and
+                profile.get('size') == size and profile.get('mtime') == mtime)
+
+    profile = _FILE_PROFILES.get(filename)
+    sidecar = ''
+    if not _is_valid(profile):
+        profile = {}
+        if use_sidecar and file_is_local(filename):
+            sidecar = _file_get_profile_sidecar(filename, profile_dir)
+            profile = _file_load_profile_sidecar(sidecar)
+        if not _is_valid(profile):
+            profile = _file_compute_profile(filename, size, options)
+            profile.update({
+                'version': _PROFILE_VERSION,
+                'filename': filename,
+                'size': size,
+                'mtime': mtime,
+            })
+            if sidecar:
+                _file_save_profile_sidecar(sidecar, profile)
+            logging.debug(f'Got profile for {filename}: {profile}')
+        _FILE_PROFILES[filename] = profile
+
+    # Apply overrides that differ from the detected profile.
+    if encoding:
+        encoding = codecs.lookup(encoding).name
+        if encoding != profile.get('encoding'):
+            options['encoding'] = encoding
+    if delimiter and delimiter != profile.get('reader_options',
+                                              {}).get('delimiter'):
+        options['delimiter'] = delimiter
+    if footer_keywords is not None:
+        footer_keywords = sorted(k.lower() for k in footer_keywords)
+        if footer_keywords != _PROFILE_FOOTER_KEYWORDS:
+            options['footer_keywords'] = footer_keywords
+    if (not options['encoding'] and not options['delimiter'] and
+            options['footer_keywords'] == _PROFILE_FOOTER_KEYWORDS):
+        return profile
+    override_key = (filename, json.dumps(options, sort_keys=True))
+    override_profile = _FILE_PROFILES.get(override_key)
+    if not _is_valid(override_profile):
+        override_profile = _file_compute_profile(filename, size, options)
+        override_profile.update({
+            'version': _PROFILE_VERSION,
+            'filename': filename,
+            'size': size,
+            'mtime': mtime,
+        })
+        _FILE_PROFILES[override_key] = override_profile
+        logging.debug(f'Got profile for {filename} with {options}:'
+                      f' {override_profile}')
+    return override_profile
+
+
+def file_get_sha256(filename: str,
+                    use_sidecar: bool = True,
+                    profile_dir: str = None) -> str:
+    """Returns the sha256 of the full content of a file.
+
+    The file is read in chunks and the hash is saved in the file's profile,
+    see file_get_profile(), so it is computed again only when the size or
+    the modification time of the file changes.
+
+    Args:
+      filename: local or GCS file name.
+      use_sidecar: if True, the hash is loaded from and saved into the
+        profile sidecar file for local files.
+      profile_dir: directory for sidecar files.
+
+    Returns:
+      hex digest of the sha256 or '' if the file doesn't exist.
+    """
+    profile = file_get_profile(filename,
+                               use_sidecar=use_sidecar,
+                               profile_dir=profile_dir)
+    if not profile:
+        return ''
+    if 'sha256' not in profile:
+        content_hash = hashlib.sha256()
+        with FileIO(filename, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                content_hash.update(chunk)
+        profile['sha256'] = content_hash.hexdigest()
+        if use_sidecar and file_is_local(filename):
+            _file_save_profile_sidecar(
+                _file_get_profile_sidecar(filename, profile_dir), profile)
+    return profile['sha256']
+
+
+def _file_get_profile_sidecar(filename: str, profile_dir: str = None) -> str:
+    """Returns the sidecar file for the profile of a local file."""
+    if not profile_dir:
+        profile_dir = os.path.join(tempfile.gettempdir(), 'file_profiles')
+    path_hash = hashlib.sha256(
+        os.path.abspath(filename).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(
+        profile_dir, f'{os.path.basename(filename)}.{path_hash}.profile.json')
+
+
+def _file_load_profile_sidecar(sidecar: str) -> dict:
+    """Returns the profile from a sidecar file or {} if there is none."""
+    if not os.path.exists(sidecar):
+        return {}
+    try:
+        with open(sidecar) as sidecar_file:
+            return json.load(sidecar_file)
+    except (OSError, ValueError) as e:
+        logging.debug(f'Ignoring invalid profile {sidecar}: {e}')
+    return {}
+
+
+def _file_save_profile_sidecar(sidecar: str, profile: dict):
+    """Saves the profile into the sidecar file."""
+    try:
+        os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+        tmp_sidecar = f'{sidecar}.{os.getpid()}.tmp'
+        with open(tmp_sidecar, 'w') as sidecar_file:
+            json.dump(profile, sidecar_file)
+        os.replace(tmp_sidecar, sidecar)
+    except OSError as e:
+        logging.debug(f'Unable to save profile {sidecar}: {e}')
+
+
+def file_get_csv_header_rows(rows: list, max_header_rows: int = 5) -> int:
+    """Returns the number of header rows among the first few rows.
+
+    A row is considered a header if it is within the first max_header_rows
+    and has more than 50% empty cells, starts with a metadata pattern such
+    as 'Table' or 'Year:' or has less than 10% numeric cells.
+
+    Args:
+      rows: list of rows, each a list of column values.
+      max_header_rows: maximum number of rows considered as headers.
+
+    Returns:
+      number of header rows, at least 1.
+    """
+    metadata_patterns = [
+        'table', 'figure', 'year:', 'note', 'source', '(number', 'unnamed:'
+    ]
+    header_count = 0
+    for index, row in enumerate(rows[:max_header_rows]):
+        num_cells = len(row)
+        empty_count = sum(1 for cell in row if not cell.strip())
+        empty_ratio = empty_count / num_cells if num_cells else 1.0
+        first_cell = row[0].strip().lower() if row else ''
+        is_metadata = any(pattern in first_cell for pattern in metadata_patterns)
+        numeric_count = 0
+        for cell in row:
+            try:
+                float(cell.replace(',', '').replace('%', '').strip())
+                numeric_count += 1
+            except ValueError:
+                pass
+        numeric_ratio = numeric_count / num_cells if num_cells else 0
+        if empty_ratio > 0.5 or is_metadata or numeric_ratio < 0.1:
+            header_count = index + 1
+        else:
+            # Found a data row.
+            break
+    return max(1, header_count)
+
+
+def _file_get_csv_footer_rows(rows: list, footer_keywords: list) -> int:
+    """Returns the number of footer rows among the last 20 rows.
+
+    Footer rows start with a row that has a footer keyword in the first
+    column or has fewer than 30% of the non-empty cells of preceding rows.
+    """
+    if not rows:
+        return 0
+    check_from = max(0, len(rows) - 20)
+    data_rows = rows[:check_from]
+    avg_non_empty = 0
+    if data_rows:
+        avg_non_empty = sum(sum(1
+                                for cell in row
+                                if cell.strip())
+                            for row in data_rows) / len(data_rows)
+    for index in range(check_from, len(rows)):
+        row = rows[index]
+        if not row:
+            continue
+        first_cell = row[0].strip().lower()
+        non_empty = sum(1 for cell in row if cell.strip())
+        if any(keyword in first_cell for keyword in footer_keywords) or (
+                avg_non_empty > 0 and non_empty < avg_non_empty * 0.3):
+            return len(rows) - index
+    return 0
+
+
+def _file_get_size_mtime(filename: str) -> tuple:
+    """Returns a tuple of the size and modification time of a file.
+
+    The size is None if the file doesn't exist.
+    """
+    if file_is_local(filename):
+        if not os.path.exists(filename):
+            return None, None
+        stat = os.stat(filename)
+        return stat.st_size, stat.st_mtime
+    if file_is_gcs(filename):
+        blob = file_get_gcs_blob(filename, exists=True)
+        if blob:
+            return blob.size, blob.updated.timestamp()
+    return None, None
+
+
+def _file_compute_profile(filename: str, size: int, options: dict) -> dict:
+    """Returns the profile for a file from its first and last sample bytes."""
+    sample_bytes = options['sample_bytes']
+    tail = b''
+    with FileIO(filename, 'rb', use_tempfile=False,
+                chunk_size=sample_bytes) as file:
+        head = file.read(sample_bytes)
+        if size > 2 * sample_bytes:
+            file.seek(size - sample_bytes)
+            tail = file.read(sample_bytes)
+        else:
+            head += file.read()
+    is_complete = not tail
+    content_hash = hashlib.sha256()
+    if not is_complete:
+        content_hash.update(str(size).encode())
+    content_hash.update(head)
+    content_hash.update(tail)
+
+    encoding = options['encoding']
+    if not encoding:
+        encoding = file_get_encoding(filename, rawdata=head[:4096])
+        try:
+            head.decode(encoding)
+        except (UnicodeDecodeError, LookupError):
+            encoding = file_get_encoding(filename, rawdata=head)
+        if codecs.lookup(encoding).name == 'ascii':
+            # Later bytes beyond the sample may not be ascii.
+            encoding = 'utf-8'
+    head_text = head.decode(encoding, errors='replace')
+    tail_text = tail.decode(encoding, errors='replace')
+    if not is_complete:
+        # Drop the partial line at the end of the head and start of the tail.
+        head_text = head_text[:head_text.rfind('\n') + 1]
+        tail_text = tail_text[tail_text.find('\n') + 1:]
+
+    reader_options = {'delimiter': options['delimiter'] or ','}
+    if head_text:
+        # Sniff the dialect on the first complete lines of the head.
+        sniff_text = head_text[:4096]
+        if len(head_text) > 4096:
+            sniff_text = sniff_text[:sniff_text.rfind('\n') + 1] or sniff_text
+        default_options = {}
+        if options['delimiter']:
+            default_options['delimiter'] = options['delimiter']
+        csv_options = file_get_csv_reader_options(filename,
+                                                  default_options,
+                                                  data=sniff_text,
+                                                  encoding=encoding)
+        dialect = csv_options.get('dialect', 'excel')
+        if isinstance(dialect, str):
+            dialect = csv.get_dialect(dialect)
+        for option in ['delimiter', 'quotechar', 'doublequote', 'escapechar',
+                       'skipinitialspace']:
+            value = getattr(dialect, option, None)
+            if value is not None:
+                reader_options[option] = value
+        if options['delimiter']:
+            reader_options['delimiter'] = options['delimiter']
+        elif csv_options.get('delimiter'):
+            reader_options['delimiter'] = csv_options['delimiter']
+
+    head_rows = list(csv.reader(io.StringIO(head_text), **reader_options))
+    tail_rows = list(csv.reader(io.StringIO(tail_text), **reader_options))
+    if is_complete:
+        num_rows = len(head_rows)
+    else:
+        # Estimate rows from the average bytes per row in the head.
+        head_size = len(head_text.encode(encoding, errors='replace'))
+        num_rows = int(size * len(head_rows) / max(head_size, 1))
+    header_rows = file_get_csv_header_rows(head_rows[:10])
+    if is_complete:
+        footer_rows = _file_get_csv_footer_rows(head_rows[header_rows:],
+                                                options['footer_keywords'])
+    else:
+        footer_rows = _file_get_csv_footer_rows(tail_rows,
+                                                options['footer_keywords'])
+    return {
+        'encoding': encoding,
+        'reader_options': reader_options,
+        'header_rows': header_rows,
+        'footer_rows': footer_rows,
+        'footer_start': max(0, num_rows - footer_rows),
+        'num_rows': num_rows,
+        'num_rows_exact': is_complete,
+        'content_hash': content_hash.hexdigest(),
+    }
+
+
 def file_is_csv(filename: str) -> bool:
     """Returns True is the file has a .csv extension or is a spreadsheet."""
     if filename.endswith('.csv') or file_is_google_spreadsheet(filename):
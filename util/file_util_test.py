@@ -13,11 +13,21 @@
 # limitations under the License.
 """Tests for file_util.py"""
 
+import base64
+import csv
+import hashlib
+import http.server
+import json
 import math
 import os
+import re
 import sys
 import tempfile
+import threading
 import unittest
+import urllib.parse
+
+import google_crc32c
 
 from absl import logging
 
@@ -30,6 +40,180 @@ _TEST_DIR = os.path.join(
 
 import file_util
 
+class _FakeGCSHandler(http.server.BaseHTTPRequestHandler):
+    """Handler for a subset of the GCS JSON API with objects in memory."""
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        params = urllib.parse.parse_qs(url.query)
+        self.server.requests.append(('GET', url.path, self.headers['Range']))
+        match = re.match(r'^(/download)?/storage/v1/b/([^/]+)(/o/(.+))?$',
+                         url.path)
+        if not match:
+            return self._send_response(404)
+        bucket = match.group(2)
+        if not match.group(3):
+            return self._send_response(200, {'name': bucket})
+        name = urllib.parse.unquote(match.group(4))
+        content = self.server.objects.get((bucket, name))
+        if content is None:
+            return self._send_response(404, {'error': {'code': 404}})
+        if params.get('alt') != ['media']:
+            return self._send_response(200, _get_object(bucket, name, content))
+        byte_range = self.headers['Range']
+        if not byte_range:
+            return self._send_response(200, content)
+        start, end = byte_range.split('=')[1].split('-')
+        start = int(start)
+        end = min(int(end) if end else len(content), len(content) - 1)
+        return self._send_response(
+            206, content[start:end + 1],
+            {'Content-Range': f'bytes {start}-{end}/{len(content)}'})
+
+    def do_POST(self):
+        # Start a resumable upload.
+        url = urllib.parse.urlparse(self.path)
+        metadata = json.loads(self._read_body() or b'{}')
+        self.server.requests.append(('POST', url.path, None))
+        bucket = url.path.split('/')[5]
+        upload_id = str(len(self.server.uploads))
+        self.server.uploads[upload_id] = (bucket, metadata['name'], [])
+        self._send_response(
+            200, {}, {
+                'Location':
+                    f'http://{self.headers["Host"]}{url.path}'
+                    f'?uploadType=resumable&upload_id={upload_id}'
+            })
+
+    def do_PUT(self):
+        # Upload a chunk for a resumable upload.
+        url = urllib.parse.urlparse(self.path)
+        upload_id = urllib.parse.parse_qs(url.query)['upload_id'][0]
+        bucket, name, chunks = self.server.uploads[upload_id]
+        chunks.append(self._read_body())
+        self.server.requests.append(('PUT', url.path,
+                                     self.headers['Content-Range']))
+        total = self.headers['Content-Range'].split('/')[1]
+        content = b''.join(chunks)
+        if total == '*':
+            return self._send_response(
+                308, b'', {'Range': f'bytes=0-{len(content) - 1}'})
+        self.server.objects[(bucket, name)] = content
+        self._send_response(200, _get_object(bucket, name, content))
+
+    def do_DELETE(self):
+        # Cancel a resumable upload.
+        url = urllib.parse.urlparse(self.path)
+        self.server.requests.append(('DELETE', url.path, None))
+        self._send_response(499)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def _send_response(self, code: int, content=b'', headers: dict = {}):
+        if isinstance(content, dict):
+            content = json.dumps(content).encode()
+        self.send_response(code)
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        return
+
+
+def _get_object(bucket: str, name: str, content: bytes) -> dict:
+    """Returns the metadata for a GCS object."""
+    return {
+        'bucket': bucket,
+        'name': name,
+        'size': str(len(content)),
+        'generation': '1',
+        'crc32c': base64.b64encode(
+            google_crc32c.value(content).to_bytes(4, 'big')).decode(),
+    }
+
+
+class GCSFileIOTest(unittest.TestCase):
+    """Tests for streaming GCS files with a local fake GCS server."""
+
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('localhost', 0),
+                                                      _FakeGCSHandler)
+        self.server.objects = {}
+        self.server.uploads = {}
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self._emulator_host = os.environ.get('STORAGE_EMULATOR_HOST')
+        os.environ['STORAGE_EMULATOR_HOST'] = (
+            f'http://localhost:{self.server.server_port}')
+        file_util._GCS_CLIENT = None
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._emulator_host is None:
+            os.environ.pop('STORAGE_EMULATOR_HOST')
+        else:
+            os.environ['STORAGE_EMULATOR_HOST'] = self._emulator_host
+        file_util._GCS_CLIENT = None
+
+    def test_streaming_read(self):
+        content = 'id,name\n' + ''.join(
+            f'{i},"place\n{i}"\n' for i in range(1000))
+        self.server.objects[('test-bucket', 'dir/test.csv')] = content.encode()
+        with file_util.FileIO('gs://test-bucket/dir/test.csv',
+                              use_tempfile=False,
+                              chunk_size=1000) as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(1001, len(rows))
+        self.assertEqual(['999', 'place\n999'], rows[-1])
+        # Content is read with multiple range requests.
+        range_requests = [r for r in self.server.requests if r[2]]
+        self.assertGreater(len(range_requests), 1)
+        self.assertEqual(
+            b'id,n',
+            file_util.file_get_sample_bytes('gs://test-bucket/dir/test.csv',
+                                            4))
+        with self.assertRaises(FileNotFoundError):
+            file_util.FileIO('gs://test-bucket/dir/missing.csv',
+                             use_tempfile=False)
+
+    def test_streaming_write(self):
+        content = 'id,value\n' * 100000
+        chunk_size = 256 * 1024
+        with file_util.FileIO('gs://test-bucket/dir/output.csv',
+                              mode='w',
+                              use_tempfile=False,
+                              chunk_size=chunk_size) as file:
+            file.write(content)
+        self.assertEqual(
+            content.encode(),
+            self.server.objects[('test-bucket', 'dir/output.csv')])
+        # Content is uploaded in chunks.
+        uploads = [r for r in self.server.requests if r[0] == 'PUT']
+        self.assertEqual(len(content) // chunk_size + 1, len(uploads))
+
+        # Upload is cancelled on errors.
+        with self.assertRaises(ValueError):
+            with file_util.FileIO('gs://test-bucket/dir/error.csv',
+                                  mode='w',
+                                  use_tempfile=False,
+                                  chunk_size=chunk_size) as file:
+                file.write(content)
+                raise ValueError('Failed to write')
+        self.assertNotIn(('test-bucket', 'dir/error.csv'), self.server.objects)
+        self.assertEqual('DELETE', self.server.requests[-1][0])
+
+        # Files written with a temporary copy are read back.
+        with file_util.FileIO('gs://test-bucket/dir/copy.csv',
+                              mode='w') as file:
+            file.write(content)
+        with file_util.FileIO('gs://test-bucket/dir/copy.csv') as file:
+            self.assertEqual(content, file.read())
+
 
 class FileIOTest(unittest.TestCase):
 
@@ -101,6 +285,122 @@ class FileUtilsTest(unittest.TestCase):
                 self.assertTrue(
                     math.isclose(num_lines, estimate_rows, rel_tol=1))
 
+    def test_file_get_csv_ranges(self):
+        rows = [['id', 'name', 'value']]
+        for index in range(100):
+            name = f'place {index}'
+            if index % 10 == 0:
+                # Quoted values with embedded newlines and quotes.
+                name = f'"place\n{index}"\n"'
+            rows.append([str(index), name, str(index * 10)])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'test.csv')
+            with open(filename, 'w', newline='') as fp:
+                csv.writer(fp).writerows(rows)
+            ranges = file_util.file_get_csv_ranges(filename,
+                                                   num_ranges=4,
+                                                   min_range_bytes=100)
+            self.assertEqual(4, len(ranges))
+            self.assertEqual(0, ranges[0]['start'])
+            self.assertEqual(os.path.getsize(filename), ranges[-1]['end'])
+            self.assertEqual(len(rows), sum(r['num_rows'] for r in ranges))
+            # Each range is read independently.
+            range_rows = []
+            for csv_range in reversed(ranges):
+                rows_in_range = list(file_util.file_read_csv_range(csv_range))
+                self.assertEqual(csv_range['num_rows'], len(rows_in_range))
+                range_rows = rows_in_range + range_rows
+            self.assertEqual(rows, range_rows)
+
+    def test_file_get_profile(self):
+        rows = [['Table 1: Population', '', ''], ['place', 'year', 'count']]
+        for index in range(100):
+            rows.append([f'place {index}', '2020', str(index * 10)])
+        rows.append(['Source: census', '', ''])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'test.csv')
+            with open(filename, 'w', newline='') as fp:
+                csv.writer(fp, delimiter=';').writerows(rows)
+            profile_dir = os.path.join(tmp_dir, 'profiles')
+            profile = file_util.file_get_profile(filename,
+                                                 profile_dir=profile_dir)
+            self.assertEqual('utf-8', profile['encoding'])
+            self.assertEqual(';', profile['reader_options']['delimiter'])
+            self.assertEqual(2, profile['header_rows'])
+            self.assertEqual(1, profile['footer_rows'])
+            self.assertEqual(len(rows) - 1, profile['footer_start'])
+            self.assertEqual(len(rows), profile['num_rows'])
+            self.assertTrue(profile['num_rows_exact'])
+            # Profile is saved in a sidecar file and reused.
+            self.assertEqual(1, len(os.listdir(profile_dir)))
+            file_util._FILE_PROFILES.clear()
+            self.assertEqual(
+                profile,
+                file_util.file_get_profile(filename, profile_dir=profile_dir))
+            # Overrides that match the detection reuse the profile.
+            self.assertEqual(
+                profile,
+                file_util.file_get_profile(filename,
+                                           encoding='UTF8',
+                                           delimiter=';',
+                                           footer_keywords=['Source', 'Note',
+                                                            'Data from',
+                                                            'Footnote', '*',
+                                                            '†', '‡'],
+                                           profile_dir=profile_dir))
+            self.assertEqual([filename], list(file_util._FILE_PROFILES))
+            # Other overrides are applied without changing the sidecar.
+            comma_profile = file_util.file_get_profile(
+                filename, delimiter=',', profile_dir=profile_dir)
+            self.assertEqual(',', comma_profile['reader_options']['delimiter'])
+            file_util._FILE_PROFILES.clear()
+            self.assertEqual(
+                profile,
+                file_util.file_get_profile(filename, profile_dir=profile_dir))
+
+            # Row count is estimated from the sample for larger files.
+            with open(filename, 'a', newline='') as fp:
+                csv.writer(fp, delimiter=';').writerows(rows[2:-1] * 10)
+            profile = file_util.file_get_profile(filename,
+                                                 sample_bytes=500,
+                                                 profile_dir=profile_dir)
+            self.assertFalse(profile['num_rows_exact'])
+            self.assertTrue(
+                math.isclose(len(rows) * 11,
+                             profile['num_rows'],
+                             rel_tol=0.2))
+            self.assertEqual(0, profile['footer_rows'])
+
+    def test_file_get_sha256(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'test.csv')
+            content = b'place,count\n' + b'geoId/06,12\n' * 1000
+            with open(filename, 'wb') as fp:
+                fp.write(content)
+            profile_dir = os.path.join(tmp_dir, 'profiles')
+            self.assertEqual(
+                hashlib.sha256(content).hexdigest(),
+                file_util.file_get_sha256(filename, profile_dir=profile_dir))
+            # The hash is saved with the profile in the sidecar.
+            file_util._FILE_PROFILES.clear()
+            profile = file_util.file_get_profile(filename,
+                                                 profile_dir=profile_dir)
+            self.assertEqual(hashlib.sha256(content).hexdigest(),
+                             profile['sha256'])
+
+            # An edit in the middle of the file with the same size changes
+            # the hash.
+            content = (b'place,count\n' + b'geoId/06,12\n' * 300 +
+                       b'geoId/06,13\n' + b'geoId/06,12\n' * 699)
+            with open(filename, 'wb') as fp:
+                fp.write(content)
+            os.utime(filename, ns=(0, os.stat(filename).st_mtime_ns + 10**9))
+            self.assertEqual(
+                hashlib.sha256(content).hexdigest(),
+                file_util.file_get_sha256(filename, profile_dir=profile_dir))
+            self.assertEqual('', file_util.file_get_sha256(
+                os.path.join(tmp_dir, 'missing.csv')))
+
     def test_file_load_csv_dict(self):
         csv_dict = file_util.file_load_csv_dict(
             os.path.join(_TEST_DIR, 'sample_output.csv'), 's2CellId')
@@ -20,6 +20,8 @@ from shapely import geometry
 import datacommons as dc
 import json
 import logging
+import numpy as np
+import shapely
 import time
 import urllib
 
@@ -60,6 +62,37 @@ def _get_continent_map(countries):
     return dc.get_property_values(countries, 'containedInPlace')
 
 
+class _PlaceIndex:
+    """STRtree over prepared place geometries.
+
+    Lookups return the first place, in insertion order, whose geometry
+    contains the point, matching a linear scan over the dict of geojsons.
+    """
+
+    def __init__(self, geojsons):
+        self._places = list(geojsons.keys())
+        geoms = np.array(list(geojsons.values()), dtype=object)
+        shapely.prepare(geoms)
+        self._tree = shapely.STRtree(geoms)
+
+    def lookup_many(self, points):
+        """Returns an array with the containing place (or None) per point."""
+        result = np.full(len(points), None, dtype=object)
+        if not self._places or not len(points):
+            return result
+        point_idx, place_idx = self._tree.query(points, predicate='within')
+        if not len(point_idx):
+            return result
+        # Keep the lowest place index per point to emulate first-match order.
+        order = np.lexsort((place_idx, point_idx))
+        point_idx = point_idx[order]
+        place_idx = place_idx[order]
+        first = np.unique(point_idx, return_index=True)[1]
+        places = np.array(self._places, dtype=object)
+        result[point_idx[first]] = places[place_idx[first]]
+        return result
+
+
 class LatLng2Places:
     """Helper class to map lat/lng to DC places using GeoJSON files.
 
@@ -74,30 +107,40 @@ class LatLng2Places:
             self._us_county_geojsons.update(_get_geojsons('County', state))
         self._continent_map = _get_continent_map(
             [k for k in self._country_geojsons])
+        self._country_index = _PlaceIndex(self._country_geojsons)
+        self._us_state_index = _PlaceIndex(self._us_state_geojsons)
+        self._us_county_index = _PlaceIndex(self._us_county_geojsons)
         print('Loaded',
               len(self._country_geojsons) + len(self._us_state_geojsons),
               'geojsons!')
 
     def resolve(self, lat, lon):
         """Given a lat/long returns a list of place DCIDs that contain it."""
+        return self.resolve_many([lat], [lon])[0]
 
-        point = geometry.Point(lon, lat)
-        country = None
-        for p, gj in self._country_geojsons.items():
-            if gj.contains(point):
-                country = p
-                break
-        cip = []
-        if country == _USA:
-            for p, gj in self._us_state_geojsons.items():
-                if gj.contains(point):
-                    cip.append(p)
-                    break
-            for p, gj in self._us_county_geojsons.items():
-                if gj.contains(point):
-                    cip.append(p.zfill(5))
-                    break
-        if country:
-            cip.append(country)
-            cip.extend(self._continent_map[country])
-        return cip
+    def resolve_many(self, lats, lons):
+        """Given arrays of lats and longs returns a list of place DCIDs
+        containing each point, in the same order as the inputs."""
+        points = shapely.points(np.asarray(lons, dtype=float),
+                                np.asarray(lats, dtype=float))
+        countries = self._country_index.lookup_many(points)
+        num_points = len(points)
+        states = np.full(num_points, None, dtype=object)
+        counties = np.full(num_points, None, dtype=object)
+        us_idx = np.flatnonzero(countries == _USA)
+        if len(us_idx):
+            us_points = points[us_idx]
+            states[us_idx] = self._us_state_index.lookup_many(us_points)
+            counties[us_idx] = self._us_county_index.lookup_many(us_points)
+        results = []
+        for country, state, county in zip(countries, states, counties):
+            cip = []
+            if state:
+                cip.append(state)
+            if county:
+                cip.append(county.zfill(5))
+            if country:
+                cip.append(country)
+                cip.extend(self._continent_map[country])
+            results.append(cip)
+        return results